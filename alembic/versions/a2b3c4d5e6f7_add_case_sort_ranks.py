@@ -0,0 +1,127 @@
+"""cases: stored sort ranks + keyset index
+
+Revision ID: a2b3c4d5e6f7
+Revises: z1a2b3c4d5e6
+Create Date: 2026-10-19
+
+Changes:
+- 新增 cases.change_rank（由 change_flags 算出）與 cases.ping_rank
+  （由 last_ping_reachable 算出），案件列表直接以欄位排序，
+  不再每次查詢時解析 change_flags JSON
+- 新增 (maintenance_id, change_rank, ping_rank, mac_address, id) index：
+  列表的 keyset 分頁依索引順序讀取
+- 既有 Case 依目前的 change_flags / last_ping_reachable 回填
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a2b3c4d5e6f7"
+down_revision: Union[str, None] = "z1a2b3c4d5e6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 與 app.services.case_service.TRACKED_ATTRIBUTES 相同順序
+_TRACKED_ATTRIBUTES = [
+    "ping_reachable", "vlan_id", "acl_rules_applied",
+    "link_status", "speed", "duplex", "interface_name",
+]
+
+
+def _col_exists(conn, table: str, column: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND column_name = :c"
+        ),
+        {"t": table, "c": column},
+    ).scalar()
+    return bool(row)
+
+
+def _index_exists(conn, table: str, index: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND index_name = :i"
+        ),
+        {"t": table, "i": index},
+    ).scalar()
+    return bool(row)
+
+
+def _change_rank(flags) -> int:
+    """與 case_service._change_rank 相同的計算。"""
+    if isinstance(flags, str):
+        flags = json.loads(flags)
+    changed = [bool((flags or {}).get(attr)) for attr in _TRACKED_ATTRIBUTES]
+    rank = len(changed) - sum(changed)
+    for has_change in changed:
+        rank = rank << 1 | (not has_change)
+    return rank
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _col_exists(conn, "cases", "change_rank"):
+        op.add_column(
+            "cases",
+            sa.Column(
+                "change_rank", sa.Integer, nullable=False, server_default="1023",
+            ),
+        )
+    if not _col_exists(conn, "cases", "ping_rank"):
+        op.add_column(
+            "cases",
+            sa.Column(
+                "ping_rank", sa.Integer, nullable=False, server_default="0",
+            ),
+        )
+
+    op.execute(
+        """
+        UPDATE cases
+        SET ping_rank = CASE
+            WHEN last_ping_reachable IS NULL THEN 0
+            WHEN last_ping_reachable = 0 THEN 1
+            ELSE 2
+        END
+        """
+    )
+    rows = conn.execute(
+        sa.text("SELECT id, change_flags FROM cases WHERE change_flags IS NOT NULL")
+    ).fetchall()
+    updates = [
+        {"id": case_id, "rank": rank}
+        for case_id, flags in rows
+        if (rank := _change_rank(flags)) != 1023
+    ]
+    if updates:
+        conn.execute(
+            sa.text("UPDATE cases SET change_rank = :rank WHERE id = :id"),
+            updates,
+        )
+
+    if not _index_exists(conn, "cases", "ix_cases_mid_rank"):
+        op.create_index(
+            "ix_cases_mid_rank",
+            "cases",
+            ["maintenance_id", "change_rank", "ping_rank", "mac_address", "id"],
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if _index_exists(conn, "cases", "ix_cases_mid_rank"):
+        op.drop_index("ix_cases_mid_rank", table_name="cases")
+    for column in ("ping_rank", "change_rank"):
+        if _col_exists(conn, "cases", column):
+            op.drop_column("cases", column)
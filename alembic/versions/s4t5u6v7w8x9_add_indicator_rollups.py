@@ -0,0 +1,75 @@
+"""add indicator_rollups table
+
+Revision ID: s4t5u6v7w8x9
+Revises: r3s4t5u6v7w8
+Create Date: 2026-10-18
+
+Changes:
+- 新增 indicator_rollups：save_batch 寫入時產生的 per-batch 彙總
+  (count/sum/min/max per metric)，供時間序列 / 降採樣查詢使用
+- 既有歷史資料以 scripts/backfill_rollups.py 回填
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "s4t5u6v7w8x9"
+down_revision: Union[str, None] = "r3s4t5u6v7w8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(conn, table: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"
+        ),
+        {"t": table},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "indicator_rollups"):
+        return
+
+    op.create_table(
+        "indicator_rollups",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column(
+            "batch_id", sa.Integer,
+            sa.ForeignKey("collection_batches.id", ondelete="CASCADE"),
+            nullable=False, index=True,
+        ),
+        sa.Column("maintenance_id", sa.String(100), nullable=False),
+        sa.Column("collection_type", sa.String(100), nullable=False),
+        sa.Column("switch_hostname", sa.String(255), nullable=False),
+        sa.Column("collected_at", sa.DateTime, nullable=False),
+        sa.Column("metric", sa.String(50), nullable=False),
+        sa.Column("sample_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("value_sum", sa.Float, nullable=False, server_default="0"),
+        sa.Column("value_min", sa.Float, nullable=True),
+        sa.Column("value_max", sa.Float, nullable=True),
+        sa.UniqueConstraint(
+            "maintenance_id", "collection_type", "switch_hostname",
+            "collected_at", "metric",
+            name="uk_indicator_rollup",
+        ),
+    )
+    op.create_index(
+        "ix_indicator_rollups_series",
+        "indicator_rollups",
+        ["maintenance_id", "collection_type", "metric", "collected_at"],
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "indicator_rollups"):
+        op.drop_table("indicator_rollups")
@@ -0,0 +1,96 @@
+"""add precomputed CRC delta fields to interface_error_records
+
+Revision ID: t5u6v7w8x9y0
+Revises: s4t5u6v7w8x9
+Create Date: 2026-10-18
+
+Changes:
+- interface_error_records: prev_crc_errors / crc_delta / first_growth_at
+  （寫入時與上一個變化點比對產生）+ (maintenance_id, crc_delta) index
+- threshold_config: error_count_growth_window_minutes 覆寫欄位
+- 既有歷史的 crc_delta 以 scripts/backfill_rollups.py --api get_error_count 回填
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "t5u6v7w8x9y0"
+down_revision: Union[str, None] = "s4t5u6v7w8x9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _col_exists(conn, table: str, column: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND column_name = :c"
+        ),
+        {"t": table, "c": column},
+    ).scalar()
+    return bool(row)
+
+
+def _index_exists(conn, table: str, index: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND index_name = :i"
+        ),
+        {"t": table, "i": index},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _col_exists(conn, "interface_error_records", "prev_crc_errors"):
+        op.add_column(
+            "interface_error_records",
+            sa.Column("prev_crc_errors", sa.Integer, nullable=True),
+        )
+    if not _col_exists(conn, "interface_error_records", "crc_delta"):
+        op.add_column(
+            "interface_error_records",
+            sa.Column(
+                "crc_delta", sa.Integer, nullable=False, server_default="0",
+            ),
+        )
+    if not _col_exists(conn, "interface_error_records", "first_growth_at"):
+        op.add_column(
+            "interface_error_records",
+            sa.Column("first_growth_at", sa.DateTime, nullable=True),
+        )
+    if not _index_exists(conn, "interface_error_records", "ix_interface_error_growth"):
+        op.create_index(
+            "ix_interface_error_growth",
+            "interface_error_records",
+            ["maintenance_id", "crc_delta"],
+        )
+
+    if not _col_exists(conn, "threshold_config", "error_count_growth_window_minutes"):
+        op.add_column(
+            "threshold_config",
+            sa.Column("error_count_growth_window_minutes", sa.Integer, nullable=True),
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if _col_exists(conn, "threshold_config", "error_count_growth_window_minutes"):
+        op.drop_column("threshold_config", "error_count_growth_window_minutes")
+
+    if _index_exists(conn, "interface_error_records", "ix_interface_error_growth"):
+        op.drop_index("ix_interface_error_growth", table_name="interface_error_records")
+    for column in ("first_growth_at", "crc_delta", "prev_crc_errors"):
+        if _col_exists(conn, "interface_error_records", column):
+            op.drop_column("interface_error_records", column)
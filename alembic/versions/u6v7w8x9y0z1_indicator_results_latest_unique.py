@@ -0,0 +1,54 @@
+"""make indicator_results hold the latest result per maintenance × indicator
+
+Revision ID: u6v7w8x9y0z1
+Revises: t5u6v7w8x9y0
+Create Date: 2026-10-18
+
+Changes:
+- indicator_results: (maintenance_id, indicator_type) unique constraint
+  背景評估器每輪覆寫最新結果；表內容為衍生資料，先清空舊資料再加約束
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "u6v7w8x9y0z1"
+down_revision: Union[str, None] = "t5u6v7w8x9y0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _constraint_exists(conn, table: str, name: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.table_constraints "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND constraint_name = :n"
+        ),
+        {"t": table, "n": name},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _constraint_exists(conn, "indicator_results", "uk_indicator_result"):
+        return
+    # 下一輪採集後由背景評估器重新產生
+    op.execute("DELETE FROM indicator_results")
+    op.create_unique_constraint(
+        "uk_indicator_result",
+        "indicator_results",
+        ["maintenance_id", "indicator_type"],
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _constraint_exists(conn, "indicator_results", "uk_indicator_result"):
+        op.drop_constraint(
+            "uk_indicator_result", "indicator_results", type_="unique",
+        )
@@ -0,0 +1,96 @@
+"""add validity interval (valid_to) to client_records
+
+Revision ID: v7w8x9y0z1a2
+Revises: u6v7w8x9y0z1
+Create Date: 2026-10-18
+
+Changes:
+- client_records: valid_to（同 MAC 下一個變化點的 collected_at，NULL = 目前狀態）
+  + (maintenance_id, valid_to, collected_at) index，供 as-of 查詢
+- 既有資料以 window function 回填 valid_to
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "v7w8x9y0z1a2"
+down_revision: Union[str, None] = "u6v7w8x9y0z1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _col_exists(conn, table: str, column: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND column_name = :c"
+        ),
+        {"t": table, "c": column},
+    ).scalar()
+    return bool(row)
+
+
+def _index_exists(conn, table: str, index: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND index_name = :i"
+        ),
+        {"t": table, "i": index},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if not _col_exists(conn, "client_records", "valid_to"):
+        op.add_column(
+            "client_records",
+            sa.Column("valid_to", sa.DateTime, nullable=True),
+        )
+
+        # 同一 MAC 可能有多筆同時間點的記錄（同 MAC 多個 client），
+        # 先 DISTINCT 時間點再 LEAD，valid_to 才會是「下一個不同的時間點」
+        op.execute(
+            """
+            UPDATE client_records cr
+            JOIN (
+                SELECT maintenance_id, mac_address, collected_at,
+                       LEAD(collected_at) OVER (
+                           PARTITION BY maintenance_id, mac_address
+                           ORDER BY collected_at
+                       ) AS next_at
+                FROM (
+                    SELECT DISTINCT maintenance_id, mac_address, collected_at
+                    FROM client_records
+                    WHERE mac_address IS NOT NULL
+                ) d
+            ) x
+              ON x.maintenance_id = cr.maintenance_id
+             AND x.mac_address = cr.mac_address
+             AND x.collected_at = cr.collected_at
+            SET cr.valid_to = x.next_at
+            """
+        )
+
+    if not _index_exists(conn, "client_records", "ix_cr_mid_valid"):
+        op.create_index(
+            "ix_cr_mid_valid",
+            "client_records",
+            ["maintenance_id", "valid_to", "collected_at"],
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if _index_exists(conn, "client_records", "ix_cr_mid_valid"):
+        op.drop_index("ix_cr_mid_valid", table_name="client_records")
+    if _col_exists(conn, "client_records", "valid_to"):
+        op.drop_column("client_records", "valid_to")
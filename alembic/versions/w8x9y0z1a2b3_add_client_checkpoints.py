@@ -0,0 +1,64 @@
+"""add client_checkpoints registry
+
+Revision ID: w8x9y0z1a2b3
+Revises: v7w8x9y0z1a2
+Create Date: 2026-10-18
+
+Changes:
+- 新增 client_checkpoints：Client 採集寫入快照時登記每個時間桶的第一個快照，
+  取代每次請求對 client_records 做 DISTINCT collected_at 再分桶
+- 既有資料在第一次登記 / 查詢時由 ClientCheckpointRepo 自動回填
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "w8x9y0z1a2b3"
+down_revision: Union[str, None] = "v7w8x9y0z1a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(conn, table: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"
+        ),
+        {"t": table},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "client_checkpoints"):
+        return
+
+    op.create_table(
+        "client_checkpoints",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("maintenance_id", sa.String(100), nullable=False),
+        sa.Column("interval_minutes", sa.Integer, nullable=False),
+        sa.Column("bucket_key", sa.String(20), nullable=False),
+        sa.Column("checkpoint_time", sa.DateTime, nullable=False),
+        sa.UniqueConstraint(
+            "maintenance_id", "interval_minutes", "bucket_key",
+            name="uk_client_checkpoint",
+        ),
+    )
+    op.create_index(
+        "ix_ccp_mid_interval_time",
+        "client_checkpoints",
+        ["maintenance_id", "interval_minutes", "checkpoint_time"],
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "client_checkpoints"):
+        op.drop_table("client_checkpoints")
@@ -0,0 +1,70 @@
+"""add case_change_states
+
+Revision ID: x9y0z1a2b3c4
+Revises: w8x9y0z1a2b3
+Create Date: 2026-10-18
+
+Changes:
+- 新增 case_change_states：每個 (Case, 追蹤屬性) 的變化偵測狀態，
+  update_change_flags 只把新的 ClientRecord fold 進狀態，不再每輪讀取完整歷史
+- 既有 Case 在第一次更新 change_flags 時由完整歷史建立狀態
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "x9y0z1a2b3c4"
+down_revision: Union[str, None] = "w8x9y0z1a2b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(conn, table: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"
+        ),
+        {"t": table},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "case_change_states"):
+        return
+
+    op.create_table(
+        "case_change_states",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("maintenance_id", sa.String(100), nullable=False),
+        sa.Column(
+            "case_id", sa.Integer,
+            sa.ForeignKey("cases.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("attribute", sa.String(30), nullable=False),
+        sa.Column("distinct_values", sa.JSON, nullable=False),
+        sa.Column("has_none", sa.Boolean, nullable=False),
+        sa.Column("last_value", sa.JSON, nullable=True),
+        sa.Column("transition_at", sa.DateTime, nullable=True),
+        sa.Column("record_count", sa.Integer, nullable=False),
+        sa.Column("last_record_id", sa.Integer, nullable=False),
+        sa.Column("last_collected_at", sa.DateTime, nullable=True),
+        sa.UniqueConstraint("case_id", "attribute", name="uk_case_change_state"),
+    )
+    op.create_index(
+        "ix_case_change_states_maintenance_id",
+        "case_change_states",
+        ["maintenance_id"],
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "case_change_states"):
+        op.drop_table("case_change_states")
@@ -0,0 +1,61 @@
+"""add client_list_changes
+
+Revision ID: y0z1a2b3c4d5
+Revises: x9y0z1a2b3c4
+Create Date: 2026-10-18
+
+Changes:
+- 新增 client_list_changes：Client 清單每次寫入一筆，
+  記憶體中的搜尋索引以此判斷清單是否被其他 process 修改過
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "y0z1a2b3c4d5"
+down_revision: Union[str, None] = "x9y0z1a2b3c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(conn, table: str) -> bool:
+    from sqlalchemy import text
+    row = conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :t"
+        ),
+        {"t": table},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "client_list_changes"):
+        return
+
+    op.create_table(
+        "client_list_changes",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("maintenance_id", sa.String(50), nullable=False),
+        sa.Column("token", sa.String(32), nullable=False),
+        sa.Column(
+            "changed_at", sa.DateTime, server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_clc_mid_id",
+        "client_list_changes",
+        ["maintenance_id", "id"],
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _table_exists(conn, "client_list_changes"):
+        op.drop_table("client_list_changes")
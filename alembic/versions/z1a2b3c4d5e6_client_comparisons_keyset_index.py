@@ -0,0 +1,75 @@
+"""client_comparisons: NOT NULL collected_at + keyset index
+
+Revision ID: z1a2b3c4d5e6
+Revises: y0z1a2b3c4d5
+Create Date: 2026-10-19
+
+Changes:
+- collected_at 改為 NOT NULL（既有 NULL 以 created_at 回填），
+  分頁鍵直接使用欄位，不需 COALESCE
+- 新增 (maintenance_id, collected_at, id) index：列表的 keyset 分頁
+  依索引順序讀取，每頁成本與頁數無關
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "z1a2b3c4d5e6"
+down_revision: Union[str, None] = "y0z1a2b3c4d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_exists(conn, table: str, index: str) -> bool:
+    row = conn.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() "
+            "AND table_name = :t AND index_name = :i"
+        ),
+        {"t": table, "i": index},
+    ).scalar()
+    return bool(row)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    op.execute(
+        """
+        UPDATE client_comparisons
+        SET collected_at = COALESCE(created_at, updated_at, NOW())
+        WHERE collected_at IS NULL
+        """
+    )
+    op.alter_column(
+        "client_comparisons",
+        "collected_at",
+        existing_type=sa.DateTime,
+        existing_server_default=sa.func.now(),
+        nullable=False,
+    )
+
+    if not _index_exists(conn, "client_comparisons", "ix_cc_mid_collected_id"):
+        op.create_index(
+            "ix_cc_mid_collected_id",
+            "client_comparisons",
+            ["maintenance_id", "collected_at", "id"],
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if _index_exists(conn, "client_comparisons", "ix_cc_mid_collected_id"):
+        op.drop_index("ix_cc_mid_collected_id", table_name="client_comparisons")
+    op.alter_column(
+        "client_comparisons",
+        "collected_at",
+        existing_type=sa.DateTime,
+        existing_server_default=sa.func.now(),
+        nullable=True,
+    )
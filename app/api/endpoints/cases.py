@@ -6,26 +6,26 @@ Cases API endpoints.
 from __future__ import annotations
 
 import asyncio
-import csv
-import io
 import json
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import case as sql_case, select, func, and_, or_
+from sqlalchemy import case as sql_case, select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
 from app.db.models import (
     Case, ClientRecord, LatestClientRecord, MaintenanceMacList,
 )
+from app.db.pagination import InvalidCursorError
 from app.api.endpoints.auth import get_current_user, require_write
 from app.services.case_service import (
     ATTRIBUTE_LABELS, CaseService, TRACKED_ATTRIBUTES,
 )
 from app.core.config import settings
+from app.services.csv_export import stream_csv
 from app.services.system_log import write_log
 
 
@@ -65,20 +65,25 @@ async def list_cases(
     include_resolved: bool = Query(False, description="是否包含已解決案件"),
     page: int = Query(1, ge=1, description="頁碼"),
     page_size: int = Query(50, ge=1, le=200, description="每頁筆數"),
+    cursor: str | None = Query(None, description="上一頁回傳的 next_cursor"),
     session: AsyncSession = Depends(get_async_session),
 ) -> dict[str, Any]:
-    """列出指定歲修的所有案件（預設排除已解決，含分頁）。"""
-    result = await _svc.get_cases(
-        maintenance_id=maintenance_id,
-        session=session,
-        assignee=assignee,
-        status=status,
-        ping_reachable=ping_reachable,
-        search=search,
-        include_resolved=include_resolved,
-        page=page,
-        page_size=page_size,
-    )
+    """列出指定歲修的所有案件（預設排除已解決，含頁碼或游標分頁）。"""
+    try:
+        result = await _svc.get_cases(
+            maintenance_id=maintenance_id,
+            session=session,
+            assignee=assignee,
+            status=status,
+            ping_reachable=ping_reachable,
+            search=search,
+            include_resolved=include_resolved,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return {"success": True, **result}
 
 
@@ -123,9 +128,8 @@ async def export_cases_csv(
     search: str | None = Query(None, description="搜尋 MAC、IP 或備註"),
     ping_reachable: bool | None = Query(None, description="篩選 Ping 狀態"),
     include_resolved: bool = Query(False, description="是否包含已解決案件"),
-    session: AsyncSession = Depends(get_async_session),
 ):
-    """匯出案件為 CSV（含最新 client 屬性快照，套用當前篩選條件）。"""
+    """匯出案件為 CSV（含最新 client 屬性快照，套用當前篩選條件，逐批串流）。"""
     from app.core.enums import CaseStatus
 
     # ── 1. 查詢案件 + MAC 資訊（與 list_cases 相同篩選邏輯）──
@@ -182,108 +186,21 @@ async def export_cases_csv(
         Case.mac_address,
     )
 
-    result = await session.execute(stmt)
-    rows = result.all()
-
-    if not rows:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(_csv_header())
-        output.seek(0)
-        content = "\ufeff" + output.getvalue()
-        return StreamingResponse(
-            iter([content.encode("utf-8")]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": (
-                    f'attachment; filename="{maintenance_id}_cases.csv"'
-                ),
-            },
+    # ── 2. 逐批串流案件；每批查該批 client 的最新 ClientRecord 快照 ──
+    async def _format(rows, lookup: AsyncSession):
+        snapshot_map = await _latest_snapshots(
+            lookup,
+            maintenance_id,
+            [case_obj.client_id for case_obj, *_ in rows if case_obj.client_id],
         )
-
-    # ── 2. 批量取每個案件的最新 ClientRecord 快照 ──
-    client_ids = [case_obj.client_id for case_obj, *_ in rows if case_obj.client_id]
-
-    snapshot_map: dict[int, ClientRecord] = {}
-    if client_ids:
-        lcr_stmt = (
-            select(LatestClientRecord.client_id, LatestClientRecord.collected_at)
-            .where(
-                LatestClientRecord.maintenance_id == maintenance_id,
-                LatestClientRecord.client_id.in_(client_ids),
-            )
-        )
-        lcr_result = await session.execute(lcr_stmt)
-        lcr_map = {r.client_id: r.collected_at for r in lcr_result.all()}
-
-        if lcr_map:
-            cr_stmt = (
-                select(ClientRecord)
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                    ClientRecord.client_id.in_(list(lcr_map.keys())),
-                )
-                .order_by(ClientRecord.collected_at.desc())
-            )
-            cr_result = await session.execute(cr_stmt)
-            for cr in cr_result.scalars().all():
-                if cr.client_id not in snapshot_map:
-                    snapshot_map[cr.client_id] = cr
-
-    # ── 3. 生成 CSV ──
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(_csv_header())
-
-    for case_obj, ip_address, description, tenant_group in rows:
-        snap = snapshot_map.get(case_obj.client_id)
-        flags = case_obj.change_flags or {}
-
-        acl_str = ""
-        if snap and snap.acl_rules_applied:
-            acl_raw = snap.acl_rules_applied
-            if isinstance(acl_raw, list):
-                acl_str = ", ".join(str(a) for a in acl_raw)
-            elif isinstance(acl_raw, dict):
-                acl_str = json.dumps(acl_raw, ensure_ascii=False)
-            else:
-                acl_str = str(acl_raw)
-
-        changed_attrs = [
-            ATTRIBUTE_LABELS.get(attr, attr)
-            for attr in TRACKED_ATTRIBUTES
-            if flags.get(attr)
+        return [
+            _case_csv_row(case_obj, ip_address, description, tenant_group,
+                          snapshot_map.get(case_obj.client_id))
+            for case_obj, ip_address, description, tenant_group in rows
         ]
 
-        writer.writerow([
-            case_obj.id,
-            case_obj.mac_address,
-            ip_address or "",
-            description or "",
-            tenant_group.value if tenant_group else "",
-            case_obj.status.value if case_obj.status else "",
-            case_obj.assignee or "",
-            case_obj.summary or "",
-            "是" if case_obj.last_ping_reachable else (
-                "否" if case_obj.last_ping_reachable is False else "未知"
-            ),
-            (snap.switch_hostname if snap else ""),
-            (snap.interface_name if snap else ""),
-            (snap.speed if snap else ""),
-            (snap.duplex if snap else ""),
-            (snap.link_status if snap else ""),
-            (str(snap.vlan_id) if snap and snap.vlan_id is not None else ""),
-            acl_str,
-            ", ".join(changed_attrs) if changed_attrs else "",
-            _to_local(case_obj.created_at),
-            _to_local(case_obj.updated_at),
-        ])
-
-    output.seek(0)
-    content = "\ufeff" + output.getvalue()
-
     return StreamingResponse(
-        iter([content.encode("utf-8")]),
+        stream_csv(stmt, _csv_header(), _format, lookup_session=True),
         media_type="text/csv",
         headers={
             "Content-Disposition": (
@@ -293,6 +210,93 @@ async def export_cases_csv(
     )
 
 
+async def _latest_snapshots(
+    session: AsyncSession,
+    maintenance_id: str,
+    client_ids: list[int],
+) -> dict[int, ClientRecord]:
+    """每個 client 的最新 ClientRecord 快照（只查有 LatestClientRecord 的）。"""
+    snapshot_map: dict[int, ClientRecord] = {}
+    if not client_ids:
+        return snapshot_map
+
+    lcr_stmt = (
+        select(LatestClientRecord.client_id, LatestClientRecord.collected_at)
+        .where(
+            LatestClientRecord.maintenance_id == maintenance_id,
+            LatestClientRecord.client_id.in_(client_ids),
+        )
+    )
+    lcr_result = await session.execute(lcr_stmt)
+    lcr_map = {r.client_id: r.collected_at for r in lcr_result.all()}
+
+    if lcr_map:
+        cr_stmt = (
+            select(ClientRecord)
+            .where(
+                ClientRecord.maintenance_id == maintenance_id,
+                ClientRecord.client_id.in_(list(lcr_map.keys())),
+            )
+            .order_by(ClientRecord.collected_at.desc())
+        )
+        cr_result = await session.execute(cr_stmt)
+        for cr in cr_result.scalars().all():
+            if cr.client_id not in snapshot_map:
+                snapshot_map[cr.client_id] = cr
+    return snapshot_map
+
+
+def _case_csv_row(
+    case_obj: Case,
+    ip_address: str | None,
+    description: str | None,
+    tenant_group: Any,
+    snap: ClientRecord | None,
+) -> list[Any]:
+    """案件 CSV 的一列（欄位順序同 _csv_header）。"""
+    flags = case_obj.change_flags or {}
+
+    acl_str = ""
+    if snap and snap.acl_rules_applied:
+        acl_raw = snap.acl_rules_applied
+        if isinstance(acl_raw, list):
+            acl_str = ", ".join(str(a) for a in acl_raw)
+        elif isinstance(acl_raw, dict):
+            acl_str = json.dumps(acl_raw, ensure_ascii=False)
+        else:
+            acl_str = str(acl_raw)
+
+    changed_attrs = [
+        ATTRIBUTE_LABELS.get(attr, attr)
+        for attr in TRACKED_ATTRIBUTES
+        if flags.get(attr)
+    ]
+
+    return [
+        case_obj.id,
+        case_obj.mac_address,
+        ip_address or "",
+        description or "",
+        tenant_group.value if tenant_group else "",
+        case_obj.status.value if case_obj.status else "",
+        case_obj.assignee or "",
+        case_obj.summary or "",
+        "是" if case_obj.last_ping_reachable else (
+            "否" if case_obj.last_ping_reachable is False else "未知"
+        ),
+        (snap.switch_hostname if snap else ""),
+        (snap.interface_name if snap else ""),
+        (snap.speed if snap else ""),
+        (snap.duplex if snap else ""),
+        (snap.link_status if snap else ""),
+        (str(snap.vlan_id) if snap and snap.vlan_id is not None else ""),
+        acl_str,
+        ", ".join(changed_attrs) if changed_attrs else "",
+        _to_local(case_obj.created_at),
+        _to_local(case_obj.updated_at),
+    ]
+
+
 @router.get("/{maintenance_id}/{case_id}")
 async def get_case_detail(
     maintenance_id: str,
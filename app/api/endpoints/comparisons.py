@@ -5,41 +5,23 @@ Client comparison endpoints.
 """
 from __future__ import annotations
 
+import json
 from datetime import datetime
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.endpoints.auth import get_current_user
 from app.core.config import settings
 from app.db.base import get_async_session
+from app.db.models import ClientComparison
+from app.db.pagination import InvalidCursorError, SortKey, paginate
+from app.repositories.client_checkpoints import ClientCheckpointRepo
 from app.services.client_comparison_service import ClientComparisonService
-
-
-def _get_checkpoint_time_bucket(
-    dt: datetime,
-    interval_minutes: int,
-) -> str:
-    """
-    根據 checkpoint 間隔計算時間桶的 key。
-
-    Args:
-        dt: 時間點
-        interval_minutes: checkpoint 間隔（分鐘）
-
-    Returns:
-        時間桶的 key（用於分組）
-
-    Examples:
-        interval=60: 12:00, 12:30, 12:45 都會變成 "2024-01-01-12-00"
-        interval=30: 12:00 -> "2024-01-01-12-00", 12:30 -> "2024-01-01-12-30"
-        interval=15: 12:00 -> "2024-01-01-12-00", 12:15 -> "2024-01-01-12-15"
-    """
-    # 計算該時間點落在哪個時間桶
-    bucket_minute = (dt.minute // interval_minutes) * interval_minutes
-    return f"{dt.strftime('%Y-%m-%d-%H')}-{bucket_minute:02d}"
+from app.services.csv_export import stream_csv
 
 
 router = APIRouter(
@@ -69,8 +51,7 @@ async def get_checkpoints(
     預設使用第一個 Checkpoint 作為 Before。
     """
     from datetime import timedelta, timezone
-    from sqlalchemy import func, distinct
-    from app.db.models import ClientRecord, MaintenanceConfig
+    from app.db.models import MaintenanceConfig
 
     # 獲取歲修配置
     config_stmt = select(MaintenanceConfig).where(
@@ -85,28 +66,11 @@ async def get_checkpoints(
     from datetime import datetime
     cutoff = datetime.now(timezone.utc) - timedelta(days=max_days)
 
-    # 獲取所有時間點
-    stmt = (
-        select(distinct(ClientRecord.collected_at))
-        .where(
-            ClientRecord.maintenance_id == maintenance_id,
-            ClientRecord.collected_at >= cutoff,
-        )
-        .order_by(ClientRecord.collected_at)
-    )
-    result = await session.execute(stmt)
-    all_timepoints = result.scalars().all()
-
-    # 根據設定的 checkpoint 間隔篩選時間桶（每個時間桶取第一筆）
+    # 採集時登記的 checkpoint（每個時間桶的第一筆快照）
     # 使用第一筆可確保 checkpoint_time ≠ current_time（max collected_at）
-    interval_minutes = settings.checkpoint_interval_minutes
-    time_bucket_checkpoints: dict[str, datetime] = {}
-    for tp in all_timepoints:
-        bucket_key = _get_checkpoint_time_bucket(tp, interval_minutes)
-        if bucket_key not in time_bucket_checkpoints:
-            time_bucket_checkpoints[bucket_key] = tp  # 該時間桶第一筆
-
-    checkpoints = sorted(time_bucket_checkpoints.values())
+    checkpoints = await ClientCheckpointRepo(session).list_since(
+        maintenance_id, cutoff, settings.checkpoint_interval_minutes,
+    )
 
     # 台灣時區 (UTC+8)
     tw_tz = timezone(timedelta(hours=8))
@@ -151,33 +115,16 @@ async def get_checkpoint_summaries(
     當 include_categories=True 時，會額外回傳每個類別的異常數趨勢。
     """
     from datetime import datetime, timedelta, timezone
-    from sqlalchemy import func, distinct
+    from sqlalchemy import func
     from app.db.models import ClientRecord, MaintenanceMacList, ClientCategory, ClientCategoryMember
 
     # 計算截止時間
     cutoff = datetime.now(timezone.utc) - timedelta(days=max_days)
 
-    # 獲取所有 checkpoint 時間點（整點）
-    stmt = (
-        select(distinct(ClientRecord.collected_at))
-        .where(
-            ClientRecord.maintenance_id == maintenance_id,
-            ClientRecord.collected_at >= cutoff,
-        )
-        .order_by(ClientRecord.collected_at)
+    # 採集時登記的 checkpoint（每個時間桶的第一筆快照）
+    checkpoints = await ClientCheckpointRepo(session).list_since(
+        maintenance_id, cutoff, settings.checkpoint_interval_minutes,
     )
-    result = await session.execute(stmt)
-    all_timepoints = result.scalars().all()
-
-    # 根據設定的 checkpoint 間隔篩選時間桶（每個時間桶取第一筆）
-    interval_minutes = settings.checkpoint_interval_minutes
-    time_bucket_checkpoints: dict[str, datetime] = {}
-    for tp in all_timepoints:
-        bucket_key = _get_checkpoint_time_bucket(tp, interval_minutes)
-        if bucket_key not in time_bucket_checkpoints:
-            time_bucket_checkpoints[bucket_key] = tp  # 該時間桶第一筆
-
-    checkpoints = sorted(time_bucket_checkpoints.values())
 
     if not checkpoints:
         return {
@@ -259,53 +206,32 @@ async def get_checkpoint_summaries(
     if not valid_checkpoints and checkpoints:
         valid_checkpoints = checkpoints
 
-    # 批次查詢所有 checkpoint 的比較結果（4 queries instead of 5*N）
-    all_diffs = await comparison_service._generate_checkpoint_diffs_batch(
+    # 單次掃描變化點計數（與 /diff 端點的異常判斷一致，不建立比較物件）
+    counts = await comparison_service.summarize_checkpoints(
         maintenance_id=maintenance_id,
         checkpoint_times=valid_checkpoints,
         current_time=current_time,
         session=session,
+        mac_to_categories=mac_to_categories,
     )
 
     for cp_time in valid_checkpoints:
-        comparisons = all_diffs.get(cp_time, [])
-
-        # 計算異常數量（與 /diff 端點邏輯完全一致）
-        issue_count = 0
-        change_count = 0
-
-        # 按類別統計
-        category_issues: dict[int, int] = {}
-        if include_categories:
-            for cat in categories_info:
-                category_issues[cat["id"]] = 0
-
-        for comp in comparisons:
-            mac = comp.mac_address.upper() if comp.mac_address else ""
-
-            # 判斷是否為異常：有變化或未偵測
-            is_issue = comp.is_changed or comp.severity == "undetected"
-
-            if comp.is_changed:
-                change_count += 1
-
-            if is_issue:
-                issue_count += 1
-                # 更新類別統計
-                if include_categories:
-                    cat_ids = mac_to_categories.get(mac, [])
-                    for cat_id in cat_ids:
-                        if cat_id in category_issues:
-                            category_issues[cat_id] += 1
+        cp_counts = counts[cp_time]
 
         summary_data = {
-            "issue_count": issue_count,
-            "change_count": change_count,
-            "total": registered_total if registered_total > 0 else len(comparisons),
+            "issue_count": cp_counts["issue_count"],
+            "change_count": cp_counts["change_count"],
+            "total": (
+                registered_total if registered_total > 0
+                else cp_counts["mac_count"]
+            ),
         }
 
         if include_categories:
-            summary_data["by_category"] = category_issues
+            summary_data["by_category"] = {
+                cat["id"]: cp_counts["by_category"].get(cat["id"], 0)
+                for cat in categories_info
+            }
 
         summaries[cp_time.isoformat()] = summary_data
 
@@ -543,6 +469,134 @@ async def get_comparison_summary(
         )
 
 
+_EMPTY_SIDE = {
+    "ip_address": None,
+    "switch_hostname": None,
+    "interface_name": None,
+    "vlan_id": None,
+    "speed": None,
+    "duplex": None,
+    "link_status": None,
+    "ping_reachable": None,
+}
+
+# 已保存比較結果的分頁順序（ix_cc_mid_collected_id）
+_COMPARISON_SORT = (
+    SortKey(ClientComparison.collected_at, descending=True),
+    SortKey(ClientComparison.id, descending=True),
+)
+
+
+def _has_any_data(comp: ClientComparison, prefix: str) -> bool:
+    """檢查指定前綴（old/new）是否有任何有效數據。"""
+    fields = [
+        f"{prefix}_switch_hostname",
+        f"{prefix}_interface_name",
+        f"{prefix}_ip_address",
+        f"{prefix}_vlan_id",
+        f"{prefix}_speed",
+        f"{prefix}_duplex",
+        f"{prefix}_link_status",
+    ]
+    for field in fields:
+        value = getattr(comp, field, None)
+        if value is not None and value != "":
+            return True
+    return False
+
+
+def _comparison_result(comp: ClientComparison) -> dict[str, Any]:
+    return {
+        "id": comp.id,
+        "mac_address": comp.mac_address,
+        "is_changed": comp.is_changed,
+        "differences": comp.differences,
+        "notes": comp.notes,
+        "old_detected": _has_any_data(comp, "old"),
+        "new_detected": _has_any_data(comp, "new"),
+        "old": {
+            "ip_address": comp.old_ip_address,
+            "switch_hostname": comp.old_switch_hostname,
+            "interface_name": comp.old_interface_name,
+            "vlan_id": comp.old_vlan_id,
+            "speed": comp.old_speed,
+            "duplex": comp.old_duplex,
+            "link_status": comp.old_link_status,
+            "ping_reachable": comp.old_ping_reachable,
+        },
+        "new": {
+            "ip_address": comp.new_ip_address,
+            "switch_hostname": comp.new_switch_hostname,
+            "interface_name": comp.new_interface_name,
+            "vlan_id": comp.new_vlan_id,
+            "speed": comp.new_speed,
+            "duplex": comp.new_duplex,
+            "link_status": comp.new_link_status,
+            "ping_reachable": comp.new_ping_reachable,
+        },
+        "collected_at": comp.collected_at.isoformat() if comp.collected_at else None,
+    }
+
+
+async def _undetected_results(
+    session: AsyncSession,
+    maintenance_id: str,
+    detected_macs: set[str],
+    search_text: str | None,
+) -> list[dict[str, Any]]:
+    """活躍分類中、不在 detected_macs 的成員（OLD 與 NEW 均未偵測）。"""
+    from app.db.models import ClientCategory, ClientCategoryMember
+
+    # 只獲取該歲修下活躍分類的成員
+    active_cat_stmt = select(ClientCategory.id).where(
+        ClientCategory.is_active == True,
+        ClientCategory.maintenance_id == maintenance_id,
+    )
+    active_cat_result = await session.execute(active_cat_stmt)
+    active_cat_ids = [row[0] for row in active_cat_result.fetchall()]
+
+    member_stmt = (
+        select(ClientCategoryMember)
+        .where(ClientCategoryMember.category_id.in_(active_cat_ids))
+    )
+    member_result = await session.execute(member_stmt)
+    members = member_result.scalars().all()
+
+    # 使用 set 避免重複添加
+    added_undetected_macs = set()
+    results = []
+
+    for member in members:
+        normalized_mac = member.mac_address.upper() if member.mac_address else ""
+        if not normalized_mac:
+            continue
+        if normalized_mac in detected_macs:
+            continue
+        if normalized_mac in added_undetected_macs:
+            continue
+        added_undetected_macs.add(normalized_mac)
+
+        # 檢查搜尋條件
+        if search_text:
+            if search_text.lower() not in normalized_mac.lower():
+                continue
+
+        results.append({
+            "id": None,
+            "mac_address": normalized_mac,
+            "is_changed": False,
+            "differences": {},
+            "notes": "此 MAC 在 OLD 和 NEW 階段均未偵測到",
+            "old_detected": False,
+            "new_detected": False,
+            "old": dict(_EMPTY_SIDE),
+            "new": dict(_EMPTY_SIDE),
+            "collected_at": None,
+            "description": member.description,
+        })
+    return results
+
+
 @router.get("/list/{maintenance_id}")
 async def list_comparisons(
     maintenance_id: str,
@@ -551,6 +605,10 @@ async def list_comparisons(
     search_text: str | None = Query(None, description="搜尋 MAC 地址或 IP 地址"),
     changed_only: bool = Query(False, description="只返回有變化的結果"),
     include_undetected: bool = Query(True, description="是否包含分類成員中未偵測的 MAC"),
+    limit: int | None = Query(
+        None, ge=1, le=2000, description="每頁筆數（未指定則回傳全部）",
+    ),
+    cursor: str | None = Query(None, description="上一頁回傳的 next_cursor"),
     session: AsyncSession = Depends(get_async_session),
 ) -> dict[str, Any]:
     """
@@ -558,155 +616,68 @@ async def list_comparisons(
 
     支持按 MAC 地址、IP 地址和是否變化進行篩選。
     包含分類成員中未偵測到的 MAC。
-    """
-    from sqlalchemy import select
-    from app.db.models import ClientCategoryMember
 
+    指定 limit 時對已保存的結果做 keyset 分頁（collected_at 新到舊），
+    以 next_cursor 取下一頁；未偵測的 MAC 附在最後一頁。before_time
+    的結果為即時計算，不分頁。
+    """
     try:
-        comparisons = await comparison_service.get_comparisons(
-            maintenance_id=maintenance_id,
-            session=session,
-            search_text=search_text,
-            changed_only=changed_only,
-            before_time=before_time,
-        )
-
-        # 建立已偵測到的 MAC 集合
-        detected_macs = {
-            comp.mac_address.upper() for comp in comparisons
-            if comp.mac_address
-        }
+        next_cursor = None
+        if limit and not before_time:
+            stmt = comparison_service.stored_comparisons_query(
+                maintenance_id, search_text, changed_only,
+            )
+            page = await paginate(
+                session,
+                stmt,
+                _COMPARISON_SORT,
+                limit=limit,
+                cursor=cursor,
+            )
+            comparisons = page.scalars()
+            next_cursor = page.next_cursor
+            detected_macs: set[str] | None = None
+            if include_undetected and next_cursor is None:
+                # 最後一頁：已偵測集合需涵蓋所有頁，由資料庫取出
+                matched = stmt.subquery()
+                mac_result = await session.execute(
+                    select(matched.c.mac_address).distinct()
+                )
+                detected_macs = {
+                    mac.upper() for mac in mac_result.scalars() if mac
+                }
+        else:
+            comparisons = await comparison_service.get_comparisons(
+                maintenance_id=maintenance_id,
+                session=session,
+                search_text=search_text,
+                changed_only=changed_only,
+                before_time=before_time,
+            )
+            # 建立已偵測到的 MAC 集合
+            detected_macs = {
+                comp.mac_address.upper() for comp in comparisons
+                if comp.mac_address
+            }
 
         # 轉換為字典格式
-        results = []
-
-        def has_any_data(comp, prefix: str) -> bool:
-            """檢查指定前綴（old/new）是否有任何有效數據。"""
-            fields = [
-                f"{prefix}_switch_hostname",
-                f"{prefix}_interface_name",
-                f"{prefix}_ip_address",
-                f"{prefix}_vlan_id",
-                f"{prefix}_speed",
-                f"{prefix}_duplex",
-                f"{prefix}_link_status",
-            ]
-            for field in fields:
-                value = getattr(comp, field, None)
-                if value is not None and value != "":
-                    return True
-            return False
-
-        for comp in comparisons:
-            old_detected = has_any_data(comp, 'old')
-            new_detected = has_any_data(comp, 'new')
-
-            results.append({
-                "id": comp.id,
-                "mac_address": comp.mac_address,
-                "is_changed": comp.is_changed,
-                "differences": comp.differences,
-                "notes": comp.notes,
-                "old_detected": old_detected,
-                "new_detected": new_detected,
-                "old": {
-                    "ip_address": comp.old_ip_address,
-                    "switch_hostname": comp.old_switch_hostname,
-                    "interface_name": comp.old_interface_name,
-                    "vlan_id": comp.old_vlan_id,
-                    "speed": comp.old_speed,
-                    "duplex": comp.old_duplex,
-                    "link_status": comp.old_link_status,
-                    "ping_reachable": comp.old_ping_reachable,
-                },
-                "new": {
-                    "ip_address": comp.new_ip_address,
-                    "switch_hostname": comp.new_switch_hostname,
-                    "interface_name": comp.new_interface_name,
-                    "vlan_id": comp.new_vlan_id,
-                    "speed": comp.new_speed,
-                    "duplex": comp.new_duplex,
-                    "link_status": comp.new_link_status,
-                    "ping_reachable": comp.new_ping_reachable,
-                },
-                "collected_at": comp.collected_at.isoformat() if comp.collected_at else None,
-            })
+        results = [_comparison_result(comp) for comp in comparisons]
 
         # 如果需要包含未偵測的 MAC
-        if include_undetected:
-            from app.db.models import ClientCategory
-
-            # 只獲取該歲修下活躍分類的成員
-            active_cat_stmt = select(ClientCategory.id).where(
-                ClientCategory.is_active == True,
-                ClientCategory.maintenance_id == maintenance_id,
-            )
-            active_cat_result = await session.execute(active_cat_stmt)
-            active_cat_ids = [row[0] for row in active_cat_result.fetchall()]
-
-            member_stmt = (
-                select(ClientCategoryMember)
-                .where(ClientCategoryMember.category_id.in_(active_cat_ids))
-            )
-            member_result = await session.execute(member_stmt)
-            members = member_result.scalars().all()
-
-            # 使用 set 避免重複添加
-            added_undetected_macs = set()
-
-            for member in members:
-                normalized_mac = member.mac_address.upper() if member.mac_address else ""
-                if not normalized_mac:
-                    continue
-                if normalized_mac in detected_macs:
-                    continue
-                if normalized_mac in added_undetected_macs:
-                    continue
-                added_undetected_macs.add(normalized_mac)
-
-                # 檢查搜尋條件
-                if search_text:
-                    if search_text.lower() not in normalized_mac.lower():
-                        continue
-
-                results.append({
-                    "id": None,
-                    "mac_address": normalized_mac,
-                    "is_changed": False,
-                    "differences": {},
-                    "notes": "此 MAC 在 OLD 和 NEW 階段均未偵測到",
-                    "old_detected": False,
-                    "new_detected": False,
-                    "old": {
-                        "ip_address": None,
-                        "switch_hostname": None,
-                        "interface_name": None,
-                        "vlan_id": None,
-                        "speed": None,
-                        "duplex": None,
-                        "link_status": None,
-                        "ping_reachable": None,
-                    },
-                    "new": {
-                        "ip_address": None,
-                        "switch_hostname": None,
-                        "interface_name": None,
-                        "vlan_id": None,
-                        "speed": None,
-                        "duplex": None,
-                        "link_status": None,
-                        "ping_reachable": None,
-                    },
-                    "collected_at": None,
-                    "description": member.description,
-                })
+        if include_undetected and detected_macs is not None:
+            results.extend(await _undetected_results(
+                session, maintenance_id, detected_macs, search_text,
+            ))
 
         return {
             "success": True,
             "maintenance_id": maintenance_id,
             "count": len(results),
             "results": results,
+            "next_cursor": next_cursor,
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -714,6 +685,61 @@ async def list_comparisons(
         )
 
 
+@router.get("/export-csv/{maintenance_id}")
+async def export_comparisons_csv(
+    maintenance_id: str,
+    _user: Annotated[dict[str, Any], Depends(get_current_user)],
+    search_text: str | None = Query(None, description="搜尋 MAC 地址或 IP 地址"),
+    changed_only: bool = Query(False, description="只匯出有變化的結果"),
+) -> StreamingResponse:
+    """匯出已保存的比較結果為 CSV（依 MAC 排序，逐批串流）。"""
+    stmt = comparison_service.stored_comparisons_query(
+        maintenance_id, search_text, changed_only,
+    ).order_by(ClientComparison.mac_address, ClientComparison.id)
+
+    sides = ("old", "new")
+    fields = (
+        "ip_address", "switch_hostname", "interface_name", "vlan_id",
+        "speed", "duplex", "link_status", "ping_reachable",
+    )
+
+    def _cell(value: Any) -> Any:
+        return "" if value is None else value
+
+    def _format(rows, _lookup):
+        for (comp,) in rows:
+            yield [
+                comp.mac_address or "",
+                "是" if comp.is_changed else "否",
+                *(
+                    _cell(getattr(comp, f"{side}_{field}"))
+                    for side in sides for field in fields
+                ),
+                json.dumps(comp.differences, ensure_ascii=False)
+                if comp.differences else "",
+                comp.notes or "",
+                comp.collected_at.isoformat() if comp.collected_at else "",
+            ]
+
+    return StreamingResponse(
+        stream_csv(
+            stmt,
+            [
+                "mac_address", "is_changed",
+                *(f"{side}_{field}" for side in sides for field in fields),
+                "differences", "notes", "collected_at",
+            ],
+            _format,
+        ),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{maintenance_id}_comparisons.csv"'
+            ),
+        },
+    )
+
+
 @router.get("/detail/{maintenance_id}/{mac_address}")
 async def get_comparison_detail(
     maintenance_id: str,
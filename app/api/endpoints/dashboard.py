@@ -14,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.db.base import get_async_session
 from app.db.models import CollectionError, MaintenanceDeviceList
+from app.repositories.indicator_results import IndicatorResultRepo
 from app.services.indicator_service import IndicatorService
 from app.api.endpoints.auth import get_current_user, check_maintenance_access
 
@@ -86,7 +87,7 @@ async def get_indicator_details(
     """
     check_maintenance_access(user, maintenance_id)
     service = IndicatorService()
-    results = await service.evaluate_all(maintenance_id, session)
+    results, evaluated_at = await service.get_results(maintenance_id, session)
 
     if indicator_type not in results:
         return {"error": f"Unknown indicator type: {indicator_type}"}
@@ -183,6 +184,7 @@ async def get_indicator_details(
         "failures": all_failures,
         "passes": result.passes,
         "collection_errors": ce_count,
+        "evaluated_at": evaluated_at.isoformat(),
     }
 
 
@@ -211,6 +213,8 @@ async def toggle_device_ignore(
     else:
         current.append(indicator_type)
     device.ignored_indicators = current
+    # 忽略設定影響指標結果，已儲存的評估結果失效
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     return {
         "hostname": hostname,
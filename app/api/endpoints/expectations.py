@@ -19,6 +19,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.endpoints.auth import get_current_user, require_write
 from app.db.base import get_async_session as get_session
+from app.repositories.indicator_results import IndicatorResultRepo
 from app.services.system_log import write_log
 from app.core.interfaces import normalize_interface_name
 from app.db.models import (
@@ -231,6 +232,8 @@ async def create_uplink_expectation(
         description=data.description.strip() if data.description else None,
     )
     session.add(item)
+    # 期望是指標驗收基準，已儲存的評估結果失效
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
     _invalidate_uplink_mock_cache()
@@ -382,6 +385,7 @@ async def update_uplink_expectation(
     if data.description is not None:
         item.description = data.description.strip() if data.description else None
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
     _invalidate_uplink_mock_cache()
@@ -424,6 +428,7 @@ async def delete_uplink_expectation(
 
     log_summary = f"刪除 Uplink 期望: {item.hostname}:{item.local_interface}"
     await session.delete(item)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     _invalidate_uplink_mock_cache()
 
@@ -458,6 +463,7 @@ async def batch_delete_uplink_expectations(
         UplinkExpectation.id.in_(item_ids),
     )
     result = await session.execute(stmt)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     _invalidate_uplink_mock_cache()
 
@@ -597,6 +603,7 @@ async def import_uplink_csv(
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     _invalidate_uplink_mock_cache()
 
@@ -830,6 +837,7 @@ async def gnms_topology_import(
         except Exception as e:
             errors.append(f"{entry.hostname}: {e}")
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     _invalidate_uplink_mock_cache()
 
@@ -936,6 +944,7 @@ async def create_version_expectation(
         description=data.description.strip() if data.description else None,
     )
     session.add(item)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
 
@@ -999,6 +1008,7 @@ async def update_version_expectation(
     if data.description is not None:
         item.description = data.description.strip() if data.description else None
     
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
 
@@ -1039,6 +1049,7 @@ async def delete_version_expectation(
 
     log_summary = f"刪除版本期望: {item.hostname}"
     await session.delete(item)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     await write_log(
@@ -1072,6 +1083,7 @@ async def batch_delete_version_expectations(
         VersionExpectation.id.in_(item_ids),
     )
     result = await session.execute(stmt)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     if result.rowcount > 0:
@@ -1199,6 +1211,7 @@ async def import_version_csv(
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
     
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     if imported + updated > 0:
@@ -1334,6 +1347,7 @@ async def create_port_channel_expectation(
         description=data.description.strip() if data.description else None,
     )
     session.add(item)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
 
@@ -1414,6 +1428,7 @@ async def update_port_channel_expectation(
     if data.description is not None:
         item.description = data.description.strip() if data.description else None
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(item)
 
@@ -1455,6 +1470,7 @@ async def delete_port_channel_expectation(
 
     log_summary = f"刪除 Port-Channel 期望: {item.hostname}:{item.port_channel}"
     await session.delete(item)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     await write_log(
@@ -1488,6 +1504,7 @@ async def batch_delete_port_channel_expectations(
         PortChannelExpectation.id.in_(item_ids),
     )
     result = await session.execute(stmt)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     if result.rowcount > 0:
@@ -1626,6 +1643,7 @@ async def import_port_channel_csv(
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     if imported + updated > 0:
@@ -1,7 +1,7 @@
 """
 Indicator API endpoints.
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Annotated, Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -12,6 +12,7 @@ from app.api.endpoints.auth import check_maintenance_access, get_current_user, r
 from app.core.enums import DataType, IndicatorObjectType
 from app.core.timezone import now_utc
 from app.db.base import get_async_session
+from app.indicators.base import compute_bucket_seconds, to_naive_utc
 from app.services.indicator_service import IndicatorService
 from app.services.system_log import write_log
 from app.services.threshold_service import ensure_cache
@@ -93,6 +94,33 @@ class TimeSeriesResponse(BaseModel):
     )
 
 
+class TimeSeriesBucketSchema(BaseModel):
+    """降採樣時間 bucket（各欄位 min/avg/max）。"""
+    timestamp: datetime = Field(..., description="Bucket 起始時間")
+    count: int = Field(..., description="Bucket 內原始資料筆數")
+    min: dict[str, float] = Field(default_factory=dict)
+    avg: dict[str, float] = Field(default_factory=dict)
+    max: dict[str, float] = Field(default_factory=dict)
+
+
+class AggregatedTimeSeriesResponse(BaseModel):
+    """區間聚合時間序列回應（點數固定上限，與歲修長度無關）。"""
+    indicator_name: str = Field(..., description="Indicator 名稱")
+    title: str = Field(..., description="圖表標題")
+    series_names: list[str] = Field(..., description="欄位名稱列表")
+    start: datetime = Field(..., description="查詢起點")
+    end: datetime = Field(..., description="查詢終點")
+    bucket_seconds: int = Field(..., description="每個 bucket 的秒數")
+    data: list[TimeSeriesBucketSchema] = Field(
+        ...,
+        description="依時間排序的 bucket（無資料的 bucket 不回傳）"
+    )
+    display_config: DisplayConfigSchema = Field(
+        ...,
+        description="顯示設定"
+    )
+
+
 class TableColumnSchema(BaseModel):
     """表格欄位定義。"""
     key: str = Field(..., description="欄位識別鍵")
@@ -318,6 +346,75 @@ async def get_indicator_timeseries(
     )
 
 
+@router.get(
+    "/{maintenance_id}/{indicator_name}/timeseries/aggregated",
+    response_model=AggregatedTimeSeriesResponse,
+)
+async def get_indicator_aggregated_timeseries(
+    maintenance_id: str,
+    indicator_name: str,
+    _user: Annotated[dict[str, Any], Depends(get_current_user)],
+    start: Optional[datetime] = Query(None, description="起點（預設 end 前 24 小時）"),
+    end: Optional[datetime] = Query(None, description="終點（預設現在）"),
+    points: int = Query(200, ge=1, le=1000, description="目標資料點數（bucket 數上限）"),
+    session: AsyncSession = Depends(get_async_session),
+) -> AggregatedTimeSeriesResponse:
+    """
+    取得任意區間的降採樣時間序列。
+
+    DB 端以 GROUP BY 分桶計算 min/avg/max，回傳點數不超過 ``points``。
+    """
+    check_maintenance_access(_user, maintenance_id)
+    indicator = indicator_manager.get_indicator(indicator_name)
+
+    if not indicator:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Indicator '{indicator_name}' not found"
+        )
+
+    end = end or now_utc()
+    start = start or (end - timedelta(hours=24))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start 必須早於 end")
+
+    try:
+        buckets = await indicator.get_bucketed_series(
+            session=session,
+            maintenance_id=maintenance_id,
+            start=start,
+            end=end,
+            points=points,
+        )
+    except NotImplementedError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    metadata = indicator.get_metadata()
+    bucket_seconds = compute_bucket_seconds(
+        to_naive_utc(start), to_naive_utc(end), points,
+    )
+
+    return AggregatedTimeSeriesResponse(
+        indicator_name=indicator_name,
+        title=metadata.title,
+        series_names=[f.name for f in metadata.observed_fields],
+        start=start,
+        end=end,
+        bucket_seconds=bucket_seconds,
+        data=[
+            TimeSeriesBucketSchema(**bucket.model_dump())
+            for bucket in buckets
+        ],
+        display_config=DisplayConfigSchema(
+            **{
+                k: v
+                for k, v in metadata.display_config.model_dump().items()
+                if v is not None
+            }
+        ),
+    )
+
+
 @router.get("/{maintenance_id}/{indicator_name}/rawdata", response_model=RawDataTableResponse)
 async def get_indicator_raw_data(
     maintenance_id: str,
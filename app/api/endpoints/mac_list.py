@@ -10,7 +10,9 @@ import io
 import re
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Body, Depends, HTTPException, UploadFile, File, Query
+from fastapi import (
+    APIRouter, Body, Depends, HTTPException, UploadFile, File, Query, Response,
+)
 from pydantic import BaseModel
 
 from app.api.endpoints.auth import get_current_user, require_write
@@ -19,6 +21,7 @@ from sqlalchemy import case, select, func, delete
 
 from app.core.enums import ClientDetectionStatus, TenantGroup
 from app.db.base import get_session_context
+from app.db.pagination import InvalidCursorError, SortKey, paginate
 from app.core.enums import UserRole
 from app.db.models import (
     MaintenanceDeviceList, MaintenanceMacList,
@@ -26,7 +29,9 @@ from app.db.models import (
     PingRecord, LatestCollectionBatch, Case, ClientRecord, ClientComparison,
     SeverityOverride, ReferenceClient, LatestClientRecord,
 )
-from app.services.client_comparison_service import ClientComparisonService
+from app.services.client_search import record_client_changes, search_condition
+from app.services.csv_export import stream_csv
+from app.services.comparison_jobs import get_regeneration, request_regeneration
 from app.services.system_log import write_log
 
 
@@ -93,45 +98,6 @@ MacResponse = ClientResponse
 MacListStats = ClientListStats
 
 
-async def regenerate_comparisons(maintenance_id: str, session=None) -> None:
-    """
-    重新生成客戶端比較結果。
-
-    當 Client 清單變更時（新增、更新、刪除），自動更新比較結果
-    以確保客戶端比較頁面與 Client 清單保持同步。
-
-    注意：使用獨立的 session 來確保能看到最新的已提交資料。
-    """
-    import logging
-    logger = logging.getLogger(__name__)
-
-    try:
-        # 使用新的 session 來確保能看到最新的已提交資料
-        async with get_session_context() as new_session:
-            service = ClientComparisonService()
-            comparisons = await service.generate_comparisons(
-                maintenance_id=maintenance_id,
-                session=new_session,
-            )
-            logger.info(
-                f"Generated {len(comparisons)} comparisons for {maintenance_id}"
-            )
-            await service.save_comparisons(
-                comparisons=comparisons,
-                session=new_session,
-            )
-            logger.info(
-                f"Saved {len(comparisons)} comparisons for {maintenance_id}"
-            )
-    except Exception as e:
-        # 比較生成失敗不應阻擋主要操作，但記錄錯誤
-        logger.error(
-            f"Failed to regenerate comparisons for {maintenance_id}: {e}"
-        )
-        import traceback
-        logger.error(traceback.format_exc())
-
-
 def normalize_mac(mac: str) -> str:
     """標準化 MAC 地址格式。"""
     return mac.strip().upper().replace("-", ":")
@@ -205,6 +171,65 @@ async def resolve_default_assignee(
     return row[0] if row else "系統管理員"
 
 
+class _AssigneeResolver:
+    """
+    批次匯入用的 default_assignee 解析（規則同 resolve_default_assignee）。
+
+    啟用中的使用者只在建立時查一次，逐列驗證不再查 DB。
+    """
+
+    def __init__(self, active_names: set[str], default: str) -> None:
+        self.active_names = active_names
+        self.default = default
+
+    @classmethod
+    async def load(cls, session) -> _AssigneeResolver:
+        stmt = (
+            select(User.display_name, User.role)
+            .where(User.is_active == True)  # noqa: E712
+            .order_by(User.id)
+        )
+        rows = (await session.execute(stmt)).all()
+        default = next(
+            (name for name, role in rows if role == UserRole.ROOT), "系統管理員",
+        )
+        return cls({name for name, _ in rows if name}, default)
+
+    def resolve(self, display_name: str | None) -> str | None:
+        """回傳指派人；指定的使用者不存在或未啟用時回傳 None。"""
+        if display_name and display_name.strip():
+            name = display_name.strip()
+            return name if name in self.active_names else None
+        return self.default
+
+
+# CSV 匯入每批寫入的列數
+_IMPORT_CHUNK_SIZE = 1000
+
+
+async def _insert_new_clients(
+    session,
+    maintenance_id: str,
+    entries: list[dict[str, Any]],
+) -> int:
+    """
+    寫入一批 Client，略過清單中已存在的 MAC。
+
+    一個 IN 查詢找出已存在的 MAC，其餘以一個多列 INSERT 寫入。
+    Returns:
+        實際寫入的筆數。
+    """
+    existing_stmt = select(MaintenanceMacList.mac_address).where(
+        MaintenanceMacList.maintenance_id == maintenance_id,
+        MaintenanceMacList.mac_address.in_([e["mac_address"] for e in entries]),
+    )
+    existing = set((await session.execute(existing_stmt)).scalars().all())
+    new_entries = [e for e in entries if e["mac_address"] not in existing]
+    if new_entries:
+        await session.execute(sa.insert(MaintenanceMacList), new_entries)
+    return len(new_entries)
+
+
 @router.get("/tenant-group-options")
 async def get_tenant_group_options(
     _user: Annotated[dict[str, Any], Depends(get_current_user)],
@@ -233,50 +258,71 @@ async def get_detection_status_options(
     ]
 
 
+async def _client_page(
+    session,
+    stmt: sa.Select[Any],
+    ping_by_ip: sa.Subquery,
+    limit: int,
+    cursor: str | None,
+    offset: int,
+    response: Response,
+) -> list[MaintenanceMacList]:
+    """
+    依（ping 不可達優先, MAC, id）取一頁 Client。
+
+    有 cursor 時以 keyset 接續，否則沿用 offset；還有下一頁時把游標
+    寫入 X-Next-Cursor 回應標頭（回應本體維持 list 以相容既有用戶端）。
+    """
+    ping_priority = case(
+        (ping_by_ip.c.is_reachable == None, 0),   # noqa: E711
+        (ping_by_ip.c.is_reachable == False, 1),   # noqa: E712
+        else_=2,
+    )
+    try:
+        page = await paginate(
+            session,
+            stmt,
+            [
+                SortKey(ping_priority),
+                SortKey(MaintenanceMacList.mac_address),
+                SortKey(MaintenanceMacList.id),
+            ],
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.scalars()
+
+
 @router.get("/{maintenance_id}", response_model=list[ClientResponse])
 async def list_clients(
     maintenance_id: str,
     _user: Annotated[dict[str, Any], Depends(get_current_user)],
+    response: Response,
     search: str | None = Query(None, description="搜尋 MAC、IP 或備註"),
     limit: int = Query(1000, description="返回數量上限"),
-    offset: int = Query(0, description="偏移量"),
+    offset: int = Query(0, description="偏移量（有 cursor 時忽略）"),
+    cursor: str | None = Query(None, description="上一頁回應的 X-Next-Cursor"),
 ) -> list[dict[str, Any]]:
-    """獲取歲修的 Client 清單。"""
+    """
+    獲取歲修的 Client 清單。
+
+    還有下一頁時在 X-Next-Cursor 回應標頭帶游標，下次以 cursor 參數帶回。
+    """
     async with get_session_context() as session:
         stmt = (
             select(MaintenanceMacList)
             .where(MaintenanceMacList.maintenance_id == maintenance_id)
         )
 
-        if search:
-            from sqlalchemy import and_, or_
-            keywords = search.strip().split()
-
-            # 空關鍵字列表時跳過搜尋條件（返回全部結果）
-            if keywords:
-                field_conditions = []
-                # MAC address field (需要轉大寫)
-                mac_match = and_(*[
-                    MaintenanceMacList.mac_address.like(f"%{kw.upper()}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(mac_match)
-
-                # IP address field
-                ip_match = and_(*[
-                    MaintenanceMacList.ip_address.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(ip_match)
-
-                # Description field
-                desc_match = and_(*[
-                    MaintenanceMacList.description.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(desc_match)
-
-                stmt = stmt.where(or_(*field_conditions))
+        # 多關鍵字搜尋（由記憶體索引回答，必要時退回 LIKE）
+        search_filter = await search_condition(session, maintenance_id, search)
+        if search_filter is not None:
+            stmt = stmt.where(search_filter)
 
         # 子查詢：從 ping_records 取每個 IP 的最新 ping 結果
         latest_ping_batches = (
@@ -299,18 +345,9 @@ async def list_clients(
             MaintenanceMacList.ip_address == ping_by_ip.c.ip,
         )
         # 排序：ping 不可達優先
-        stmt = stmt.order_by(
-            case(
-                (ping_by_ip.c.is_reachable == None, 0),   # noqa: E711
-                (ping_by_ip.c.is_reachable == False, 1),   # noqa: E712
-                else_=2,
-            ),
-            MaintenanceMacList.mac_address,
+        clients = await _client_page(
+            session, stmt, ping_by_ip, limit, cursor, offset, response,
         )
-        stmt = stmt.offset(offset).limit(limit)
-
-        result = await session.execute(stmt)
-        clients = result.scalars().all()
 
         return [
             {
@@ -512,6 +549,7 @@ async def add_client(
                 category_ids.append(cat_id)
                 category_names.append(cat.name)
 
+        await record_client_changes(session, maintenance_id, upserted=[entry])
         await session.commit()
         await session.refresh(entry)
 
@@ -523,8 +561,8 @@ async def add_client(
             maintenance_id=maintenance_id,
         )
 
-        # 自動重新生成比較結果
-        await regenerate_comparisons(maintenance_id, session)
+        # 排入比較結果重建（只重算這個 MAC）
+        request_regeneration(maintenance_id, macs=[entry.mac_address])
 
         return {
             "id": entry.id,
@@ -570,6 +608,8 @@ async def update_client(
                 detail=f"Client ID {client_id} 不存在"
             )
 
+        old_mac = entry.mac_address
+
         # 驗證並更新 MAC（若提供）
         if data.mac_address is not None:
             new_mac = validate_mac(data.mac_address)
@@ -595,6 +635,7 @@ async def update_client(
 
         # 注意：編輯功能不處理分類，請使用「分類」按鈕修改分類
 
+        await record_client_changes(session, maintenance_id, upserted=[entry])
         await session.commit()
         await session.refresh(entry)
 
@@ -606,8 +647,10 @@ async def update_client(
             maintenance_id=maintenance_id,
         )
 
-        # 自動重新生成比較結果（MAC 變更可能影響比較）
-        await regenerate_comparisons(maintenance_id, session)
+        # 排入比較結果重建（MAC 變更時新舊 MAC 都要重算）
+        request_regeneration(
+            maintenance_id, macs={old_mac, entry.mac_address},
+        )
 
         return {
             "id": entry.id,
@@ -695,6 +738,9 @@ async def remove_client(
         )
 
         await session.delete(entry)
+        await record_client_changes(
+            session, maintenance_id, deleted_ids=[client_id],
+        )
         await session.commit()
 
     await write_log(
@@ -705,9 +751,8 @@ async def remove_client(
         maintenance_id=maintenance_id,
     )
 
-    # 自動重新生成比較結果（new session context）
-    async with get_session_context() as session2:
-        await regenerate_comparisons(maintenance_id, session2)
+    # 排入比較結果重建（只重算這個 MAC）
+    request_regeneration(maintenance_id, macs=[mac])
 
     return {"message": f"已移除 {mac}"}
 
@@ -727,6 +772,12 @@ async def batch_delete_macs(
         }
 
     async with get_session_context() as session:
+        mac_stmt = select(MaintenanceMacList.mac_address).where(
+            MaintenanceMacList.maintenance_id == maintenance_id,
+            MaintenanceMacList.id.in_(mac_ids),
+        )
+        deleted_macs = (await session.execute(mac_stmt)).scalars().all()
+
         # 從分類中移除這些 client
         del_member_stmt = delete(ClientCategoryMember).where(
             ClientCategoryMember.client_id.in_(mac_ids),
@@ -755,9 +806,13 @@ async def batch_delete_macs(
             MaintenanceMacList.id.in_(mac_ids),
         )
         result = await session.execute(stmt)
+        if result.rowcount > 0:
+            await record_client_changes(
+                session, maintenance_id, deleted_ids=mac_ids,
+            )
         await session.commit()
 
-        # 自動重新生成比較結果
+        # 排入比較結果重建（只重算被刪除的 MAC）
         if result.rowcount > 0:
             await write_log(
                 level="WARNING",
@@ -766,7 +821,7 @@ async def batch_delete_macs(
                 module="client_list",
                 maintenance_id=maintenance_id,
             )
-            await regenerate_comparisons(maintenance_id, session)
+            request_regeneration(maintenance_id, macs=deleted_macs)
 
         return {
             "success": True,
@@ -800,6 +855,7 @@ async def clear_all(
             MaintenanceMacList.maintenance_id == maintenance_id
         )
         result = await session.execute(stmt)
+        await record_client_changes(session, maintenance_id, cleared=True)
         await session.commit()
 
         await write_log(
@@ -810,8 +866,8 @@ async def clear_all(
             maintenance_id=maintenance_id,
         )
 
-        # 自動重新生成比較結果（清空後會是空的）
-        await regenerate_comparisons(maintenance_id, session)
+        # 排入比較結果完整重建
+        request_regeneration(maintenance_id)
 
         return {
             "message": f"已清空 {maintenance_id} 的 MAC 清單",
@@ -837,6 +893,9 @@ async def import_csv(
     - tenant_group: 選填（預設 F18，有效值: F18/F6/AP/F14/F12）
     - description: 選填
     - default_assignee: 選填（必須是已存在的使用者顯示名稱，未指定則預設為系統管理員）
+
+    清單中已存在或檔案內重複的 MAC 計入 skipped；
+    比較結果與案件同步在背景執行（回應中的 comparison_job）。
     """
     async with get_session_context() as session:
         # 如果需要清空現有清單
@@ -846,78 +905,104 @@ async def import_csv(
             )
             await session.execute(del_stmt)
 
-        # 讀取 CSV
-        content = await file.read()
-        try:
-            text = content.decode("utf-8-sig")
-        except UnicodeDecodeError:
-            text = content.decode("utf-8")
-
-        reader = csv.DictReader(io.StringIO(text))
+        assignees = await _AssigneeResolver.load(session)
+        valid_tenant_groups = {t.value for t in TenantGroup}
 
         imported = 0
         skipped = 0
-        errors = []
+        errors: list[str] = []
+        seen_macs: set[str] = set()
+        pending: list[dict[str, Any]] = []
 
-        valid_tenant_groups = {t.value for t in TenantGroup}
+        # 逐列讀取上傳檔（不整份載入記憶體），每 _IMPORT_CHUNK_SIZE 列寫入一次
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        try:
+            for row_num, row in enumerate(csv.DictReader(text), start=2):
+                raw_mac = (row.get("mac_address") or "").strip()
+                raw_ip = (row.get("ip_address") or "").strip()
+                raw_tg = (row.get("tenant_group") or "F18").strip().upper()
+                desc = (row.get("description") or "").strip() or None
+                raw_assignee = (row.get("default_assignee") or "").strip() or None
+
+                # 驗證 MAC
+                if not raw_mac:
+                    errors.append(f"Row {row_num}: MAC 為空")
+                    continue
+                mac = normalize_mac(raw_mac)
+                if not MAC_REGEX.match(mac):
+                    errors.append(f"Row {row_num}: MAC 格式錯誤 ({raw_mac})")
+                    continue
 
-        for row_num, row in enumerate(reader, start=2):
-            raw_mac = row.get("mac_address", "").strip()
-            raw_ip = row.get("ip_address", "").strip()
-            raw_tg = row.get("tenant_group", "F18").strip().upper()
-            desc = row.get("description", "").strip() or None
-            raw_assignee = row.get("default_assignee", "").strip() or None
-
-            # 驗證 MAC
-            if not raw_mac:
-                errors.append(f"Row {row_num}: MAC 為空")
-                continue
-            mac = normalize_mac(raw_mac)
-            if not MAC_REGEX.match(mac):
-                errors.append(f"Row {row_num}: MAC 格式錯誤 ({raw_mac})")
-                continue
-
-            # 驗證 IP
-            if not raw_ip:
-                errors.append(f"Row {row_num}: IP 為空")
-                continue
-            if not IP_REGEX.match(raw_ip):
-                errors.append(f"Row {row_num}: IP 格式錯誤 ({raw_ip})")
-                continue
-
-            # 驗證 tenant_group
-            if raw_tg and raw_tg not in valid_tenant_groups:
-                errors.append(
-                    f"Row {row_num}: 無效的 tenant_group ({raw_tg})"
-                )
-                continue
-            tenant_group = TenantGroup(raw_tg) if raw_tg else TenantGroup.F18
+                # 驗證 IP
+                if not raw_ip:
+                    errors.append(f"Row {row_num}: IP 為空")
+                    continue
+                if not IP_REGEX.match(raw_ip):
+                    errors.append(f"Row {row_num}: IP 格式錯誤 ({raw_ip})")
+                    continue
 
-            # 驗證 default_assignee
-            try:
-                assignee = await resolve_default_assignee(
-                    session, raw_assignee,
-                )
-            except HTTPException as exc:
-                errors.append(f"Row {row_num}: {exc.detail}")
-                continue
+                # 驗證 tenant_group
+                if raw_tg and raw_tg not in valid_tenant_groups:
+                    errors.append(
+                        f"Row {row_num}: 無效的 tenant_group ({raw_tg})"
+                    )
+                    continue
 
-            # 新增 Client
-            entry = MaintenanceMacList(
-                maintenance_id=maintenance_id,
-                mac_address=mac,
-                ip_address=raw_ip,
-                tenant_group=tenant_group,
-                detection_status=ClientDetectionStatus.NOT_CHECKED,
-                description=desc,
-                default_assignee=assignee,
-            )
-            session.add(entry)
-            imported += 1
+                # 驗證 default_assignee
+                assignee = assignees.resolve(raw_assignee)
+                if assignee is None:
+                    errors.append(
+                        f"Row {row_num}: 使用者 '{raw_assignee}' 不存在或未啟用"
+                    )
+                    continue
 
+                # 檔案內重複的 MAC 只取第一筆
+                if mac in seen_macs:
+                    skipped += 1
+                    continue
+                seen_macs.add(mac)
+
+                pending.append({
+                    "maintenance_id": maintenance_id,
+                    "mac_address": mac,
+                    "ip_address": raw_ip,
+                    "tenant_group": TenantGroup(raw_tg) if raw_tg else TenantGroup.F18,
+                    "detection_status": ClientDetectionStatus.NOT_CHECKED,
+                    "description": desc,
+                    "default_assignee": assignee,
+                })
+                if len(pending) >= _IMPORT_CHUNK_SIZE:
+                    inserted = await _insert_new_clients(
+                        session, maintenance_id, pending,
+                    )
+                    imported += inserted
+                    skipped += len(pending) - inserted
+                    pending = []
+        except UnicodeDecodeError as e:
+            raise HTTPException(
+                status_code=400, detail="CSV 編碼錯誤，請使用 UTF-8",
+            ) from e
+        finally:
+            text.detach()  # 不關閉 UploadFile 的底層檔案
+
+        if pending:
+            inserted = await _insert_new_clients(session, maintenance_id, pending)
+            imported += inserted
+            skipped += len(pending) - inserted
+
+        # 多列 INSERT 不取回 id，搜尋索引於下次搜尋時重新載入
+        if replace or imported > 0:
+            await record_client_changes(session, maintenance_id, reload=True)
         await session.commit()
 
-        # 自動重新生成比較結果 + 同步案件
+        result: dict[str, Any] = {
+            "imported": imported,
+            "skipped": skipped,
+            "errors": errors,  # 返回所有錯誤，讓前端顯示完整錯誤清單
+            "total_errors": len(errors),
+        }
+
+        # 比較結果 + 案件同步（為新匯入的 MAC 建立 Case）在背景一次完成
         if imported > 0:
             await write_log(
                 level="INFO",
@@ -926,25 +1011,18 @@ async def import_csv(
                 module="client_list",
                 maintenance_id=maintenance_id,
             )
-            await regenerate_comparisons(maintenance_id, session)
-
-            # 自動同步案件（為新匯入的 MAC 建立 Case 記錄）
-            from app.services.case_service import CaseService
-            case_svc = CaseService()
-            await case_svc.sync_cases(maintenance_id, session)
+            result["comparison_job"] = request_regeneration(
+                maintenance_id, sync_cases=True,
+            ).to_dict()
 
-        return {
-            "imported": imported,
-            "skipped": skipped,
-            "errors": errors,  # 返回所有錯誤，讓前端顯示完整錯誤清單
-            "total_errors": len(errors),
-        }
+        return result
 
 
 @router.get("/{maintenance_id}/detailed")
 async def list_clients_detailed(
     maintenance_id: str,
     _user: Annotated[dict[str, Any], Depends(get_current_user)],
+    response: Response,
     search: str | None = Query(None, description="搜尋 MAC、IP 或備註"),
     filter_status: str | None = Query(
         None, description="detected/mismatch/not_detected/not_checked/all"
@@ -953,41 +1031,24 @@ async def list_clients_detailed(
         None, description="uncategorized/category_id"
     ),
     limit: int = Query(500, description="返回數量上限"),
-    offset: int = Query(0, description="偏移量"),
+    offset: int = Query(0, description="偏移量（有 cursor 時忽略）"),
+    cursor: str | None = Query(None, description="上一頁回應的 X-Next-Cursor"),
 ) -> list[dict[str, Any]]:
-    """獲取詳細 Client 清單（含偵測狀態、分類）。"""
+    """
+    獲取詳細 Client 清單（含偵測狀態、分類）。
+
+    分頁方式同 list_clients（X-Next-Cursor 標頭 + cursor 參數）。
+    """
     async with get_session_context() as session:
         # 獲取所有 Client
         stmt = select(MaintenanceMacList).where(
             MaintenanceMacList.maintenance_id == maintenance_id
         )
 
-        if search:
-            from sqlalchemy import and_, or_
-            keywords = search.strip().split()
-
-            # 空關鍵字列表時跳過搜尋條件（返回全部結果）
-            if keywords:
-                field_conditions = []
-                mac_match = and_(*[
-                    MaintenanceMacList.mac_address.like(f"%{kw.upper()}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(mac_match)
-
-                ip_match = and_(*[
-                    MaintenanceMacList.ip_address.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(ip_match)
-
-                desc_match = and_(*[
-                    MaintenanceMacList.description.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(desc_match)
-
-                stmt = stmt.where(or_(*field_conditions))
+        # 多關鍵字搜尋（由記憶體索引回答，必要時退回 LIKE）
+        search_filter = await search_condition(session, maintenance_id, search)
+        if search_filter is not None:
+            stmt = stmt.where(search_filter)
 
         # ── 在 SQL 層套用 filter_status ──
         if filter_status and filter_status != "all":
@@ -1059,17 +1120,9 @@ async def list_clients_detailed(
             ping_by_ip_d,
             MaintenanceMacList.ip_address == ping_by_ip_d.c.ip,
         )
-        stmt = stmt.order_by(
-            case(
-                (ping_by_ip_d.c.is_reachable == None, 0),   # noqa: E711
-                (ping_by_ip_d.c.is_reachable == False, 1),   # noqa: E712
-                else_=2,
-            ),
-            MaintenanceMacList.mac_address,
+        clients = await _client_page(
+            session, stmt, ping_by_ip_d, limit, cursor, offset, response,
         )
-        stmt = stmt.offset(offset).limit(limit)
-        result = await session.execute(stmt)
-        clients = result.scalars().all()
 
         client_ids = [c.id for c in clients]
 
@@ -1154,7 +1207,7 @@ async def export_csv(
         None, description="uncategorized/category_id"
     ),
 ):
-    """匯出 Client 清單為 CSV（支援搜尋及篩選）。"""
+    """匯出 Client 清單為 CSV（支援搜尋及篩選，逐批串流）。"""
     from fastapi.responses import StreamingResponse
 
     async with get_session_context() as session:
@@ -1163,33 +1216,10 @@ async def export_csv(
             .where(MaintenanceMacList.maintenance_id == maintenance_id)
         )
 
-        # 多關鍵字搜尋
-        if search:
-            from sqlalchemy import and_, or_
-            keywords = search.strip().split()
-
-            # 空關鍵字列表時跳過搜尋條件（返回全部結果）
-            if keywords:
-                field_conditions = []
-                mac_match = and_(*[
-                    MaintenanceMacList.mac_address.like(f"%{kw.upper()}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(mac_match)
-
-                ip_match = and_(*[
-                    MaintenanceMacList.ip_address.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(ip_match)
-
-                desc_match = and_(*[
-                    MaintenanceMacList.description.like(f"%{kw}%")
-                    for kw in keywords
-                ])
-                field_conditions.append(desc_match)
-
-                stmt = stmt.where(or_(*field_conditions))
+        # 多關鍵字搜尋（由記憶體索引回答，必要時退回 LIKE）
+        search_filter = await search_condition(session, maintenance_id, search)
+        if search_filter is not None:
+            stmt = stmt.where(search_filter)
 
         # 在 SQL 層套用 filter_status
         if filter_status and filter_status != "all":
@@ -1268,47 +1298,41 @@ async def export_csv(
         )
         # Add is_reachable to selected columns
         stmt = stmt.add_columns(ping_by_ip_c.c.is_reachable)
-        result = await session.execute(stmt)
-        rows = result.all()
-
-        # 生成 CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow([
-            "mac_address", "ip_address", "ping_reachable",
-            "tenant_group", "description", "default_assignee",
-        ])
-
-        def _reach(v):
-            if v is None:
-                return "未檢測"
-            return "可達" if v else "不可達"
-
-        for row in rows:
-            c = row[0]  # MaintenanceMacList entity
-            reachable = row[1]  # is_reachable from ping join
+
+    # 生成 CSV：串流讀取（server-side cursor），逐批編碼
+    def _reach(v):
+        if v is None:
+            return "未檢測"
+        return "可達" if v else "不可達"
+
+    def _format(rows, _lookup):
+        for c, reachable in rows:  # MaintenanceMacList entity, ping join
             tg = c.tenant_group.value if c.tenant_group else "F18"
-            writer.writerow([
+            yield [
                 c.mac_address,
                 c.ip_address,
                 _reach(reachable),
                 tg,
                 c.description or "",
                 c.default_assignee or "",
-            ])
+            ]
 
-        output.seek(0)
-        content = "\ufeff" + output.getvalue()  # BOM for Excel
-
-        return StreamingResponse(
-            iter([content]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": (
-                    f'attachment; filename="{maintenance_id}_client_list.csv"'
-                )
-            }
-        )
+    return StreamingResponse(
+        stream_csv(
+            stmt,
+            [
+                "mac_address", "ip_address", "ping_reachable",
+                "tenant_group", "description", "default_assignee",
+            ],
+            _format,
+        ),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{maintenance_id}_client_list.csv"'
+            )
+        }
+    )
 
 
 @router.get("/{maintenance_id}/template-csv")
@@ -1546,6 +1570,7 @@ async def gnms_macarp_import(
             return assignee_cache[key]
 
         imported = 0
+        imported_entries: list[MaintenanceMacList] = []
         skipped = 0
         errors: list[str] = []
 
@@ -1595,7 +1620,7 @@ async def gnms_macarp_import(
                 except ValueError:
                     tg = TenantGroup.F18
 
-                session.add(MaintenanceMacList(
+                entry = MaintenanceMacList(
                     maintenance_id=maintenance_id,
                     mac_address=mac,
                     ip_address=raw_ip,
@@ -1603,13 +1628,19 @@ async def gnms_macarp_import(
                     detection_status=ClientDetectionStatus.NOT_CHECKED,
                     description=desc,
                     default_assignee=assignee,
-                ))
+                )
+                session.add(entry)
                 existing_macs.add(mac)
+                imported_entries.append(entry)
                 imported += 1
 
+        if imported_entries:
+            await record_client_changes(
+                session, maintenance_id, upserted=imported_entries,
+            )
         await session.commit()
 
-        # 同步���件 + 比較結果
+        # 案件同步 + 比較結果（背景佇列）
         if imported > 0:
             await write_log(
                 level="INFO",
@@ -1618,11 +1649,11 @@ async def gnms_macarp_import(
                 module="client_list",
                 maintenance_id=maintenance_id,
             )
-            await regenerate_comparisons(maintenance_id, session)
-
-            from app.services.case_service import CaseService
-            case_svc = CaseService()
-            await case_svc.sync_cases(maintenance_id, session)
+            request_regeneration(
+                maintenance_id,
+                macs=[e.mac_address for e in imported_entries],
+                sync_cases=True,
+            )
 
         logger.info(
             "GNMS MacARP import for %s: imported=%d, skipped=%d, errors=%d",
@@ -1649,9 +1680,10 @@ async def detect_clients(
     1. 從 Client 清單載入所有 IP + MAC + tenant_group
     2. 按 tenant_group 分組呼叫 GNMS Ping 檢查可達性
     4. 更新偵測狀態：DETECTED / MISMATCH / NOT_DETECTED
+    5. 觸發比較結果背景重建（不等待完成）
 
     Returns:
-        偵測統計
+        偵測統計，comparison_job 為背景重建的進度
     """
     from app.services.client_collection_service import (
         get_client_collection_service,
@@ -1668,8 +1700,19 @@ async def detect_clients(
         maintenance_id=maintenance_id,
     )
 
-    # 偵測完成後自動重新生成比較結果
-    async with get_session_context() as session:
-        await regenerate_comparisons(maintenance_id, session)
+    # 偵測完成後在背景重新生成比較結果，進度見 /comparisons/regeneration
+    result["comparison_job"] = request_regeneration(maintenance_id).to_dict()
 
     return result
+
+
+@router.get("/{maintenance_id}/comparisons/regeneration")
+async def get_comparison_regeneration(
+    maintenance_id: str,
+    _user: Annotated[dict[str, Any], Depends(get_current_user)],
+) -> dict[str, Any]:
+    """比較結果背景重建的進度（沒有任何 job 時 status 為 idle）。"""
+    job = get_regeneration(maintenance_id)
+    if job is None:
+        return {"maintenance_id": maintenance_id, "status": "idle"}
+    return job.to_dict()
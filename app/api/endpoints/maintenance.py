@@ -17,6 +17,7 @@ from app.db.base import get_async_session
 from app.api.endpoints.auth import require_root, require_write, get_current_user, check_maintenance_access
 from app.core.enums import UserRole
 from app.services.system_log import write_log
+from app.services.client_comparison_service import forget_change_log
 from typing import Annotated
 from sqlalchemy import text
 
@@ -46,18 +47,21 @@ from app.db.models import (
     PowerRecord,
     VersionRecord,
     # Client
+    ClientCheckpoint,
     ClientRecord,
     ClientComparison,
     ClientCategory,
     ClientCategoryMember,
     # Maintenance Lists
     MaintenanceMacList,
+    ClientListChange,
     MaintenanceDeviceList,
     # Contacts (通訊錄)
     Contact,
     ContactCategory,
     # Cases (案件)
     Case,
+    CaseChangeState,
     CaseNote,
     # Meals (餐點)
     MealZone,
@@ -411,7 +415,7 @@ async def delete_maintenance(
         )
         deleted_counts[name] = result.rowcount
 
-    # === 4. 刪除案件相關（先刪 case_notes，再刪 cases）===
+    # === 4. 刪除案件相關（先刪 case_notes / case_change_states，再刪 cases）===
     case_ids_stmt = select(Case.id).where(Case.maintenance_id == maintenance_id)
     case_ids_result = await session.execute(case_ids_stmt)
     case_ids = [row[0] for row in case_ids_result.fetchall()]
@@ -424,6 +428,13 @@ async def delete_maintenance(
     else:
         deleted_counts["case_notes"] = 0
 
+    result = await session.execute(
+        delete(CaseChangeState).where(
+            CaseChangeState.maintenance_id == maintenance_id,
+        )
+    )
+    deleted_counts["case_change_states"] = result.rowcount
+
     result = await session.execute(
         delete(Case).where(Case.maintenance_id == maintenance_id)
     )
@@ -445,6 +456,13 @@ async def delete_maintenance(
     )
     deleted_counts["client_records"] = result.rowcount
 
+    result = await session.execute(
+        delete(ClientCheckpoint).where(
+            ClientCheckpoint.maintenance_id == maintenance_id
+        )
+    )
+    deleted_counts["client_checkpoints"] = result.rowcount
+
     result = await session.execute(
         delete(ClientComparison).where(
             ClientComparison.maintenance_id == maintenance_id
@@ -493,6 +511,13 @@ async def delete_maintenance(
     )
     deleted_counts["mac_list"] = result.rowcount
 
+    result = await session.execute(
+        delete(ClientListChange).where(
+            ClientListChange.maintenance_id == maintenance_id
+        )
+    )
+    deleted_counts["client_list_changes"] = result.rowcount
+
     result = await session.execute(
         delete(MaintenanceDeviceList).where(
             MaintenanceDeviceList.maintenance_id == maintenance_id
@@ -577,6 +602,7 @@ async def delete_maintenance(
     await session.delete(config)
 
     await session.commit()
+    forget_change_log(maintenance_id)
 
     total_deleted = sum(deleted_counts.values())
     await write_log(
@@ -26,6 +26,7 @@ from app.db.models import (
     DEVICE_VENDOR_OPTIONS,
 )
 from app.core.enums import TenantGroup
+from app.repositories.indicator_results import IndicatorResultRepo
 from app.api.endpoints.auth import get_current_user, require_write
 from app.services.system_log import write_log
 from typing import Annotated, Any
@@ -476,6 +477,8 @@ async def create_device(
         description=data.description.strip() if data.description else None,
     )
     session.add(device)
+    # 設備清單是指標分母，已儲存的評估結果失效
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(device)
 
@@ -597,6 +600,7 @@ async def update_device(
             data.description.strip() if data.description else None
         )
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
     await session.refresh(device)
 
@@ -656,6 +660,7 @@ async def delete_device(
         )
 
     await session.delete(device)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     await write_log(
@@ -919,6 +924,7 @@ async def import_csv(
             session.add(device)
             imported += 1
 
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     try:
         await session.commit()
     except IntegrityError as exc:
@@ -974,6 +980,7 @@ async def clear_all(
         MaintenanceDeviceList.maintenance_id == maintenance_id
     )
     result = await session.execute(stmt)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     await write_log(
@@ -1048,6 +1055,7 @@ async def batch_delete_devices(
         MaintenanceDeviceList.id.in_(device_ids),
     )
     result = await session.execute(stmt)
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     if result.rowcount > 0:
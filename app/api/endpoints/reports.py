@@ -2,81 +2,95 @@
 Sanity Check Report API endpoints.
 
 Sanity Check 報告匯出功能的 API 端點。
+報告在背景渲染並依資料版本存檔（見 app.services.report_jobs），
+回應附 ETag；內容未變時瀏覽器帶 If-None-Match 會得到 304。
+產生時間在回傳時才填入，不在存檔的產物內。
 """
 from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.endpoints.auth import get_current_user
 from app.db.base import get_async_session
-from app.services.indicator_service import IndicatorService
-from app.services.report_service import ReportService
+from app.services.report_jobs import (
+    ReportArtifact,
+    ReportKind,
+    get_report,
+    html_kind,
+    request_report,
+)
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
+# 瀏覽器可保存，但每次使用前要重新驗證（ETag）
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _artifact_response(
+    request: Request,
+    artifact: ReportArtifact,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """回傳報告產物；If-None-Match 與 ETag 相同時回 304。"""
+    headers = dict(headers or {})
+    if artifact.etag is not None:
+        headers["ETag"] = artifact.etag
+        headers["Cache-Control"] = _CACHE_CONTROL
+        if _etag_matches(request.headers.get("if-none-match"), artifact.etag):
+            return Response(status_code=304, headers=headers)
+
+    generated_at = artifact.generated_at()
+    headers["Content-Length"] = str(artifact.size(generated_at))
+    return StreamingResponse(
+        artifact.iter_bytes(generated_at),
+        media_type=artifact.media_type,
+        headers=headers,
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 
 @router.get("/maintenance/{maintenance_id}/preview")
 async def preview_report(
     maintenance_id: str,
+    request: Request,
     _user: Annotated[dict[str, Any], Depends(get_current_user)],
     session: AsyncSession = Depends(get_async_session),
-) -> dict[str, Any]:
+) -> Response:
     """
     預覽 Sanity Check 報告內容。
 
     返回 JSON 格式的完整報告數據，供前端預覽或自行處理。
     """
-    service = IndicatorService()
-    summary = await service.get_dashboard_summary(maintenance_id, session)
-
-    # 獲取所有指標的詳細失敗清單
-    results = await service.evaluate_all(maintenance_id, session)
-
-    indicator_details = {}
-    for indicator_type, result in results.items():
-        indicator_details[indicator_type] = {
-            "indicator_type": result.indicator_type,
-            "total_count": result.total_count,
-            "pass_count": result.pass_count,
-            "fail_count": result.fail_count,
-            "pass_rate": result.pass_rate_percent,
-            "failures": result.failures or [],
-            "passes": result.passes or [],
-        }
-
-    # 使用台灣時區 (UTC+8)
-    tw_tz = timezone(timedelta(hours=8))
-
-    return {
-        "maintenance_id": maintenance_id,
-        "generated_at": datetime.now(tw_tz).isoformat(),
-        "summary": summary,
-        "indicators": indicator_details,
-    }
+    artifact = await get_report(maintenance_id, "json", session)
+    return _artifact_response(request, artifact)
 
 
 @router.get("/maintenance/{maintenance_id}/export", response_class=HTMLResponse)
 async def export_report_html(
     maintenance_id: str,
+    request: Request,
     _user: Annotated[dict[str, Any], Depends(get_current_user)],
     include_details: bool = True,
     session: AsyncSession = Depends(get_async_session),
-) -> HTMLResponse:
+) -> Response:
     """
     匯出 Sanity Check 報告為 HTML 格式。
 
     返回可下載的完整 HTML 報告文件。
     """
-    report_service = ReportService()
-    html_content = await report_service.generate_html_report(
-        maintenance_id=maintenance_id,
-        include_details=include_details,
-        session=session,
+    artifact = await get_report(
+        maintenance_id, html_kind(include_details), session,
     )
 
     # 使用台灣時區 (UTC+8)
@@ -86,10 +100,22 @@ async def export_report_html(
         f"{datetime.now(tw_tz).strftime('%Y%m%d_%H%M%S')}.html"
     )
 
-    return HTMLResponse(
-        content=html_content,
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Content-Type": "text/html; charset=utf-8",
-        },
-    )
+    return _artifact_response(request, artifact, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+
+
+@router.post("/maintenance/{maintenance_id}/render", status_code=202)
+async def render_report(
+    maintenance_id: str,
+    _user: Annotated[dict[str, Any], Depends(get_current_user)],
+    kind: ReportKind = "html",
+    session: AsyncSession = Depends(get_async_session),
+) -> dict[str, Any]:
+    """
+    在背景預先渲染報告，立即回傳。
+
+    kind: html / html-summary / json。之後的 preview / export 直接取用產物。
+    """
+    job = await request_report(maintenance_id, kind, session)
+    return job.to_dict()
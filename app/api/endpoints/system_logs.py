@@ -9,14 +9,17 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import delete, func, select, or_
+from sqlalchemy import Select, delete, func, select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.endpoints.auth import get_current_user, require_root
 from app.db.base import get_async_session
 from app.db.models import SystemLog
+from app.db.pagination import InvalidCursorError, SortKey, paginate
+from app.services.csv_export import stream_csv
 from app.services.system_log import write_log
 
 router = APIRouter(prefix="/system-logs", tags=["System Logs"])
@@ -62,22 +65,15 @@ async def report_frontend_error(
 # ── 管理員日誌查詢（ROOT 專用） ──────────────────────────────
 
 
-@router.get("")
-async def get_system_logs(
-    user: Annotated[dict[str, Any], Depends(require_root)],
-    session: AsyncSession = Depends(get_async_session),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=1, le=200),
-    level: str | None = Query(None),
-    source: str | None = Query(None),
-    search: str | None = Query(None),
-    maintenance_id: str | None = Query(None),
-    start_date: str | None = Query(None),
-    end_date: str | None = Query(None),
-) -> dict[str, Any]:
-    """
-    查詢系統日誌（分頁、過濾、搜尋）。
-    """
+def _filtered_logs(
+    level: str | None,
+    source: str | None,
+    search: str | None,
+    maintenance_id: str | None,
+    start_date: str | None,
+    end_date: str | None,
+) -> Select[SystemLog]:
+    """依查詢參數過濾的日誌查詢（未排序，供列表與匯出共用）。"""
     stmt = select(SystemLog)
 
     # 過濾條件
@@ -101,22 +97,63 @@ async def get_system_logs(
     if end_date:
         stmt = stmt.where(SystemLog.created_at <= end_date)
 
-    # 計算總數
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await session.execute(count_stmt)).scalar() or 0
+    return stmt
 
-    # 排序 + 分頁
-    stmt = stmt.order_by(SystemLog.created_at.desc())
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
 
-    result = await session.execute(stmt)
-    logs = result.scalars().all()
+@router.get("")
+async def get_system_logs(
+    user: Annotated[dict[str, Any], Depends(require_root)],
+    session: AsyncSession = Depends(get_async_session),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="上一頁回傳的 next_cursor"),
+    level: str | None = Query(None),
+    source: str | None = Query(None),
+    search: str | None = Query(None),
+    maintenance_id: str | None = Query(None),
+    start_date: str | None = Query(None),
+    end_date: str | None = Query(None),
+) -> dict[str, Any]:
+    """
+    查詢系統日誌（分頁、過濾、搜尋）。
+
+    帶 cursor 時以 keyset 分頁接續上一頁（不重算總數，total 為 None）；
+    否則沿用 page 頁碼分頁。兩種模式都回傳 next_cursor。
+    """
+    stmt = _filtered_logs(
+        level, source, search, maintenance_id, start_date, end_date,
+    )
+
+    # 計算總數（keyset 接續頁不重算）
+    total = total_pages = None
+    if not cursor:
+        count_stmt = select(func.count()).select_from(stmt.subquery())
+        total = (await session.execute(count_stmt)).scalar() or 0
+        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
+
+    # 排序（新到舊，同時間以 id 決定順序）+ 分頁
+    try:
+        result = await paginate(
+            session,
+            stmt,
+            [
+                SortKey(SystemLog.created_at, descending=True),
+                SortKey(SystemLog.id, descending=True),
+            ],
+            limit=page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    logs = result.scalars()
 
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size if total > 0 else 0,
+        "total_pages": total_pages,
+        "next_cursor": result.next_cursor,
         "items": [
             {
                 "id": log.id,
@@ -162,6 +199,57 @@ async def get_system_log_stats(
     }
 
 
+@router.get("/export-csv")
+async def export_system_logs_csv(
+    user: Annotated[dict[str, Any], Depends(require_root)],
+    level: str | None = Query(None),
+    source: str | None = Query(None),
+    search: str | None = Query(None),
+    maintenance_id: str | None = Query(None),
+    start_date: str | None = Query(None),
+    end_date: str | None = Query(None),
+) -> StreamingResponse:
+    """
+    匯出符合過濾條件的日誌為 CSV（新到舊，逐批串流）。
+    """
+    stmt = _filtered_logs(
+        level, source, search, maintenance_id, start_date, end_date,
+    ).order_by(SystemLog.created_at.desc(), SystemLog.id.desc())
+
+    def _format(logs, _lookup):
+        for (log,) in logs:
+            yield [
+                log.created_at.isoformat() if log.created_at else "",
+                log.level,
+                log.source,
+                log.module or "",
+                log.summary,
+                log.detail or "",
+                log.username or "",
+                log.maintenance_id or "",
+                log.request_method or "",
+                log.request_path or "",
+                log.status_code if log.status_code is not None else "",
+                log.ip_address or "",
+            ]
+
+    return StreamingResponse(
+        stream_csv(
+            stmt,
+            [
+                "created_at", "level", "source", "module", "summary", "detail",
+                "username", "maintenance_id", "request_method", "request_path",
+                "status_code", "ip_address",
+            ],
+            _format,
+        ),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": 'attachment; filename="system_logs.csv"',
+        },
+    )
+
+
 @router.delete("/cleanup")
 async def cleanup_system_logs(
     user: Annotated[dict[str, Any], Depends(require_root)],
@@ -8,7 +8,7 @@ from __future__ import annotations
 from typing import Any, Annotated
 
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, model_validator
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
@@ -38,6 +38,7 @@ class ThresholdUpdateRequest(BaseModel):
     transceiver_temperature_max: float | None = None
     transceiver_voltage_min: float | None = None
     transceiver_voltage_max: float | None = None
+    error_count_growth_window_minutes: int | None = Field(default=None, ge=0)
 
     @model_validator(mode="after")
     def check_min_less_than_max(self) -> "ThresholdUpdateRequest":
@@ -2,25 +2,63 @@
 Image upload endpoint for case notes.
 
 案件筆記圖片上傳 API — 使用 MinIO (S3-compatible) 儲存。
+上傳與下載都以串流轉送；下載支援 Range、ETag（If-None-Match → 304），
+熱門圖片由本機磁碟快取回傳（見 app.services.object_cache）。
 """
 from __future__ import annotations
 
+import logging
+import re
 import uuid
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
-from typing import Annotated, Any
+from typing import Annotated, Any, BinaryIO
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
 
 from app.api.endpoints.auth import get_current_user
-from app.services.storage import get_object, upload_file
+from app.services.object_cache import get_object_cache
+from app.services.storage import (
+    ObjectNotFoundError,
+    iter_object,
+    read_file_range,
+    stat_object,
+    upload_stream,
+)
 from app.services.system_log import write_log
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/uploads", tags=["Uploads"])
 
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
 ALLOWED_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 
+# 物件名稱含隨機 ID、上傳後不會被覆寫 → 瀏覽器可長期快取
+_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class _FileTooLargeError(Exception):
+    pass
+
+
+class _LimitedReader:
+    """逐段讀取 UploadFile；累計超過 limit 時中止上傳。"""
+
+    def __init__(self, file: UploadFile, limit: int) -> None:
+        self.file = file
+        self.limit = limit
+        self.read_bytes = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        data = await self.file.read(size)
+        self.read_bytes += len(data)
+        if self.read_bytes > self.limit:
+            raise _FileTooLargeError
+        return data
+
 
 @router.post("/case-image/{maintenance_id}")
 async def upload_case_image(
@@ -36,9 +74,8 @@ async def upload_case_image(
             detail=f"不支援的檔案類型: {file.content_type}",
         )
 
-    # 讀取並驗證大小
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
+    # 驗證大小（multipart 解析後已知大小；未知時邊讀邊檢查）
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="檔案大小超過 5MB 限制")
 
     # 產生唯一檔名
@@ -46,12 +83,18 @@ async def upload_case_image(
     filename = f"{uuid.uuid4().hex[:12]}{ext}"
     object_name = f"cases/{maintenance_id}/{filename}"
 
-    # 上傳至 MinIO
-    url = await upload_file(
-        object_name=object_name,
-        data=content,
-        content_type=file.content_type or "image/jpeg",
-    )
+    # 串流上傳至 MinIO（不整個讀進記憶體）
+    try:
+        url = await upload_stream(
+            object_name=object_name,
+            stream=_LimitedReader(file, MAX_FILE_SIZE),
+            length=file.size if file.size is not None else -1,
+            content_type=file.content_type or "image/jpeg",
+        )
+    except _FileTooLargeError as e:
+        raise HTTPException(
+            status_code=400, detail="檔案大小超過 5MB 限制",
+        ) from e
 
     await write_log(
         level="INFO",
@@ -65,10 +108,110 @@ async def upload_case_image(
 
 
 @router.get("/files/{file_path:path}")
-async def serve_uploaded_file(file_path: str) -> Response:
-    """Proxy S3 objects through the app so browsers only need port 8000."""
-    try:
-        data, content_type = await get_object(file_path)
-    except Exception:
-        raise HTTPException(status_code=404, detail="File not found")
-    return Response(content=data, media_type=content_type)
+async def serve_uploaded_file(file_path: str, request: Request) -> Response:
+    """
+    Proxy S3 objects through the app so browsers only need port 8000.
+
+    串流回傳；支援單一 Range（206 / 416）與 If-None-Match（304），
+    完整下載會順便寫入本機磁碟快取。
+    """
+    cache = get_object_cache()
+    cached = cache.open(file_path) if cache is not None else None
+    if cached is not None:
+        f, info = cached
+    else:
+        f = None
+        try:
+            info = await stat_object(file_path)
+        except ObjectNotFoundError as e:
+            raise HTTPException(status_code=404, detail="File not found") from e
+        except Exception as e:
+            logger.exception("Failed to stat uploaded file %s", file_path)
+            raise HTTPException(status_code=404, detail="File not found") from e
+
+    headers = {
+        "ETag": info.etag,
+        "Cache-Control": _CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), info.etag):
+        if f is not None:
+            f.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == info.etag:
+        try:
+            byte_range = _parse_range(request.headers.get("range"), info.size)
+        except ValueError:
+            if f is not None:
+                f.close()
+            return Response(
+                status_code=416, headers={"Content-Range": f"bytes */{info.size}"},
+            )
+
+    status_code = 200
+    offset, length = 0, info.size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        offset, length = start, end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    headers["Content-Length"] = str(length)
+
+    body: Iterator[bytes] | AsyncIterator[bytes]
+    if f is not None:
+        body = _iter_and_close(f, offset, length)
+    elif byte_range is not None:
+        body = iter_object(file_path, offset, length)
+    else:
+        body = iter_object(file_path)
+        if cache is not None and info.size <= cache.max_object_bytes:
+            body = cache.fill(file_path, info, body)
+
+    return StreamingResponse(
+        body, status_code=status_code, media_type=info.content_type, headers=headers,
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    解析單一 bytes range，回傳 (start, end)（含 end）。
+
+    沒有 Range、格式不支援（含多段 range）時回傳 None → 回傳完整內容；
+    範圍超出檔案時 raise ValueError → 416。
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最後 N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(header)
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _iter_and_close(f: BinaryIO, offset: int, length: int) -> Iterator[bytes]:
+    with f:
+        yield from read_file_range(f, offset, length)
@@ -152,6 +152,26 @@ class Settings(BaseSettings):
 
     # Object Storage (MinIO)
     minio: MinioConfig = MinioConfig()
+    storage_backend: str = Field(
+        default="minio",
+        description="Upload storage backend: 'minio' (MinIO / S3-compatible) "
+        "or 'local' (files under storage_local_dir; for development and tests).",
+    )
+    storage_local_dir: str = Field(
+        default="data/uploads",
+        description="Root directory of the 'local' storage backend.",
+    )
+    upload_cache_dir: str = Field(
+        default="",
+        description="Local disk cache for served upload objects. "
+        "Empty = <system temp dir>/netora-upload-cache.",
+    )
+    upload_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        ge=0,
+        description="Size bound of the upload disk cache (least recently used objects are evicted; "
+        "objects over 1/8 of this are not cached). 0 disables the cache.",
+    )
 
     # Database
     db_host: str = Field(default="localhost", description="DB host")
@@ -205,6 +225,64 @@ class Settings(BaseSettings):
         default=60,
         description="Checkpoint snapshot interval in minutes.",
     )
+    indicator_results_max_age_seconds: int = Field(
+        default=600,
+        ge=0,
+        description="Max age of stored indicator results served by read endpoints. "
+        "Results are re-evaluated for all active maintenances after every collection round; "
+        "older (or missing) results fall back to live evaluation. 0 disables stored results.",
+    )
+    client_state_store_enabled: bool = Field(
+        default=False,
+        description="Keep each maintenance's current client state in an in-process columnar store "
+        "(synced against client_records on every read) for comparisons and summaries.",
+    )
+    client_state_store_max_clients: int = Field(
+        default=200_000,
+        ge=0,
+        description="Maintenances with more MACs than this are not kept in memory "
+        "(about 27 MB per 100k clients).",
+    )
+    client_search_index_enabled: bool = Field(
+        default=True,
+        description="Serve client list searches from an in-process trigram index per maintenance "
+        "(synced against client_list_changes on every search) instead of LIKE scans.",
+    )
+    client_search_index_max_clients: int = Field(
+        default=100_000,
+        ge=0,
+        description="Maintenances with more clients than this are searched with LIKE "
+        "(about 50 MB per 100k clients with short descriptions).",
+    )
+    topology_store_enabled: bool = Field(
+        default=True,
+        description="Keep each maintenance's topology graph (normalized neighbor links, hierarchy levels, "
+        "indicator failure overlay) in process; only devices whose LLDP/CDP batch changed are reloaded.",
+    )
+    report_artifact_dir: str = Field(
+        default="",
+        description="Directory for rendered report artifacts (keyed by maintenance and data version, "
+        "served with ETag). Empty = <system temp dir>/netora-reports.",
+    )
+    client_full_assembly_interval_seconds: int = Field(
+        default=3600,
+        ge=0,
+        description="Client assembly only recomputes clients affected by changed MAC/interface/ACL/"
+        "neighbor/ping batches; every this many seconds it reassembles all clients anyway "
+        "(catches batches written by other processes). 0 = always reassemble all clients.",
+    )
+    comparison_regen_debounce_seconds: float = Field(
+        default=2.0,
+        ge=0,
+        description="Client list edits queue a comparison rebuild that starts once no further "
+        "edit arrives for this many seconds; edits in the window are coalesced into one run.",
+    )
+    comparison_regen_max_delay_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description="Upper bound on how long a continuous burst of edits can postpone "
+        "the queued comparison rebuild.",
+    )
     frontend_polling_interval_seconds: int = Field(
         default=60,
         description="Frontend polling interval in seconds.",
@@ -321,7 +399,12 @@ class Settings(BaseSettings):
         return {s.strip().lower() for s in self.operational_healthy_statuses.split(",") if s.strip()}
 
     # Indicator Thresholds — Error Count
-    # 邏輯：delta = 最新變化點 - 上一個變化點，delta > 0 即異常（無閾值設定）
+    # 邏輯：delta = 最新變化點 - 上一個變化點，delta > 0 即異常
+    error_count_growth_window_minutes: int = Field(
+        default=0,
+        ge=0,
+        description="CRC 增長判定時間窗（分鐘）；0 = 只看最新變化點",
+    )
 
     # Indicator Thresholds — Transceiver (雙向閾值)
     transceiver_tx_power_min: float = Field(
@@ -215,6 +215,9 @@ _MGMT_IFACE_RE = re.compile(
     r"(?i)^(Mgmt|MGE|M-|mgmt|management|MEth)",
 )
 
+# 同上規則的小寫 prefix（供 SQL ``LOWER(col) LIKE 'prefix%'`` 過濾使用）
+MANAGEMENT_INTERFACE_PREFIXES = ("mgmt", "mge", "m-", "management", "meth")
+
 
 def is_management_interface(name: str) -> bool:
     """判斷是否為管理介面（正規化前後均可）。"""
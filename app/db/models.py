@@ -224,6 +224,52 @@ class LatestCollectionBatch(Base):
         )
 
 
+class IndicatorRollup(Base):
+    """
+    Per-batch 指標彙總（寫入時由 save_batch 產生）。
+
+    每個變化點 batch × metric 一筆 count/sum/min/max，
+    時間序列與降採樣查詢只讀此表，不再掃 typed rows。
+    可由 scripts/backfill_rollups.py 從 collection_batches 歷史重建。
+
+    local only — 尚未同步至生產。
+    """
+
+    __tablename__ = "indicator_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "maintenance_id", "collection_type", "switch_hostname",
+            "collected_at", "metric",
+            name="uk_indicator_rollup",
+        ),
+        Index(
+            "ix_indicator_rollups_series",
+            "maintenance_id", "collection_type", "metric", "collected_at",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    batch_id: Mapped[int] = mapped_column(
+        ForeignKey("collection_batches.id", ondelete="CASCADE"), index=True,
+    )
+    maintenance_id: Mapped[str] = mapped_column(String(100))
+    collection_type: Mapped[str] = mapped_column(String(100))
+    switch_hostname: Mapped[str] = mapped_column(String(255))
+    collected_at: Mapped[datetime] = mapped_column(DateTime)
+
+    metric: Mapped[str] = mapped_column(String(50))
+    sample_count: Mapped[int] = mapped_column(Integer, default=0)
+    value_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    value_min: Mapped[float | None] = mapped_column(Float, nullable=True)
+    value_max: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        return (
+            f"<IndicatorRollup {self.collection_type}.{self.metric}"
+            f"@{self.switch_hostname}>"
+        )
+
+
 # ── Typed Record Models ──────────────────────────────────────────
 
 
@@ -294,9 +340,17 @@ class NeighborRecord(Base):
 
 
 class InterfaceErrorRecord(Base):
-    """介面錯誤計數（對應 interface_error_records）。"""
+    """
+    介面錯誤計數（對應 interface_error_records）。
+
+    prev_crc_errors / crc_delta / first_growth_at 由寫入時與同設備
+    上一個變化點比對產生，評估時直接以 crc_delta > 0 過濾。
+    """
 
     __tablename__ = "interface_error_records"
+    __table_args__ = (
+        Index("ix_interface_error_growth", "maintenance_id", "crc_delta"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     batch_id: Mapped[int] = mapped_column(
@@ -314,6 +368,11 @@ class InterfaceErrorRecord(Base):
     giants: Mapped[int] = mapped_column(Integer, default=0)
     runts: Mapped[int] = mapped_column(Integer, default=0)
 
+    # 寫入時預先計算的增量（local only）
+    prev_crc_errors: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    crc_delta: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    first_growth_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f"<InterfaceErrorRecord {self.switch_hostname}:{self.interface_name}>"
 
@@ -635,7 +694,7 @@ class ThresholdConfig(Base):
     transceiver_temperature_max: Mapped[float | None] = mapped_column(Float, nullable=True)
     transceiver_voltage_min: Mapped[float | None] = mapped_column(Float, nullable=True)
     transceiver_voltage_max: Mapped[float | None] = mapped_column(Float, nullable=True)
-
+    error_count_growth_window_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), onupdate=func.now(),
@@ -651,9 +710,19 @@ class ThresholdConfig(Base):
 
 
 class IndicatorResult(Base):
-    """指標評估結果（歷史記錄）。"""
+    """
+    指標評估結果（每個歲修 × 指標保留最新一筆）。
+
+    由背景評估器在每輪採集後批次寫入，讀取端點直接查詢，
+    不必每次請求都重新評估。
+    """
 
     __tablename__ = "indicator_results"
+    __table_args__ = (
+        UniqueConstraint(
+            "maintenance_id", "indicator_type", name="uk_indicator_result",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     indicator_type: Mapped[str] = mapped_column(String(100), index=True)
@@ -696,6 +765,34 @@ class Checkpoint(Base):
     )
 
 
+class ClientCheckpoint(Base):
+    """
+    Client 快照的 checkpoint 時間點（每個時間桶的第一個快照）。
+
+    由 Client 採集寫入快照時登記，列表 / 摘要端點直接查詢，
+    不必每次對 client_records 做 DISTINCT collected_at 再分桶。
+    interval_minutes 記錄分桶間隔，設定變更後以新間隔重新回填。
+    """
+
+    __tablename__ = "client_checkpoints"
+    __table_args__ = (
+        UniqueConstraint(
+            "maintenance_id", "interval_minutes", "bucket_key",
+            name="uk_client_checkpoint",
+        ),
+        Index(
+            "ix_ccp_mid_interval_time",
+            "maintenance_id", "interval_minutes", "checkpoint_time",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    maintenance_id: Mapped[str] = mapped_column(String(100))
+    interval_minutes: Mapped[int] = mapped_column(Integer)
+    bucket_key: Mapped[str] = mapped_column(String(20))
+    checkpoint_time: Mapped[datetime] = mapped_column(DateTime)
+
+
 class ClientCategory(Base):
     """客戶分類。"""
 
@@ -740,13 +837,17 @@ class ClientComparison(Base):
     """客戶比較記錄。"""
 
     __tablename__ = "client_comparisons"
+    __table_args__ = (
+        # 列表的 keyset 分頁：collected_at 新到舊、同時間依 id
+        Index("ix_cc_mid_collected_id", "maintenance_id", "collected_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     maintenance_id: Mapped[str | None] = mapped_column(
         String(50), nullable=True, index=True,
     )
-    collected_at: Mapped[datetime | None] = mapped_column(
-        DateTime, nullable=True, index=True, server_default=func.now(),
+    collected_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, index=True, server_default=func.now(),
     )
     client_id: Mapped[int | None] = mapped_column(
         ForeignKey("maintenance_mac_list.id", ondelete="SET NULL"),
@@ -787,12 +888,20 @@ class ClientComparison(Base):
 
 
 class ClientRecord(Base):
-    """客戶記錄。"""
+    """
+    客戶記錄。
+
+    只在資料變化時寫入（變化點），[collected_at, valid_to) 為該狀態的有效區間：
+    同一 MAC 寫入較新的記錄時，舊記錄的 valid_to 設為新記錄的 collected_at；
+    valid_to 為 NULL 表示仍是目前狀態。「時間 T 所有 MAC 的狀態」
+    = collected_at <= T AND (valid_to IS NULL OR valid_to > T)。
+    """
 
     __tablename__ = "client_records"
     __table_args__ = (
         Index("ix_cr_mid_mac_ts", "maintenance_id", "mac_address", "collected_at"),
         Index("ix_cr_mid_cid_ts", "maintenance_id", "client_id", "collected_at"),
+        Index("ix_cr_mid_valid", "maintenance_id", "valid_to", "collected_at"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -820,6 +929,7 @@ class ClientRecord(Base):
     acl_rules_applied: Mapped[str | None] = mapped_column(JSON, nullable=True)
     raw_data: Mapped[str | None] = mapped_column(Text, nullable=True)
     parsed_data: Mapped[str | None] = mapped_column(JSON, nullable=True)
+    valid_to: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime | None] = mapped_column(
         DateTime, server_default=func.now(),
     )
@@ -954,6 +1064,27 @@ class MaintenanceMacList(Base):
     )
 
 
+class ClientListChange(Base):
+    """
+    Client 清單的異動紀錄（每次寫入清單一筆）。
+
+    各 process 的搜尋索引以 (筆數, 最大 id) 判斷清單是否被修改過；
+    token 由寫入端產生，同一 process 寫入的異動可直接套用到索引。
+    """
+
+    __tablename__ = "client_list_changes"
+    __table_args__ = (
+        Index("ix_clc_mid_id", "maintenance_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    maintenance_id: Mapped[str] = mapped_column(String(50))
+    token: Mapped[str] = mapped_column(String(32))
+    changed_at: Mapped[datetime | None] = mapped_column(
+        DateTime, server_default=func.now(),
+    )
+
+
 class Case(Base):
     """案件（每個 Client 一個案件）。"""
 
@@ -964,6 +1095,11 @@ class Case(Base):
             name="uk_case_maintenance_client",
         ),
         Index("ix_cases_mid_status_ping", "maintenance_id", "status", "last_ping_reachable"),
+        # 案件列表的 keyset 分頁（change_rank → ping_rank → MAC → id）
+        Index(
+            "ix_cases_mid_rank",
+            "maintenance_id", "change_rank", "ping_rank", "mac_address", "id",
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -988,6 +1124,11 @@ class Case(Base):
         Boolean, nullable=True,
     )
 
+    # 列表排序用：未知=0、不可達=1、可達=2（與 last_ping_reachable 一起寫入）
+    ping_rank: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0",
+    )
+
     # Ping 可達起始時間（用於 anti-flapping：持續可達 10 分鐘才自動結案）
     ping_reachable_since: Mapped[datetime | None] = mapped_column(
         DateTime, nullable=True,
@@ -998,6 +1139,12 @@ class Case(Base):
         JSON, nullable=True,
     )
 
+    # 由 change_flags 算出的列表排序值（越小越前面，與 change_flags 一起寫入）；
+    # 1023 = 沒有任何變化
+    change_rank: Mapped[int] = mapped_column(
+        Integer, default=1023, server_default="1023",
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(),
     )
@@ -1022,6 +1169,43 @@ class CaseNote(Base):
     )
 
 
+class CaseChangeState(Base):
+    """
+    Case 每個追蹤屬性的變化偵測狀態（change_flags 的增量來源）。
+
+    依 (collected_at, id) 順序 fold 該 client 的 ClientRecord：出現過的
+    不同非空值（最多記兩個）、是否出現過空值、最後一個值、
+    最近一次 空值→有值 的時間。record_count / last_record_id / last_collected_at
+    為已 fold 的範圍，用來只套用新記錄並偵測刪除或亂序寫入。
+    """
+
+    __tablename__ = "case_change_states"
+    __table_args__ = (
+        UniqueConstraint("case_id", "attribute", name="uk_case_change_state"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    maintenance_id: Mapped[str] = mapped_column(String(100), index=True)
+    case_id: Mapped[int] = mapped_column(
+        ForeignKey("cases.id", ondelete="CASCADE"),
+    )
+    attribute: Mapped[str] = mapped_column(String(30))
+
+    # 出現過的不同非空值（str），超過一個即有變化，因此最多保留兩個
+    distinct_values: Mapped[list[str]] = mapped_column(JSON, default=list)
+    has_none: Mapped[bool] = mapped_column(Boolean, default=False)
+    last_value: Mapped[str | None] = mapped_column(JSON, nullable=True)
+    transition_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True,
+    )
+
+    record_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_record_id: Mapped[int] = mapped_column(Integer, default=0)
+    last_collected_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True,
+    )
+
+
 class MealZone(Base):
     """餐點配送區域。"""
 
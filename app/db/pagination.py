@@ -0,0 +1,153 @@
+"""
+Keyset (seek) pagination.
+
+OFFSET 分頁讓資料庫掃過並丟棄前面所有列，越後面的頁越慢；keyset 分頁以
+上一頁最後一列的排序鍵為起點（``WHERE (k1, k2, id) > (...)`` 的展開式），
+每頁成本只與頁大小有關。
+
+- 排序鍵的最後一個必須唯一決定順序（通常是主鍵 id）
+- 鍵值不可為 NULL（NULL 無法比較大小；可為 NULL 的欄位請先 COALESCE）
+- 游標為排序鍵值的 base64url JSON，對用戶端不透明，只能原樣帶回
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class InvalidCursorError(ValueError):
+    """游標無法解碼或與排序鍵數量不符。"""
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """分頁排序鍵：一個 SQL 運算式與方向。"""
+
+    expression: ColumnElement[Any] | InstrumentedAttribute[Any]
+    descending: bool = False
+
+    def order_by(self) -> ColumnElement[Any] | InstrumentedAttribute[Any]:
+        return self.expression.desc() if self.descending else self.expression
+
+
+@dataclass
+class KeysetPage:
+    """一頁查詢結果；next_cursor 為 None 表示已是最後一頁。"""
+
+    rows: list[tuple[Any, ...]]
+    next_cursor: str | None
+
+    def scalars(self) -> list[Any]:
+        """每列的第一個欄位（select 單一實體時即 ORM 物件）。"""
+        return [row[0] for row in self.rows]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+        raise ValueError(f"unknown cursor value {value!r}")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """排序鍵值 → 游標字串。"""
+    raw = json.dumps(
+        [_encode_value(v) for v in values], separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """游標字串 → 排序鍵值；格式不符時拋出 InvalidCursorError。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor does not match sort keys")
+        values = [_decode_value(v) for v in values]
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError(f"無效的分頁游標: {cursor!r}") from e
+    if any(v is None for v in values):
+        raise InvalidCursorError(f"無效的分頁游標: {cursor!r}")
+    return values
+
+
+def seek_condition(
+    keys: Sequence[SortKey],
+    values: Sequence[Any],
+) -> ColumnElement[bool]:
+    """
+    排在 values 之後的列的條件。
+
+    (k1, k2, k3) > (v1, v2, v3) 展開為
+    k1 > v1 OR (k1 = v1 AND k2 > v2) OR (k1 = v1 AND k2 = v2 AND k3 > v3)，
+    每個鍵依自己的方向比較（DESC 用 <）。不用 row-value 比較：
+    方向混合時無法表達，且 MariaDB 對展開式的索引範圍掃描較穩定。
+    """
+    terms = []
+    for i, key in enumerate(keys):
+        value = values[i]
+        after = key.expression < value if key.descending else key.expression > value
+        terms.append(and_(
+            *(k.expression == v for k, v in zip(keys[:i], values[:i], strict=True)),
+            after,
+        ))
+    return or_(*terms)
+
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select[*tuple[Any, ...]],
+    keys: Sequence[SortKey],
+    limit: int,
+    cursor: str | None = None,
+    offset: int = 0,
+) -> KeysetPage:
+    """
+    依 keys 排序取一頁。
+
+    stmt 不應自帶 ORDER BY / LIMIT。有 cursor 時從游標之後開始（offset 忽略），
+    否則套用 offset（相容舊的頁碼分頁）。回傳的每列欄位與 stmt 相同；
+    多取一列判斷是否還有下一頁。
+
+    Raises:
+        InvalidCursorError: cursor 無法解碼。
+    """
+    width = len(stmt.column_descriptions)
+    stmt = stmt.add_columns(
+        *(key.expression.label(f"_seek_{i}") for i, key in enumerate(keys))
+    ).order_by(*(key.order_by() for key in keys))
+
+    if cursor:
+        stmt = stmt.where(seek_condition(keys, decode_cursor(cursor, len(keys))))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    fetched = (await session.execute(stmt.limit(limit + 1))).all()
+    rows = fetched[:limit]
+    next_cursor = None
+    if rows and len(fetched) > limit:
+        next_cursor = encode_cursor(tuple(rows[-1][width:]))
+    return KeysetPage([tuple(row[:width]) for row in rows], next_cursor)
@@ -0,0 +1,56 @@
+"""
+Dialect-portable SQL helpers.
+
+生產環境為 MariaDB，單元 / 整合測試使用 SQLite；此處集中定義
+兩者語法不同、但查詢需要用到的 SQL 函式。
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Insert, Integer, insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class epoch_seconds(FunctionElement[int]):  # noqa: N801 — SQL function style
+    """
+    Seconds since 1970-01-01 for a naive (UTC) DATETIME column.
+
+    不使用 MariaDB ``UNIX_TIMESTAMP()``：它會套用 session time zone，
+    而 collected_at 一律以 naive UTC 儲存。``TIMESTAMPDIFF`` 為純算術。
+    """
+
+    type = Integer()
+    inherit_cache = True
+    name = "epoch_seconds"
+
+
+@compiles(epoch_seconds)
+def _epoch_seconds_mysql(element: Any, compiler: Any, **kw: Any) -> str:
+    return (
+        "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', "
+        f"{compiler.process(element.clauses, **kw)})"
+    )
+
+
+@compiles(epoch_seconds, "sqlite")
+def _epoch_seconds_sqlite(element: Any, compiler: Any, **kw: Any) -> str:
+    return (
+        "CAST(strftime('%s', "
+        f"{compiler.process(element.clauses, **kw)}) AS INTEGER)"
+    )
+
+
+def insert_ignore(table: Any) -> Insert:
+    """
+    INSERT that skips rows conflicting with a unique key.
+
+    MariaDB 為 ``INSERT IGNORE``、SQLite 為 ``INSERT OR IGNORE``；
+    用於多個請求可能同時寫入同一筆冪等資料的情況。
+    """
+    return (
+        insert(table)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
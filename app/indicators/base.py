@@ -5,8 +5,10 @@ All indicator evaluators inherit from BaseIndicator.
 """
 from __future__ import annotations
 
+import math
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from pydantic import BaseModel
@@ -54,6 +56,58 @@ class TimeSeriesPoint(BaseModel):
     values: dict[str, float]
 
 
+class TimeSeriesBucket(BaseModel):
+    """A downsampled time bucket with per-field min/avg/max."""
+    timestamp: datetime  # bucket 起始時間
+    count: int  # bucket 內原始資料筆數
+    min: dict[str, float]
+    avg: dict[str, float]
+    max: dict[str, float]
+
+
+def compute_bucket_seconds(start: datetime, end: datetime, points: int) -> int:
+    """Bucket width (seconds, >= 1) so that [start, end) yields <= points buckets."""
+    span = (end - start).total_seconds()
+    return max(1, math.ceil(span / max(points, 1)))
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Normalise a query datetime to naive UTC (collected_at storage format)."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def buckets_from_aggregates(
+    rows: list[dict[str, Any]],
+    fields: tuple[str, ...],
+    start: datetime,
+    bucket_seconds: int,
+) -> list[TimeSeriesBucket]:
+    """Convert repo ``get_bucketed_aggregates`` rows into TimeSeriesBucket."""
+    buckets: list[TimeSeriesBucket] = []
+    for row in rows:
+        mins: dict[str, float] = {}
+        avgs: dict[str, float] = {}
+        maxs: dict[str, float] = {}
+        for name in fields:
+            if row.get(f"{name}_avg") is None:
+                continue
+            mins[name] = float(row[f"{name}_min"])
+            avgs[name] = float(row[f"{name}_avg"])
+            maxs[name] = float(row[f"{name}_max"])
+        buckets.append(TimeSeriesBucket(
+            timestamp=start + timedelta(
+                seconds=int(row["bucket"]) * bucket_seconds,
+            ),
+            count=int(row["count"]),
+            min=mins,
+            avg=avgs,
+            max=maxs,
+        ))
+    return buckets
+
+
 class RawDataRow(BaseModel):
     """Base class for raw data rows (subclasses define specific fields)."""
     model_config = {"extra": "allow"}
@@ -105,12 +159,29 @@ class BaseIndicator(ABC):
         maintenance_id: str,
     ) -> list[str]:
         """取得目前在設備清單中的新設備 hostname 列表（指標分母來源）。"""
-        stmt = select(MaintenanceDeviceList.new_hostname).where(
-            MaintenanceDeviceList.maintenance_id == maintenance_id,
+        by_mid = await BaseIndicator._get_active_device_hostnames_many(
+            session, [maintenance_id],
+        )
+        return by_mid[maintenance_id]
+
+    @staticmethod
+    async def _get_active_device_hostnames_many(
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, list[str]]:
+        """多個歲修的設備 hostname（單一 IN 查詢），依歲修分組。"""
+        stmt = select(
+            MaintenanceDeviceList.maintenance_id,
+            MaintenanceDeviceList.new_hostname,
+        ).where(
+            MaintenanceDeviceList.maintenance_id.in_(maintenance_ids),
             MaintenanceDeviceList.new_hostname.isnot(None),
         )
         result = await session.execute(stmt)
-        return [row[0] for row in result.all()]
+        by_mid: dict[str, list[str]] = {mid: [] for mid in maintenance_ids}
+        for mid, hostname in result.all():
+            by_mid[mid].append(hostname)
+        return by_mid
 
     @staticmethod
     async def _get_collected_devices(
@@ -119,12 +190,30 @@ class BaseIndicator(ABC):
         collection_type: str,
     ) -> set[str]:
         """查詢已有採集 batch 的設備集合（用於區分「無資料」vs「未採集」）。"""
-        stmt = select(LatestCollectionBatch.switch_hostname).where(
-            LatestCollectionBatch.maintenance_id == maintenance_id,
+        by_mid = await BaseIndicator._get_collected_devices_many(
+            session, [maintenance_id], collection_type,
+        )
+        return by_mid[maintenance_id]
+
+    @staticmethod
+    async def _get_collected_devices_many(
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+        collection_type: str,
+    ) -> dict[str, set[str]]:
+        """多個歲修已有採集 batch 的設備集合，依歲修分組。"""
+        stmt = select(
+            LatestCollectionBatch.maintenance_id,
+            LatestCollectionBatch.switch_hostname,
+        ).where(
+            LatestCollectionBatch.maintenance_id.in_(maintenance_ids),
             LatestCollectionBatch.collection_type == collection_type,
         )
         result = await session.execute(stmt)
-        return {row[0] for row in result.all()}
+        by_mid: dict[str, set[str]] = {mid: set() for mid in maintenance_ids}
+        for mid, hostname in result.all():
+            by_mid[mid].add(hostname)
+        return by_mid
 
     @staticmethod
     async def _get_error_devices(
@@ -133,12 +222,30 @@ class BaseIndicator(ABC):
         collection_type: str,
     ) -> set[str]:
         """查詢有採集錯誤的設備集合（SNMP 失敗但寫了空 batch）。"""
-        stmt = select(CollectionError.switch_hostname).where(
-            CollectionError.maintenance_id == maintenance_id,
+        by_mid = await BaseIndicator._get_error_devices_many(
+            session, [maintenance_id], collection_type,
+        )
+        return by_mid[maintenance_id]
+
+    @staticmethod
+    async def _get_error_devices_many(
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+        collection_type: str,
+    ) -> dict[str, set[str]]:
+        """多個歲修有採集錯誤的設備集合，依歲修分組。"""
+        stmt = select(
+            CollectionError.maintenance_id,
+            CollectionError.switch_hostname,
+        ).where(
+            CollectionError.maintenance_id.in_(maintenance_ids),
             CollectionError.collection_type == collection_type,
         )
         result = await session.execute(stmt)
-        return {row[0] for row in result.all()}
+        by_mid: dict[str, set[str]] = {mid: set() for mid in maintenance_ids}
+        for mid, hostname in result.all():
+            by_mid[mid].add(hostname)
+        return by_mid
 
     @abstractmethod
     async def evaluate(
@@ -158,6 +265,28 @@ class BaseIndicator(ABC):
         """
         ...
 
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """
+        Evaluate several maintenance operations at once.
+
+        背景評估器每輪呼叫一次；子類以 maintenance_id IN (...) 一次取回
+        所有歲修的資料後逐一計算。預設逐一呼叫 evaluate。
+
+        Args:
+            maintenance_ids: The maintenance operation IDs
+            session: Database session
+
+        Returns:
+            maintenance_id → IndicatorEvaluationResult
+        """
+        return {
+            mid: await self.evaluate(mid, session) for mid in maintenance_ids
+        }
+
     @abstractmethod
     def get_metadata(self) -> IndicatorMetadata:
         """
@@ -188,6 +317,27 @@ class BaseIndicator(ABC):
         """
         ...
 
+    async def get_bucketed_series(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        start: datetime,
+        end: datetime,
+        points: int,
+    ) -> list[TimeSeriesBucket]:
+        """
+        Get a downsampled series over [start, end) with at most *points* buckets.
+
+        只有數值型指標（光模塊、錯誤計數）提供；其他指標維持
+        get_time_series 的通過率序列。
+
+        Raises:
+            NotImplementedError: indicator has no numeric fields to aggregate
+        """
+        raise NotImplementedError(
+            f"{self.indicator_type} 不支援區間聚合時間序列"
+        )
+
     @abstractmethod
     async def get_latest_raw_data(
         self,
@@ -9,17 +9,22 @@ Interface Error Count indicator evaluator (device-level).
     delta = 最新變化點 crc_errors - 上一個變化點 crc_errors
     若任一介面 delta > 0 → 該設備異常
 
+delta 於寫入時由 InterfaceErrorRecordRepo 計算並存於 row（crc_delta），
+評估只需過濾 crc_delta > 0。設定 error_count_growth_window_minutes 時，
+改為「最近 N 分鐘內任一變化點有增長」即異常。
+
 設備無採集紀錄 → 失敗。
 只有一筆 batch（首次採集）時：無歷史可比，視為通過。
 """
 from __future__ import annotations
 
 from collections import defaultdict
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import CollectionBatch, InterfaceErrorRecord
 from app.indicators.base import (
     BaseIndicator,
     DisplayConfig,
@@ -27,9 +32,15 @@ from app.indicators.base import (
     IndicatorMetadata,
     ObservedField,
     RawDataRow,
+    TimeSeriesBucket,
     TimeSeriesPoint,
+    buckets_from_aggregates,
+    compute_bucket_seconds,
+    to_naive_utc,
 )
+from app.repositories.rollups import IndicatorRollupRepo
 from app.repositories.typed_records import InterfaceErrorRecordRepo
+from app.services.threshold_service import get_threshold
 
 
 class ErrorCountIndicator(BaseIndicator):
@@ -53,52 +64,93 @@ class ErrorCountIndicator(BaseIndicator):
             session, maintenance_id,
         )
         if not device_hostnames:
-            return IndicatorEvaluationResult(
-                indicator_type=self.indicator_type,
-                maintenance_id=maintenance_id,
-                total_count=0, pass_count=0, fail_count=0,
-                pass_rates={"error_no_growth": 0},
-                summary="無設備資料",
-            )
+            return self._evaluate_loaded(maintenance_id, [], {}, set(), [])
 
         repo = InterfaceErrorRecordRepo(session)
-        active_set = set(device_hostnames)
 
-        # 0. 查詢採集狀態（區分「零錯誤」vs「採集失敗」vs「尚未採集」）
-        collected_devices = await self._get_collected_devices(
-            session, maintenance_id, "get_error_count",
-        )
+        # 查詢採集狀態（區分「零錯誤」vs「採集失敗」vs「尚未採集」）
+        item_counts = await repo.get_latest_item_counts(maintenance_id)
         error_devices = await self._get_error_devices(
             session, maintenance_id, "get_error_count",
         )
 
-        # 1. 取最新採集（per device 最新 batch 的所有 rows）
-        current_records = await repo.get_latest_per_device(maintenance_id)
+        # 只取 crc_delta > 0 的介面（增量於寫入時預先計算）
+        growth_rows = await repo.get_growing_interfaces(
+            maintenance_id, since=self._growth_since(maintenance_id),
+        )
+        return self._evaluate_loaded(
+            maintenance_id, device_hostnames, item_counts, error_devices,
+            growth_rows,
+        )
 
-        # 2. 按 device 分組（只保留設備清單中的設備），記錄 latest batch_id
-        device_batch: dict[str, int] = {}
-        current_by_device: dict[str, list[InterfaceErrorRecord]] = defaultdict(list)
-        for r in current_records:
-            if r.switch_hostname not in active_set:
-                continue
-            current_by_device[r.switch_hostname].append(r)
-            device_batch[r.switch_hostname] = r.batch_id
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """
+        以 IN 查詢一次取回所有歲修的資料後逐一評估。
 
-        # 3. 找每台設備的上一個 batch（倒數第二個變化點）
-        prev_by_device = await self._get_previous_batches(
-            session, maintenance_id, device_batch,
+        增長查詢依時間窗設定分組：同一時間窗的歲修共用一個 IN 查詢。
+        """
+        repo = InterfaceErrorRecordRepo(session)
+        hostnames = await self._get_active_device_hostnames_many(
+            session, maintenance_ids,
+        )
+        item_counts = await repo.get_latest_item_counts_many(maintenance_ids)
+        error_devices = await self._get_error_devices_many(
+            session, maintenance_ids, "get_error_count",
         )
 
-        # 4. 逐設備評估（分母 = 設備數，分子 = 有 CRC 增長的設備數）
+        by_window: dict[int, list[str]] = defaultdict(list)
+        for mid in maintenance_ids:
+            by_window[self._growth_window(mid)].append(mid)
+        growth_rows: dict[str, list[Any]] = {}
+        for window, mids in by_window.items():
+            growth_rows.update(await repo.get_growing_interfaces_many(
+                mids, since=self._window_start(window),
+            ))
+
+        return {
+            mid: self._evaluate_loaded(
+                mid, hostnames[mid], item_counts[mid], error_devices[mid],
+                growth_rows[mid],
+            )
+            for mid in maintenance_ids
+        }
+
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        device_hostnames: list[str],
+        item_counts: dict[str, int],
+        error_devices: set[str],
+        growth_rows: list[Any],
+    ) -> IndicatorEvaluationResult:
+        """依已載入的設備清單、採集狀態與增長 rows 計算結果。"""
+        if not device_hostnames:
+            return IndicatorEvaluationResult(
+                indicator_type=self.indicator_type,
+                maintenance_id=maintenance_id,
+                total_count=0, pass_count=0, fail_count=0,
+                pass_rates={"error_no_growth": 0},
+                summary="無設備資料",
+            )
+
+        growing_by_device = self._group_growth(
+            growth_rows, set(device_hostnames),
+        )
+
+        # 逐設備評估（分母 = 設備數，分子 = 有 CRC 增長的設備數）
         total_count = len(device_hostnames)
         pass_count = 0
         failures: list[dict] = []
         passes: list[dict] = []
 
         for hostname in device_hostnames:
-            current_rows = current_by_device.get(hostname, [])
+            item_count = item_counts.get(hostname)
 
-            if not current_rows:
+            if not item_count:
                 if hostname in error_devices:
                     # 採集失敗（有 CollectionError）→ 失敗
                     failures.append({
@@ -106,7 +158,7 @@ class ErrorCountIndicator(BaseIndicator):
                         "reason": "採集失敗",
                         "data": {},
                     })
-                elif hostname in collected_devices:
+                elif item_count == 0:
                     # 有 batch 但無錯誤記錄（所有介面零錯誤）→ 正常
                     pass_count += 1
                     if len(passes) < 10:
@@ -124,33 +176,7 @@ class ErrorCountIndicator(BaseIndicator):
                     })
                 continue
 
-            prev_rows = prev_by_device.get(hostname, {})
-
-            if not prev_rows:
-                # 首次採集，無歷史比對 → 通過
-                pass_count += 1
-                if len(passes) < 10:
-                    passes.append({
-                        "device": hostname,
-                        "reason": "首次採集，無歷史比對",
-                        "data": {},
-                    })
-                continue
-
-            # 檢查每個介面的增長
-            growing_interfaces: list[dict] = []
-            for record in current_rows:
-                prev_info = prev_rows.get(record.interface_name)
-                if prev_info is None:
-                    continue  # 新介面，無歷史 → 不視為異常
-                delta = record.crc_errors - prev_info["crc_errors"]
-                if delta > 0:
-                    growing_interfaces.append({
-                        "interface": record.interface_name,
-                        "delta": delta,
-                        "prev_crc_errors": prev_info["crc_errors"],
-                        "crc_errors": record.crc_errors,
-                    })
+            growing_interfaces = growing_by_device.get(hostname)
 
             if growing_interfaces:
                 # 設備有 CRC 增長 → 異常
@@ -174,7 +200,7 @@ class ErrorCountIndicator(BaseIndicator):
                     "data": {"growing_interfaces": growing_interfaces},
                 })
             else:
-                # 所有介面未增長 → 通過
+                # 所有介面未增長（含首次採集無歷史可比）→ 通過
                 pass_count += 1
                 if len(passes) < 10:
                     passes.append({
@@ -198,88 +224,61 @@ class ErrorCountIndicator(BaseIndicator):
         )
 
     @staticmethod
-    async def _get_previous_batches(
-        session: AsyncSession,
-        maintenance_id: str,
-        device_batch: dict[str, int],
-    ) -> dict[str, dict[str, dict]]:
-        """
-        取每台設備上一個變化點的 interface error 資料。
+    def _growth_window(maintenance_id: str) -> int:
+        """error_count_growth_window_minutes（0 → 只比較最新兩個變化點）。"""
+        return int(get_threshold(
+            "error_count_growth_window_minutes", maintenance_id,
+        ))
 
-        使用兩次批量查詢取代 N+1 迴圈：
-        1. 一次查出所有設備的倒數第二個 batch_id
-        2. 一次查出這些 batch 的所有 error records
+    @classmethod
+    def _growth_since(cls, maintenance_id: str) -> datetime | None:
+        """增長判定時間窗起點（naive UTC）；未設定時間窗 → None。"""
+        return cls._window_start(cls._growth_window(maintenance_id))
 
-        Returns:
-            {hostname: {interface_name: {"crc_errors": int}}}
-        """
-        if not device_batch:
-            return {}
-
-        from sqlalchemy import func as sa_func, and_, literal_column
-
-        # ── 第 1 步：批量找每台設備的 prev batch_id ──
-        # 用 lateral / correlated subquery 替代 N 次迴圈查詢
-        # 構建 UNION ALL: 每台設備一個 (hostname, max_id < latest) 子查詢
-        # 但更高效的做法：用 window function 在一次查詢中找到每台設備倒數第二批
-        all_batches_stmt = (
-            select(
-                CollectionBatch.switch_hostname,
-                CollectionBatch.id,
-                sa_func.row_number().over(
-                    partition_by=CollectionBatch.switch_hostname,
-                    order_by=CollectionBatch.id.desc(),
-                ).label("rn"),
-            )
-            .where(
-                CollectionBatch.collection_type == "get_error_count",
-                CollectionBatch.maintenance_id == maintenance_id,
-                CollectionBatch.switch_hostname.in_(list(device_batch.keys())),
-            )
-            .subquery()
-        )
-
-        # rn=1 是最新，rn=2 是倒數第二
-        prev_batch_stmt = (
-            select(
-                all_batches_stmt.c.switch_hostname,
-                all_batches_stmt.c.id,
-            )
-            .where(all_batches_stmt.c.rn == 2)
-        )
-        prev_batch_result = await session.execute(prev_batch_stmt)
-        prev_batch_rows = prev_batch_result.all()
+    @staticmethod
+    def _window_start(window: int) -> datetime | None:
+        if window <= 0:
+            return None
+        return datetime.now(UTC).replace(tzinfo=None) - timedelta(minutes=window)
 
-        if not prev_batch_rows:
-            return {}
+    @staticmethod
+    def _group_growth(
+        rows: list[Any],
+        active_set: set[str],
+    ) -> dict[str, list[dict]]:
+        """
+        依設備、介面彙整增長 rows（rows 依 collected_at 遞增）。
 
-        # hostname → prev_batch_id
-        prev_batch_map: dict[str, int] = {
-            row.switch_hostname: row.id for row in prev_batch_rows
-        }
+        時間窗模式下同一介面可能有多個增長 batch：delta 累加，
+        prev_crc_errors 取最早、crc_errors 取最新。
 
-        # ── 第 2 步：批量取所有 prev batch 的 error records ──
-        prev_batch_ids = list(prev_batch_map.values())
-        rows_stmt = select(InterfaceErrorRecord).where(
-            InterfaceErrorRecord.batch_id.in_(prev_batch_ids),
-        )
-        rows_result = await session.execute(rows_stmt)
-        prev_records = rows_result.scalars().all()
-
-        # 按 batch_id 分組，再映射回 hostname
-        batch_to_host = {bid: host for host, bid in prev_batch_map.items()}
-        result: dict[str, dict[str, dict]] = {}
-        for r in prev_records:
-            hostname = batch_to_host.get(r.batch_id)
-            if hostname is None:
+        Returns:
+            {hostname: [{"interface", "delta", "prev_crc_errors",
+                         "crc_errors", "first_growth_at"}, ...]}
+        """
+        by_device: dict[str, dict[str, dict]] = defaultdict(dict)
+        for r in rows:
+            if r.switch_hostname not in active_set:
                 continue
-            if hostname not in result:
-                result[hostname] = {}
-            result[hostname][r.interface_name] = {
-                "crc_errors": r.crc_errors,
-            }
-
-        return result
+            entry = by_device[r.switch_hostname].get(r.interface_name)
+            if entry is None:
+                by_device[r.switch_hostname][r.interface_name] = {
+                    "interface": r.interface_name,
+                    "delta": r.crc_delta,
+                    "prev_crc_errors": r.prev_crc_errors,
+                    "crc_errors": r.crc_errors,
+                    "first_growth_at": (
+                        r.first_growth_at.isoformat()
+                        if r.first_growth_at else None
+                    ),
+                }
+            else:
+                entry["delta"] += r.crc_delta
+                entry["crc_errors"] = r.crc_errors
+        return {
+            host: list(interfaces.values())
+            for host, interfaces in by_device.items()
+        }
 
     @staticmethod
     def _calc_percent(passed: int, total: int) -> float:
@@ -316,30 +315,40 @@ class ErrorCountIndicator(BaseIndicator):
         session: AsyncSession,
         maintenance_id: str,
     ) -> list[TimeSeriesPoint]:
-        """獲取時間序列數據。"""
-        repo = InterfaceErrorRecordRepo(session)
-        records = await repo.get_time_series_records(
-            maintenance_id=maintenance_id,
-            limit=limit,
+        """獲取時間序列數據（讀 indicator_rollups，每點為 CRC 總數）。"""
+        repo = IndicatorRollupRepo(session, InterfaceErrorRecordRepo.collection_type)
+        series = await repo.get_recent_series(
+            maintenance_id, ("crc_errors",), limit,
         )
-
-        ts_map: dict[str, dict] = defaultdict(
-            lambda: {"timestamp": None, "crc_errors": 0}
-        )
-        for record in records:
-            key = record.collected_at.isoformat()
-            entry = ts_map[key]
-            entry["timestamp"] = record.collected_at
-            entry["crc_errors"] += record.crc_errors
-
         return [
             TimeSeriesPoint(
-                timestamp=entry["timestamp"],
-                values={"crc_errors": float(entry["crc_errors"])},
+                timestamp=timestamp,
+                values={"crc_errors": metrics["crc_errors"].total},
             )
-            for entry in sorted(ts_map.values(), key=lambda e: e["timestamp"])
+            for timestamp, metrics in series
         ]
 
+    _BUCKET_FIELDS = ("crc_errors", "input_errors", "output_errors")
+
+    async def get_bucketed_series(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        start: datetime,
+        end: datetime,
+        points: int,
+    ) -> list[TimeSeriesBucket]:
+        """區間降採樣：每個 bucket 的 per-interface 錯誤計數 min/avg/max。"""
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        bucket_seconds = compute_bucket_seconds(start, end, points)
+        repo = IndicatorRollupRepo(session, InterfaceErrorRecordRepo.collection_type)
+        rows = await repo.get_bucketed_aggregates(
+            maintenance_id, self._BUCKET_FIELDS, start, end, bucket_seconds,
+        )
+        return buckets_from_aggregates(
+            rows, self._BUCKET_FIELDS, start, bucket_seconds,
+        )
+
     async def get_latest_raw_data(
         self,
         limit: int,
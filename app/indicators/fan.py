@@ -7,6 +7,7 @@ Uses typed FanRecord table via FanRecordRepo.
 from __future__ import annotations
 
 from collections import defaultdict
+from collections.abc import Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -21,6 +22,7 @@ from app.indicators.base import (
     TimeSeriesPoint,
     RawDataRow,
 )
+from app.repositories.rollups import IndicatorRollupRepo
 from app.repositories.typed_records import FanRecordRepo
 
 
@@ -42,17 +44,49 @@ class FanIndicator(BaseIndicator):
         self,
         maintenance_id: str,
         session: AsyncSession,
+    ) -> IndicatorEvaluationResult:
+        """評估風扇指標。"""
+        # 1. 設備清單 = 分母
+        device_hostnames = await self._get_active_device_hostnames(
+            session, maintenance_id,
+        )
+        if not device_hostnames:
+            return self._evaluate_loaded(maintenance_id, [], [])
+
+        # 2. 取採集資料
+        repo = FanRecordRepo(session)
+        records = await repo.get_latest_per_device(maintenance_id)
+        return self._evaluate_loaded(maintenance_id, device_hostnames, records)
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的設備清單與採集資料後逐一評估。"""
+        hostnames = await self._get_active_device_hostnames_many(
+            session, maintenance_ids,
+        )
+        records = await FanRecordRepo(session).get_latest_per_device_many(
+            maintenance_ids,
+        )
+        return {
+            mid: self._evaluate_loaded(mid, hostnames[mid], records[mid])
+            for mid in maintenance_ids
+        }
+
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        device_hostnames: list[str],
+        records: list[FanRecord],
     ) -> IndicatorEvaluationResult:
         """
-        評估風扇指標。
+        依已載入的設備清單與採集資料計算結果。
 
         分母 = 設備清單中的設備數（source of truth）。
         分子 = 風扇狀態全部正常的設備數。
         """
-        # 1. 設備清單 = 分母
-        device_hostnames = await self._get_active_device_hostnames(
-            session, maintenance_id,
-        )
         total_count = len(device_hostnames)
 
         if total_count == 0:
@@ -64,15 +98,12 @@ class FanIndicator(BaseIndicator):
                 summary="無設備資料",
             )
 
-        # 2. 取採集資料，按設備分組
-        repo = FanRecordRepo(session)
-        records = await repo.get_latest_per_device(maintenance_id)
-
+        # 按設備分組
         records_by_host: dict[str, list[FanRecord]] = defaultdict(list)
         for record in records:
             records_by_host[record.switch_hostname].append(record)
 
-        # 3. 以設備清單為基準遍歷
+        # 以設備清單為基準遍歷
         pass_count = 0
         failures = []
         passes = []
@@ -170,29 +201,18 @@ class FanIndicator(BaseIndicator):
         session: AsyncSession,
         maintenance_id: str,
     ) -> list[TimeSeriesPoint]:
-        """獲取時間序列數據。"""
-        repo = FanRecordRepo(session)
-        records = await repo.get_time_series_records(
-            maintenance_id=maintenance_id,
-            limit=limit,
+        """獲取時間序列數據（讀 indicator_rollups，每點為狀態正常比例）。"""
+        repo = IndicatorRollupRepo(session, FanRecordRepo.collection_type)
+        series = await repo.get_recent_series(
+            maintenance_id, ("status_not_ok",), limit,
         )
 
-        # Group records by collected_at to compute per-snapshot OK rate
-        snapshots: dict[str, list[FanRecord]] = defaultdict(list)
-        for record in records:
-            snapshots[record.collected_at].append(record)
-
         time_series = []
-        for collected_at in sorted(snapshots.keys()):
-            snapshot_records = snapshots[collected_at]
-            ok_count = sum(
-                1
-                for r in snapshot_records
-                if str(r.status).lower().strip() in self.VALID_STATUSES
-            )
+        for collected_at, metrics in series:
+            agg = metrics["status_not_ok"]
             ok_rate = (
-                (ok_count / len(snapshot_records) * 100)
-                if snapshot_records
+                ((agg.count - agg.total) / agg.count * 100)
+                if agg.count
                 else 0.0
             )
             time_series.append(
@@ -9,6 +9,9 @@ Evaluates if NEW devices are reachable via ICMP.
 """
 from __future__ import annotations
 
+from collections.abc import Sequence
+from typing import Any
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -43,17 +46,50 @@ class PingIndicator(BaseIndicator):
         self,
         maintenance_id: str,
         session: AsyncSession,
+    ) -> IndicatorEvaluationResult:
+        """評估 Ping 指標。"""
+        # 1. 獲取所有新設備清單（分母來源）
+        expected_devices = await self._get_expected_devices(
+            session, maintenance_id
+        )
+        if not expected_devices:
+            return self._evaluate_loaded(maintenance_id, [], {})
+
+        # 2. 獲取採集數據，建立 hostname -> PingRecord 的映射
+        collected = await self._get_collected_results(
+            session, maintenance_id
+        )
+        return self._evaluate_loaded(maintenance_id, expected_devices, collected)
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的設備清單與 ping 結果後逐一評估。"""
+        expected = await self._get_expected_devices_many(
+            session, maintenance_ids,
+        )
+        collected = await self._get_collected_results_many(
+            session, maintenance_ids,
+        )
+        return {
+            mid: self._evaluate_loaded(mid, expected[mid], collected[mid])
+            for mid in maintenance_ids
+        }
+
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        expected_devices: list[dict[str, Any]],
+        collected: dict[str, dict[str, Any]],
     ) -> IndicatorEvaluationResult:
         """
-        評估 Ping 指標。
+        依已載入的設備清單與 ping 結果計算結果。
 
         分母：MaintenanceDeviceList 中的新設備總數
         分子：新設備中 ping 成功（可達且成功率 >= 80%）的數量
         """
-        # 1. 獲取所有新設備清單（分母來源）
-        expected_devices = await self._get_expected_devices(
-            session, maintenance_id
-        )
         total_count = len(expected_devices)
 
         if total_count == 0:
@@ -68,12 +104,7 @@ class PingIndicator(BaseIndicator):
                 summary="無新設備資料"
             )
 
-        # 2. 獲取採集數據，建立 hostname -> PingRecord 的映射
-        collected = await self._get_collected_results(
-            session, maintenance_id
-        )
-
-        # 3. 逐一評估每個新設備
+        # 逐一評估每個新設備
         pass_count = 0
         failures = []
         passes = []
@@ -132,20 +163,30 @@ class PingIndicator(BaseIndicator):
         maintenance_id: str,
     ) -> list[dict]:
         """獲取該歲修的所有新設備清單（排除無 hostname/IP 的設備）。"""
+        by_mid = await self._get_expected_devices_many(session, [maintenance_id])
+        return by_mid[maintenance_id]
+
+    async def _get_expected_devices_many(
+        self,
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, list[dict[str, Any]]]:
+        """多個歲修的新設備清單（單一 IN 查詢），依歲修分組。"""
         stmt = select(MaintenanceDeviceList).where(
-            MaintenanceDeviceList.maintenance_id == maintenance_id,
+            MaintenanceDeviceList.maintenance_id.in_(maintenance_ids),
             MaintenanceDeviceList.new_hostname != None,  # noqa: E711
             MaintenanceDeviceList.new_ip_address != None,  # noqa: E711
         )
         result = await session.execute(stmt)
-        devices = result.scalars().all()
-        return [
-            {
+        by_mid: dict[str, list[dict[str, Any]]] = {
+            mid: [] for mid in maintenance_ids
+        }
+        for d in result.scalars():
+            by_mid[d.maintenance_id].append({
                 "new_hostname": d.new_hostname,
                 "new_ip_address": d.new_ip_address,
-            }
-            for d in devices
-        ]
+            })
+        return by_mid
 
     async def _get_collected_results(
         self,
@@ -158,11 +199,28 @@ class PingIndicator(BaseIndicator):
         使用 PingRecordRepo.get_latest_per_device() 取得每台設備最新的
         ping 結果，與其他指標的資料流一致。
         """
+        by_mid = await self._get_collected_results_many(
+            session, [maintenance_id],
+        )
+        return by_mid[maintenance_id]
+
+    async def _get_collected_results_many(
+        self,
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, dict[str, dict[str, Any]]]:
+        """多個歲修的可達性數據（單一 IN 查詢），依歲修分組。"""
         repo = PingRecordRepo(session)
-        records = await repo.get_latest_per_device(maintenance_id)
+        records = await repo.get_latest_per_device_many(maintenance_ids)
+        return {
+            mid: self._best_results(mid_records)
+            for mid, mid_records in records.items()
+        }
 
-        # 每台設備可能有多筆 record（多個 target），取最佳結果
-        collected: dict[str, dict] = {}
+    @staticmethod
+    def _best_results(records: list[PingRecord]) -> dict[str, dict[str, Any]]:
+        """每台設備可能有多筆 record（多個 target），取最佳結果。"""
+        collected: dict[str, dict[str, Any]] = {}
         for record in records:
             hostname = record.switch_hostname
             existing = collected.get(hostname)
@@ -6,6 +6,7 @@ Evaluates if Port-Channels match the expected configuration and status.
 from __future__ import annotations
 
 from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
 from typing import Any
 
 from sqlalchemy import select
@@ -61,6 +62,31 @@ class PortChannelIndicator(BaseIndicator):
 
         repo = PortChannelRecordRepo(session)
         records = await repo.get_latest_per_device(maintenance_id)
+        return self._evaluate_loaded(maintenance_id, exp_map, records)
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的期望與採集資料後逐一評估。"""
+        exp_maps = await self._build_expectation_map_many(
+            session, maintenance_ids,
+        )
+        repo = PortChannelRecordRepo(session)
+        records = await repo.get_latest_per_device_many(maintenance_ids)
+        return {
+            mid: self._evaluate_loaded(mid, exp_maps[mid], records[mid])
+            for mid in maintenance_ids
+        }
+
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        exp_map: _ExpMap,
+        records: list[PortChannelRecord],
+    ) -> IndicatorEvaluationResult:
+        """依已載入的期望與採集資料計算結果。"""
         device_pcs = self._build_device_pc_map(records)
 
         total_count = 0
@@ -98,16 +124,28 @@ class PortChannelIndicator(BaseIndicator):
         maintenance_id: str,
     ) -> _ExpMap:
         """Load expectations for all devices in this maintenance."""
+        by_mid = await self._build_expectation_map_many(
+            session, [maintenance_id],
+        )
+        return by_mid[maintenance_id]
+
+    async def _build_expectation_map_many(
+        self,
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, _ExpMap]:
+        """Load expectations for several maintenances in one IN query."""
         stmt = select(PortChannelExpectation).where(
-            PortChannelExpectation.maintenance_id == maintenance_id,
+            PortChannelExpectation.maintenance_id.in_(maintenance_ids),
         )
         result = await session.execute(stmt)
         expectations = result.scalars().all()
 
-        exp_map: _ExpMap = {}
+        by_mid: dict[str, _ExpMap] = {mid: {} for mid in maintenance_ids}
         for exp in expectations:
+            exp_map = by_mid[exp.maintenance_id]
             exp_map.setdefault(exp.hostname, {})[exp.port_channel] = exp
-        return exp_map
+        return by_mid
 
     @staticmethod
     def _build_device_pc_map(records: list[PortChannelRecord]) -> _DevicePCMap:
@@ -128,6 +166,7 @@ class PortChannelIndicator(BaseIndicator):
         Returns:
             (total_count, pass_count, failures, passes)
         """
+        failures: list[_Failure]
         actual_pcs = device_pcs.get(hostname)
         if not actual_pcs:
             failures = [
@@ -138,7 +177,7 @@ class PortChannelIndicator(BaseIndicator):
 
         total = 0
         passed = 0
-        failures: list[_Failure] = []
+        failures = []
         passes: list[_Failure] = []
         for pc_name, exp in expected_pcs.items():
             total += 1
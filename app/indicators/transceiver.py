@@ -2,12 +2,18 @@
 Transceiver (光模塊) indicator evaluator.
 
 Uses TransceiverRecord with flat tx_power/rx_power/temperature/voltage fields.
+Evaluation works on columnar arrays (see ``_TransceiverColumns``) so that
+only failing rows are materialised as dicts.
 """
 from __future__ import annotations
 
+import math
+from array import array
 from collections import defaultdict
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import datetime
+from operator import attrgetter
 from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,9 +26,14 @@ from app.indicators.base import (
     IndicatorMetadata,
     ObservedField,
     RawDataRow,
+    TimeSeriesBucket,
     TimeSeriesPoint,
+    buckets_from_aggregates,
+    compute_bucket_seconds,
+    to_naive_utc,
 )
 from app.core.interfaces import is_management_interface as _is_management_interface
+from app.repositories.rollups import IndicatorRollupRepo
 from app.repositories.typed_records import TransceiverRecordRepo
 from app.services.threshold_service import get_threshold
 
@@ -31,6 +42,13 @@ from app.services.threshold_service import get_threshold
 _UNCONNECTED_DBM = -36.95
 _UNCONNECTED_TOL = 0.1  # float 容差
 
+# 評估所需欄位（column-only 查詢，不建 ORM 物件）
+_EVAL_COLUMNS = (
+    "switch_hostname", "interface_name",
+    "tx_power", "rx_power", "temperature", "voltage",
+)
+_METRIC_FIELDS = ("tx_power", "rx_power", "temperature", "voltage")
+
 
 @dataclass(frozen=True)
 class _Thresholds:
@@ -45,6 +63,100 @@ class _Thresholds:
     voltage_max: float
 
 
+class _TransceiverColumns:
+    """
+    Columnar view of transceiver rows: one ``array('d')`` per metric.
+
+    None 以 NaN 表示 — NaN 與任何閾值比較皆為 False，因此範圍檢查
+    會自然把缺失值判為「不在範圍內」，與逐筆檢查的語意一致。
+    八個閾值在單一迴圈內套用；sentinel 遮罩只對失敗 rows 計算。
+    ``rows`` 保留原始 row，僅在需要產生 failure dict 時才回頭讀取。
+    """
+
+    __slots__ = ("rows", "tx_power", "rx_power", "temperature", "voltage")
+
+    rows: Sequence[Any]
+    tx_power: array[float]
+    rx_power: array[float]
+    temperature: array[float]
+    voltage: array[float]
+
+    def __init__(self, rows: Sequence[Any]) -> None:
+        self.rows = rows
+        self.tx_power = self._column(rows, "tx_power")
+        self.rx_power = self._column(rows, "rx_power")
+        self.temperature = self._column(rows, "temperature")
+        self.voltage = self._column(rows, "voltage")
+
+    @staticmethod
+    def _column(rows: Sequence[Any], field: str) -> array[float]:
+        nan = math.nan
+        return array(
+            "d",
+            [nan if v is None else v for v in map(attrgetter(field), rows)],
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def pass_count(self, field: str, lo: float, hi: float) -> tuple[int, int]:
+        """Return (passed, total) over non-None values of *field*."""
+        col = getattr(self, field)
+        total = len(col) - sum(1 for v in col if v != v)
+        passed = sum(1 for v in col if lo <= v <= hi)
+        return passed, total
+
+    def failing_rows(self, th: _Thresholds) -> list[int]:
+        """Indices of rows outside any of the eight thresholds (or missing)."""
+        tx_lo, tx_hi = th.tx_power_min, th.tx_power_max
+        rx_lo, rx_hi = th.rx_power_min, th.rx_power_max
+        t_lo, t_hi = th.temperature_min, th.temperature_max
+        v_lo, v_hi = th.voltage_min, th.voltage_max
+        return [
+            i for i, (tx, rx, t, v) in enumerate(zip(
+                self.tx_power, self.rx_power, self.temperature, self.voltage,
+                strict=True,
+            ))
+            if not (
+                tx_lo <= tx <= tx_hi and rx_lo <= rx <= rx_hi
+                and t_lo <= t <= t_hi and v_lo <= v <= v_hi
+            )
+        ]
+
+    def unconnected_only(
+        self, th: _Thresholds, indices: list[int],
+    ) -> list[bool]:
+        """
+        Sentinel mask over failing *indices*.
+
+        True when every out-of-range metric is a -36.95 dBm power reading;
+        mirrors ``TransceiverIndicator._is_failure_unconnected_only``
+        (None values are ignored, at least one power issue is required).
+        """
+        tx, rx = self.tx_power, self.rx_power
+        temp, volt = self.temperature, self.voltage
+        mask: list[bool] = []
+        for i in indices:
+            t, v = temp[i], volt[i]
+            # 溫度/電壓有值且超出範圍 → 真正失敗（NaN 比較皆 False，視為略過）
+            if t < th.temperature_min or t > th.temperature_max:
+                mask.append(False)
+                continue
+            if v < th.voltage_min or v > th.voltage_max:
+                mask.append(False)
+                continue
+            tx_out = tx[i] < th.tx_power_min or tx[i] > th.tx_power_max
+            rx_out = rx[i] < th.rx_power_min or rx[i] > th.rx_power_max
+            tx_sentinel = abs(tx[i] - _UNCONNECTED_DBM) < _UNCONNECTED_TOL
+            rx_sentinel = abs(rx[i] - _UNCONNECTED_DBM) < _UNCONNECTED_TOL
+            mask.append(
+                (tx_out or rx_out)
+                and (not tx_out or tx_sentinel)
+                and (not rx_out or rx_sentinel)
+            )
+        return mask
+
+
 class TransceiverIndicator(BaseIndicator):
     """
     Transceiver 光模塊指標評估器。
@@ -81,6 +193,61 @@ class TransceiverIndicator(BaseIndicator):
         device_hostnames = await self._get_active_device_hostnames(
             session, maintenance_id,
         )
+        if not device_hostnames:
+            return self._evaluate_loaded(maintenance_id, [], [], set(), set())
+
+        repo = TransceiverRecordRepo(session)
+        all_rows = await repo.get_latest_columns_per_device(
+            maintenance_id, *_EVAL_COLUMNS,
+        )
+
+        # 查詢採集狀態（區分「正常無光口」vs「採集失敗」vs「尚未採集」）
+        collected_devices = await self._get_collected_devices(
+            session, maintenance_id, "get_gbic_details",
+        )
+        error_devices = await self._get_error_devices(
+            session, maintenance_id, "get_gbic_details",
+        )
+        return self._evaluate_loaded(
+            maintenance_id, device_hostnames, all_rows,
+            collected_devices, error_devices,
+        )
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的設備清單、光模塊欄位與採集狀態後逐一評估。"""
+        repo = TransceiverRecordRepo(session)
+        hostnames = await self._get_active_device_hostnames_many(
+            session, maintenance_ids,
+        )
+        rows = await repo.get_latest_columns_per_device_many(
+            maintenance_ids, *_EVAL_COLUMNS,
+        )
+        collected = await self._get_collected_devices_many(
+            session, maintenance_ids, "get_gbic_details",
+        )
+        errors = await self._get_error_devices_many(
+            session, maintenance_ids, "get_gbic_details",
+        )
+        return {
+            mid: self._evaluate_loaded(
+                mid, hostnames[mid], rows[mid], collected[mid], errors[mid],
+            )
+            for mid in maintenance_ids
+        }
+
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        device_hostnames: list[str],
+        all_rows: Sequence[Any],
+        collected_devices: set[str],
+        error_devices: set[str],
+    ) -> IndicatorEvaluationResult:
+        """依已載入的設備清單、光模塊欄位與採集狀態計算結果。"""
         if not device_hostnames:
             return IndicatorEvaluationResult(
                 indicator_type=self.indicator_type,
@@ -94,28 +261,25 @@ class TransceiverIndicator(BaseIndicator):
             )
 
         th = self._load_thresholds(maintenance_id)
-        repo = TransceiverRecordRepo(session)
-        all_records = await repo.get_latest_per_device(maintenance_id)
-
-        # 查詢採集狀態（區分「正常無光口」vs「採集失敗」vs「尚未採集」）
-        collected_devices = await self._get_collected_devices(
-            session, maintenance_id, "get_gbic_details",
-        )
-        error_devices = await self._get_error_devices(
-            session, maintenance_id, "get_gbic_details",
-        )
 
         # 只保留設備清單中的設備紀錄，並排除管理介面（無 GBIC）
         active_set = set(device_hostnames)
         records = [
-            r for r in all_records
+            r for r in all_rows
             if r.switch_hostname in active_set
             and not _is_management_interface(r.interface_name)
         ]
 
-        device_records: dict[str, list[TransceiverRecord]] = defaultdict(list)
-        for r in records:
-            device_records[r.switch_hostname].append(r)
+        # 欄位式套用閾值，只有失敗 row 才會建 failure dict
+        columns = _TransceiverColumns(records)
+        failing = columns.failing_rows(th)
+        row_unconnected = dict(zip(
+            failing, columns.unconnected_only(th, failing), strict=True,
+        ))
+
+        device_rows: dict[str, list[int]] = defaultdict(list)
+        for idx, r in enumerate(records):
+            device_rows[r.switch_hostname].append(idx)
 
         # 設備層級評估：分母 = 設備數
         total_count = len(device_hostnames)
@@ -124,9 +288,9 @@ class TransceiverIndicator(BaseIndicator):
         passes: list[dict[str, Any]] = []
 
         for hostname in device_hostnames:
-            dev_records = device_records.get(hostname, [])
+            dev_rows = device_rows.get(hostname, [])
 
-            if not dev_records:
+            if not dev_rows:
                 if hostname in error_devices:
                     # 採集失敗（有 CollectionError）→ 失敗
                     failures.append({
@@ -152,12 +316,11 @@ class TransceiverIndicator(BaseIndicator):
                     })
                 continue
 
-            # 逐介面檢查
-            failing_ifaces: list[dict[str, Any]] = []
-            for record in dev_records:
-                failure = self._check_single_record(record, th)
-                if failure is not None:
-                    failing_ifaces.append(failure)
+            failing_ifaces = [
+                self._build_failure(records[i], th, row_unconnected[i])
+                for i in dev_rows
+                if i in row_unconnected
+            ]
 
             if failing_ifaces:
                 # 全部失敗介面都是 -36.95 未對接 → 視為通過
@@ -204,7 +367,7 @@ class TransceiverIndicator(BaseIndicator):
                 if len(passes) < 10:
                     passes.append({
                         "device": hostname,
-                        "reason": f"光模塊正常（{len(dev_records)} 介面）",
+                        "reason": f"光模塊正常（{len(dev_rows)} 介面）",
                         "data": {},
                     })
 
@@ -215,20 +378,20 @@ class TransceiverIndicator(BaseIndicator):
             pass_count=pass_count,
             fail_count=total_count - pass_count,
             pass_rates={
-                "tx_power_ok": self._field_pass_rate(
-                    records, "tx_power",
+                "tx_power_ok": self._column_pass_rate(
+                    columns, "tx_power",
                     th.tx_power_min, th.tx_power_max,
                 ),
-                "rx_power_ok": self._field_pass_rate(
-                    records, "rx_power",
+                "rx_power_ok": self._column_pass_rate(
+                    columns, "rx_power",
                     th.rx_power_min, th.rx_power_max,
                 ),
-                "temperature_ok": self._field_pass_rate(
-                    records, "temperature",
+                "temperature_ok": self._column_pass_rate(
+                    columns, "temperature",
                     th.temperature_min, th.temperature_max,
                 ),
-                "voltage_ok": self._field_pass_rate(
-                    records, "voltage",
+                "voltage_ok": self._column_pass_rate(
+                    columns, "voltage",
                     th.voltage_min, th.voltage_max,
                 ),
             },
@@ -259,7 +422,22 @@ class TransceiverIndicator(BaseIndicator):
         The returned dict includes ``"unconnected_only": True`` when all
         failures stem from the -36.95 dBm sentinel (module present but
         no fiber attached).
+
+        Scalar reference for ``_TransceiverColumns.failing_rows`` +
+        ``_build_failure``.
         """
+        if not self._collect_failure_reasons(record, th):
+            return None
+
+        # 判斷是否所有 power 異常都來自 -36.95 sentinel（未對接）
+        # 且溫度/電壓皆正常或 sentinel
+        unconnected_only = self._is_failure_unconnected_only(record, th)
+        return self._build_failure(record, th, unconnected_only)
+
+    def _build_failure(
+        self, record: Any, th: _Thresholds, unconnected_only: bool,
+    ) -> dict[str, Any]:
+        """Materialise the failure dict for a row already known to fail."""
         if (
             record.tx_power is None
             and record.rx_power is None
@@ -274,18 +452,10 @@ class TransceiverIndicator(BaseIndicator):
                 "unconnected_only": False,
             }
 
-        failure_reasons = self._collect_failure_reasons(record, th)
-        if not failure_reasons:
-            return None
-
-        # 判斷是否所有 power 異常都來自 -36.95 sentinel（未對接）
-        # 且溫度/電壓皆正常或 sentinel
-        unconnected_only = self._is_failure_unconnected_only(record, th)
-
         return {
             "device": record.switch_hostname,
             "interface": record.interface_name,
-            "reason": " | ".join(failure_reasons),
+            "reason": " | ".join(self._collect_failure_reasons(record, th)),
             "data": self._record_data(record),
             "unconnected_only": unconnected_only,
         }
@@ -419,6 +589,17 @@ class TransceiverIndicator(BaseIndicator):
                 passed += 1
         return self._calc_percent(passed, total)
 
+    def _column_pass_rate(
+        self,
+        columns: _TransceiverColumns,
+        field: str,
+        min_threshold: float,
+        max_threshold: float,
+    ) -> float:
+        """Columnar counterpart of ``_field_pass_rate``."""
+        passed, total = columns.pass_count(field, min_threshold, max_threshold)
+        return self._calc_percent(passed, total)
+
     @staticmethod
     def _calc_percent(passed: int, total: int) -> float:
         return (passed / total * 100) if total > 0 else 0.0
@@ -479,19 +660,17 @@ class TransceiverIndicator(BaseIndicator):
         session: AsyncSession,
         maintenance_id: str,
     ) -> list[TimeSeriesPoint]:
-        """獲取時間序列數據。"""
-        repo = TransceiverRecordRepo(session)
-        records = await repo.get_time_series_records(maintenance_id, limit)
-
-        grouped: dict[datetime, list[TransceiverRecord]] = defaultdict(list)
-        for record in records:
-            if _is_management_interface(record.interface_name):
-                continue
-            grouped[record.collected_at].append(record)
+        """獲取時間序列數據（讀 indicator_rollups，每點為各欄位平均）。"""
+        repo = IndicatorRollupRepo(session, TransceiverRecordRepo.collection_type)
+        series = await repo.get_recent_series(maintenance_id, _METRIC_FIELDS, limit)
 
         time_series: list[TimeSeriesPoint] = []
-        for timestamp in sorted(grouped.keys()):
-            values = self._aggregate_group_averages(grouped[timestamp])
+        for timestamp, metrics in series:
+            values = {
+                field: agg.avg
+                for field, agg in metrics.items()
+                if agg.avg is not None
+            }
             if values:
                 time_series.append(
                     TimeSeriesPoint(timestamp=timestamp, values=values)
@@ -499,33 +678,24 @@ class TransceiverIndicator(BaseIndicator):
 
         return time_series
 
-    @staticmethod
-    def _aggregate_group_averages(
-        group: list[TransceiverRecord],
-    ) -> dict[str, float]:
-        """Compute per-field averages for a group of records sharing a timestamp."""
-        buckets: dict[str, list[float]] = {
-            "tx_power": [],
-            "rx_power": [],
-            "temperature": [],
-            "voltage": [],
-        }
-
-        for record in group:
-            if record.tx_power is not None:
-                buckets["tx_power"].append(record.tx_power)
-            if record.rx_power is not None:
-                buckets["rx_power"].append(record.rx_power)
-            if record.temperature is not None:
-                buckets["temperature"].append(record.temperature)
-            if record.voltage is not None:
-                buckets["voltage"].append(record.voltage)
-
-        return {
-            field: sum(vals) / len(vals)
-            for field, vals in buckets.items()
-            if vals
-        }
+    async def get_bucketed_series(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        start: datetime,
+        end: datetime,
+        points: int,
+    ) -> list[TimeSeriesBucket]:
+        """區間降採樣：每個 bucket 的 Tx/Rx/溫度/電壓 min/avg/max（排除管理介面）。"""
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        bucket_seconds = compute_bucket_seconds(start, end, points)
+        repo = IndicatorRollupRepo(session, TransceiverRecordRepo.collection_type)
+        rows = await repo.get_bucketed_aggregates(
+            maintenance_id, _METRIC_FIELDS, start, end, bucket_seconds,
+        )
+        return buckets_from_aggregates(
+            rows, _METRIC_FIELDS, start, bucket_seconds,
+        )
 
     # ── raw data ────────────────────────────────────────────────
 
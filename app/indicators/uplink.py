@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import logging
 from collections import defaultdict
+from collections.abc import Sequence
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -51,12 +52,26 @@ class UplinkIndicator(BaseIndicator):
         session: AsyncSession,
     ) -> list[NeighborRecord]:
         """合併 LLDP + CDP 的最新鄰居記錄。"""
-        all_records: list[NeighborRecord] = []
+        by_mid = await self._get_latest_all_protocols_many(
+            [maintenance_id], session,
+        )
+        return by_mid[maintenance_id]
+
+    async def _get_latest_all_protocols_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, list[NeighborRecord]]:
+        """多個歲修合併 LLDP + CDP 的最新鄰居記錄（每協定一個 IN 查詢）。"""
+        by_mid: dict[str, list[NeighborRecord]] = {
+            mid: [] for mid in maintenance_ids
+        }
         for ct in _UPLINK_COLLECTION_TYPES:
             repo = get_typed_repo(ct, session)
-            records = await repo.get_latest_per_device(maintenance_id)
-            all_records.extend(records)
-        return all_records
+            records = await repo.get_latest_per_device_many(maintenance_ids)
+            for mid, mid_records in records.items():
+                by_mid[mid].extend(mid_records)
+        return by_mid
 
     async def evaluate(
         self,
@@ -82,7 +97,32 @@ class UplinkIndicator(BaseIndicator):
         records = await self._get_latest_all_protocols(
             maintenance_id, session
         )
+        return self._evaluate_loaded(maintenance_id, expectations, records)
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的 uplink 期望與鄰居記錄後逐一評估。"""
+        expectations = await self._load_expectations_full_many(
+            session, maintenance_ids,
+        )
+        records = await self._get_latest_all_protocols_many(
+            maintenance_ids, session,
+        )
+        return {
+            mid: self._evaluate_loaded(mid, expectations[mid], records[mid])
+            for mid in maintenance_ids
+        }
 
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        expectations: list[UplinkExpectation],
+        records: list[NeighborRecord],
+    ) -> IndicatorEvaluationResult:
+        """依已載入的 uplink 期望與鄰居記錄計算結果（匹配邏輯見 evaluate）。"""
         # 按設備分組 — hostname-level set + interface-level set
         device_neighbors: dict[str, set[str]] = defaultdict(set)
         # (switch_hostname, remote_hostname) → set of (local_if, remote_if)
@@ -228,11 +268,27 @@ class UplinkIndicator(BaseIndicator):
         maintenance_id: str,
     ) -> list[UplinkExpectation]:
         """從 DB 讀取 uplink 期望（含 interface 資訊）。"""
+        by_mid = await self._load_expectations_full_many(
+            session, [maintenance_id],
+        )
+        return by_mid[maintenance_id]
+
+    async def _load_expectations_full_many(
+        self,
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, list[UplinkExpectation]]:
+        """多個歲修的 uplink 期望（單一 IN 查詢），依歲修分組。"""
         stmt = select(UplinkExpectation).where(
-            UplinkExpectation.maintenance_id == maintenance_id,
+            UplinkExpectation.maintenance_id.in_(maintenance_ids),
         )
         result = await session.execute(stmt)
-        return list(result.scalars().all())
+        by_mid: dict[str, list[UplinkExpectation]] = {
+            mid: [] for mid in maintenance_ids
+        }
+        for exp in result.scalars():
+            by_mid[exp.maintenance_id].append(exp)
+        return by_mid
 
     async def _load_expectations(
         self,
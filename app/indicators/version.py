@@ -11,6 +11,8 @@ Version indicator evaluator.
 """
 from __future__ import annotations
 
+from collections.abc import Sequence
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -63,7 +65,40 @@ class VersionIndicator(BaseIndicator):
         version_expectations = await self._load_expectations(
             session, maintenance_id
         )
+        if not version_expectations:
+            return self._evaluate_loaded(maintenance_id, {}, [])
+
+        # 查詢版本數據（每台設備最新一筆）
+        repo = VersionRecordRepo(session)
+        records = await repo.get_latest_per_device(maintenance_id)
+        return self._evaluate_loaded(
+            maintenance_id, version_expectations, records,
+        )
+
+    async def evaluate_many(
+        self,
+        maintenance_ids: Sequence[str],
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """以 IN 查詢一次取回所有歲修的版本期望與採集資料後逐一評估。"""
+        expectations = await self._load_expectations_many(
+            session, maintenance_ids,
+        )
+        records = await VersionRecordRepo(session).get_latest_per_device_many(
+            maintenance_ids,
+        )
+        return {
+            mid: self._evaluate_loaded(mid, expectations[mid], records[mid])
+            for mid in maintenance_ids
+        }
 
+    def _evaluate_loaded(
+        self,
+        maintenance_id: str,
+        version_expectations: dict[str, list[str]],
+        records: list[VersionRecord],
+    ) -> IndicatorEvaluationResult:
+        """依已載入的版本期望與採集資料計算結果。"""
         # 若無期望，直接返回
         if not version_expectations:
             return IndicatorEvaluationResult(
@@ -77,10 +112,6 @@ class VersionIndicator(BaseIndicator):
                 summary="無版本期望設定",
             )
 
-        # 查詢版本數據（每台設備最新一筆）
-        repo = VersionRecordRepo(session)
-        records = await repo.get_latest_per_device(maintenance_id)
-
         # 建立 hostname -> 最新版本記錄 的映射
         records_by_hostname: dict[str, VersionRecord] = {}
         for record in records:
@@ -164,22 +195,33 @@ class VersionIndicator(BaseIndicator):
 
         expected_versions 以分號分隔，每個子字串代表一個期望的 substring。
         """
+        by_mid = await self._load_expectations_many(session, [maintenance_id])
+        return by_mid[maintenance_id]
+
+    async def _load_expectations_many(
+        self,
+        session: AsyncSession,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, dict[str, list[str]]]:
+        """多個歲修的版本期望（單一 IN 查詢），依歲修分組。"""
         stmt = select(VersionExpectation).where(
-            VersionExpectation.maintenance_id == maintenance_id,
+            VersionExpectation.maintenance_id.in_(maintenance_ids),
         )
         result = await session.execute(stmt)
         expectations = result.scalars().all()
 
-        exp_map: dict[str, list[str]] = {}
+        by_mid: dict[str, dict[str, list[str]]] = {
+            mid: {} for mid in maintenance_ids
+        }
         for exp in expectations:
             substrings = [
                 v.strip()
                 for v in exp.expected_versions.split(";")
                 if v.strip()
             ]
-            exp_map[exp.hostname] = substrings
+            by_mid[exp.maintenance_id][exp.hostname] = substrings
 
-        return exp_map
+        return by_mid
 
     def get_metadata(self) -> IndicatorMetadata:
         """獲取指標元數據。"""
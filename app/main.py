@@ -174,6 +174,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # 游標分頁的下一頁游標放在回應標頭，跨來源時需明確開放才讀得到
+        expose_headers=["X-Next-Cursor"],
     )
 
     # Global exception handler for database integrity errors
@@ -3,6 +3,13 @@ Repository package.
 
 Provides data access layer using Repository Pattern.
 """
+from app.repositories.case_change_states import CaseChangeStateRepo
+from app.repositories.client_checkpoints import ClientCheckpointRepo
+from app.repositories.client_list_changes import ClientListChangeRepo
+from app.repositories.client_locations import ClientLocationRepo
+from app.repositories.client_records import ClientRecordRepo
+from app.repositories.indicator_results import IndicatorResultRepo
+from app.repositories.rollups import IndicatorRollupRepo, rebuild_rollups
 from app.repositories.typed_records import (
     BaseRepository,
     TypedRecordRepository,
@@ -11,6 +18,14 @@ from app.repositories.typed_records import (
 
 __all__ = [
     "BaseRepository",
+    "CaseChangeStateRepo",
+    "ClientCheckpointRepo",
+    "ClientListChangeRepo",
+    "ClientLocationRepo",
+    "ClientRecordRepo",
+    "IndicatorResultRepo",
+    "IndicatorRollupRepo",
     "TypedRecordRepository",
     "get_typed_repo",
+    "rebuild_rollups",
 ]
@@ -0,0 +1,73 @@
+"""
+Batch change events.
+
+save_batch 在 data_hash 改變（建新 batch / 差異更新）時記錄一筆
+BatchChange；事件掛在 session 上，commit 之後才發佈給訂閱者，
+rollback 則丟棄。訂閱者因此看得到事件對應的資料，
+hash 未變的採集輪不會產生任何事件。
+
+事件只在同一個 process 內傳遞，訂閱者需自行處理其他 process 寫入的資料
+（例如定期完整重算）。
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from typing import NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "batch_changes"
+
+
+class BatchChange(NamedTuple):
+    """某歲修、某 collection type、某台設備的最新 batch 內容改變了。"""
+
+    maintenance_id: str
+    collection_type: str
+    switch_hostname: str
+
+
+BatchListener = Callable[[BatchChange], None]
+
+_listeners: list[BatchListener] = []
+
+
+def subscribe(listener: BatchListener) -> Callable[[], None]:
+    """註冊訂閱者，回傳取消訂閱的函式。"""
+    _listeners.append(listener)
+
+    def unsubscribe() -> None:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+    return unsubscribe
+
+
+def record_change(session: AsyncSession, change: BatchChange) -> None:
+    """記錄待發佈的事件（session commit 後發佈）。"""
+    session.sync_session.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+def _publish(change: BatchChange) -> None:
+    for listener in list(_listeners):
+        try:
+            listener(change)
+        except Exception:
+            logger.exception("Batch change listener failed for %s", change)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for change in session.info.pop(_PENDING_KEY, ()):
+        _publish(change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
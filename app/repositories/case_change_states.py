@@ -0,0 +1,120 @@
+"""
+Case Change State Repository.
+
+case_change_states 保存每個 (Case, 追蹤屬性) 已 fold 的變化偵測狀態。
+每個 Case 的所有屬性列共用同一個 fold 範圍（record_count / last_record_id），
+因此範圍相關的查詢只需 join 其中一個屬性（anchor）的列。
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Collection
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Case, CaseChangeState, ClientRecord
+
+# IN 條件每批的 case id 數
+_IN_CHUNK_SIZE = 1000
+
+
+class CaseChangeStateRepo:
+    """case_change_states 的讀取與範圍檢查。"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def load(
+        self,
+        maintenance_id: str,
+        case_ids: Collection[int] | None = None,
+    ) -> dict[int, dict[str, CaseChangeState]]:
+        """{case_id: {attribute: state}}；case_ids 為 None 時載入整個歲修。"""
+        chunks: list[list[int] | None] = [None]
+        if case_ids is not None:
+            ordered = sorted(case_ids)
+            chunks = [
+                ordered[i:i + _IN_CHUNK_SIZE]
+                for i in range(0, len(ordered), _IN_CHUNK_SIZE)
+            ]
+
+        states: dict[int, dict[str, CaseChangeState]] = defaultdict(dict)
+        for chunk in chunks:
+            stmt = select(CaseChangeState).where(
+                CaseChangeState.maintenance_id == maintenance_id,
+            )
+            if chunk is not None:
+                stmt = stmt.where(CaseChangeState.case_id.in_(chunk))
+            for state in (await self.session.execute(stmt)).scalars().all():
+                states[state.case_id][state.attribute] = state
+        return dict(states)
+
+    async def find_stale(self, maintenance_id: str, anchor: str) -> set[int]:
+        """
+        已 fold 範圍內的記錄數與狀態不符的 Case（有記錄被刪除）。
+
+        比對 id <= last_record_id 的 ClientRecord 筆數與 record_count，
+        這些 Case 的狀態必須從完整歷史重建。
+        """
+        stmt = (
+            select(Case.id)
+            .join(
+                CaseChangeState,
+                and_(
+                    CaseChangeState.case_id == Case.id,
+                    CaseChangeState.attribute == anchor,
+                ),
+            )
+            .outerjoin(
+                ClientRecord,
+                and_(
+                    ClientRecord.maintenance_id == maintenance_id,
+                    ClientRecord.client_id == Case.client_id,
+                    ClientRecord.id <= CaseChangeState.last_record_id,
+                ),
+            )
+            .where(Case.maintenance_id == maintenance_id)
+            .group_by(Case.id, CaseChangeState.record_count)
+            .having(func.count(ClientRecord.id) != CaseChangeState.record_count)
+        )
+        return set((await self.session.execute(stmt)).scalars().all())
+
+    async def get_unfolded_records(
+        self,
+        maintenance_id: str,
+        anchor: str,
+        after_id: int = 0,
+    ) -> list[ClientRecord]:
+        """
+        已有狀態的 Case 尚未 fold 的記錄（id > last_record_id），按 client、時間排序。
+
+        after_id 為已知全部 fold 過的最大 id，只掃描其後的記錄。
+        """
+        stmt = (
+            select(ClientRecord)
+            .join(
+                Case,
+                and_(
+                    Case.maintenance_id == maintenance_id,
+                    Case.client_id == ClientRecord.client_id,
+                ),
+            )
+            .join(
+                CaseChangeState,
+                and_(
+                    CaseChangeState.case_id == Case.id,
+                    CaseChangeState.attribute == anchor,
+                ),
+            )
+            .where(
+                ClientRecord.maintenance_id == maintenance_id,
+                ClientRecord.id > after_id,
+                ClientRecord.id > CaseChangeState.last_record_id,
+            )
+            .order_by(
+                ClientRecord.client_id, ClientRecord.collected_at, ClientRecord.id,
+            )
+        )
+        return list((await self.session.execute(stmt)).scalars().all())
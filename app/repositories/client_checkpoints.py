@@ -0,0 +1,163 @@
+"""
+Client Checkpoint Repository.
+
+client_checkpoints 登記每個時間桶（checkpoint 間隔）的第一個 Client 快照時間，
+由採集寫入快照時附加；checkpoint 列表不必每次對 client_records 做
+DISTINCT collected_at 再分桶。某個 (歲修, 間隔) 尚無登記時自動從
+client_records 回填（既有資料、或 checkpoint 間隔設定變更後）。
+
+登記與回填都以 INSERT IGNORE 寫入：同時的第一次請求各自回填出相同的列，
+撞到 uk_client_checkpoint 的直接略過，不會拋 IntegrityError。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, delete, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ClientCheckpoint, ClientRecord
+from app.db.sql_functions import insert_ignore
+
+
+def checkpoint_bucket(dt: datetime, interval_minutes: int) -> str:
+    """
+    根據 checkpoint 間隔計算時間桶的 key。
+
+    Args:
+        dt: 時間點
+        interval_minutes: checkpoint 間隔（分鐘）
+
+    Returns:
+        時間桶的 key（用於分組）
+
+    Examples:
+        interval=60: 12:00, 12:30, 12:45 都會變成 "2024-01-01-12-00"
+        interval=30: 12:00 -> "2024-01-01-12-00", 12:30 -> "2024-01-01-12-30"
+        interval=15: 12:00 -> "2024-01-01-12-00", 12:15 -> "2024-01-01-12-15"
+    """
+    # 計算該時間點落在哪個時間桶
+    bucket_minute = (dt.minute // interval_minutes) * interval_minutes
+    return f"{dt.strftime('%Y-%m-%d-%H')}-{bucket_minute:02d}"
+
+
+class ClientCheckpointRepo:
+    """Registry of per-bucket Client snapshot times."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def register(
+        self,
+        maintenance_id: str,
+        collected_at: datetime,
+        interval_minutes: int,
+    ) -> None:
+        """
+        登記一個剛寫入的快照時間（呼叫端需先 flush 快照記錄）。
+
+        採集按時間順序寫入，時間桶已有登記時保留第一筆。
+        """
+        if await self._ensure_backfilled(maintenance_id, interval_minutes):
+            return
+
+        await self._insert([{
+            "maintenance_id": maintenance_id,
+            "interval_minutes": interval_minutes,
+            "bucket_key": checkpoint_bucket(collected_at, interval_minutes),
+            "checkpoint_time": collected_at,
+        }])
+
+    async def list_since(
+        self,
+        maintenance_id: str,
+        cutoff: datetime,
+        interval_minutes: int,
+    ) -> list[datetime]:
+        """
+        cutoff 之後的 checkpoint 時間（遞增）。
+
+        與「cutoff 之後的時間點分桶、每桶取第一筆」結果相同：
+        跨 cutoff 的時間桶改用 cutoff 之後的第一個快照。
+        """
+        await self._ensure_backfilled(maintenance_id, interval_minutes)
+
+        stmt = (
+            select(ClientCheckpoint.checkpoint_time)
+            .where(
+                ClientCheckpoint.maintenance_id == maintenance_id,
+                ClientCheckpoint.interval_minutes == interval_minutes,
+                ClientCheckpoint.checkpoint_time >= cutoff,
+            )
+            .order_by(ClientCheckpoint.checkpoint_time)
+        )
+        checkpoints = list((await self.session.execute(stmt)).scalars().all())
+
+        first_stmt = select(func.min(ClientRecord.collected_at)).where(
+            ClientRecord.maintenance_id == maintenance_id,
+            ClientRecord.collected_at >= cutoff,
+        )
+        first = (await self.session.execute(first_stmt)).scalar()
+        if first is not None and (
+            not checkpoints
+            or checkpoint_bucket(first, interval_minutes)
+            != checkpoint_bucket(checkpoints[0], interval_minutes)
+        ):
+            checkpoints.insert(0, first)
+
+        return checkpoints
+
+    async def delete_before(
+        self,
+        maintenance_id: str,
+        before: datetime | None = None,
+    ) -> int:
+        """刪除登記（before=None 表示全部），與 client_records 清理同步。"""
+        stmt = delete(ClientCheckpoint).where(
+            ClientCheckpoint.maintenance_id == maintenance_id,
+        )
+        if before is not None:
+            stmt = stmt.where(ClientCheckpoint.checkpoint_time < before)
+        result = cast(CursorResult[Any], await self.session.execute(stmt))
+        return result.rowcount or 0
+
+    async def _ensure_backfilled(
+        self,
+        maintenance_id: str,
+        interval_minutes: int,
+    ) -> bool:
+        """尚無登記時從 client_records 回填；有回填時回傳 True。"""
+        exists_stmt = select(ClientCheckpoint.id).where(
+            ClientCheckpoint.maintenance_id == maintenance_id,
+            ClientCheckpoint.interval_minutes == interval_minutes,
+        ).limit(1)
+        if (await self.session.execute(exists_stmt)).first() is not None:
+            return False
+
+        stmt = (
+            select(distinct(ClientRecord.collected_at))
+            .where(ClientRecord.maintenance_id == maintenance_id)
+            .order_by(ClientRecord.collected_at)
+        )
+        firsts: dict[str, datetime] = {}
+        for tp in (await self.session.execute(stmt)).scalars().all():
+            if tp is not None:
+                firsts.setdefault(checkpoint_bucket(tp, interval_minutes), tp)
+
+        await self._insert([
+            {
+                "maintenance_id": maintenance_id,
+                "interval_minutes": interval_minutes,
+                "bucket_key": bucket_key,
+                "checkpoint_time": tp,
+            }
+            for bucket_key, tp in firsts.items()
+        ])
+        return bool(firsts)
+
+    async def _insert(self, rows: list[dict[str, Any]]) -> None:
+        """寫入登記；時間桶已有登記（含其他請求同時寫入的）時保留既有的。"""
+        if rows:
+            await self.session.execute(insert_ignore(ClientCheckpoint), rows)
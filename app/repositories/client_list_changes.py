@@ -0,0 +1,60 @@
+"""
+Client List Change Repository.
+
+client_list_changes 為 Client 清單的寫入紀錄（每次寫入一筆，帶寫入端產生的 token），
+供記憶體中的搜尋索引判斷清單是否被修改、以及哪些異動是同一 process 寫入的。
+"""
+
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ClientListChange
+from app.repositories.sync_points import SyncVersion, get_sync_version
+
+
+class ClientListChangeRepo:
+    """client_list_changes 的寫入與同步點查詢。"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def record(self, maintenance_id: str) -> ClientListChange:
+        """新增一筆異動紀錄（flush 後回傳，id 已生成）。"""
+        change = ClientListChange(
+            maintenance_id=maintenance_id, token=uuid.uuid4().hex,
+        )
+        self.session.add(change)
+        await self.session.flush()
+        return change
+
+    async def get_version(
+        self,
+        maintenance_id: str,
+        known_max_id: int,
+    ) -> SyncVersion:
+        """搜尋索引與 DB 的同步點（見 app.repositories.sync_points）。"""
+        return await get_sync_version(
+            self.session, ClientListChange, maintenance_id, known_max_id,
+        )
+
+    async def get_tokens_after(
+        self,
+        maintenance_id: str,
+        after_id: int,
+        up_to_id: int,
+    ) -> list[str]:
+        """after_id < id <= up_to_id 的異動 token（按 id 排序）。"""
+        stmt = (
+            select(ClientListChange.token)
+            .where(
+                ClientListChange.maintenance_id == maintenance_id,
+                ClientListChange.id > after_id,
+                ClientListChange.id <= up_to_id,
+            )
+            .order_by(ClientListChange.id)
+        )
+        return list((await self.session.execute(stmt)).scalars().all())
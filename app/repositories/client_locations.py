@@ -0,0 +1,185 @@
+"""
+Client Location Repository.
+
+Client 位置候選在 DB 端組好：最新 mac_table_records 以 semi-join 只留下
+maintenance_mac_list 登記的 MAC，再以 (switch, interface) left join
+interface status、static / dynamic ACL 與 per-port MAC 數量。
+未登記主機的 MAC table rows 不會傳回應用程式，Python 只負責選位置的規則。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection
+from typing import Any
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    DynamicAclRecord,
+    InterfaceStatusRecord,
+    LatestCollectionBatch,
+    MacTableRecord,
+    MaintenanceMacList,
+    StaticAclRecord,
+)
+
+
+def _latest_scope(model: Any, collection_type: str, maintenance_id: str) -> list[Any]:
+    """與 TypedRecordRepository.get_latest_per_device 相同的範圍：每台設備最新 batch。"""
+    latest_batch_ids = select(LatestCollectionBatch.batch_id).where(
+        LatestCollectionBatch.collection_type == collection_type,
+        LatestCollectionBatch.maintenance_id == maintenance_id,
+    )
+    return [
+        model.batch_id.in_(latest_batch_ids),
+        model.maintenance_id == maintenance_id,
+    ]
+
+
+def _last_per_port(model: Any, scope: list[Any], *conditions: Any) -> Any:
+    """每個 (switch, interface) 只取 id 最大的一筆（同 Python dict 逐筆覆寫）。"""
+    last_ids = (
+        select(func.max(model.id))
+        .where(*scope, *conditions)
+        .group_by(model.switch_hostname, model.interface_name)
+    )
+    return model.id.in_(last_ids)
+
+
+def _acl_subquery(model: Any, collection_type: str, maintenance_id: str) -> Any:
+    scope = _latest_scope(model, collection_type, maintenance_id)
+    return (
+        select(model.switch_hostname, model.interface_name, model.acl_number)
+        .where(_last_per_port(
+            model, scope, model.acl_number.isnot(None), model.acl_number != "",
+        ))
+        .subquery()
+    )
+
+
+def _on_port(subquery: Any) -> Any:
+    return and_(
+        subquery.c.switch_hostname == MacTableRecord.switch_hostname,
+        subquery.c.interface_name == MacTableRecord.interface_name,
+    )
+
+
+class ClientLocationRepo:
+    """Location candidates of registered client MACs."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_candidates(
+        self,
+        maintenance_id: str,
+        macs: Collection[str] | None = None,
+    ) -> list[Any]:
+        """
+        已登記 MAC 在最新 MAC table 中的每一筆出現位置。
+
+        Args:
+            maintenance_id: 歲修 ID
+            macs: 只取這些 MAC（大寫）的候選；None = 全部已登記 MAC
+
+        Returns:
+            Row（mac_address, switch_hostname, interface_name, vlan_id,
+            speed, duplex, link_status, acl_number, mac_count）；
+            acl_number 為 static ACL 優先、dynamic ACL 補充，
+            mac_count 為該 port 在 MAC table 中的 MAC 總數（含未登記主機）。
+        """
+        mac_scope = _latest_scope(MacTableRecord, "get_mac_table", maintenance_id)
+        registered = select(func.upper(MaintenanceMacList.mac_address)).where(
+            MaintenanceMacList.maintenance_id == maintenance_id,
+        )
+
+        port_counts = (
+            select(
+                MacTableRecord.switch_hostname,
+                MacTableRecord.interface_name,
+                func.count().label("mac_count"),
+            )
+            .where(*mac_scope)
+            .group_by(MacTableRecord.switch_hostname, MacTableRecord.interface_name)
+            .subquery()
+        )
+
+        if_scope = _latest_scope(
+            InterfaceStatusRecord, "get_interface_status", maintenance_id,
+        )
+        interfaces = (
+            select(
+                InterfaceStatusRecord.switch_hostname,
+                InterfaceStatusRecord.interface_name,
+                InterfaceStatusRecord.speed,
+                InterfaceStatusRecord.duplex,
+                InterfaceStatusRecord.link_status,
+            )
+            .where(_last_per_port(InterfaceStatusRecord, if_scope))
+            .subquery()
+        )
+
+        static_acl = _acl_subquery(StaticAclRecord, "get_static_acl", maintenance_id)
+        dynamic_acl = _acl_subquery(
+            DynamicAclRecord, "get_dynamic_acl", maintenance_id,
+        )
+
+        stmt = (
+            select(
+                MacTableRecord.mac_address,
+                MacTableRecord.switch_hostname,
+                MacTableRecord.interface_name,
+                MacTableRecord.vlan_id,
+                interfaces.c.speed,
+                interfaces.c.duplex,
+                interfaces.c.link_status,
+                func.coalesce(
+                    static_acl.c.acl_number, dynamic_acl.c.acl_number,
+                ).label("acl_number"),
+                port_counts.c.mac_count,
+            )
+            .select_from(MacTableRecord)
+            .join(port_counts, _on_port(port_counts))
+            .outerjoin(interfaces, _on_port(interfaces))
+            .outerjoin(static_acl, _on_port(static_acl))
+            .outerjoin(dynamic_acl, _on_port(dynamic_acl))
+            .where(
+                *mac_scope,
+                func.upper(MacTableRecord.mac_address).in_(registered),
+            )
+            .order_by(MacTableRecord.id)
+        )
+        if macs is not None:
+            stmt = stmt.where(func.upper(MacTableRecord.mac_address).in_(macs))
+        result = await self.session.execute(stmt)
+        return list(result.all())
+
+    async def get_registered_macs_on(
+        self,
+        maintenance_id: str,
+        switch_hostnames: Collection[str],
+    ) -> set[str]:
+        """最新 MAC table 中出現在指定設備上的已登記 MAC（大寫）。"""
+        mac_upper = func.upper(MacTableRecord.mac_address)
+        stmt = (
+            select(mac_upper)
+            .where(
+                *_latest_scope(MacTableRecord, "get_mac_table", maintenance_id),
+                MacTableRecord.switch_hostname.in_(switch_hostnames),
+                mac_upper.in_(
+                    select(func.upper(MaintenanceMacList.mac_address)).where(
+                        MaintenanceMacList.maintenance_id == maintenance_id,
+                    )
+                ),
+            )
+            .distinct()
+        )
+        return set((await self.session.execute(stmt)).scalars().all())
+
+    async def count_mac_rows(self, maintenance_id: str) -> int:
+        """最新 MAC table 的總筆數（採集統計用）。"""
+        stmt = select(func.count()).select_from(MacTableRecord).where(
+            *_latest_scope(MacTableRecord, "get_mac_table", maintenance_id),
+        )
+        return (await self.session.execute(stmt)).scalar() or 0
@@ -0,0 +1,208 @@
+"""
+Client Record Repository.
+
+client_records 只在資料變化時寫入，[collected_at, valid_to) 為每筆狀態的有效區間。
+「時間 T 所有 MAC 的狀態」是 (maintenance_id, valid_to, collected_at) 上的
+range 查詢，不必掃描 T 之前的完整歷史再在 Python 取每個 MAC 的第一筆。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ClientRecord
+from app.repositories.sync_points import SyncVersion, get_sync_version
+
+# 快照標記的特殊 MAC 地址（用於在沒有實際資料時記錄時間點）
+SNAPSHOT_MARKER_MAC = "__MARKER__"
+
+# 關閉舊區間時 IN 條件每批的 MAC 數
+_CLOSE_CHUNK_SIZE = 500
+
+
+def mac_key(record: ClientRecord) -> str:
+    """比對 / 分組用的 MAC（大寫）。"""
+    return (record.mac_address or "").upper()
+
+
+def stored_macs(macs: Iterable[str]) -> list[str]:
+    """
+    以 MAC 欄位本身比對（可用 maintenance_id + mac_address 索引）時的 IN 清單。
+
+    新記錄存大寫；舊資料可能是小寫，兩種寫法都列入。
+    """
+    return sorted({form for mac in macs for form in (mac.upper(), mac.lower())})
+
+
+def _is_preferred(candidate: ClientRecord, current: ClientRecord | None) -> bool:
+    """
+    同一 MAC 有多筆有效記錄時的取捨：較新者優先；
+    同時間點（同 MAC 多個 client）取 id 最小者，結果才是確定的。
+    """
+    if current is None:
+        return True
+    # 候選記錄都來自 collected_at 不為 NULL 的查詢
+    assert candidate.collected_at is not None
+    assert current.collected_at is not None
+    if candidate.collected_at != current.collected_at:
+        return candidate.collected_at > current.collected_at
+    return candidate.id < current.id
+
+
+class ClientRecordRepo:
+    """As-of queries and validity maintenance for ClientRecord."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    @staticmethod
+    def _scope(maintenance_id: str) -> list[Any]:
+        return [
+            ClientRecord.maintenance_id == maintenance_id,
+            ClientRecord.mac_address.isnot(None),
+            ClientRecord.mac_address != "",
+            ClientRecord.mac_address != SNAPSHOT_MARKER_MAC,
+        ]
+
+    async def get_state_at(
+        self,
+        maintenance_id: str,
+        at: datetime | None = None,
+    ) -> dict[str, ClientRecord]:
+        """
+        時間 at 時每個 MAC 的狀態（at=None 表示目前狀態）。
+
+        Returns:
+            {MAC（大寫）: ClientRecord}，每個 MAC 恰好一筆。
+        """
+        conditions = self._scope(maintenance_id)
+        if at is None:
+            conditions.append(ClientRecord.valid_to.is_(None))
+        else:
+            conditions += [
+                ClientRecord.collected_at <= at,
+                or_(ClientRecord.valid_to.is_(None), ClientRecord.valid_to > at),
+            ]
+        result = await self.session.execute(select(ClientRecord).where(*conditions))
+
+        state: dict[str, ClientRecord] = {}
+        for record in result.scalars().all():
+            key = mac_key(record)
+            if _is_preferred(record, state.get(key)):
+                state[key] = record
+        return state
+
+    async def get_change_log(
+        self,
+        maintenance_id: str,
+        start: datetime,
+        end: datetime,
+        *,
+        collected_after: datetime | None = None,
+    ) -> list[ClientRecord]:
+        """
+        [start, end] 期間曾經有效的記錄（變化點），供按時間順序掃描。
+
+        collected_after 只取該時間之後寫入的變化點（延伸已載入的區段）。
+
+        Returns:
+            按 collected_at 遞增；同時間點 id 小者排在後面，
+            依序套用後每個 MAC 的最後一筆即為 get_state_at 的選擇。
+        """
+        conditions = self._scope(maintenance_id) + [
+            ClientRecord.collected_at <= end,
+            or_(ClientRecord.valid_to.is_(None), ClientRecord.valid_to > start),
+        ]
+        if collected_after is not None:
+            conditions.append(ClientRecord.collected_at > collected_after)
+        stmt = (
+            select(ClientRecord)
+            .where(*conditions)
+            .order_by(ClientRecord.collected_at, ClientRecord.id.desc())
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def fingerprint(
+        self,
+        maintenance_id: str,
+        until: datetime,
+    ) -> tuple[int, int | None]:
+        """
+        until 之前（含）記錄的 (筆數, 最大 id)。
+
+        歷史記錄只會被刪除（清單移除 MAC、保留期限清理），
+        指紋不變即表示快取的變化點仍與 DB 一致。
+        """
+        stmt = select(func.count(), func.max(ClientRecord.id)).where(
+            ClientRecord.maintenance_id == maintenance_id,
+            ClientRecord.collected_at <= until,
+        )
+        count, max_id = (await self.session.execute(stmt)).one()
+        return count, max_id
+
+    async def get_version(
+        self,
+        maintenance_id: str,
+        known_max_id: int,
+    ) -> SyncVersion:
+        """記憶體快取與 DB 的同步點（見 app.repositories.sync_points）。"""
+        return await get_sync_version(
+            self.session, ClientRecord, maintenance_id, known_max_id,
+        )
+
+    async def get_written_after(
+        self,
+        maintenance_id: str,
+        after_id: int,
+        up_to_id: int,
+    ) -> list[ClientRecord]:
+        """id 在 (after_id, up_to_id] 的記錄，順序同 get_change_log。"""
+        stmt = (
+            select(ClientRecord)
+            .where(
+                *self._scope(maintenance_id),
+                ClientRecord.id > after_id,
+                ClientRecord.id <= up_to_id,
+            )
+            .order_by(ClientRecord.collected_at, ClientRecord.id.desc())
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def close_superseded(
+        self,
+        maintenance_id: str,
+        records: Iterable[ClientRecord],
+        now: datetime,
+    ) -> None:
+        """
+        寫入新變化點前呼叫：同 MAC 仍有效的舊記錄 valid_to 設為 now。
+
+        MAC 比對不分大小寫（與讀取端的 upper() 分組一致）。
+        """
+        macs: set[str] = set()
+        for record in records:
+            if record.mac_address:
+                mac = record.mac_address
+                macs.update((mac, mac.upper(), mac.lower()))
+        ordered = sorted(macs)
+
+        for i in range(0, len(ordered), _CLOSE_CHUNK_SIZE):
+            chunk = ordered[i:i + _CLOSE_CHUNK_SIZE]
+            await self.session.execute(
+                update(ClientRecord)
+                .where(
+                    ClientRecord.maintenance_id == maintenance_id,
+                    ClientRecord.mac_address.in_(chunk),
+                    ClientRecord.valid_to.is_(None),
+                    ClientRecord.collected_at < now,
+                )
+                .values(valid_to=now)
+                .execution_options(synchronize_session=False)
+            )
@@ -0,0 +1,78 @@
+"""
+Indicator Result Repository.
+
+indicator_results 每個 (maintenance_id, indicator_type) 只保留最新一筆，
+由背景評估器批次覆寫（IN 條件一次刪除 + 一次寫入），讀取端點直接查詢。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IndicatorResult
+
+
+class IndicatorResultRepo:
+    """Read / replace the stored latest IndicatorResult rows."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_latest(self, maintenance_id: str) -> list[IndicatorResult]:
+        """取得某歲修已儲存的所有指標結果。"""
+        stmt = select(IndicatorResult).where(
+            IndicatorResult.maintenance_id == maintenance_id,
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_versions(
+        self,
+        maintenance_id: str,
+    ) -> list[tuple[str, int, datetime]]:
+        """
+        已儲存結果的 (indicator_type, id, evaluated_at)，不載入 details。
+
+        背景評估器每次覆寫都產生新的 id，呼叫端可據此判斷結果是否變動。
+        """
+        stmt = select(
+            IndicatorResult.indicator_type,
+            IndicatorResult.id,
+            IndicatorResult.evaluated_at,
+        ).where(IndicatorResult.maintenance_id == maintenance_id)
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+
+    async def replace(
+        self,
+        maintenance_ids: Iterable[str],
+        rows: list[IndicatorResult],
+    ) -> None:
+        """
+        以 rows 覆寫指定歲修的結果。
+
+        maintenance_ids 內但 rows 沒有的指標（評估失敗）一併清除，
+        讓讀取端改走即時評估而不是回傳舊結果。呼叫端負責 commit。
+        """
+        ids = list(maintenance_ids)
+        if not ids:
+            return
+        await self.session.execute(
+            delete(IndicatorResult).where(
+                IndicatorResult.maintenance_id.in_(ids),
+            )
+        )
+        self.session.add_all(rows)
+        await self.session.flush()
+
+    async def invalidate(self, maintenance_id: str) -> None:
+        """清除某歲修的結果（閾值等評估設定變更後呼叫）。"""
+        await self.session.execute(
+            delete(IndicatorResult).where(
+                IndicatorResult.maintenance_id == maintenance_id,
+            )
+        )
@@ -0,0 +1,223 @@
+"""
+Indicator Rollup Repository.
+
+讀取 save_batch 寫入時產生的 per-batch 彙總（indicator_rollups），
+時間序列 / 降採樣查詢只掃 rollup rows，與 typed rows 數量無關。
+
+rebuild_rollups 以 collection_batches 歷史重建彙總（backfill）。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import CollectionBatch, IndicatorRollup
+from app.repositories.typed_records import TYPED_REPO_MAP, get_typed_repo
+
+
+@dataclass(frozen=True)
+class RollupAggregate:
+    """多筆 rollup 合併後的 count/sum/min/max。"""
+
+    count: int
+    total: float
+    min: float | None
+    max: float | None
+
+    @property
+    def avg(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+
+class IndicatorRollupRepo:
+    """Query / rebuild IndicatorRollup rows for one collection type."""
+
+    def __init__(self, session: AsyncSession, collection_type: str) -> None:
+        self.session = session
+        self.collection_type = collection_type
+
+    def _scope(self, maintenance_id: str, metrics: tuple[str, ...]) -> list[Any]:
+        return [
+            IndicatorRollup.maintenance_id == maintenance_id,
+            IndicatorRollup.collection_type == self.collection_type,
+            IndicatorRollup.metric.in_(metrics),
+        ]
+
+    async def get_recent_series(
+        self,
+        maintenance_id: str,
+        metrics: tuple[str, ...],
+        limit: int,
+    ) -> list[tuple[datetime, dict[str, RollupAggregate]]]:
+        """
+        最近 limit 個時間點，每點各 metric 的彙總（跨設備合併）。
+
+        Returns:
+            [(collected_at, {metric: RollupAggregate}), ...]，時間遞增排序。
+        """
+        scope = self._scope(maintenance_id, metrics)
+        # 先取最近 limit 個時間點（derived table join，MariaDB 不支援 IN + LIMIT）
+        recent = (
+            select(IndicatorRollup.collected_at)
+            .where(*scope)
+            .group_by(IndicatorRollup.collected_at)
+            .order_by(IndicatorRollup.collected_at.desc())
+            .limit(limit)
+            .subquery()
+        )
+        stmt = (
+            select(
+                IndicatorRollup.collected_at,
+                IndicatorRollup.metric,
+                func.sum(IndicatorRollup.sample_count).label("samples"),
+                func.sum(IndicatorRollup.value_sum).label("total"),
+                func.min(IndicatorRollup.value_min).label("min"),
+                func.max(IndicatorRollup.value_max).label("max"),
+            )
+            .join(recent, recent.c.collected_at == IndicatorRollup.collected_at)
+            .where(*scope)
+            .group_by(IndicatorRollup.collected_at, IndicatorRollup.metric)
+            .order_by(IndicatorRollup.collected_at)
+        )
+        result = await self.session.execute(stmt)
+
+        series: list[tuple[datetime, dict[str, RollupAggregate]]] = []
+        for row in result.all():
+            if not series or series[-1][0] != row.collected_at:
+                series.append((row.collected_at, {}))
+            series[-1][1][row.metric] = RollupAggregate(
+                count=int(row.samples or 0),
+                total=float(row.total or 0.0),
+                min=row.min,
+                max=row.max,
+            )
+        return series
+
+    async def get_bucketed_aggregates(
+        self,
+        maintenance_id: str,
+        metrics: tuple[str, ...],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+    ) -> list[dict[str, Any]]:
+        """
+        [start, end) 依固定寬度 bucket 合併 rollups。
+
+        回傳格式與 TypedRecordRepository.get_bucketed_aggregates 相同
+        （可直接交給 buckets_from_aggregates）；avg = SUM(sum) / SUM(count)，
+        count 取各 metric 樣本數的最大值。
+        """
+        from app.db.sql_functions import epoch_seconds
+
+        start_epoch = int(start.replace(tzinfo=UTC).timestamp())
+        bucket_col = (
+            (epoch_seconds(IndicatorRollup.collected_at) - start_epoch)
+            // bucket_seconds
+        ).label("bucket")
+
+        stmt = (
+            select(
+                bucket_col,
+                IndicatorRollup.metric,
+                func.sum(IndicatorRollup.sample_count).label("samples"),
+                func.sum(IndicatorRollup.value_sum).label("total"),
+                func.min(IndicatorRollup.value_min).label("min"),
+                func.max(IndicatorRollup.value_max).label("max"),
+            )
+            .where(
+                *self._scope(maintenance_id, metrics),
+                IndicatorRollup.collected_at >= start,
+                IndicatorRollup.collected_at < end,
+            )
+            .group_by(bucket_col, IndicatorRollup.metric)
+            .order_by(bucket_col)
+        )
+        result = await self.session.execute(stmt)
+
+        buckets: dict[int, dict[str, Any]] = {}
+        for row in result.all():
+            entry = buckets.setdefault(
+                int(row.bucket), {"bucket": int(row.bucket), "count": 0},
+            )
+            count = int(row.samples or 0)
+            entry["count"] = max(entry["count"], count)
+            entry[f"{row.metric}_min"] = row.min
+            entry[f"{row.metric}_avg"] = (
+                float(row.total) / count if count else None
+            )
+            entry[f"{row.metric}_max"] = row.max
+        return [buckets[b] for b in sorted(buckets)]
+
+
+async def rebuild_rollups(
+    session: AsyncSession,
+    collection_type: str,
+    maintenance_id: str | None = None,
+) -> int:
+    """
+    從 collection_batches 歷史重建某採集類型的 rollups（冪等）。
+
+    依設備、時間順序走訪每個 batch，先重算 derive_row_fields 衍生欄位
+    （如 CRC 增量），再刪除該 batch 既有 rollups 重新寫入。呼叫端負責 commit。
+
+    Returns:
+        處理的 batch 數。
+    """
+    repo = get_typed_repo(collection_type, session)
+    if not repo.rollup_metrics:
+        return 0
+
+    # 只取 metadata 欄位（不載入 raw_data）
+    stmt = select(
+        CollectionBatch.id,
+        CollectionBatch.maintenance_id,
+        CollectionBatch.collection_type,
+        CollectionBatch.switch_hostname,
+        CollectionBatch.collected_at,
+    ).where(
+        CollectionBatch.collection_type == collection_type,
+    )
+    if maintenance_id is not None:
+        stmt = stmt.where(CollectionBatch.maintenance_id == maintenance_id)
+    stmt = stmt.order_by(
+        CollectionBatch.maintenance_id,
+        CollectionBatch.switch_hostname,
+        CollectionBatch.collected_at,
+        CollectionBatch.id,
+    )
+    batches = list((await session.execute(stmt)).all())
+
+    previous: dict[tuple[str, str], int] = {}
+    for batch in batches:
+        key = (batch.maintenance_id, batch.switch_hostname)
+        rows_result = await session.execute(
+            select(repo.model).where(repo.model.batch_id == batch.id)
+        )
+        rows = list(rows_result.scalars().all())
+
+        await session.execute(
+            delete(IndicatorRollup).where(IndicatorRollup.batch_id == batch.id)
+        )
+        await repo.derive_row_fields(rows, previous.get(key))
+        rollups = await repo.save_rollups(batch, rows, previous.get(key))
+        await session.flush()
+        # 歷史量大時避免 identity map 持續膨脹
+        for obj in (*rows, *rollups):
+            session.expunge(obj)
+        previous[key] = batch.id
+
+    return len(batches)
+
+
+def rollup_collection_types() -> list[str]:
+    """有產生 rollups 的採集類型。"""
+    return [
+        name for name, repo_cls in TYPED_REPO_MAP.items()
+        if repo_cls.rollup_metrics
+    ]
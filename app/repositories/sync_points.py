@@ -0,0 +1,43 @@
+"""
+Sync points between in-process caches and append-only tables.
+
+記憶體中的快取（ClientStateStore、ClientSearchStore、Case 的異動摘要）
+以「只新增、id 遞增」的表判斷 DB 是否變動。同步點為一個查詢取得的
+(總筆數, 最大 id, id <= 已知最大 id 的筆數)：
+
+- 已知部分的筆數不變、最大 id 變大 → 只有新增，可增量套用 id 較大的部分
+- 已知部分的筆數變少 → 有紀錄被刪除，需重新載入
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ClientListChange, ClientRecord
+
+
+class SyncVersion(NamedTuple):
+    total: int
+    max_id: int | None
+    known_count: int
+
+
+async def get_sync_version(
+    session: AsyncSession,
+    model: type[ClientRecord] | type[ClientListChange],
+    maintenance_id: str,
+    known_max_id: int,
+) -> SyncVersion:
+    """model 在歲修內的同步點（三個值來自同一個查詢）。"""
+    stmt = select(
+        func.count(),
+        func.max(model.id),
+        func.coalesce(
+            func.sum(case((model.id <= known_max_id, 1), else_=0)), 0,
+        ),
+    ).where(model.maintenance_id == maintenance_id)
+    total, max_id, known_count = (await session.execute(stmt)).one()
+    return SyncVersion(total, max_id, int(known_count))
@@ -12,18 +12,25 @@ from __future__ import annotations
 import hashlib
 import json
 import re
+from collections.abc import Sequence
 from datetime import UTC, datetime
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Protocol, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import and_, func, select
+from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.interfaces import (
+    MANAGEMENT_INTERFACE_PREFIXES,
+    is_management_interface,
+)
 from app.db.base import Base
 from app.db.models import (
     CollectionBatch,
     DynamicAclRecord,
     FanRecord,
+    IndicatorRollup,
     InterfaceErrorRecord,
     InterfaceStatusRecord,
     LatestCollectionBatch,
@@ -36,6 +43,7 @@ from app.db.models import (
     TransceiverRecord,
     VersionRecord,
 )
+from app.repositories.batch_events import BatchChange, record_change
 
 ModelT = TypeVar("ModelT", bound=Base)
 RecordT = TypeVar("RecordT", bound=Base)
@@ -105,6 +113,63 @@ def _compute_hash(parsed_items: list[BaseModel]) -> str:
     ).hexdigest()[:16]
 
 
+def _field_samples(
+    rows: list[Any],
+    fields: tuple[str, ...],
+) -> dict[str, list[float]]:
+    """field → 非 None 的數值樣本（rollup 用）。"""
+    samples: dict[str, list[float]] = {}
+    for name in fields:
+        samples[name] = [
+            float(v) for v in (getattr(r, name) for r in rows) if v is not None
+        ]
+    return samples
+
+
+def _status_not_ok_samples(rows: list[Any]) -> list[float]:
+    """風扇 / 電源：每筆 1.0 = 狀態異常、0.0 = 正常（sum 即異常數）。"""
+    healthy = settings.operational_healthy_set
+    return [
+        0.0 if str(r.status).lower().strip() in healthy else 1.0
+        for r in rows
+    ]
+
+
+class RollupBatch(Protocol):
+    """_build_rollup 讀取的 batch 欄位（CollectionBatch 或 select 出的 Row）。"""
+
+    @property
+    def id(self) -> int: ...
+    @property
+    def maintenance_id(self) -> str: ...
+    @property
+    def collection_type(self) -> str: ...
+    @property
+    def switch_hostname(self) -> str: ...
+    @property
+    def collected_at(self) -> datetime: ...
+
+
+def _build_rollup(
+    batch: RollupBatch,
+    metric: str,
+    samples: list[float],
+) -> IndicatorRollup:
+    """一個 batch × metric 的 count/sum/min/max（無樣本時 min/max 為 None）。"""
+    return IndicatorRollup(
+        batch_id=batch.id,
+        maintenance_id=batch.maintenance_id,
+        collection_type=batch.collection_type,
+        switch_hostname=batch.switch_hostname,
+        collected_at=batch.collected_at,
+        metric=metric,
+        sample_count=len(samples),
+        value_sum=float(sum(samples)),
+        value_min=min(samples) if samples else None,
+        value_max=max(samples) if samples else None,
+    )
+
+
 class TypedRecordRepository(Generic[RecordT]):
     """
     Generic repository for typed record tables.
@@ -114,10 +179,14 @@ class TypedRecordRepository(Generic[RecordT]):
     - get_latest_per_device: latest batch of rows per hostname
     - get_time_series_records: typed rows ordered by time
     - get_latest_records: raw typed rows ordered by time
+
+    rollup_metrics 非空的子類，save_batch 會同時為新 batch 寫入
+    IndicatorRollup（見 rollup_values）。
     """
 
     model: type[RecordT]
     collection_type: str
+    rollup_metrics: tuple[str, ...] = ()
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
@@ -137,6 +206,8 @@ class TypedRecordRepository(Generic[RecordT]):
         - hash 相同 → 只更新 last_checked_at，不建新 batch
         - hash 不同 → 資料有變化，建新 batch + typed rows + 更新指標
 
+        hash 改變時記錄 BatchChange（commit 後發佈，見 batch_events）。
+
         Returns:
             The created CollectionBatch, or None if skipped (unchanged).
         """
@@ -171,6 +242,7 @@ class TypedRecordRepository(Generic[RecordT]):
         await self.session.flush()  # get batch.id
 
         # 建 typed rows（統一 normalize interface 名稱）
+        rows: list[RecordT] = []
         for item in parsed_items:
             data = item.model_dump()
             if "interface_name" in data and data["interface_name"]:
@@ -193,6 +265,13 @@ class TypedRecordRepository(Generic[RecordT]):
                 **data,
             )
             self.session.add(row)
+            rows.append(row)
+
+        # 衍生欄位與 per-batch 彙總（需在指標更新前，
+        # latest.batch_id 仍為上一個變化點）
+        previous_batch_id = latest.batch_id if latest else None
+        await self.derive_row_fields(rows, previous_batch_id)
+        await self.save_rollups(batch, rows, previous_batch_id)
 
         # 更新或建立 LatestCollectionBatch 指標
         if latest:
@@ -212,8 +291,52 @@ class TypedRecordRepository(Generic[RecordT]):
             ))
 
         await self.session.flush()
+        record_change(self.session, BatchChange(
+            maintenance_id, self.collection_type, switch_hostname,
+        ))
         return batch
 
+    async def derive_row_fields(
+        self,
+        rows: list[RecordT],
+        previous_batch_id: int | None,
+    ) -> None:
+        """
+        寫入前填入需跨 batch 比對的衍生欄位（預設無）。
+
+        previous_batch_id 為同設備上一個變化點（首次採集為 None）。
+        """
+
+    async def rollup_values(
+        self,
+        rows: list[RecordT],
+        previous_batch_id: int | None,
+    ) -> dict[str, list[float]]:
+        """
+        metric → 此 batch 的樣本值（彙總為 IndicatorRollup）。
+
+        預設取 rollup_metrics 同名欄位的非 None 值；
+        呼叫時 derive_row_fields 已完成。
+        """
+        return _field_samples(rows, self.rollup_metrics)
+
+    async def save_rollups(
+        self,
+        batch: RollupBatch,
+        rows: list[RecordT],
+        previous_batch_id: int | None,
+    ) -> list[IndicatorRollup]:
+        """為 batch 建立 IndicatorRollup（不 flush，隨 save_batch 一起寫入）。"""
+        if not self.rollup_metrics:
+            return []
+        values = await self.rollup_values(rows, previous_batch_id)
+        rollups = [
+            _build_rollup(batch, metric, samples)
+            for metric, samples in values.items()
+        ]
+        self.session.add_all(rollups)
+        return rollups
+
     async def get_latest_per_device(
         self,
         maintenance_id: str,
@@ -224,22 +347,112 @@ class TypedRecordRepository(Generic[RecordT]):
         Uses LatestCollectionBatch for O(1) lookup of latest batch_id,
         then JOINs to get all typed rows from those batches.
         """
+        by_mid = await self.get_latest_per_device_many([maintenance_id])
+        return by_mid[maintenance_id]
+
+    async def get_latest_per_device_many(
+        self,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, list[RecordT]]:
+        """get_latest_per_device for several maintenances in one IN query."""
+        mid_column = self.model.__table__.c.maintenance_id
+        stmt = select(mid_column, self.model).where(
+            self.model.batch_id.in_(self._latest_batch_ids(maintenance_ids)),
+            mid_column.in_(maintenance_ids),
+        )
+
+        result = await self.session.execute(stmt)
+        by_mid: dict[str, list[RecordT]] = {mid: [] for mid in maintenance_ids}
+        for mid, record in result.tuples():
+            by_mid[mid].append(record)
+        return by_mid
+
+    async def get_latest_columns_per_device(
+        self,
+        maintenance_id: str,
+        *column_names: str,
+    ) -> list[Any]:
+        """
+        Same rows as get_latest_per_device, but only the requested columns.
+
+        回傳 SQLAlchemy Row（支援屬性存取），不建立 ORM 物件；
+        適合大量 rows 只需少數欄位的評估路徑。
+        """
+        by_mid = await self.get_latest_columns_per_device_many(
+            [maintenance_id], *column_names,
+        )
+        return by_mid[maintenance_id]
+
+    async def get_latest_columns_per_device_many(
+        self,
+        maintenance_ids: Sequence[str],
+        *column_names: str,
+    ) -> dict[str, list[Any]]:
+        """
+        get_latest_columns_per_device for several maintenances in one IN query.
+
+        Row 另含 maintenance_id 欄位（分組用）。
+        """
+        columns = [
+            getattr(self.model, name)
+            for name in ("maintenance_id", *column_names)
+        ]
+        stmt = select(*columns).where(
+            self.model.batch_id.in_(self._latest_batch_ids(maintenance_ids)),
+            self.model.maintenance_id.in_(maintenance_ids),
+        )
+
+        result = await self.session.execute(stmt)
+        by_mid: dict[str, list[Any]] = {mid: [] for mid in maintenance_ids}
+        for row in result.all():
+            by_mid[row.maintenance_id].append(row)
+        return by_mid
+
+    def _latest_batch_ids(self, maintenance_ids: Sequence[str]) -> Any:
+        """Subquery: latest batch_id per device for this collection type."""
         latest = (
             select(LatestCollectionBatch.batch_id)
             .where(
                 LatestCollectionBatch.collection_type == self.collection_type,
-                LatestCollectionBatch.maintenance_id == maintenance_id,
+                LatestCollectionBatch.maintenance_id.in_(maintenance_ids),
             )
             .subquery()
         )
+        return select(latest.c.batch_id)
 
-        stmt = select(self.model).where(
-            self.model.batch_id.in_(select(latest.c.batch_id)),
-            self.model.maintenance_id == maintenance_id,
-        )
+    async def get_latest_item_counts(
+        self,
+        maintenance_id: str,
+    ) -> dict[str, int]:
+        """hostname → 最新 batch 的 item_count（有採集 batch 的設備才會出現）。"""
+        by_mid = await self.get_latest_item_counts_many([maintenance_id])
+        return by_mid[maintenance_id]
 
+    async def get_latest_item_counts_many(
+        self,
+        maintenance_ids: Sequence[str],
+    ) -> dict[str, dict[str, int]]:
+        """get_latest_item_counts for several maintenances in one IN query."""
+        stmt = (
+            select(
+                LatestCollectionBatch.maintenance_id,
+                LatestCollectionBatch.switch_hostname,
+                CollectionBatch.item_count,
+            )
+            .join(
+                CollectionBatch,
+                CollectionBatch.id == LatestCollectionBatch.batch_id,
+            )
+            .where(
+                LatestCollectionBatch.collection_type == self.collection_type,
+                LatestCollectionBatch.maintenance_id.in_(maintenance_ids),
+            )
+        )
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        by_mid: dict[str, dict[str, int]] = {mid: {} for mid in maintenance_ids}
+        for mid, host, count in result.all():
+            by_mid[mid][host] = count or 0
+        return by_mid
 
     async def get_latest_batch_info(
         self,
@@ -316,6 +529,61 @@ class TypedRecordRepository(Generic[RecordT]):
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def get_bucketed_aggregates(
+        self,
+        maintenance_id: str,
+        fields: tuple[str, ...],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        exclude_management: bool = False,
+    ) -> list[dict[str, Any]]:
+        """
+        Downsample typed rows in [start, end) into fixed-width time buckets.
+
+        start / end 為 naive UTC（與 collected_at 儲存方式相同）。
+
+        由 DB 端 GROUP BY 計算每個 bucket 的 count 與各欄位 min/avg/max，
+        回傳筆數最多為 (end - start) / bucket_seconds，與原始 rows 數量無關。
+
+        Returns:
+            [{"bucket": int, "count": int, "<field>_min": ..., ...}, ...]
+            bucket 為自 start 起算的 bucket 序號（遞增排序）。
+        """
+        from app.db.sql_functions import epoch_seconds
+
+        start_epoch = int(start.replace(tzinfo=UTC).timestamp())
+        # collected_at >= start → 差值非負，整數除法即 floor
+        bucket_col = (
+            (epoch_seconds(self.model.collected_at) - start_epoch)
+            // bucket_seconds
+        ).label("bucket")
+
+        columns: list[Any] = [bucket_col, func.count().label("count")]
+        for name in fields:
+            col = getattr(self.model, name)
+            columns += [
+                func.min(col).label(f"{name}_min"),
+                func.avg(col).label(f"{name}_avg"),
+                func.max(col).label(f"{name}_max"),
+            ]
+
+        stmt = select(*columns).where(
+            self.model.maintenance_id == maintenance_id,
+            self.model.collected_at >= start,
+            self.model.collected_at < end,
+        )
+        if exclude_management:
+            iface = func.lower(self.model.interface_name)
+            stmt = stmt.where(~or_(*(
+                iface.like(f"{prefix}%")
+                for prefix in MANAGEMENT_INTERFACE_PREFIXES
+            )))
+        stmt = stmt.group_by(bucket_col).order_by(bucket_col)
+
+        result = await self.session.execute(stmt)
+        return [dict(row._mapping) for row in result.all()]
+
     async def get_latest_records(
         self,
         maintenance_id: str,
@@ -364,6 +632,18 @@ class TransceiverRecordRepo(TypedRecordRepository[TransceiverRecord]):
 
     model = TransceiverRecord
     collection_type = "get_gbic_details"
+    rollup_metrics = ("tx_power", "rx_power", "temperature", "voltage")
+
+    async def rollup_values(
+        self,
+        rows: list[TransceiverRecord],
+        previous_batch_id: int | None,
+    ) -> dict[str, list[float]]:
+        """與指標評估一致，管理介面不計入彙總。"""
+        return _field_samples(
+            [r for r in rows if not is_management_interface(r.interface_name)],
+            self.rollup_metrics,
+        )
 
     async def save_batch(
         self,
@@ -417,6 +697,113 @@ class NeighborCdpRecordRepo(TypedRecordRepository[NeighborRecord]):
 class InterfaceErrorRecordRepo(TypedRecordRepository[InterfaceErrorRecord]):
     model = InterfaceErrorRecord
     collection_type = "get_error_count"
+    rollup_metrics = ("crc_errors", "input_errors", "output_errors", "crc_growth")
+
+    _COUNTER_FIELDS = ("crc_errors", "input_errors", "output_errors")
+
+    async def derive_row_fields(
+        self,
+        rows: list[InterfaceErrorRecord],
+        previous_batch_id: int | None,
+    ) -> None:
+        """
+        與上一個變化點同名介面比對，填入 prev_crc_errors / crc_delta / first_growth_at。
+
+        - 首次採集或新介面 → prev_crc_errors=None、crc_delta=0
+        - first_growth_at：首次觀察到 crc_delta > 0 的時間，之後的 batch 沿用
+        """
+        prev: dict[str, tuple[int, datetime | None]] = {}
+        if previous_batch_id is not None:
+            result = await self.session.execute(
+                select(
+                    InterfaceErrorRecord.interface_name,
+                    InterfaceErrorRecord.crc_errors,
+                    InterfaceErrorRecord.first_growth_at,
+                ).where(InterfaceErrorRecord.batch_id == previous_batch_id)
+            )
+            prev = {name: (crc, first) for name, crc, first in result.all()}
+
+        for r in rows:
+            prev_crc, first_growth_at = prev.get(r.interface_name, (None, None))
+            r.prev_crc_errors = prev_crc
+            r.crc_delta = (
+                (r.crc_errors or 0) - prev_crc if prev_crc is not None else 0
+            )
+            if r.crc_delta > 0 and first_growth_at is None:
+                first_growth_at = r.collected_at
+            r.first_growth_at = first_growth_at
+
+    async def rollup_values(
+        self,
+        rows: list[InterfaceErrorRecord],
+        previous_batch_id: int | None,
+    ) -> dict[str, list[float]]:
+        """
+        計數器欄位 + crc_growth。
+
+        crc_growth 樣本 = 有歷史可比的介面之 crc_delta（負值視為 0）；
+        首次採集或新介面不產生樣本。
+        """
+        # 計數器欄位 DB default 0；寫入時尚未 flush 的 None 同樣視為 0
+        values = {
+            name: [float(getattr(r, name) or 0) for r in rows]
+            for name in self._COUNTER_FIELDS
+        }
+        values["crc_growth"] = [
+            float(max(r.crc_delta, 0))
+            for r in rows
+            if r.prev_crc_errors is not None
+        ]
+        return values
+
+    async def get_growing_interfaces(
+        self,
+        maintenance_id: str,
+        since: datetime | None = None,
+    ) -> list[Any]:
+        """
+        crc_delta > 0 的介面 rows（只取評估需要的欄位）。
+
+        since 為 None → 只看各設備最新 batch（最新變化點 vs 上一個）；
+        否則取 collected_at >= since 的所有 batch（時間窗內任何增長）。
+        """
+        by_mid = await self.get_growing_interfaces_many([maintenance_id], since)
+        return by_mid[maintenance_id]
+
+    async def get_growing_interfaces_many(
+        self,
+        maintenance_ids: Sequence[str],
+        since: datetime | None = None,
+    ) -> dict[str, list[Any]]:
+        """get_growing_interfaces for several maintenances in one IN query."""
+        stmt = select(
+            InterfaceErrorRecord.maintenance_id,
+            InterfaceErrorRecord.switch_hostname,
+            InterfaceErrorRecord.interface_name,
+            InterfaceErrorRecord.crc_errors,
+            InterfaceErrorRecord.prev_crc_errors,
+            InterfaceErrorRecord.crc_delta,
+            InterfaceErrorRecord.first_growth_at,
+            InterfaceErrorRecord.collected_at,
+        ).where(
+            InterfaceErrorRecord.maintenance_id.in_(maintenance_ids),
+            InterfaceErrorRecord.crc_delta > 0,
+        )
+        if since is None:
+            stmt = stmt.where(
+                InterfaceErrorRecord.batch_id.in_(
+                    self._latest_batch_ids(maintenance_ids),
+                ),
+            )
+        else:
+            stmt = stmt.where(InterfaceErrorRecord.collected_at >= since)
+        stmt = stmt.order_by(InterfaceErrorRecord.collected_at)
+
+        result = await self.session.execute(stmt)
+        by_mid: dict[str, list[Any]] = {mid: [] for mid in maintenance_ids}
+        for row in result.all():
+            by_mid[row.maintenance_id].append(row)
+        return by_mid
 
 
 class StaticAclRecordRepo(TypedRecordRepository[StaticAclRecord]):
@@ -438,11 +825,27 @@ class MacTableRecordRepo(TypedRecordRepository[MacTableRecord]):
 class FanRecordRepo(TypedRecordRepository[FanRecord]):
     model = FanRecord
     collection_type = "get_fan"
+    rollup_metrics = ("status_not_ok",)
+
+    async def rollup_values(
+        self,
+        rows: list[Any],
+        previous_batch_id: int | None,
+    ) -> dict[str, list[float]]:
+        return {"status_not_ok": _status_not_ok_samples(rows)}
 
 
 class PowerRecordRepo(TypedRecordRepository[PowerRecord]):
     model = PowerRecord
     collection_type = "get_power"
+    rollup_metrics = ("status_not_ok",)
+
+    async def rollup_values(
+        self,
+        rows: list[Any],
+        previous_batch_id: int | None,
+    ) -> dict[str, list[float]]:
+        return {"status_not_ok": _status_not_ok_samples(rows)}
 
 
 class VersionRecordRepo(TypedRecordRepository[VersionRecord]):
@@ -558,6 +961,9 @@ class ClientPingRecordRepo(TypedRecordRepository[PingRecord]):
         latest.last_checked_at = now
 
         await self.session.flush()
+        record_change(self.session, BatchChange(
+            maintenance_id, self.collection_type, switch_hostname,
+        ))
         return batch if changed > 0 else None
 
 
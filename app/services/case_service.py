@@ -6,16 +6,21 @@ Case Service.
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from sqlalchemy import case, select, func, update, and_, or_
+from sqlalchemy import select, func, update, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.enums import CaseStatus, UserRole
 from app.db.models import (
-    Case, CaseNote, ClientRecord, MaintenanceMacList, User,
+    Case, CaseChangeState, CaseNote, ClientRecord, MaintenanceMacList, User,
 )
+from app.db.pagination import SortKey, paginate
+from app.repositories.case_change_states import CaseChangeStateRepo
+from app.repositories.client_records import ClientRecordRepo
 from app.services.system_log import write_log
 
 logger = logging.getLogger(__name__)
@@ -108,6 +113,138 @@ def _detect_change(
     return False  # 規則 5：歷史無空值，一直穩定
 
 
+# change_flags 規則 4：None → 值 轉換後需穩定這麼久才不算變化
+_STABILIZE_AFTER = timedelta(minutes=15)
+
+# IN 條件每批的 id 數
+_IN_CHUNK_SIZE = 1000
+
+
+def _reset_state(state: CaseChangeState) -> None:
+    """清空已 fold 的內容（從完整歷史重建前）。"""
+    state.distinct_values = []
+    state.has_none = False
+    state.last_value = None
+    state.transition_at = None
+    state.record_count = 0
+    state.last_record_id = 0
+    state.last_collected_at = None
+
+
+def _fold_record(state: CaseChangeState, record: ClientRecord) -> None:
+    """
+    把一筆時間上最新的 ClientRecord 併入屬性狀態。
+
+    與 _detect_change / _get_transition_ts 對完整歷史的判斷等價：
+    不同非空值只需記到兩個；transition_at 為最後一個空值之後第一個非空值的時間，
+    最末為空值時清除。
+    """
+    value = getattr(record, state.attribute, None)
+    if value is None:
+        state.has_none = True
+        state.last_value = None
+        state.transition_at = None
+    else:
+        text = str(value)
+        if state.last_value is None and state.has_none:
+            state.transition_at = record.collected_at  # 空值 → 有值
+        if text not in state.distinct_values and len(state.distinct_values) < 2:
+            state.distinct_values = [*state.distinct_values, text]
+        state.last_value = text
+    state.record_count += 1
+    state.last_record_id = max(state.last_record_id, record.id)
+    state.last_collected_at = record.collected_at
+
+
+def _state_flag(
+    state: CaseChangeState,
+    now: datetime,
+) -> tuple[bool, datetime | None]:
+    """
+    依 fold 後的狀態判斷屬性是否有變化（規則同 _detect_change）。
+
+    第二個值為規則 4b 的 True 在穩定期結束後轉為 False 的時間點，其餘為 None。
+    """
+    if not state.distinct_values:
+        return False, None  # 規則 1：無快照或全部為空
+    if len(state.distinct_values) > 1:
+        return True, None  # 規則 2：多個不同值
+    if state.last_value is None:
+        return False, None  # 規則 3：最近為空
+    if not state.has_none:
+        return False, None  # 規則 5：一直穩定
+    if state.transition_at is None:
+        return True, None  # 規則 4b：無時間資訊
+    ts = state.transition_at
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    if (now - ts) > _STABILIZE_AFTER:
+        return False, None  # 規則 4a：已穩定
+    return True, ts + _STABILIZE_AFTER  # 規則 4b：剛變化
+
+
+def _compute_change_flags(
+    states: dict[str, CaseChangeState],
+    now: datetime,
+) -> tuple[dict[str, bool], datetime | None]:
+    """
+    一個 Case 的 change_flags，以及結果會隨時間改變的時間點。
+
+    規則 4b 的 True 在轉換滿 15 分鐘後會自動變成 False；
+    回傳其中最早的時間點，讓呼叫端在那之後重算（沒有則為 None）。
+    """
+    flags: dict[str, bool] = {}
+    deadline: datetime | None = None
+    for attr in TRACKED_ATTRIBUTES:
+        flags[attr], stable_at = _state_flag(states[attr], now)
+        if stable_at is not None and (deadline is None or stable_at < deadline):
+            deadline = stable_at
+    return flags, deadline
+
+
+def _change_rank(flags: dict[str, Any] | None) -> int:
+    """
+    change_flags 的列表排序值（Case.change_rank，越小越前面）。
+
+    變化數量多的在前；數量相同時依 TRACKED_ATTRIBUTES 順序逐級比較
+    （ping 有變化的在前，再比 VLAN …），每個屬性佔一個 bit。
+    沒有任何變化為 (7 << 7) | 0b1111111 = 1023（欄位預設值）。
+    """
+    changed = [bool((flags or {}).get(attr)) for attr in TRACKED_ATTRIBUTES]
+    rank = len(changed) - sum(changed)
+    for has_change in changed:
+        rank = rank << 1 | (not has_change)
+    return rank
+
+
+# Case.ping_rank：ping 不可達優先（未知 → 不可達 → 可達）
+_PING_RANK: dict[bool | None, int] = {None: 0, False: 1, True: 2}
+
+
+def _folds_in_order(state: CaseChangeState, records: list[ClientRecord]) -> bool:
+    """新記錄都排在已 fold 的範圍之後（否則需從完整歷史重建）。"""
+    if not records or state.record_count == 0:
+        return True
+    first, last = records[0].collected_at, state.last_collected_at
+    if last is None:
+        return True
+    return first is not None and first >= last
+
+
+@dataclass
+class _FlagWatermark:
+    """update_change_flags 上次處理到的位置（每個歲修一筆）。"""
+
+    max_id: int  # 已處理的最大 ClientRecord.id
+    record_count: int  # 當時的 ClientRecord 筆數（偵測刪除）
+    case_ids: set[int]
+    # 規則 4b 為 True 的 Case → 穩定期結束的時間
+    stabilizing: dict[int, datetime]
+
+
+_flag_watermarks: dict[str, _FlagWatermark] = {}
+
+
 class CaseService:
     """案件管理服務。"""
 
@@ -193,13 +330,20 @@ class CaseService:
         include_resolved: bool = False,
         page: int = 1,
         page_size: int = 50,
+        cursor: str | None = None,
     ) -> dict[str, Any]:
         """
-        取得案件列表（含篩選、分頁），按 ping 不可達優先排序。
+        取得案件列表（含篩選、分頁），按屬性變化、ping 不可達優先排序。
 
         合併 MaintenanceMacList 的 ip_address、description、tenant_group。
         預設隱藏已解決案件，除非明確篩選或 include_resolved=True。
         回傳包含預先計算的 change_tags（來自 Case.change_flags）。
+
+        帶 cursor 時以 keyset 接續上一頁（不重算總數，total / page /
+        total_pages 為 None）；否則依 page 頁碼分頁。皆回傳 next_cursor。
+
+        Raises:
+            InvalidCursorError: cursor 無法解碼。
         """
         # 查詢案件 + MAC 資訊
         stmt = (
@@ -250,67 +394,33 @@ class CaseService:
                 search_conditions.append(field_match)
             stmt = stmt.where(or_(*search_conditions))
 
-        # 計算篩選後總數
-        count_stmt = select(func.count()).select_from(stmt.subquery())
-        total = (await session.execute(count_stmt)).scalar() or 0
-
-        # 排序：所有分類統一規則
-        # 1) 有屬性變化的排前面
-        # 2) 變化數量多的排前面
-        # 3) 逐級比較變化屬性（ping → VLAN → ACL → 連線狀態 → 速率 → 雙工 → 介面）
-        # 4) ping 不可達優先
-        # 5) 按 MAC 排序
-        from sqlalchemy import literal_column
-        _cf = literal_column("COALESCE(CAST(change_flags AS CHAR),'')")
-        has_change = case((_cf.like('%true%'), 0), else_=1)
-
-        # 變化數量（用字串長度差異法）
-        _cf_len = func.char_length(_cf)
-        _cf_no_true = func.char_length(func.replace(_cf, 'true', ''))
-        change_count_desc = (_cf_len - _cf_no_true) / 4
-
-        # 逐級比較：每個屬性獨立排序，有變化=0 排前面，無變化=1
-        _chg_ping = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.ping_reachable')=1,0,1)")
-        _chg_vlan = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.vlan_id')=1,0,1)")
-        _chg_acl = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.acl_rules_applied')=1,0,1)")
-        _chg_link = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.link_status')=1,0,1)")
-        _chg_speed = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.speed')=1,0,1)")
-        _chg_duplex = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.duplex')=1,0,1)")
-        _chg_iface = literal_column(
-            "IF(JSON_VALUE(change_flags,'$.interface_name')=1,0,1)")
-
-        ping_priority = case(
-            (Case.last_ping_reachable == None, 0),   # noqa: E711
-            (Case.last_ping_reachable == False, 1),   # noqa: E712
-            else_=2,
-        )
-
-        stmt = stmt.order_by(
-            has_change,                # 有變化排前面
-            change_count_desc.desc(),  # 變化數量多排前面
-            _chg_ping,                 # 0: ping
-            _chg_vlan,                 # 1: VLAN
-            _chg_acl,                  # 2: ACL
-            _chg_link,                 # 3: 連線狀態
-            _chg_speed,                # 4: 速率
-            _chg_duplex,               # 4: 雙工
-            _chg_iface,                # 5: 介面
-            ping_priority,             # ping 不可達優先
-            Case.mac_address,
+        # 計算篩選後總數（keyset 接續頁不重算）
+        total = None
+        if not cursor:
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await session.execute(count_stmt)).scalar() or 0
+
+        # 排序：所有分類統一規則（排序值由 update_change_flags / update_ping
+        # 預先寫入，依 ix_cases_mid_rank 順序讀取）
+        # 1) 變化數量多的排前面
+        # 2) 逐級比較變化屬性（ping → VLAN → ACL → 連線狀態 → 速率 → 雙工 → 介面）
+        # 3) ping 不可達優先
+        # 4) 按 MAC 排序
+        sort_keys = [
+            SortKey(Case.change_rank),
+            SortKey(Case.ping_rank),
+            SortKey(Case.mac_address),
+            SortKey(Case.id),                            # 唯一決定順序（游標）
+        ]
+        result = await paginate(
+            session,
+            stmt,
+            sort_keys,
+            limit=page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
         )
-
-        # 分頁
-        offset = (page - 1) * page_size
-        stmt = stmt.offset(offset).limit(page_size)
-
-        result = await session.execute(stmt)
-        rows = result.all()
+        rows = result.rows
 
         # 使用預算的 change_flags（由排程 update_change_flags 維護），
         # 不再即時查 client_records，省掉一次大查詢 + N×7 次 _detect_change。
@@ -343,15 +453,18 @@ class CaseService:
                 "updated_at": case_obj.updated_at.isoformat() if case_obj.updated_at else None,
             })
 
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 1
+        total_pages = None
+        if total is not None:
+            total_pages = (total + page_size - 1) // page_size if total > 0 else 1
 
         return {
             "cases": cases,
             "count": len(cases),
             "total": total,
-            "page": page,
+            "page": None if cursor else page,
             "page_size": page_size,
             "total_pages": total_pages,
+            "next_cursor": result.next_cursor,
         }
 
     async def get_case_stats(
@@ -774,68 +887,92 @@ class CaseService:
           - 不可達 → 可達：設為 now()
           - 可達 → 可達：保持原值不變
           - 可達 → 不可達：清除為 NULL
+
+        Set-based：依最新 ping 結果（可達 / 不可達 / 未知）各一個 UPDATE，
+        只更新狀態需要改變的 Case，不逐筆 UPDATE。
         """
         now = datetime.now(timezone.utc)
 
-        # 取得每個 client_id 最新的 ClientRecord
-        latest_subq = (
+        # 每個 client_id 最新的 ClientRecord（走 ix_cr_mid_cid_ts）
+        latest_ts = (
             select(
                 ClientRecord.client_id,
-                ClientRecord.ping_reachable,
-                func.row_number().over(
-                    partition_by=ClientRecord.client_id,
-                    order_by=ClientRecord.collected_at.desc(),
-                ).label("rn"),
+                func.max(ClientRecord.collected_at).label("collected_at"),
             )
             .where(
                 ClientRecord.maintenance_id == maintenance_id,
                 ClientRecord.client_id.isnot(None),
             )
+            .group_by(ClientRecord.client_id)
             .subquery()
         )
 
-        latest_stmt = (
-            select(latest_subq.c.client_id, latest_subq.c.ping_reachable)
-            .where(latest_subq.c.rn == 1)
-        )
-        result = await session.execute(latest_stmt)
-        latest_pings = result.fetchall()
-
-        # 取得現有 Case 的 ping 狀態
-        case_stmt = select(
-            Case.client_id, Case.last_ping_reachable, Case.ping_reachable_since,
-        ).where(Case.maintenance_id == maintenance_id)
-        case_result = await session.execute(case_stmt)
-        case_states = {
-            row[0]: (row[1], row[2])
-            for row in case_result.fetchall()
-        }
-
-        for client_id, ping_reachable in latest_pings:
-            old_reachable, old_since = case_states.get(client_id, (None, None))
-
-            # 計算 ping_reachable_since
-            if ping_reachable is True:
-                if old_reachable is True and old_since is not None:
-                    # 持續可達：保持原始時間
-                    new_since = old_since
-                else:
-                    # 新轉為可達：記錄起始時間
-                    new_since = now
-            else:
-                # 不可達或未知：清除計時器
-                new_since = None
+        def latest_with(ping_condition: Any) -> Any:
+            return (
+                select(ClientRecord.client_id)
+                .join(latest_ts, and_(
+                    ClientRecord.client_id == latest_ts.c.client_id,
+                    ClientRecord.collected_at == latest_ts.c.collected_at,
+                ))
+                .where(
+                    ClientRecord.maintenance_id == maintenance_id,
+                    ping_condition,
+                )
+            )
 
+        transitions = [
+            # 新轉為可達（或缺少起始時間）：記錄起始時間；持續可達者不動
+            (
+                ClientRecord.ping_reachable == True,  # noqa: E712
+                or_(
+                    Case.last_ping_reachable.is_(None),
+                    Case.last_ping_reachable == False,  # noqa: E712
+                    Case.ping_reachable_since.is_(None),
+                ),
+                {
+                    "last_ping_reachable": True,
+                    "ping_rank": _PING_RANK[True],
+                    "ping_reachable_since": now,
+                },
+            ),
+            # 不可達：清除計時器
+            (
+                ClientRecord.ping_reachable == False,  # noqa: E712
+                or_(
+                    Case.last_ping_reachable.is_(None),
+                    Case.last_ping_reachable == True,  # noqa: E712
+                    Case.ping_reachable_since.isnot(None),
+                ),
+                {
+                    "last_ping_reachable": False,
+                    "ping_rank": _PING_RANK[False],
+                    "ping_reachable_since": None,
+                },
+            ),
+            # 未知：清除計時器
+            (
+                ClientRecord.ping_reachable.is_(None),
+                or_(
+                    Case.last_ping_reachable.isnot(None),
+                    Case.ping_reachable_since.isnot(None),
+                ),
+                {
+                    "last_ping_reachable": None,
+                    "ping_rank": _PING_RANK[None],
+                    "ping_reachable_since": None,
+                },
+            ),
+        ]
+        for ping_condition, needs_update, values in transitions:
             await session.execute(
                 update(Case)
                 .where(
                     Case.maintenance_id == maintenance_id,
-                    Case.client_id == client_id,
-                )
-                .values(
-                    last_ping_reachable=ping_reachable,
-                    ping_reachable_since=new_since,
+                    Case.client_id.in_(latest_with(ping_condition)),
+                    needs_update,
                 )
+                .values(**values)
+                .execution_options(synchronize_session=False)
             )
 
         await session.commit()
@@ -931,63 +1068,200 @@ class CaseService:
         session: AsyncSession,
     ) -> int:
         """
-        批量更新所有 Case 的 change_flags（預先計算屬性變化）。
+        增量更新 Case 的 change_flags（預先計算屬性變化）。
+
+        每個 (Case, 屬性) 的偵測狀態保存在 case_change_states，
+        只把上次之後的新 ClientRecord fold 進去；只重算有新記錄的 client、
+        新建立的 Case，以及「剛從空值轉為有值」且 15 分鐘穩定期已到的 Case。
+        重啟或有記錄被刪除時檢查每個 Case 的 fold 範圍，
+        只有新 Case、記錄被刪除或亂序寫入的 Case 才讀取完整歷史重建。
+        結果只寫入 change_flags 真的改變的 Case（一個 executemany UPDATE）。
 
-        對每個 Case 的 MAC，查詢 ClientRecord 並偵測各屬性變化，
-        結果存入 Case.change_flags JSON 欄位。
+        Returns:
+            change_flags 有改變的 Case 數。
         """
-        # 取得所有 Case 的 client_id
+        now = datetime.now(timezone.utc)
+
         case_stmt = select(Case.id, Case.client_id).where(
             Case.maintenance_id == maintenance_id,
         )
-        case_result = await session.execute(case_stmt)
-        case_rows = case_result.fetchall()
-
-        if not case_rows:
+        case_clients = {
+            case_id: client_id
+            for case_id, client_id in (await session.execute(case_stmt)).fetchall()
+        }
+        if not case_clients:
+            _flag_watermarks.pop(maintenance_id, None)
             return 0
 
-        # 一次查詢所有 ClientRecord（避免 N+1，排除系統標記）
-        all_records_stmt = (
-            select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-                ClientRecord.client_id.isnot(None),
-            )
-            .order_by(ClientRecord.client_id, ClientRecord.collected_at)
+        mark = _flag_watermarks.pop(maintenance_id, None)
+        total, max_id, known_count = await ClientRecordRepo(session).get_version(
+            maintenance_id, mark.max_id if mark else 0,
         )
-        records_result = await session.execute(all_records_stmt)
-        all_records = records_result.scalars().all()
-
-        # 按 client_id 分組
-        from collections import defaultdict
-        records_by_client: dict[int, list] = defaultdict(list)
-        for r in all_records:
-            if r.client_id:
-                records_by_client[r.client_id].append(r)
+        state_repo = CaseChangeStateRepo(session)
+        anchor = TRACKED_ATTRIBUTES[0]
+
+        stale: set[int] = set()
+        if mark is None or known_count != mark.record_count:
+            targets = set(case_clients)
+            stabilizing: dict[int, datetime] = {}
+            states = await state_repo.load(maintenance_id)
+            stale = await state_repo.find_stale(maintenance_id, anchor)
+            pending = await state_repo.get_unfolded_records(maintenance_id, anchor)
+        else:
+            pending = []
+            if max_id is not None and max_id > mark.max_id:
+                pending = await state_repo.get_unfolded_records(
+                    maintenance_id, anchor, after_id=mark.max_id,
+                )
+            new_clients = {r.client_id for r in pending}
+            targets = {
+                case_id for case_id, client_id in case_clients.items()
+                if client_id in new_clients
+                or case_id not in mark.case_ids
+                or mark.stabilizing.get(case_id, now) < now
+            }
+            stabilizing = {
+                case_id: deadline
+                for case_id, deadline in mark.stabilizing.items()
+                if case_id in case_clients and case_id not in targets
+            }
+            states = await state_repo.load(maintenance_id, targets) if targets else {}
+
+        pending_by_client: dict[int, list[ClientRecord]] = defaultdict(list)
+        for r in pending:
+            pending_by_client[r.client_id].append(r)
+
+        # 可直接 fold 的 Case → 新記錄；其餘從完整歷史重建
+        to_fold: dict[int, list[ClientRecord]] = {}
+        for case_id in targets:
+            case_states = states.get(case_id, {})
+            if case_id in stale or len(case_states) != len(TRACKED_ATTRIBUTES):
+                continue
+            last_id = case_states[anchor].last_record_id
+            records = [
+                r for r in pending_by_client.get(case_clients[case_id], [])
+                if r.id > last_id
+            ]
+            if _folds_in_order(case_states[anchor], records):
+                to_fold[case_id] = records
+        rebuild = targets - to_fold.keys()
 
         updated = 0
-        for case_id, client_id in case_rows:
-            records = records_by_client.get(client_id, [])
-            flags = {}
-            for attr in TRACKED_ATTRIBUTES:
-                values = [getattr(r, attr, None) for r in records]
-                flags[attr] = _detect_change(
-                    values,
-                    last_collected_at=_get_transition_ts(records, attr),
+        if targets:
+            histories: dict[int, list[ClientRecord]] = {}
+            if rebuild:
+                histories = await self._load_client_histories(
+                    maintenance_id,
+                    {case_clients[case_id] for case_id in rebuild},
+                    session,
+                    all_clients=len(rebuild) == len(case_clients),
                 )
 
-            await session.execute(
-                update(Case)
-                .where(Case.id == case_id)
-                .values(change_flags=flags)
-            )
-            updated += 1
+            changed: list[dict[str, Any]] = []
+            for case_id, old_flags in await self._load_change_flags(targets, session):
+                if case_id in rebuild:
+                    case_states = self._reset_change_states(
+                        maintenance_id, case_id, states.get(case_id, {}), session,
+                    )
+                    records = histories.get(case_clients[case_id], [])
+                else:
+                    case_states = states[case_id]
+                    records = to_fold[case_id]
+                for record in records:
+                    for state in case_states.values():
+                        _fold_record(state, record)
+
+                flags, deadline = _compute_change_flags(case_states, now)
+                if deadline is not None:
+                    stabilizing[case_id] = deadline
+                if flags != old_flags:
+                    changed.append({
+                        "id": case_id,
+                        "change_flags": flags,
+                        "change_rank": _change_rank(flags),
+                    })
+
+            if changed:
+                await session.execute(update(Case), changed)
+            updated = len(changed)
 
         await session.commit()
+        _flag_watermarks[maintenance_id] = _FlagWatermark(
+            max_id=max_id or 0,
+            record_count=total,
+            case_ids=set(case_clients),
+            stabilizing=stabilizing,
+        )
 
         if updated > 0:
             logger.info(
-                "Updated change_flags for %d cases in %s",
-                updated, maintenance_id,
+                "Updated change_flags for %d cases in %s (%d rebuilt from history)",
+                updated, maintenance_id, len(rebuild),
             )
         return updated
+
+    @staticmethod
+    def _reset_change_states(
+        maintenance_id: str,
+        case_id: int,
+        existing: dict[str, CaseChangeState],
+        session: AsyncSession,
+    ) -> dict[str, CaseChangeState]:
+        """清空（缺少的則新建）一個 Case 所有追蹤屬性的偵測狀態。"""
+        states: dict[str, CaseChangeState] = {}
+        for attr in TRACKED_ATTRIBUTES:
+            state = existing.get(attr)
+            if state is None:
+                state = CaseChangeState(
+                    maintenance_id=maintenance_id, case_id=case_id, attribute=attr,
+                )
+                session.add(state)
+            _reset_state(state)
+            states[attr] = state
+        return states
+
+    @staticmethod
+    async def _load_client_histories(
+        maintenance_id: str,
+        client_ids: set[int],
+        session: AsyncSession,
+        all_clients: bool,
+    ) -> dict[int, list[ClientRecord]]:
+        """指定 client 的完整 ClientRecord 歷史（按時間排序，排除系統標記）。"""
+        conditions = [
+            ClientRecord.maintenance_id == maintenance_id,
+            ClientRecord.client_id.isnot(None),
+        ]
+        chunks: list[list[int] | None] = [None]
+        if not all_clients:
+            ordered = sorted(client_ids)
+            chunks = [
+                ordered[i:i + _IN_CHUNK_SIZE]
+                for i in range(0, len(ordered), _IN_CHUNK_SIZE)
+            ]
+
+        records_by_client: dict[int, list[ClientRecord]] = defaultdict(list)
+        for chunk in chunks:
+            stmt = select(ClientRecord).where(*conditions)
+            if chunk is not None:
+                stmt = stmt.where(ClientRecord.client_id.in_(chunk))
+            stmt = stmt.order_by(
+                ClientRecord.client_id, ClientRecord.collected_at, ClientRecord.id,
+            )
+            for r in (await session.execute(stmt)).scalars().all():
+                records_by_client[r.client_id].append(r)
+        return records_by_client
+
+    @staticmethod
+    async def _load_change_flags(
+        case_ids: set[int],
+        session: AsyncSession,
+    ) -> list[tuple[int, dict[str, bool] | None]]:
+        ordered = sorted(case_ids)
+        rows: list[tuple[int, dict[str, bool] | None]] = []
+        for i in range(0, len(ordered), _IN_CHUNK_SIZE):
+            stmt = select(Case.id, Case.change_flags).where(
+                Case.id.in_(ordered[i:i + _IN_CHUNK_SIZE]),
+            )
+            rows.extend((await session.execute(stmt)).fetchall())
+        return rows
@@ -9,23 +9,53 @@ Client Collection Service — 純 DB 讀取版。
   2. interface_status_records → 該 interface 的 speed / duplex / link_status
   3. gnms_ping ping_records   → client IP 的 ping 狀態
   4. static_acl / dynamic_acl records → 該 interface 的 ACL 規則
+
+增量組裝：訂閱 save_batch 的 BatchChange，只重算受影響的 client；
+定期完整組裝一次，涵蓋其他 process 寫入的 batch。
 """
 from __future__ import annotations
 
 import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, NamedTuple
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.db.base import get_session_context
 from app.db.models import ClientRecord, LatestClientRecord, MaintenanceMacList
+from app.repositories.batch_events import BatchChange, subscribe
+from app.repositories.client_checkpoints import ClientCheckpointRepo
+from app.repositories.client_locations import ClientLocationRepo
+from app.repositories.client_records import (
+    SNAPSHOT_MARKER_MAC,
+    ClientRecordRepo,
+)
+from app.services.client_state_store import get_client_state_store
 
 logger = logging.getLogger(__name__)
 
 # ── MAC 匹配 helpers ────────────────────────────────────────────
 
+
+class _Candidate(NamedTuple):
+    """MAC 的一個候選位置（勝出者才轉成 ClientRecord）。"""
+
+    mac_address: str | None
+    switch_hostname: str | None
+    interface_name: str | None
+    vlan_id: int | None
+    speed: str | None
+    duplex: str | None
+    link_status: str | None
+    acl_rules_applied: str | None
+    speed_mbps: int | None
+
+
 from app.core.interfaces import is_port_channel as _is_port_channel
 
 
@@ -50,6 +80,83 @@ def _parse_speed_mbps(speed: str | None) -> int | None:
         return None
 
 
+# ── 事件驅動的增量組裝 ───────────────────────────────────────────
+
+# 影響位置選擇的 collection types（BatchChange 以 switch 為單位）
+_LOCATION_TYPES = frozenset({
+    "get_mac_table",
+    "get_interface_status",
+    "get_static_acl",
+    "get_dynamic_acl",
+    "get_uplink_lldp",
+    "get_uplink_cdp",
+})
+_PING_TYPE = "gnms_ping"
+
+# IN 清單上限：受影響的 MAC 超過此數量時直接完整組裝
+_MAX_IN_LIST = 2000
+
+
+@dataclass
+class _PendingChanges:
+    """上次組裝後已 commit 的 batch 變化。"""
+
+    switches: set[str] = field(default_factory=set)
+    ping: bool = False
+
+
+@dataclass
+class _AssemblyState:
+    """上次組裝的結果；增量組裝只更新受影響的部分。"""
+
+    clients: dict[int, tuple[str, str | None]]  # client id → (MAC, IP)
+    ping: dict[str, bool]
+    mac_row_count: int
+    best: dict[str, _Candidate] = field(default_factory=dict)  # MAC（大寫）→ 位置
+    switches_by_mac: dict[str, set[str]] = field(default_factory=dict)
+    macs_by_switch: dict[str, set[str]] = field(default_factory=dict)
+    found_count: int = 0
+    assembled_at: float = field(default_factory=time.monotonic)
+
+    def relocate(
+        self,
+        macs: Iterable[str],
+        located: dict[str, _Candidate],
+        candidate_rows: Iterable[Any],
+    ) -> None:
+        """以重新查詢的候選取代 macs 原本的位置與候選 switch。"""
+        for mac in macs:
+            for switch in self.switches_by_mac.pop(mac, ()):
+                self.macs_by_switch[switch].discard(mac)
+            self.best.pop(mac, None)
+        self.best.update(located)
+        for r in candidate_rows:
+            mac = r.mac_address.upper()
+            self.switches_by_mac.setdefault(mac, set()).add(r.switch_hostname)
+            self.macs_by_switch.setdefault(r.switch_hostname, set()).add(mac)
+
+    def count_found(self) -> None:
+        self.found_count = sum(
+            1 for mac, _ in self.clients.values() if mac.upper() in self.best
+        )
+
+
+_pending_changes: dict[str, _PendingChanges] = {}
+_assembly_states: dict[str, _AssemblyState] = {}
+
+
+def _on_batch_change(change: BatchChange) -> None:
+    if change.collection_type in _LOCATION_TYPES:
+        pending = _pending_changes.setdefault(change.maintenance_id, _PendingChanges())
+        pending.switches.add(change.switch_hostname)
+    elif change.collection_type == _PING_TYPE:
+        pending = _pending_changes.setdefault(change.maintenance_id, _PendingChanges())
+        pending.ping = True
+
+
+subscribe(_on_batch_change)
+
+
 class ClientCollectionService:
     """
     客戶端資料組裝服務。
@@ -68,15 +175,21 @@ class ClientCollectionService:
         """
         主入口：從 DB 讀取已採集的資料，組裝 ClientRecord。
 
+        事件驅動：只重算 batch 有變化的 switch 上有候選位置的 MAC、
+        清單有變動的 client 與 ping 結果改變的 client；沒有任何變化的一輪
+        只更新 last_checked_at。首次組裝、或距上次完整組裝超過
+        client_full_assembly_interval_seconds 時重算全部 client。
+
         Args:
             maintenance_id: 歲修 ID
 
         Returns:
-            採集統計
+            採集統計（mode: full / incremental / unchanged）
         """
         results: dict[str, Any] = {
             "collection_type": "client",
             "maintenance_id": maintenance_id,
+            "mode": "full",
             "total": 0,
             "success": 0,
             "failed": 0,
@@ -85,14 +198,17 @@ class ClientCollectionService:
         }
 
         now = datetime.now(timezone.utc)
+        # 先取出事件再讀資料：之後才 commit 的變化留給下一輪
+        changes = _pending_changes.pop(maintenance_id, None)
+        # 組裝失敗時不留下 state，下一輪完整重算
+        state = _assembly_states.pop(maintenance_id, None)
+        written: list[ClientRecord] = []
 
         async with get_session_context() as session:
             # 1. 載入 MAC 白名單
-            client_list = await self._load_client_list(
-                maintenance_id, session,
-            )
+            clients = await self._load_client_keys(maintenance_id, session)
 
-            if not client_list:
+            if not clients:
                 await self._write_snapshot_marker(
                     session=session,
                     maintenance_id=maintenance_id,
@@ -104,226 +220,58 @@ class ClientCollectionService:
                 )
                 return results
 
-            # MAC → list of clients（同一 MAC 可能對應多個 client，如 VM）
-            from collections import defaultdict as _defaultdict
-            mac_to_clients: dict[str, list[MaintenanceMacList]] = _defaultdict(list)
-            for c in client_list:
-                mac_to_clients[c.mac_address.upper()].append(c)
-
-            # 2. 從 DB 讀取最新 mac_table_records
-            from app.repositories.typed_records import get_typed_repo
-
-            mac_repo = get_typed_repo("get_mac_table", session)
-            mac_records = await mac_repo.get_latest_per_device(
-                maintenance_id,
-            )
-
-            # 3. 從 DB 讀取最新 interface_status_records
-            if_repo = get_typed_repo("get_interface_status", session)
-            if_records = await if_repo.get_latest_per_device(
-                maintenance_id,
-            )
-
-            # 4. 從 DB 讀取最新 gnms_ping records
-            ping_repo = get_typed_repo("gnms_ping", session)
-            ping_records = await ping_repo.get_latest_per_device(
-                maintenance_id,
-            )
-
-            # 5. 從 DB 讀取最新 ACL records (static + dynamic)
-            sacl_repo = get_typed_repo("get_static_acl", session)
-            sacl_records = await sacl_repo.get_latest_per_device(
-                maintenance_id,
-            )
-            dacl_repo = get_typed_repo("get_dynamic_acl", session)
-            dacl_records = await dacl_repo.get_latest_per_device(
-                maintenance_id,
-            )
-
-            # 5b. 從 DB 讀取最新 neighbor records (LLDP + CDP)
-            lldp_repo = get_typed_repo("get_uplink_lldp", session)
-            lldp_records = await lldp_repo.get_latest_per_device(
-                maintenance_id,
-            )
-            cdp_repo = get_typed_repo("get_uplink_cdp", session)
-            cdp_records = await cdp_repo.get_latest_per_device(
-                maintenance_id,
-            )
-
-            # 6. 建立 lookup maps
-            # interface_status: (switch_hostname, interface_name) → record
-            if_map: dict[tuple[str, str], Any] = {}
-            for r in if_records:
-                if_map[(r.switch_hostname, r.interface_name)] = r
-
-            # gnms_ping: target IP → is_reachable
-            ping_map: dict[str, bool] = {}
-            for r in ping_records:
-                ping_map[r.target] = r.is_reachable
-
-            # ACL: (switch_hostname, interface_name) → acl_number
-            # static ACL 優先，dynamic ACL 補充
-            acl_map: dict[tuple[str, str], str | None] = {}
-            for r in dacl_records:
-                if r.acl_number:
-                    acl_map[(r.switch_hostname, r.interface_name)] = r.acl_number
-            for r in sacl_records:
-                if r.acl_number:
-                    acl_map[(r.switch_hostname, r.interface_name)] = r.acl_number
-
-            # neighbor: (switch_hostname, interface_name) 有鄰居 = uplink port
-            # local_interface 可能尚未正規化（舊資料），統一 normalize
-            from app.repositories.typed_records import normalize_interface_name
-
-            neighbor_ports: set[tuple[str, str]] = set()
-            for r in lldp_records:
-                iface = normalize_interface_name(r.local_interface) if r.local_interface else r.local_interface
-                neighbor_ports.add((r.switch_hostname, iface))
-            for r in cdp_records:
-                iface = normalize_interface_name(r.local_interface) if r.local_interface else r.local_interface
-                neighbor_ports.add((r.switch_hostname, iface))
-
-            # mac_count: 每個 port 上學到幾個 MAC（uplink 通常遠多於 access）
-            mac_count_per_port: dict[tuple[str, str], int] = {}
-            for r in mac_records:
-                key = (r.switch_hostname, r.interface_name)
-                mac_count_per_port[key] = mac_count_per_port.get(key, 0) + 1
-
-            # 7. 組裝 ClientRecord 候選人（同一 MAC 可能出現在多台 switch）
-            #    per-MAC 先選出最佳位置，再為該 MAC 的每個 client 建立記錄
-            candidates_per_mac: dict[str, list[ClientRecord]] = {}
-            found_macs: set[str] = set()
-
-            results["total"] = len(mac_records)
-
-            for mac_rec in mac_records:
-                mac_upper = mac_rec.mac_address.upper()
-                if mac_upper not in mac_to_clients:
-                    continue
-
-                found_macs.add(mac_upper)
-
-                # 查找 interface status
-                intf_key = (mac_rec.switch_hostname, mac_rec.interface_name)
-                if_rec = if_map.get(intf_key)
-
-                # 查找 ACL
-                acl_number = acl_map.get(intf_key)
-
-                # 建立不含 client 特定資訊的基礎記錄（用於位置選擇）
-                record = ClientRecord(
-                    maintenance_id=maintenance_id,
-                    collected_at=now,
-                    mac_address=mac_rec.mac_address,
-                    ip_address=None,  # 稍後填入
-                    switch_hostname=mac_rec.switch_hostname,
-                    interface_name=mac_rec.interface_name,
-                    vlan_id=mac_rec.vlan_id,
-                    speed=if_rec.speed if if_rec else None,
-                    duplex=if_rec.duplex if if_rec else None,
-                    link_status=if_rec.link_status if if_rec else None,
-                    ping_reachable=None,  # 稍後填入
-                    acl_rules_applied=acl_number,
+            client_ids: Iterable[int] | None = None
+            if state is not None and not self._needs_full_assembly(state):
+                client_ids = await self._assemble_changes(
+                    session, maintenance_id, state, clients, changes,
                 )
-
-                candidates_per_mac.setdefault(mac_upper, []).append(record)
-
-            # 7b. 從候選人中選出最佳位置記錄（五條規則逐步篩選）
-            best_location_per_mac: dict[str, ClientRecord] = {}
-            for mac_upper, candidates in candidates_per_mac.items():
-                best_location_per_mac[mac_upper] = self._select_best_candidate(
-                    candidates, neighbor_ports, mac_count_per_port,
+            if state is None or client_ids is None:
+                state = await self._assemble_all(session, maintenance_id, clients)
+                client_ids = clients
+            else:
+                results["mode"] = "incremental" if client_ids else "unchanged"
+                # 未重算的 client 視為已檢查（與完整組裝時 hash 相同的結果一致）
+                await session.execute(
+                    update(LatestClientRecord)
+                    .where(LatestClientRecord.maintenance_id == maintenance_id)
+                    .values(last_checked_at=now)
                 )
 
-            # 7c. 為每個 client 建立獨立的 ClientRecord（同 MAC 不同 client）
-            all_records: list[ClientRecord] = []
-            found_client_ids: set[int] = set()
+            results["total"] = state.mac_row_count
+            results["success"] = 1 if state.mac_row_count else 0
+            results["client_records_count"] = state.found_count
 
-            for mac_upper, best in best_location_per_mac.items():
-                for client in mac_to_clients[mac_upper]:
-                    found_client_ids.add(client.id)
-                    ping_ok = None
-                    if client.ip_address:
-                        ping_ok = ping_map.get(client.ip_address)
-
-                    all_records.append(ClientRecord(
-                        maintenance_id=maintenance_id,
-                        collected_at=now,
-                        client_id=client.id,
-                        mac_address=best.mac_address,
-                        ip_address=client.ip_address,
-                        switch_hostname=best.switch_hostname,
-                        interface_name=best.interface_name,
-                        vlan_id=best.vlan_id,
-                        speed=best.speed,
-                        duplex=best.duplex,
-                        link_status=best.link_status,
-                        ping_reachable=ping_ok,
-                        acl_rules_applied=best.acl_rules_applied,
-                    ))
-
-            results["success"] = 1 if mac_records else 0
-            results["client_records_count"] = len(all_records)
-
-            # 8. 為未找到 MAC 的 client 建立 None 記錄（保留 ping 結果）
-            missing_clients = [
-                c for c in client_list if c.id not in found_client_ids
-            ]
-            for client in missing_clients:
-                ping_ok = None
-                if client.ip_address:
-                    ping_ok = ping_map.get(client.ip_address)
-
-                all_records.append(ClientRecord(
-                    maintenance_id=maintenance_id,
-                    collected_at=now,
-                    client_id=client.id,
-                    mac_address=client.mac_address,
-                    ip_address=client.ip_address,
-                    switch_hostname=None,
-                    interface_name=None,
-                    vlan_id=None,
-                    speed=None,
-                    duplex=None,
-                    link_status=None,
-                    ping_reachable=ping_ok,
-                    acl_rules_applied=None,
-                ))
-
-            if missing_clients:
-                logger.info(
-                    "Added %d None records for clients not found in %s",
-                    len(missing_clients), maintenance_id,
-                )
+            # 為每個 client 建立獨立的 ClientRecord（同 MAC 不同 client）
+            all_records = self._build_client_records(
+                maintenance_id, now, state, sorted(client_ids),
+            )
 
-            # 9. Per-MAC 變更偵測 + 選擇性寫入
+            # Per-client 變更偵測 + 選擇性寫入
             if all_records:
-                records_to_write = await self._save_changed_records(
+                written = await self._save_changed_records(
                     session=session,
                     maintenance_id=maintenance_id,
                     all_records=all_records,
                     now=now,
+                    partial=results["mode"] != "full",
                 )
-                if records_to_write:
+                if written:
                     logger.info(
-                        "Saved %d/%d changed client records for %s",
-                        records_to_write, len(all_records), maintenance_id,
+                        "Saved %d/%d changed client records for %s (%s)",
+                        len(written), len(all_records), maintenance_id,
+                        results["mode"],
                     )
                 else:
                     logger.debug(
                         "No client data change for %s (%d records checked)",
                         maintenance_id, len(all_records),
                     )
-            else:
-                await self._write_snapshot_marker(
-                    session=session,
-                    maintenance_id=maintenance_id,
-                    collected_at=now,
-                )
-                logger.info(
-                    "Wrote snapshot marker for %s (no records)",
-                    maintenance_id,
-                )
+
+        # commit 成功後才保留 state、套用到記憶體中的目前狀態
+        _assembly_states[maintenance_id] = state
+        store = get_client_state_store()
+        if store is not None:
+            store.apply(maintenance_id, written)
 
         # 清理超過 7 天的舊資料
         async with get_session_context() as session:
@@ -336,19 +284,231 @@ class ClientCollectionService:
                 results["deleted_old_records"] = deleted
 
         logger.info(
-            "Client collection done for %s: %d records",
-            maintenance_id, results["client_records_count"],
+            "Client collection done for %s (%s): %d records",
+            maintenance_id, results["mode"], results["client_records_count"],
         )
         return results
 
+    # ── Assembly ─────────────────────────────────────────────────
+
+    @staticmethod
+    def _needs_full_assembly(state: _AssemblyState) -> bool:
+        interval = settings.client_full_assembly_interval_seconds
+        return interval == 0 or time.monotonic() - state.assembled_at >= interval
+
+    async def _assemble_all(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        clients: dict[int, tuple[str, str | None]],
+    ) -> _AssemblyState:
+        """重算所有已登記 MAC 的位置。"""
+        # 2-5. 已登記 MAC 的位置候選（semi-join + interface / ACL join 在 DB 完成）
+        location_repo = ClientLocationRepo(session)
+        candidate_rows = await location_repo.get_candidates(maintenance_id)
+
+        state = _AssemblyState(
+            clients=clients,
+            ping=await self._load_ping_map(session, maintenance_id),
+            mac_row_count=await location_repo.count_mac_rows(maintenance_id),
+        )
+        # 7. 每個已登記 MAC 選出最佳位置（同一 MAC 可能出現在多台 switch）
+        state.relocate(
+            (),
+            self._locate_registered_macs(
+                candidate_rows,
+                await self._load_neighbor_ports(session, maintenance_id),
+            ),
+            candidate_rows,
+        )
+        state.count_found()
+        return state
+
+    async def _assemble_changes(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        state: _AssemblyState,
+        clients: dict[int, tuple[str, str | None]],
+        changes: _PendingChanges | None,
+    ) -> set[int] | None:
+        """
+        依上次組裝後的變化更新 state。
+
+        MAC 的位置只取決於它在各 switch 上的候選，因此只需重算：
+        有變化的 switch 上原本或現在有候選的 MAC，以及 MAC 有變動的 client。
+
+        Returns:
+            需重建 ClientRecord 的 client id；None = 受影響範圍太大，改為完整組裝。
+        """
+        switches = changes.switches if changes else set()
+        changed_clients = {
+            cid for cid, key in clients.items() if state.clients.get(cid) != key
+        }
+
+        macs = {clients[cid][0].upper() for cid in changed_clients}
+        macs.update(
+            state.clients[cid][0].upper()
+            for cid in changed_clients if cid in state.clients
+        )
+        location_repo = ClientLocationRepo(session)
+        if switches:
+            for switch in switches:
+                macs |= state.macs_by_switch.get(switch, set())
+            macs |= await location_repo.get_registered_macs_on(
+                maintenance_id, switches,
+            )
+            state.mac_row_count = await location_repo.count_mac_rows(maintenance_id)
+
+        if len(macs) > _MAX_IN_LIST:
+            return None
+
+        if macs:
+            candidate_rows = await location_repo.get_candidates(maintenance_id, macs)
+            state.relocate(
+                macs,
+                self._locate_registered_macs(
+                    candidate_rows,
+                    await self._load_neighbor_ports(session, maintenance_id),
+                ),
+                candidate_rows,
+            )
+
+        changed_ips: set[str] = set()
+        if changes and changes.ping:
+            ping = await self._load_ping_map(session, maintenance_id)
+            changed_ips = {
+                ip for ip in ping.keys() | state.ping.keys()
+                if ping.get(ip) != state.ping.get(ip)
+            }
+            state.ping = ping
+
+        state.clients = clients
+        if not (macs or changed_ips or changed_clients):
+            return set()
+        state.count_found()
+        return changed_clients | {
+            cid for cid, (mac, ip) in clients.items()
+            if mac.upper() in macs or ip in changed_ips
+        }
+
+    @staticmethod
+    def _build_client_records(
+        maintenance_id: str,
+        now: datetime,
+        state: _AssemblyState,
+        client_ids: Iterable[int],
+    ) -> list[ClientRecord]:
+        """依 state 建立 ClientRecord；找不到 MAC 的 client 為 None 記錄（保留 ping 結果）。"""
+        records: list[ClientRecord] = []
+        for cid in client_ids:
+            mac, ip = state.clients[cid]
+            best = state.best.get(mac.upper())
+            ping_ok = state.ping.get(ip) if ip else None
+            if best is None:
+                best = _Candidate(mac, *[None] * 8)
+            records.append(ClientRecord(
+                maintenance_id=maintenance_id,
+                collected_at=now,
+                client_id=cid,
+                mac_address=best.mac_address,
+                ip_address=ip,
+                switch_hostname=best.switch_hostname,
+                interface_name=best.interface_name,
+                vlan_id=best.vlan_id,
+                speed=best.speed,
+                duplex=best.duplex,
+                link_status=best.link_status,
+                ping_reachable=ping_ok,
+                acl_rules_applied=best.acl_rules_applied,
+            ))
+        return records
+
+    @staticmethod
+    async def _load_ping_map(
+        session: AsyncSession,
+        maintenance_id: str,
+    ) -> dict[str, bool]:
+        """gnms_ping: target IP → is_reachable"""
+        from app.repositories.typed_records import get_typed_repo
+
+        ping_records = await get_typed_repo(
+            "gnms_ping", session,
+        ).get_latest_columns_per_device(maintenance_id, "target", "is_reachable")
+        return {r.target: r.is_reachable for r in ping_records}
+
+    @staticmethod
+    async def _load_neighbor_ports(
+        session: AsyncSession,
+        maintenance_id: str,
+    ) -> set[tuple[str, str]]:
+        """
+        neighbor: (switch_hostname, interface_name) 有鄰居 = uplink port
+
+        local_interface 可能尚未正規化（舊資料），統一 normalize
+        （需在 Python 正規化，且每台設備只有少數幾筆，不併入 SQL）
+        """
+        from app.repositories.typed_records import (
+            get_typed_repo,
+            normalize_interface_name,
+        )
+
+        neighbor_ports: set[tuple[str, str]] = set()
+        for collection_type in ("get_uplink_lldp", "get_uplink_cdp"):
+            for r in await get_typed_repo(
+                collection_type, session,
+            ).get_latest_columns_per_device(
+                maintenance_id, "switch_hostname", "local_interface",
+            ):
+                iface = normalize_interface_name(r.local_interface) if r.local_interface else r.local_interface
+                neighbor_ports.add((r.switch_hostname, iface))
+        return neighbor_ports
+
     # ── Best candidate selection ─────────────────────────────────
 
+    @classmethod
+    def _locate_registered_macs(
+        cls,
+        candidate_rows: Iterable[Any],
+        neighbor_ports: set[tuple[str, str]],
+    ) -> dict[str, _Candidate]:
+        """
+        ClientLocationRepo.get_candidates 的 rows → 每個已登記 MAC（大寫）的最佳位置。
+
+        候選是輕量 tuple，ORM 物件只為勝出者、逐 client 建立。
+        """
+        # mac_count: 每個 port 上學到幾個 MAC（uplink 通常遠多於 access）
+        mac_count_per_port: dict[tuple[str, str], int] = {}
+        candidates_per_mac: dict[str, list[_Candidate]] = {}
+
+        for r in candidate_rows:
+            mac_count_per_port[(r.switch_hostname, r.interface_name)] = r.mac_count
+            candidates_per_mac.setdefault(r.mac_address.upper(), []).append(_Candidate(
+                mac_address=r.mac_address,
+                switch_hostname=r.switch_hostname,
+                interface_name=r.interface_name,
+                vlan_id=r.vlan_id,
+                speed=r.speed,
+                duplex=r.duplex,
+                link_status=r.link_status,
+                acl_rules_applied=r.acl_number,
+                speed_mbps=_parse_speed_mbps(r.speed),
+            ))
+
+        # 從候選人中選出最佳位置記錄（五條規則逐步篩選）
+        return {
+            mac_upper: cls._select_best_candidate(
+                candidates, neighbor_ports, mac_count_per_port,
+            )
+            for mac_upper, candidates in candidates_per_mac.items()
+        }
+
     @staticmethod
     def _select_best_candidate(
-        candidates: list[ClientRecord],
+        candidates: list[_Candidate],
         neighbor_ports: set[tuple[str, str]],
         mac_count_per_port: dict[tuple[str, str], int],
-    ) -> ClientRecord:
+    ) -> _Candidate:
         """從多個候選位置中選出最佳記錄（五條規則逐步篩選）。"""
         if len(candidates) == 1:
             return candidates[0]
@@ -381,9 +541,7 @@ class ClientCollectionService:
 
         # Rule 4: 有 Speed 且 Speed 最小的
         with_speed = [
-            (r, _parse_speed_mbps(r.speed))
-            for r in remaining
-            if _parse_speed_mbps(r.speed) is not None
+            (r, r.speed_mbps) for r in remaining if r.speed_mbps is not None
         ]
         if with_speed:
             min_spd = min(s for _, s in with_speed)
@@ -404,21 +562,7 @@ class ClientCollectionService:
             return fewest[0]
 
         # 五條規則都無法分出唯一 → 各項數值設為空
-        base = remaining[0]
-        return ClientRecord(
-            maintenance_id=base.maintenance_id,
-            collected_at=base.collected_at,
-            mac_address=base.mac_address,
-            ip_address=None,
-            switch_hostname=None,
-            interface_name=None,
-            vlan_id=None,
-            speed=None,
-            duplex=None,
-            link_status=None,
-            ping_reachable=None,
-            acl_rules_applied=None,
-        )
+        return _Candidate(remaining[0].mac_address, *[None] * 8)
 
     # ── Per-client change detection ──────────────────────────────
 
@@ -444,16 +588,25 @@ class ClientCollectionService:
         maintenance_id: str,
         all_records: list[ClientRecord],
         now: datetime,
-    ) -> int:
+        partial: bool = False,
+    ) -> list[ClientRecord]:
         """Per-client hash 比對，只寫入有變化的 ClientRecord。
 
+        partial=True 時 all_records 只是部分 client（增量組裝），
+        只載入這些 client 的 LatestClientRecord。
+
         Returns:
-            寫入的記錄數量。
+            寫入的記錄（已 flush 取得 id）；commit 後由呼叫端套用到
+            ClientStateStore。
         """
         # 一次載入此歲修所有 LatestClientRecord（以 client_id 為 key）
         latest_stmt = select(LatestClientRecord).where(
             LatestClientRecord.maintenance_id == maintenance_id,
         )
+        if partial and len(all_records) <= _MAX_IN_LIST:
+            latest_stmt = latest_stmt.where(
+                LatestClientRecord.client_id.in_([r.client_id for r in all_records]),
+            )
         latest_result = await session.execute(latest_stmt)
         latest_map: dict[int, LatestClientRecord] = {
             row.client_id: row
@@ -491,10 +644,17 @@ class ClientCollectionService:
                     ))
 
         if records_to_write:
+            # 先關閉同 MAC 舊狀態的有效區間，再寫入新變化點
+            await ClientRecordRepo(session).close_superseded(
+                maintenance_id, records_to_write, now,
+            )
             await self._phase4_save(session, records_to_write)
+            await ClientCheckpointRepo(session).register(
+                maintenance_id, now, settings.checkpoint_interval_minutes,
+            )
 
         await session.flush()
-        return len(records_to_write)
+        return records_to_write
 
     # ── On-demand detection ─────────────────────────────────────
 
@@ -509,9 +669,10 @@ class ClientCollectionService:
         - MAC 在 mac_table 中且 ping 通 → DETECTED
         - MAC 在 mac_table 中但 ping 不通 → NOT_DETECTED
         - MAC 不在 mac_table 中 → NOT_DETECTED
-        """
-        from sqlalchemy import update
 
+        狀態在記憶體中算好，只更新狀態有變的 client：
+        每種狀態一個 UPDATE ... WHERE id IN (...)（依 _MAX_IN_LIST 分批）。
+        """
         from app.core.enums import ClientDetectionStatus
         from app.repositories.typed_records import get_typed_repo
 
@@ -520,24 +681,23 @@ class ClientCollectionService:
             "total": 0,
             "detected": 0,
             "not_detected": 0,
+            "updated": 0,
             "errors": [],
         }
 
         async with get_session_context() as session:
-            clients = await self._load_client_list(maintenance_id, session)
+            stmt = select(
+                MaintenanceMacList.id,
+                MaintenanceMacList.mac_address,
+                MaintenanceMacList.ip_address,
+                MaintenanceMacList.detection_status,
+            ).where(MaintenanceMacList.maintenance_id == maintenance_id)
+            clients = (await session.execute(stmt)).all()
             results["total"] = len(clients)
 
             if not clients:
                 return results
 
-            # Reset all to NOT_CHECKED
-            reset_stmt = (
-                update(MaintenanceMacList)
-                .where(MaintenanceMacList.maintenance_id == maintenance_id)
-                .values(detection_status=ClientDetectionStatus.NOT_CHECKED)
-            )
-            await session.execute(reset_stmt)
-
             # Read latest mac_table records
             mac_repo = get_typed_repo("get_mac_table", session)
             mac_records = await mac_repo.get_latest_per_device(
@@ -553,12 +713,11 @@ class ClientCollectionService:
             ping_map = {r.target: r.is_reachable for r in ping_records}
 
             # Determine detection status
+            ids_by_status: dict[ClientDetectionStatus, list[int]] = {}
             for client in clients:
-                mac_upper = client.mac_address.upper()
                 ip = client.ip_address
-
                 ping_ok = ping_map.get(ip) if ip else None
-                in_mac_table = mac_upper in found_macs
+                in_mac_table = client.mac_address.upper() in found_macs
 
                 if in_mac_table and ping_ok:
                     status = ClientDetectionStatus.DETECTED
@@ -567,42 +726,45 @@ class ClientCollectionService:
                     status = ClientDetectionStatus.NOT_DETECTED
                     results["not_detected"] += 1
 
-                stmt = (
-                    update(MaintenanceMacList)
-                    .where(MaintenanceMacList.id == client.id)
-                    .values(detection_status=status)
-                )
-                await session.execute(stmt)
+                if client.detection_status != status:
+                    ids_by_status.setdefault(status, []).append(client.id)
+
+            for status, ids in ids_by_status.items():
+                for i in range(0, len(ids), _MAX_IN_LIST):
+                    await session.execute(
+                        update(MaintenanceMacList)
+                        .where(MaintenanceMacList.id.in_(ids[i:i + _MAX_IN_LIST]))
+                        .values(detection_status=status)
+                    )
+                results["updated"] += len(ids)
 
             await session.commit()
 
         logger.info(
-            "Client detection done for %s: %d detected, %d not_detected",
+            "Client detection done for %s: %d detected, %d not_detected "
+            "(%d status changes)",
             maintenance_id,
             results["detected"],
             results["not_detected"],
+            results["updated"],
         )
         return results
 
     # ── Helpers ───────────────────────────────────────────────────
 
-    async def _load_client_list(
+    async def _load_client_keys(
         self,
         maintenance_id: str,
         session: AsyncSession,
-    ) -> list[MaintenanceMacList]:
-        """載入完整的 Client 清單（包含 IP、MAC、tenant_group）。"""
-        stmt = select(MaintenanceMacList).where(
-            MaintenanceMacList.maintenance_id == maintenance_id
-        )
+    ) -> dict[int, tuple[str, str | None]]:
+        """Client 清單的 id → (MAC, IP)（組裝只需要這些欄位）。"""
+        stmt = select(
+            MaintenanceMacList.id,
+            MaintenanceMacList.mac_address,
+            MaintenanceMacList.ip_address,
+        ).where(MaintenanceMacList.maintenance_id == maintenance_id)
         result = await session.execute(stmt)
-        clients = result.scalars().all()
-
-        logger.info(
-            "Loaded client list for %s: %d clients",
-            maintenance_id, len(clients),
-        )
-        return list(clients)
+        return {row.id: (row.mac_address, row.ip_address) for row in result.all()}
 
     async def _write_snapshot_marker(
         self,
@@ -614,7 +776,7 @@ class ClientCollectionService:
         marker = ClientRecord(
             maintenance_id=maintenance_id,
             collected_at=collected_at,
-            mac_address="__MARKER__",
+            mac_address=SNAPSHOT_MARKER_MAC,
             ip_address=None,
             switch_hostname="__SYSTEM__",
             interface_name=None,
@@ -627,6 +789,9 @@ class ClientCollectionService:
         )
         session.add(marker)
         await session.flush()
+        await ClientCheckpointRepo(session).register(
+            maintenance_id, collected_at, settings.checkpoint_interval_minutes,
+        )
 
     async def _phase4_save(
         self,
@@ -660,6 +825,9 @@ class ClientCollectionService:
         )
 
         result = await session.execute(stmt)
+        await ClientCheckpointRepo(session).delete_before(
+            maintenance_id, cutoff_time,
+        )
         await session.commit()
 
         return result.rowcount or 0
@@ -5,17 +5,107 @@ Client comparison service.
 """
 from __future__ import annotations
 
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Collection, Mapping
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import Select, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import ClientRecord, ClientComparison
 from app.core.timezone import now_utc
+from app.repositories.client_records import (
+    SNAPSHOT_MARKER_MAC,
+    ClientRecordRepo,
+    mac_key,
+    stored_macs,
+)
+from app.services.client_state_store import ClientState, get_client_state_store
 
-# 快照標記的特殊 MAC 地址（用於在沒有實際資料時記錄時間點）
-SNAPSHOT_MARKER_MAC = "__MARKER__"
+# 比較用欄位（old_* / new_* 對應 ClientRecord 的同名欄位）
+_SIDE_FIELDS = (
+    "ip_address", "switch_hostname", "interface_name", "vlan_id",
+    "speed", "duplex", "link_status", "ping_reachable",
+)
+
+
+class _Sides:
+    """只有 old_* / new_* 欄位的輕量物件，供 _classify 套用比較邏輯。"""
+
+    __slots__ = tuple(
+        f"{prefix}_{field}" for prefix in ("old", "new") for field in _SIDE_FIELDS
+    )
+
+    def __init__(self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+
+@dataclass
+class _ChangeLog:
+    """
+    某歲修已掃描到 end 的 checkpoint 狀態向量。
+
+    deltas 按時間順序，每項為 (checkpoint 時間, 與前一個 checkpoint 之間
+    有變化的 MAC → 狀態)；第一項為第一個 checkpoint 時的完整狀態向量，
+    依序套用即得到任一已快取 checkpoint 的狀態向量。
+    """
+
+    end: datetime
+    fingerprint: tuple[int, int | None]
+    deltas: list[tuple[datetime, dict[str, ClientState]]]
+
+
+# 歷史 checkpoint 的狀態不會再變：每個歲修快取各 checkpoint 的狀態向量，
+# 新資料進來時只延伸尾端，並重新查詢 current 狀態；最多保留
+# CHANGE_LOG_CACHE_SIZE 個歲修（最久未使用的先淘汰）
+CHANGE_LOG_CACHE_SIZE = 16
+_change_logs: OrderedDict[str, _ChangeLog] = OrderedDict()
+
+
+def forget_change_log(maintenance_id: str) -> None:
+    """
+    丟棄歲修的 checkpoint 狀態快取（刪除歲修後呼叫）。
+
+    清理舊記錄不需呼叫：刪除會改變指紋，下次查詢時重建。
+    """
+    _change_logs.pop(maintenance_id, None)
+
+
+def _bucket_changes(
+    records: list[ClientRecord],
+    checkpoints: list[datetime],
+) -> list[tuple[datetime, dict[str, ClientState]]]:
+    """把按時間順序的變化點歸入第一個不早於它的 checkpoint，同 MAC 取最後一筆。"""
+    deltas: list[tuple[datetime, dict[str, ClientState]]] = [
+        (cp, {}) for cp in checkpoints
+    ]
+    k = 0
+    for r in records:
+        while r.collected_at is not None and r.collected_at > checkpoints[k]:
+            k += 1
+        deltas[k][1][mac_key(r)] = ClientState.of(r)
+    return deltas
+
+
+def _fill_sides(
+    target: Any,
+    before_record: ClientRecord | ClientState | None,
+    after_record: ClientRecord | ClientState | None,
+) -> None:
+    """把兩個時間點的 ClientRecord 填入 target 的 old_* / new_* 欄位。"""
+    if before_record:
+        for field in _SIDE_FIELDS:
+            setattr(target, f"old_{field}", getattr(before_record, field))
+
+    # 直接使用 ClientRecord 判斷是否有數據
+    # 如果 switch_hostname 為 None，代表該 MAC 未被偵測到（None 記錄）
+    if after_record and after_record.switch_hostname is not None:
+        for field in _SIDE_FIELDS:
+            setattr(target, f"new_{field}", getattr(after_record, field))
 
 
 class ClientComparisonService:
@@ -35,6 +125,7 @@ class ClientComparisonService:
         self,
         maintenance_id: str,
         session: AsyncSession,
+        macs: Collection[str] | None = None,
     ) -> list[ClientComparison]:
         """
         生成客戶端比較結果。
@@ -43,6 +134,9 @@ class ClientComparisonService:
         1. 只比較歲修設定中的 MAC
         2. 清單中的 MAC 若在 NEW 階段未找到，標記為 undetected (critical)
         3. 資料數量與歲修設定一致
+
+        macs 指定時只產生這些 MAC（大寫）的比較結果，
+        內容與完整生成中同一 MAC 的結果相同。
         """
         from app.db.models import MaintenanceMacList
         from app.core.enums import ClientDetectionStatus
@@ -51,6 +145,10 @@ class ClientComparisonService:
         mac_stmt = select(MaintenanceMacList).where(
             MaintenanceMacList.maintenance_id == maintenance_id
         )
+        if macs is not None:
+            mac_stmt = mac_stmt.where(
+                MaintenanceMacList.mac_address.in_(stored_macs(macs)),
+            )
         mac_result = await session.execute(mac_stmt)
         mac_records = mac_result.scalars().all()
 
@@ -60,18 +158,21 @@ class ClientComparisonService:
             m.mac_address.upper(): m.detection_status for m in mac_records
         }
 
-        if not mac_list:
+        if not mac_list and (
+            macs is None or not await self._has_mac_list(maintenance_id, session)
+        ):
             # 如果沒有 MAC 清單，回退到原有邏輯（從 ClientRecord 取）
             return await self._generate_comparisons_legacy(
-                maintenance_id, session,
+                maintenance_id, session, macs,
             )
 
+        # 部分重算時只讀取這些 MAC 的記錄
+        record_macs = mac_list if macs is not None else None
+
         # 2. 查詢 OLD 階段的記錄，按 MAC 地址分組，只保留最新的
         old_stmt = (
             select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-            )
+            .where(*self._record_scope(maintenance_id, record_macs))
             .order_by(ClientRecord.mac_address, ClientRecord.collected_at.desc())
         )
         old_result = await session.execute(old_stmt)
@@ -89,9 +190,7 @@ class ClientComparisonService:
         # 3. 查詢 NEW 階段的記錄，按 MAC 地址分組，只保留最新的
         new_stmt = (
             select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-            )
+            .where(*self._record_scope(maintenance_id, record_macs))
             .order_by(ClientRecord.mac_address, ClientRecord.collected_at.desc())
         )
         new_result = await session.execute(new_stmt)
@@ -154,6 +253,7 @@ class ClientComparisonService:
         self,
         maintenance_id: str,
         session: AsyncSession,
+        macs: Collection[str] | None = None,
     ) -> list[ClientComparison]:
         """
         Legacy 比較生成方法（無 MaintenanceMacList 時使用）。
@@ -164,9 +264,7 @@ class ClientComparisonService:
         # 查詢 OLD 階段的記錄
         old_stmt = (
             select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-            )
+            .where(*self._record_scope(maintenance_id, macs))
             .order_by(
                 ClientRecord.mac_address,
                 ClientRecord.collected_at.desc(),
@@ -186,9 +284,7 @@ class ClientComparisonService:
         # 查詢 NEW 階段的記錄
         new_stmt = (
             select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-            )
+            .where(*self._record_scope(maintenance_id, macs))
             .order_by(
                 ClientRecord.mac_address,
                 ClientRecord.collected_at.desc(),
@@ -313,7 +409,9 @@ class ClientComparisonService:
             return None
         return status.strip().lower() or None
 
-    def _find_differences(self, comparison: ClientComparison) -> dict[str, Any]:
+    def _find_differences(
+        self, comparison: ClientComparison | _Sides,
+    ) -> dict[str, Any]:
         """找出比較記錄中的差異。"""
         differences: dict[str, Any] = {}
 
@@ -406,6 +504,43 @@ class ClientComparisonService:
 
         return " | ".join(notes) if notes else "未檢測到變化"
     
+    @staticmethod
+    def _record_scope(
+        maintenance_id: str,
+        macs: Collection[str] | None,
+    ) -> list[Any]:
+        """ClientRecord 的查詢範圍；macs（大寫）指定時只取這些 MAC。"""
+        conditions: list[Any] = [ClientRecord.maintenance_id == maintenance_id]
+        if macs is not None:
+            conditions.append(ClientRecord.mac_address.in_(stored_macs(macs)))
+        return conditions
+
+    @staticmethod
+    async def _has_mac_list(maintenance_id: str, session: AsyncSession) -> bool:
+        from app.db.models import MaintenanceMacList
+
+        stmt = select(MaintenanceMacList.id).where(
+            MaintenanceMacList.maintenance_id == maintenance_id,
+        ).limit(1)
+        return (await session.execute(stmt)).first() is not None
+
+    async def replace_comparisons(
+        self,
+        maintenance_id: str,
+        macs: Collection[str],
+        comparisons: list[ClientComparison],
+        session: AsyncSession,
+    ) -> None:
+        """只替換指定 MAC（大寫）的比較結果；不在 comparisons 中的 MAC 直接移除。"""
+        await session.execute(
+            delete(ClientComparison).where(
+                ClientComparison.maintenance_id == maintenance_id,
+                ClientComparison.mac_address.in_(stored_macs(macs)),
+            )
+        )
+        session.add_all(comparisons)
+        await session.commit()
+
     async def save_comparisons(
         self,
         comparisons: list[ClientComparison],
@@ -443,30 +578,17 @@ class ClientComparisonService:
         支持按 MAC 地址、IP 地址和是否變化進行篩選。
         如果提供 before_time，則動態生成比較結果而非查詢資料庫。
         """
-        from sqlalchemy import or_
-
         # 如果提供了 before_time，動態生成比較結果
         if before_time:
             from datetime import datetime
 
             before_dt = datetime.fromisoformat(before_time)
 
-            # 獲取最新階段時間
-            from sqlalchemy import func
-            latest_stmt = (
-                select(func.max(ClientRecord.collected_at))
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                )
-            )
-            latest_result = await session.execute(latest_stmt)
-            latest_time = latest_result.scalar()
-
-            # 生成比較結果
+            # 生成比較結果（after 取目前狀態）
             comparisons = await self._generate_comparisons_at_time(
                 maintenance_id=maintenance_id,
                 before_time=before_dt,
-                after_time=latest_time,
+                after_time=None,
                 session=session,
             )
 
@@ -486,6 +608,22 @@ class ClientComparisonService:
             return comparisons
 
         # 否則查詢資料庫中保存的比較結果
+        stmt = self.stored_comparisons_query(
+            maintenance_id, search_text, changed_only,
+        ).order_by(ClientComparison.collected_at.desc())
+
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    def stored_comparisons_query(
+        self,
+        maintenance_id: str,
+        search_text: str | None = None,
+        changed_only: bool = False,
+    ) -> Select[ClientComparison]:
+        """已保存比較結果的篩選查詢（未排序，供列表與分頁共用）。"""
+        from sqlalchemy import or_
+
         stmt = select(ClientComparison).where(
             ClientComparison.maintenance_id == maintenance_id
         )
@@ -504,10 +642,7 @@ class ClientComparisonService:
         if changed_only:
             stmt = stmt.where(ClientComparison.is_changed == True)
 
-        stmt = stmt.order_by(ClientComparison.collected_at.desc())
-
-        result = await session.execute(stmt)
-        return result.scalars().all()
+        return stmt
     
     async def get_comparison_summary(
         self,
@@ -547,124 +682,27 @@ class ClientComparisonService:
 
         使用 MaintenanceMacList 作為 MAC 清單基準，確保新加入的 MAC
         即使尚未有偵測記錄也會出現在比較結果中。
+        after_time 為 None 時使用目前狀態。
         """
-        from app.db.models import MaintenanceMacList
+        mac_list = await self._load_mac_list(maintenance_id, session)
 
-        # 載入 MaintenanceMacList 作為 MAC 清單基準
-        mac_list_stmt = select(MaintenanceMacList).where(
-            MaintenanceMacList.maintenance_id == maintenance_id
+        # 兩個時間點各一次 as-of 查詢（每個 MAC 恰好一筆）
+        repo = ClientRecordRepo(session)
+        before_by_mac = await repo.get_state_at(maintenance_id, before_time)
+        after_by_mac = await self._state_at(
+            repo, maintenance_id, after_time, session,
         )
-        mac_list_result = await session.execute(mac_list_stmt)
-        mac_records = mac_list_result.scalars().all()
-
-        mac_list = {m.mac_address.upper() for m in mac_records}
 
-        # 查詢在 before_time 時間點的記錄
-        before_stmt = (
-            select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-                ClientRecord.collected_at <= before_time,
-            )
-            .order_by(
-                ClientRecord.mac_address,
-                ClientRecord.collected_at.desc(),
-            )
-        )
-        before_result = await session.execute(before_stmt)
-        before_records = before_result.scalars().all()
-
-        # 按 MAC 地址分組，只保留最新記錄（排除快照標記）
-        before_by_mac = {}
-        for record in before_records:
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue  # 跳過空值和快照標記
-            if mac_upper not in before_by_mac:
-                before_by_mac[mac_upper] = record
-
-        # 查詢在 after_time 時間點的記錄
-        if after_time:
-            after_stmt = (
-                select(ClientRecord)
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                    ClientRecord.collected_at <= after_time,
-                )
-                .order_by(
-                    ClientRecord.mac_address,
-                    ClientRecord.collected_at.desc(),
-                )
-            )
-        else:
-            after_stmt = (
-                select(ClientRecord)
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                )
-                .order_by(
-                    ClientRecord.mac_address,
-                    ClientRecord.collected_at.desc(),
-                )
-            )
-        after_result = await session.execute(after_stmt)
-        after_records = after_result.scalars().all()
-
-        # 按 MAC 地址分組，只保留最新記錄（排除快照標記）
-        after_by_mac = {}
-        for record in after_records:
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue  # 跳過空值和快照標記
-            if mac_upper not in after_by_mac:
-                after_by_mac[mac_upper] = record
-
-        # 生成比較結果
         # 優先使用 MaintenanceMacList，確保刪除的 MAC 不再顯示
-        comparisons = []
-        if mac_list:
-            all_macs = mac_list
-        else:
-            all_macs = set(before_by_mac.keys()) | set(after_by_mac.keys())
+        all_macs = mac_list or (set(before_by_mac) | set(after_by_mac))
 
-        for mac in all_macs:
-            before_record = before_by_mac.get(mac)
-            after_record = after_by_mac.get(mac)
-            
-            comparison = ClientComparison(
-                maintenance_id=maintenance_id,
-                collected_at=now_utc(),
-                mac_address=mac,
+        return [
+            self._build_comparison(
+                maintenance_id, mac,
+                before_by_mac.get(mac), after_by_mac.get(mac),
             )
-            
-            # 添加 BEFORE 資料
-            if before_record:
-                comparison.old_ip_address = before_record.ip_address
-                comparison.old_switch_hostname = before_record.switch_hostname
-                comparison.old_interface_name = before_record.interface_name
-                comparison.old_vlan_id = before_record.vlan_id
-                comparison.old_speed = before_record.speed
-                comparison.old_duplex = before_record.duplex
-                comparison.old_link_status = before_record.link_status
-                comparison.old_ping_reachable = before_record.ping_reachable
-
-            # 添加 AFTER 資料
-            # 直接使用 ClientRecord 判斷是否有數據
-            # 如果 switch_hostname 為 None，代表該 MAC 未被偵測到（None 記錄）
-            if after_record and after_record.switch_hostname is not None:
-                comparison.new_ip_address = after_record.ip_address
-                comparison.new_switch_hostname = after_record.switch_hostname
-                comparison.new_interface_name = after_record.interface_name
-                comparison.new_vlan_id = after_record.vlan_id
-                comparison.new_speed = after_record.speed
-                comparison.new_duplex = after_record.duplex
-                comparison.new_link_status = after_record.link_status
-                comparison.new_ping_reachable = after_record.ping_reachable
-
-            comparison = self._compare_records(comparison)
-            comparisons.append(comparison)
-
-        return comparisons
+            for mac in all_macs
+        ]
 
     async def _generate_checkpoint_diff(
         self,
@@ -681,274 +719,236 @@ class ClientComparisonService:
 
         兩者都來自 NEW 階段，用於追蹤歲修過程中設備狀態的變化。
         """
-        from app.db.models import MaintenanceMacList
-
-        # 載入 MAC 清單
-        mac_list_stmt = select(MaintenanceMacList).where(
-            MaintenanceMacList.maintenance_id == maintenance_id
-        )
-        mac_list_result = await session.execute(mac_list_stmt)
-        mac_records = mac_list_result.scalars().all()
-
-        mac_list = {m.mac_address.upper() for m in mac_records}
-
-        # 查詢 Checkpoint 時間點的記錄
-        checkpoint_stmt = (
-            select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-                ClientRecord.collected_at <= checkpoint_time,
-            )
-            .order_by(
-                ClientRecord.mac_address,
-                ClientRecord.collected_at.desc(),
-            )
+        return await self._generate_comparisons_at_time(
+            maintenance_id=maintenance_id,
+            before_time=checkpoint_time,
+            after_time=current_time,
+            session=session,
         )
-        checkpoint_result = await session.execute(checkpoint_stmt)
-        checkpoint_records = checkpoint_result.scalars().all()
-
-        # 按 MAC 分組，保留最接近 checkpoint 時間的記錄（排除快照標記）
-        checkpoint_by_mac = {}
-        for record in checkpoint_records:
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue  # 跳過空值和快照標記
-            if mac_upper not in checkpoint_by_mac:
-                checkpoint_by_mac[mac_upper] = record
-
-        # 查詢 Current（最新）時間點的記錄
-        if current_time:
-            current_stmt = (
-                select(ClientRecord)
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                    ClientRecord.collected_at <= current_time,
-                )
-                .order_by(
-                    ClientRecord.mac_address,
-                    ClientRecord.collected_at.desc(),
-                )
-            )
-        else:
-            current_stmt = (
-                select(ClientRecord)
-                .where(
-                    ClientRecord.maintenance_id == maintenance_id,
-                )
-                .order_by(
-                    ClientRecord.mac_address,
-                    ClientRecord.collected_at.desc(),
-                )
-            )
-        current_result = await session.execute(current_stmt)
-        current_records = current_result.scalars().all()
-
-        # 按 MAC 分組，保留最新記錄（排除快照標記）
-        current_by_mac = {}
-        for record in current_records:
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue  # 跳過空值和快照標記
-            if mac_upper not in current_by_mac:
-                current_by_mac[mac_upper] = record
-
-        # 生成比較結果
-        # 優先使用 MaintenanceMacList 作為基準，確保刪除的 MAC 不再顯示
-        # 如果沒有 MaintenanceMacList，才使用 ClientRecord 的聯集
-        comparisons = []
-        if mac_list:
-            all_macs = mac_list
-        else:
-            all_macs = set(checkpoint_by_mac.keys()) | set(current_by_mac.keys())
 
-        for mac in all_macs:
-            checkpoint_record = checkpoint_by_mac.get(mac)
-            current_record = current_by_mac.get(mac)
-
-            comparison = ClientComparison(
-                maintenance_id=maintenance_id,
-                collected_at=now_utc(),
-                mac_address=mac,
-            )
-
-            # 添加 Checkpoint (Before) 資料
-            if checkpoint_record:
-                comparison.old_ip_address = checkpoint_record.ip_address
-                comparison.old_switch_hostname = checkpoint_record.switch_hostname
-                comparison.old_interface_name = checkpoint_record.interface_name
-                comparison.old_vlan_id = checkpoint_record.vlan_id
-                comparison.old_speed = checkpoint_record.speed
-                comparison.old_duplex = checkpoint_record.duplex
-                comparison.old_link_status = checkpoint_record.link_status
-                comparison.old_ping_reachable = checkpoint_record.ping_reachable
-
-            # 添加 Current 資料
-            # 直接使用 ClientRecord 判斷是否有數據
-            # 如果 switch_hostname 為 None，代表該 MAC 未被偵測到（None 記錄）
-            if current_record and current_record.switch_hostname is not None:
-                comparison.new_ip_address = current_record.ip_address
-                comparison.new_switch_hostname = current_record.switch_hostname
-                comparison.new_interface_name = current_record.interface_name
-                comparison.new_vlan_id = current_record.vlan_id
-                comparison.new_speed = current_record.speed
-                comparison.new_duplex = current_record.duplex
-                comparison.new_link_status = current_record.link_status
-                comparison.new_ping_reachable = current_record.ping_reachable
-
-            comparison = self._compare_records(comparison)
-            comparisons.append(comparison)
-
-        return comparisons
-
-    async def _generate_checkpoint_diffs_batch(
+    async def summarize_checkpoints(
         self,
         maintenance_id: str,
         checkpoint_times: list[datetime],
         current_time: datetime,
         session: AsyncSession,
-    ) -> dict[datetime, list[ClientComparison]]:
-        """批次比較多個 checkpoint vs current。
-
-        相比逐一呼叫 _generate_checkpoint_diff，此方法只執行 3 次 DB 查詢
-        （mac_list + current_records + all_checkpoint_records），
-        不受 checkpoint 數量影響。
+        mac_to_categories: dict[str, list[int]] | None = None,
+    ) -> dict[datetime, dict[str, Any]]:
+        """多個 checkpoint vs current 的異常 / 變化計數（sweep line）。
+
+        結果與逐一呼叫 _generate_checkpoint_diff 再計數相同，但不建立
+        ClientComparison：current 固定，每個 MAC 的比較結果只取決於它在
+        checkpoint 時的記錄。按時間順序走訪 [最早, 最晚 checkpoint] 的變化點一次，
+        維護每個 MAC 的 (is_changed, is_undetected)，只在 MAC 有新變化點時重新分類。
+
+        Returns:
+            {checkpoint_time: {"issue_count", "change_count", "mac_count",
+            "by_category": {category_id: issue_count}}}
         """
         import logging
-        logger = logging.getLogger(__name__)
+        from collections import Counter
 
-        from app.db.models import MaintenanceMacList
+        logger = logging.getLogger(__name__)
 
         if not checkpoint_times:
             return {}
 
-        # 1. 載入 MAC 清單 (1 query)
-        mac_list_stmt = select(MaintenanceMacList).where(
-            MaintenanceMacList.maintenance_id == maintenance_id
+        ordered_cps = sorted(set(checkpoint_times))
+        mac_list = await self._load_mac_list(maintenance_id, session)
+
+        repo = ClientRecordRepo(session)
+        current_by_mac = await self._state_at(
+            repo, maintenance_id, current_time, session,
         )
-        mac_list_result = await session.execute(mac_list_stmt)
-        mac_records = mac_list_result.scalars().all()
+        deltas = await self._load_change_log(repo, maintenance_id, ordered_cps)
+        categories = mac_to_categories or {}
+
+        status: dict[str, tuple[bool, bool]] = {}
+        counts: Counter[str] = Counter()
+        by_category: Counter[int] = Counter()
+
+        def apply(mac: str, before: ClientState | None) -> None:
+            new = self._classify(before, current_by_mac.get(mac))
+            old = status.get(mac)
+            if new == old:
+                return
+            for state, sign in ((old, -1), (new, 1)):
+                if state is None:
+                    continue
+                is_changed, is_undetected = state
+                counts["change_count"] += sign * is_changed
+                if is_changed or is_undetected:
+                    counts["issue_count"] += sign
+                    for cat_id in categories.get(mac, []):
+                        by_category[cat_id] += sign
+            status[mac] = new
+
+        # 比較的 MAC 集合：有 MaintenanceMacList 時固定；否則為
+        # 「checkpoint 時有記錄的 MAC ∪ current 的 MAC」，隨變化點出現逐步加入
+        # （記錄區間首尾相接，MAC 一旦有記錄，之後每個 checkpoint 都有狀態）
+        for mac in mac_list or current_by_mac:
+            apply(mac, None)
+
+        results: dict[datetime, dict[str, Any]] = {}
+        i = 0
+        for cp_time in ordered_cps:
+            # 合併到 cp_time 為止的快取 checkpoint，同一 MAC 取最後的狀態
+            latest: dict[str, ClientState] = {}
+            while i < len(deltas) and deltas[i][0] <= cp_time:
+                latest.update(deltas[i][1])
+                i += 1
+            for mac, state in latest.items():
+                if not mac_list or mac in mac_list:
+                    apply(mac, state)
+
+            results[cp_time] = {
+                "issue_count": counts["issue_count"],
+                "change_count": counts["change_count"],
+                "mac_count": len(status),
+                "by_category": dict(by_category),
+            }
 
-        mac_list = {m.mac_address.upper() for m in mac_records}
+        logger.info(
+            "Checkpoint summaries for %s: %d checkpoints, %d MACs, %d changes",
+            maintenance_id,
+            len(ordered_cps),
+            len(status),
+            sum(len(delta) for _, delta in deltas),
+        )
 
-        # 2. 載入 current_records → build current_by_mac (1 query)
-        current_stmt = (
-            select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-                ClientRecord.collected_at <= current_time,
+        return results
+
+    @staticmethod
+    async def _state_at(
+        repo: ClientRecordRepo,
+        maintenance_id: str,
+        at: datetime | None,
+        session: AsyncSession,
+    ) -> Mapping[str, ClientRecord | ClientState]:
+        """時間 at 的狀態；at 為目前（或不早於最新快照）時優先使用記憶體。"""
+        store = get_client_state_store()
+        if store is not None:
+            table = await store.current_state(maintenance_id, session)
+            if table is not None and (at is None or table.covers(at)):
+                return table
+        return await repo.get_state_at(maintenance_id, at)
+
+    @staticmethod
+    async def _load_change_log(
+        repo: ClientRecordRepo,
+        maintenance_id: str,
+        checkpoints: list[datetime],
+    ) -> list[tuple[datetime, dict[str, ClientState]]]:
+        """
+        取得 checkpoints（遞增）的狀態向量差異，優先使用快取。
+
+        指紋相符時沿用快取：未快取的 checkpoint 只重新查詢所在區段並切開，
+        尾端之後只查詢新寫入的變化點；快取多出的 checkpoint 在走訪時
+        併入下一個請求的 checkpoint，不影響結果。
+        """
+        cached = _change_logs.get(maintenance_id)
+        if (
+            cached is None
+            or await repo.fingerprint(maintenance_id, cached.end)
+            != cached.fingerprint
+        ):
+            start, end = checkpoints[0], checkpoints[-1]
+            records = await repo.get_change_log(maintenance_id, start, end)
+            cached = _ChangeLog(
+                end=end,
+                fingerprint=await repo.fingerprint(maintenance_id, end),
+                deltas=_bucket_changes(records, checkpoints),
             )
-            .order_by(
-                ClientRecord.mac_address,
-                ClientRecord.collected_at.desc(),
+            _change_logs[maintenance_id] = cached
+            _change_logs.move_to_end(maintenance_id)
+            while len(_change_logs) > CHANGE_LOG_CACHE_SIZE:
+                _change_logs.popitem(last=False)
+            return cached.deltas
+
+        _change_logs.move_to_end(maintenance_id)
+        times = [cp for cp, _ in cached.deltas]
+        known = set(times)
+        segments: dict[int, list[datetime]] = {}
+        for cp in checkpoints:
+            if cp <= cached.end and cp not in known:
+                segments.setdefault(bisect_left(times, cp), []).append(cp)
+        # 由後往前切，前面區段的索引不受影響
+        for k in sorted(segments, reverse=True):
+            if k == 0:
+                # 早於快取的第一個 checkpoint：重新取得完整狀態
+                records = await repo.get_change_log(
+                    maintenance_id, segments[k][0], times[0],
+                )
+            else:
+                records = await repo.get_change_log(
+                    maintenance_id, times[k - 1], times[k],
+                    collected_after=times[k - 1],
+                )
+            cached.deltas[k:k + 1] = _bucket_changes(
+                records, [*segments[k], times[k]],
             )
-        )
-        current_result = await session.execute(current_stmt)
-        current_by_mac: dict[str, ClientRecord] = {}
-        for record in current_result.scalars().all():
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue
-            if mac_upper not in current_by_mac:
-                current_by_mac[mac_upper] = record
 
-        # 3. 載入所有 checkpoint 記錄 (1 query)
-        #    取 collected_at <= max(checkpoint_times)，在 Python 中按 checkpoint 分組
-        max_cp = max(checkpoint_times)
-        all_cp_stmt = (
-            select(ClientRecord)
-            .where(
-                ClientRecord.maintenance_id == maintenance_id,
-                ClientRecord.collected_at <= max_cp,
+        newer = [cp for cp in checkpoints if cp > cached.end]
+        if newer:
+            new_records = await repo.get_change_log(
+                maintenance_id, cached.end, newer[-1],
+                collected_after=cached.end,
             )
-            .order_by(
-                ClientRecord.mac_address,
-                ClientRecord.collected_at.desc(),
+            cached.deltas.extend(_bucket_changes(new_records, newer))
+            cached.end = newer[-1]
+            cached.fingerprint = await repo.fingerprint(
+                maintenance_id, cached.end,
             )
-        )
-        all_cp_result = await session.execute(all_cp_stmt)
-        all_cp_records = all_cp_result.scalars().all()
-
-        # 按 MAC 分組，轉為升序排列並建立 timestamps 索引供 bisect 使用
-        # SQL 回傳 desc，reverse 後得到 asc（舊→新）
-        from bisect import bisect_right
-        from collections import defaultdict
-        _records_by_mac_desc: dict[str, list[ClientRecord]] = defaultdict(list)
-        for record in all_cp_records:
-            mac_upper = record.mac_address.upper() if record.mac_address else ""
-            if not mac_upper or mac_upper == SNAPSHOT_MARKER_MAC:
-                continue
-            _records_by_mac_desc[mac_upper].append(record)
-
-        # 預處理：每個 MAC 的記錄轉為升序 + 提取 timestamps 陣列
-        records_by_mac: dict[str, list[ClientRecord]] = {}
-        timestamps_by_mac: dict[str, list[datetime]] = {}
-        for mac, recs in _records_by_mac_desc.items():
-            asc = list(reversed(recs))
-            records_by_mac[mac] = asc
-            timestamps_by_mac[mac] = [r.collected_at for r in asc]
-
-        # 4. 對每個 checkpoint 生成比較結果
-        results: dict[datetime, list[ClientComparison]] = {}
-        all_macs = mac_list if mac_list else (
-            set(records_by_mac.keys()) | set(current_by_mac.keys())
-        )
+        return cached.deltas
 
-        for cp_time in checkpoint_times:
-            # 為此 checkpoint 建立 checkpoint_by_mac（bisect 二分搜尋 O(log R)）
-            checkpoint_by_mac: dict[str, ClientRecord] = {}
-            for mac in records_by_mac:
-                ts = timestamps_by_mac[mac]
-                idx = bisect_right(ts, cp_time)
-                if idx > 0:
-                    checkpoint_by_mac[mac] = records_by_mac[mac][idx - 1]
-
-            # 生成 comparisons
-            comparisons = []
-            for mac in all_macs:
-                checkpoint_record = checkpoint_by_mac.get(mac)
-                current_record = current_by_mac.get(mac)
-
-                comparison = ClientComparison(
-                    maintenance_id=maintenance_id,
-                    collected_at=now_utc(),
-                    mac_address=mac,
-                )
+    @staticmethod
+    async def _load_mac_list(
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> set[str]:
+        """載入 MaintenanceMacList 的 MAC（大寫）作為比較基準。"""
+        from app.db.models import MaintenanceMacList
 
-                if checkpoint_record:
-                    comparison.old_ip_address = checkpoint_record.ip_address
-                    comparison.old_switch_hostname = checkpoint_record.switch_hostname
-                    comparison.old_interface_name = checkpoint_record.interface_name
-                    comparison.old_vlan_id = checkpoint_record.vlan_id
-                    comparison.old_speed = checkpoint_record.speed
-                    comparison.old_duplex = checkpoint_record.duplex
-                    comparison.old_link_status = checkpoint_record.link_status
-                    comparison.old_ping_reachable = checkpoint_record.ping_reachable
-
-                # 直接使用 ClientRecord 判斷是否有數據
-                # 如果 switch_hostname 為 None，代表該 MAC 未被偵測到（None 記錄）
-                if current_record and current_record.switch_hostname is not None:
-                    comparison.new_ip_address = current_record.ip_address
-                    comparison.new_switch_hostname = current_record.switch_hostname
-                    comparison.new_interface_name = current_record.interface_name
-                    comparison.new_vlan_id = current_record.vlan_id
-                    comparison.new_speed = current_record.speed
-                    comparison.new_duplex = current_record.duplex
-                    comparison.new_link_status = current_record.link_status
-                    comparison.new_ping_reachable = current_record.ping_reachable
-
-                comparison = self._compare_records(comparison)
-                comparisons.append(comparison)
-
-            results[cp_time] = comparisons
+        stmt = select(MaintenanceMacList.mac_address).where(
+            MaintenanceMacList.maintenance_id == maintenance_id
+        )
+        result = await session.execute(stmt)
+        return {mac.upper() for mac in result.scalars().all()}
 
-        logger.info(
-            "Batch checkpoint diff for %s: %d checkpoints, %d MACs",
-            maintenance_id,
-            len(checkpoint_times),
-            len(all_macs),
+    def _build_comparison(
+        self,
+        maintenance_id: str,
+        mac: str,
+        before_record: ClientRecord | ClientState | None,
+        after_record: ClientRecord | ClientState | None,
+    ) -> ClientComparison:
+        """以兩個時間點的 ClientRecord 組出一筆比較結果。"""
+        comparison = ClientComparison(
+            maintenance_id=maintenance_id,
+            collected_at=now_utc(),
+            mac_address=mac,
         )
+        _fill_sides(comparison, before_record, after_record)
+        return self._compare_records(comparison)
 
-        return results
+    def _classify(
+        self,
+        before_record: ClientRecord | ClientState | None,
+        after_record: ClientRecord | ClientState | None,
+    ) -> tuple[bool, bool]:
+        """
+        只計算 (is_changed, is_undetected)，與 _compare_records 的判斷一致，
+        但不建立 ClientComparison（供 summarize_checkpoints 使用）。
+        """
+        sides = _Sides()
+        _fill_sides(sides, before_record, after_record)
+        old_detected = self._has_any_data(sides, "old")
+        new_detected = self._has_any_data(sides, "new")
+        if not old_detected and not new_detected:
+            return False, True
+        if old_detected != new_detected:
+            return True, False
+        return bool(self._find_differences(sides)), False
 
     def _compare_records(
         self,
@@ -1005,7 +1005,9 @@ class ClientComparisonService:
 
         return comparison
     
-    def _has_any_data(self, comparison: ClientComparison, prefix: str) -> bool:
+    def _has_any_data(
+        self, comparison: ClientComparison | _Sides, prefix: str,
+    ) -> bool:
         """檢查指定前綴（old/new）是否有任何有效數據。"""
         fields = [
             f"{prefix}_switch_hostname",
@@ -0,0 +1,390 @@
+"""
+In-process trigram index for client list search.
+
+Client 清單的搜尋語意：關鍵字以空白分隔，只要某一個欄位（MAC / IP / 備註）
+包含所有關鍵字（不分大小寫的子字串）即符合，欄位之間為 OR。
+原本以 LIKE '%kw%' 實作，每次搜尋都掃描整個歲修的清單；
+MariaDB 的 FULLTEXT 以詞為單位（沒有 n-gram parser），無法表達子字串比對。
+
+- 每個歲修在記憶體保留 id → (MAC, IP, 備註) 的正規化值，
+  以及每個欄位的 trigram → client id 列表
+- 查詢取所有關鍵字中最稀有的 trigram 當候選，再逐筆驗證子字串
+- 寫入清單時呼叫 record_client_changes：寫入 client_list_changes 一筆，
+  同一 process 的索引在該筆紀錄 commit 後直接套用異動
+- 每次搜尋以一個查詢比對 client_list_changes 的 (筆數, 最大 id)；
+  有其他 process 寫入的異動（未知 token）或紀錄被刪除時重新載入
+
+以下情況仍以 LIKE 查詢（索引只在選擇性高時比掃描快）：
+關鍵字都短於 3 個字元、含 LIKE 萬用字元（% _ \\）、符合筆數超過 _MAX_IN_LIST，
+或歲修超過 client_search_index_max_clients 個 client。
+"""
+from __future__ import annotations
+
+import unicodedata
+from array import array
+from collections.abc import Collection, Iterable, Sequence
+from dataclasses import dataclass, field
+
+from sqlalchemy import ColumnElement, and_, false, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import MaintenanceMacList
+from app.repositories.client_list_changes import ClientListChangeRepo
+from app.repositories.sync_points import SyncVersion
+from app.services.synced_store import SyncedStore
+
+# 搜尋欄位（順序即索引中值的順序）
+_FIELDS = ("mac_address", "ip_address", "description")
+
+# 以 id IN (...) 回傳結果的上限；符合更多筆時改用 LIKE（幾乎整份清單都符合）
+_MAX_IN_LIST = 2000
+
+# 單一歲修累積未套用的異動超過此數，捨棄索引改為下次搜尋時重新載入
+_MAX_PENDING_CHANGES = 1000
+
+_LIKE_SPECIAL = frozenset("%_\\")
+
+_Values = tuple[str | None, str | None, str | None]
+# (client id, MAC, IP, 備註)
+_ClientRow = tuple[int, str | None, str | None, str | None]
+
+
+def parse_keywords(search: str | None) -> list[str]:
+    """搜尋字串 → 關鍵字（以空白分隔；空字串為 []，表示不過濾）。"""
+    return search.strip().split() if search else []
+
+
+def like_condition(keywords: Sequence[str]) -> ColumnElement[bool]:
+    """以 LIKE 表達的搜尋條件（索引的語意以此為準）。"""
+    return or_(*(
+        and_(*(
+            getattr(MaintenanceMacList, name).like(
+                f"%{kw.upper() if name == 'mac_address' else kw}%"
+            )
+            for kw in keywords
+        ))
+        for name in _FIELDS
+    ))
+
+
+def _normalize(value: str) -> str:
+    """比照 MariaDB *_ci collation：不分大小寫、忽略重音與全形。"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+@dataclass
+class _Change:
+    """同一 process 寫入、等待 commit 後套用的異動。"""
+
+    change_id: int
+    rows: list[_ClientRow] = field(
+        default_factory=list,
+    )
+    deleted_ids: list[int] = field(default_factory=list)
+    cleared: bool = False
+
+
+class ClientSearchIndex:
+    """單一歲修的 trigram 索引（client id → 正規化後的欄位值）。"""
+
+    def __init__(self) -> None:
+        self._values: dict[int, _Values] = {}
+        self._postings: tuple[dict[str, array[int]], ...] = tuple(
+            {} for _ in _FIELDS
+        )
+        # posting 只追加不刪除（更新 / 刪除後的過期項目於驗證時排除），
+        # 過期項目超過有效項目時整理
+        self._entries = 0
+        self._live_entries = 0
+        # 與 DB 的同步點（見 SyncedStore）：client_list_changes 的最大 id 與筆數
+        self.max_id = 0
+        self.record_count = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def put(
+        self,
+        client_id: int,
+        mac: str | None,
+        ip: str | None,
+        description: str | None,
+    ) -> None:
+        mac_n, ip_n, description_n = (
+            None if v is None else _normalize(v) for v in (mac, ip, description)
+        )
+        values: _Values = (mac_n, ip_n, description_n)
+        old = self._values.get(client_id)
+        self._values[client_id] = values
+        for i, value in enumerate(values):
+            if old is not None:
+                old_value = old[i]
+                if old_value == value:
+                    continue
+                if old_value is not None:
+                    self._live_entries -= len(_trigrams(old_value))
+            if value is not None:
+                self._index(i, client_id, value)
+        self._maybe_compact()
+
+    def discard(self, client_id: int) -> None:
+        old = self._values.pop(client_id, None)
+        if old is not None:
+            self._live_entries -= sum(
+                len(_trigrams(value)) for value in old if value is not None
+            )
+            self._maybe_compact()
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._reset_postings()
+
+    def apply(self, change: _Change) -> None:
+        if change.cleared:
+            self.clear()
+        for client_id in change.deleted_ids:
+            self.discard(client_id)
+        for row in change.rows:
+            self.put(*row)
+
+    def search(
+        self,
+        keywords: Sequence[str],
+        limit: int | None = None,
+    ) -> set[int] | None:
+        """
+        符合的 client id（語意同 like_condition）。
+
+        回傳 None 表示索引無法有效回答：關鍵字都短於 3 個字元，
+        或符合筆數超過 limit。
+        """
+        normalized = [_normalize(kw) for kw in keywords]
+        grams = {g for kw in normalized for g in _trigrams(kw)}
+        if not grams:
+            return None
+        matched: set[int] = set()
+        for i in range(len(_FIELDS)):
+            for client_id in self._candidates(i, grams):
+                values = self._values.get(client_id)
+                if values is None:
+                    continue
+                value = values[i]
+                if value is not None and all(kw in value for kw in normalized):
+                    matched.add(client_id)
+                    if limit is not None and len(matched) > limit:
+                        return None
+        return matched
+
+    def _candidates(self, i: int, grams: set[str]) -> Iterable[int]:
+        postings = self._postings[i]
+        best: array[int] | None = None
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        return () if best is None else best
+
+    def _index(self, i: int, client_id: int, value: str) -> None:
+        postings = self._postings[i]
+        for gram in _trigrams(value):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("i")
+            posting.append(client_id)
+            self._entries += 1
+            self._live_entries += 1
+
+    def _reset_postings(self) -> None:
+        self._postings = tuple({} for _ in _FIELDS)
+        self._entries = 0
+        self._live_entries = 0
+
+    def _maybe_compact(self) -> None:
+        if self._entries > 2 * self._live_entries + 1024:
+            self._reset_postings()
+            for client_id, values in self._values.items():
+                for i, value in enumerate(values):
+                    if value is not None:
+                        self._index(i, client_id, value)
+
+
+class ClientSearchStore(SyncedStore[ClientSearchIndex, Sequence[_ClientRow]]):
+    """每個歲修一個 ClientSearchIndex，以 client_list_changes 同步（見 SyncedStore）。"""
+
+    label = "Client search index"
+
+    def __init__(self, max_clients: int) -> None:
+        super().__init__(max_clients)
+        self._pending: dict[str, dict[str, _Change]] = {}
+
+    async def search(
+        self,
+        maintenance_id: str,
+        keywords: Sequence[str],
+        session: AsyncSession,
+        limit: int | None = None,
+    ) -> set[int] | None:
+        """符合的 client id；None 表示改用 LIKE（見 ClientSearchIndex.search）。"""
+        index = await self.current(maintenance_id, session)
+        if index is None:
+            return None
+        return index.search(keywords, limit)
+
+    def stash(self, maintenance_id: str, token: str, change: _Change) -> None:
+        """同一 process 的異動：等該筆紀錄 commit 後，下次搜尋時套用。"""
+        if change.cleared:
+            self._oversized.discard(maintenance_id)
+        if maintenance_id not in self._entries:
+            return
+        pending = self._pending.setdefault(maintenance_id, {})
+        pending[token] = change
+        if len(pending) > _MAX_PENDING_CHANGES:
+            self.invalidate(maintenance_id)
+
+    def invalidate(self, maintenance_id: str) -> None:
+        super().invalidate(maintenance_id)
+        self._pending.pop(maintenance_id, None)
+
+    async def _get_version(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        known_max_id: int,
+    ) -> SyncVersion:
+        return await ClientListChangeRepo(session).get_version(
+            maintenance_id, known_max_id,
+        )
+
+    async def _catch_up(
+        self,
+        maintenance_id: str,
+        entry: ClientSearchIndex,
+        session: AsyncSession,
+        max_id: int,
+    ) -> bool:
+        # 只有同一 process 寫入（token 已知）的異動可直接套用
+        tokens = await ClientListChangeRepo(session).get_tokens_after(
+            maintenance_id, entry.max_id, max_id,
+        )
+        pending = self._pending.get(maintenance_id, {})
+        if not all(token in pending for token in tokens):
+            return False
+        for token in tokens:
+            entry.apply(pending.pop(token))
+        self._prune(maintenance_id, max_id)
+        return True
+
+    async def _fetch(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> Sequence[_ClientRow]:
+        result = await session.execute(
+            select(
+                MaintenanceMacList.id,
+                MaintenanceMacList.mac_address,
+                MaintenanceMacList.ip_address,
+                MaintenanceMacList.description,
+            ).where(MaintenanceMacList.maintenance_id == maintenance_id)
+        )
+        return result.all()
+
+    def _build(self, rows: Sequence[_ClientRow]) -> ClientSearchIndex:
+        index = ClientSearchIndex()
+        for row in rows:
+            index.put(*row)
+        return index
+
+    def _loaded(self, maintenance_id: str, entry: ClientSearchIndex) -> None:
+        self._prune(maintenance_id, entry.max_id)
+
+    def _prune(self, maintenance_id: str, max_id: int) -> None:
+        """丟棄同步點之前的異動（已包含在索引中，或交易已 rollback）。"""
+        pending = self._pending.get(maintenance_id)
+        if pending:
+            for token in [t for t, c in pending.items() if c.change_id <= max_id]:
+                del pending[token]
+
+
+# ── Singleton ────────────────────────────────────────────────────
+
+_client_search_store: ClientSearchStore | None = None
+
+
+def get_client_search_store() -> ClientSearchStore | None:
+    """Get the store, or None when client_search_index_enabled is off."""
+    global _client_search_store
+    if not settings.client_search_index_enabled:
+        return None
+    if _client_search_store is None:
+        _client_search_store = ClientSearchStore(
+            settings.client_search_index_max_clients,
+        )
+    return _client_search_store
+
+
+async def search_condition(
+    session: AsyncSession,
+    maintenance_id: str,
+    search: str | None,
+) -> ColumnElement[bool] | None:
+    """
+    Client 清單的搜尋條件（None 表示不過濾）。
+
+    可由索引回答時為 id IN (...)，否則為 like_condition。
+    """
+    keywords = parse_keywords(search)
+    if not keywords:
+        return None
+
+    store = get_client_search_store()
+    if store is not None and not any(_LIKE_SPECIAL & set(kw) for kw in keywords):
+        ids = await store.search(maintenance_id, keywords, session, _MAX_IN_LIST)
+        if ids is not None:
+            if not ids:
+                return false()
+            return MaintenanceMacList.id.in_(sorted(ids))
+    return like_condition(keywords)
+
+
+async def record_client_changes(
+    session: AsyncSession,
+    maintenance_id: str,
+    upserted: Iterable[MaintenanceMacList] = (),
+    deleted_ids: Collection[int] = (),
+    *,
+    cleared: bool = False,
+    reload: bool = False,
+) -> None:
+    """
+    記錄 Client 清單的寫入（在寫入的同一個交易內、commit 前呼叫）。
+
+    Args:
+        upserted: 新增或修改的 client（flush 後取 id）。
+        deleted_ids: 刪除的 client id。
+        cleared: 清單在這些異動之前被清空。
+        reload: 異動內容未列出（批次匯入），索引於下次搜尋時重新載入。
+    """
+    change = await ClientListChangeRepo(session).record(maintenance_id)
+    store = get_client_search_store()
+    if store is None:
+        return
+    if reload:
+        store.invalidate(maintenance_id)
+        return
+    store.stash(maintenance_id, change.token, _Change(
+        change_id=change.id,
+        rows=[
+            (c.id, c.mac_address, c.ip_address, c.description) for c in upserted
+        ],
+        deleted_ids=list(deleted_ids),
+        cleared=cleared,
+    ))
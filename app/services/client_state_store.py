@@ -0,0 +1,283 @@
+"""
+In-process columnar store of current client state.
+
+每個歲修在記憶體保留「目前狀態」（每個 MAC 最新一筆 ClientRecord），
+比較 / 摘要取 current 時不必每次從 client_records 載入整批 ORM 物件。
+
+- 欄位以 array 儲存：字串欄位（IP、switch、interface、speed、duplex、link）
+  存 intern 後的 int code，VLAN / ping 存小整數，-1 表示 None
+- 同一 process 內由 ClientCollectionService 在 commit 後增量套用新寫入的變化點
+- DB 仍是唯一來源：每次讀取以一個查詢比對 (筆數, 最大 id)，
+  其他 process 寫入的新記錄增量套用；有記錄被刪除則重新載入（重啟後也是重新載入）
+
+記憶體（64-bit CPython）：每個 client 約 45 bytes 欄位 + MAC 字串與索引約 112 bytes
++ 字串池（幾乎只有 IP 是每個 client 不同）約 108 bytes，10 萬個 client 約 27 MB
+（見 tests/unit/services/test_client_state_store.py 的量測）。
+超過 client_state_store_max_clients 的歲修不進記憶體，直接查 DB。
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ClientRecord
+from app.repositories.client_records import ClientRecordRepo, mac_key
+from app.repositories.sync_points import SyncVersion
+from app.services.synced_store import SyncedStore
+
+_NONE = -1
+
+
+class ClientState(NamedTuple):
+    """一個 MAC 的比較欄位（不持有 ORM 物件）。"""
+
+    ip_address: str | None
+    switch_hostname: str | None
+    interface_name: str | None
+    vlan_id: int | None
+    speed: str | None
+    duplex: str | None
+    link_status: str | None
+    ping_reachable: bool | None
+
+    @classmethod
+    def of(cls, record: ClientRecord | ClientState) -> ClientState:
+        return cls(*(getattr(record, field) for field in cls._fields))
+
+
+# 以 intern code 儲存的字串欄位
+_STRING_FIELDS = (
+    "ip_address", "switch_hostname", "interface_name",
+    "speed", "duplex", "link_status",
+)
+
+
+def _epoch(dt: datetime) -> float:
+    """DB 讀出的時間為 naive UTC，採集寫入時為 aware，統一成 epoch 秒。"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.timestamp()
+
+
+class ClientStateTable(Mapping[str, ClientState]):
+    """
+    單一歲修的目前狀態（MAC 大寫 → ClientState）。
+
+    同一 MAC 的取捨與 ClientRecordRepo.get_state_at 相同：
+    較新的 collected_at 優先，同時間點取 id 最小者。
+    """
+
+    def __init__(self) -> None:
+        self._rows: dict[str, int] = {}
+        self._macs: list[str] = []
+        self._strings: list[str] = []
+        self._string_codes: dict[str, int] = {}
+        self._columns = {field: array("i") for field in _STRING_FIELDS}
+        self._vlan = array("i")
+        self._ping = array("b")
+        self._record_ids = array("q")
+        self._collected = array("d")
+        # 與 DB 的同步點（見 SyncedStore）
+        self.max_id = 0
+        self.record_count = 0
+        self._latest = float("-inf")
+
+    # ── Mapping ──────────────────────────────────────────────────
+
+    def __getitem__(self, mac: str) -> ClientState:
+        row = self._rows[mac]
+        codes = {field: self._columns[field][row] for field in _STRING_FIELDS}
+        vlan = self._vlan[row]
+        ping = self._ping[row]
+        return ClientState(
+            ip_address=self._decode(codes["ip_address"]),
+            switch_hostname=self._decode(codes["switch_hostname"]),
+            interface_name=self._decode(codes["interface_name"]),
+            vlan_id=None if vlan == _NONE else vlan,
+            speed=self._decode(codes["speed"]),
+            duplex=self._decode(codes["duplex"]),
+            link_status=self._decode(codes["link_status"]),
+            ping_reachable=None if ping == _NONE else bool(ping),
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, mac: object) -> bool:
+        return mac in self._rows
+
+    # ── Updates ──────────────────────────────────────────────────
+
+    def apply(self, records: Iterable[ClientRecord]) -> None:
+        """套用變化點（可重複套用，較舊的記錄不會覆蓋較新的狀態）。"""
+        for record in records:
+            mac = mac_key(record)
+            if not mac or record.collected_at is None:
+                continue
+            collected = _epoch(record.collected_at)
+            row = self._rows.get(mac)
+            if row is None:
+                row = self._append(mac)
+            elif not self._is_newer(row, collected, record.id):
+                continue
+            self._set(row, record, collected)
+            self._latest = max(self._latest, collected)
+
+    def covers(self, at: datetime) -> bool:
+        """at 不早於已套用的最新快照時，目前狀態即為 at 時的狀態。"""
+        return _epoch(at) >= self._latest
+
+    def memory_bytes(self) -> int:
+        """估計佔用的記憶體（欄位 buffer + MAC 索引 + 字串池）。"""
+        columns: list[array[int] | array[float]] = [
+            *self._columns.values(), self._vlan, self._ping,
+            self._record_ids, self._collected,
+        ]
+        total = sum(col.buffer_info()[1] * col.itemsize for col in columns)
+        total += sys.getsizeof(self._rows) + sys.getsizeof(self._macs)
+        total += sum(sys.getsizeof(mac) for mac in self._macs)
+        total += sys.getsizeof(self._strings) + sys.getsizeof(self._string_codes)
+        total += sum(sys.getsizeof(s) for s in self._strings)
+        return total
+
+    # ── Internals ────────────────────────────────────────────────
+
+    def _append(self, mac: str) -> int:
+        row = len(self._macs)
+        self._rows[mac] = row
+        self._macs.append(mac)
+        for col in self._columns.values():
+            col.append(_NONE)
+        self._vlan.append(_NONE)
+        self._ping.append(_NONE)
+        self._record_ids.append(0)
+        self._collected.append(float("-inf"))
+        return row
+
+    def _is_newer(self, row: int, collected: float, record_id: int | None) -> bool:
+        if collected != self._collected[row]:
+            return collected > self._collected[row]
+        return record_id is not None and record_id < self._record_ids[row]
+
+    def _set(self, row: int, record: ClientRecord, collected: float) -> None:
+        for field in _STRING_FIELDS:
+            self._columns[field][row] = self._encode(getattr(record, field))
+        self._vlan[row] = _NONE if record.vlan_id is None else record.vlan_id
+        self._ping[row] = (
+            _NONE if record.ping_reachable is None else int(record.ping_reachable)
+        )
+        self._record_ids[row] = record.id or 0
+        self._collected[row] = collected
+
+    def _encode(self, value: str | None) -> int:
+        if value is None:
+            return _NONE
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(value)
+            self._string_codes[value] = code
+        return code
+
+    def _decode(self, code: int) -> str | None:
+        return None if code == _NONE else self._strings[code]
+
+
+class ClientStateStore(
+    SyncedStore[ClientStateTable, Mapping[str, ClientRecord]],
+):
+    """每個歲修一個 ClientStateTable，以 client_records 同步（見 SyncedStore）。"""
+
+    label = "Client state"
+
+    async def current_state(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> ClientStateTable | None:
+        """
+        取得與 DB 同步後的目前狀態。
+
+        回傳 None 表示此歲修不使用記憶體（超過上限），呼叫端改查 DB。
+        """
+        return await self.current(maintenance_id, session)
+
+    def apply(
+        self,
+        maintenance_id: str,
+        records: list[ClientRecord],
+    ) -> None:
+        """
+        同一 process 寫入新變化點後直接套用（records 需已 flush 取得 id）。
+
+        只在 records 緊接目前同步點時推進同步點；否則留給下次讀取時
+        由 current_state 從 DB 補齊（套用可重複，不會重複計算）。
+        """
+        table = self._entries.get(maintenance_id)
+        if table is None or not records:
+            return
+        table.apply(records)
+        ids = sorted(r.id for r in records if r.id is not None)
+        if ids and ids[0] == table.max_id + 1 and ids[-1] - ids[0] + 1 == len(ids):
+            table.max_id = ids[-1]
+            table.record_count += len(ids)
+
+    async def _get_version(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        known_max_id: int,
+    ) -> SyncVersion:
+        return await ClientRecordRepo(session).get_version(
+            maintenance_id, known_max_id,
+        )
+
+    async def _catch_up(
+        self,
+        maintenance_id: str,
+        entry: ClientStateTable,
+        session: AsyncSession,
+        max_id: int,
+    ) -> bool:
+        entry.apply(await ClientRecordRepo(session).get_written_after(
+            maintenance_id, entry.max_id, max_id,
+        ))
+        return True
+
+    async def _fetch(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> Mapping[str, ClientRecord]:
+        return await ClientRecordRepo(session).get_state_at(maintenance_id)
+
+    def _build(self, rows: Mapping[str, ClientRecord]) -> ClientStateTable:
+        table = ClientStateTable()
+        table.apply(rows.values())
+        return table
+
+
+# ── Singleton ────────────────────────────────────────────────────
+
+_client_state_store: ClientStateStore | None = None
+
+
+def get_client_state_store() -> ClientStateStore | None:
+    """Get the store, or None when client_state_store_enabled is off."""
+    global _client_state_store
+    if not settings.client_state_store_enabled:
+        return None
+    if _client_state_store is None:
+        _client_state_store = ClientStateStore(
+            settings.client_state_store_max_clients,
+        )
+    return _client_state_store
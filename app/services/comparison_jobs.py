@@ -0,0 +1,231 @@
+"""
+Comparison regeneration queue.
+
+Client 清單的每個異動（新增、更新、刪除、匯入、偵測）都需要更新比較結果。
+異動只呼叫 request_regeneration 排入佇列並立即回傳；每個歲修一個背景 worker：
+
+- 防抖：最後一次請求後靜止 comparison_regen_debounce_seconds 秒才開始，
+  窗口內的請求合併為一次重建（連續異動最多延後 comparison_regen_max_delay_seconds）
+- 同一歲修同時只有一個重建在跑；執行中的新請求累積到下一輪
+- 只重算上次之後被異動的 MAC；有任何請求未指定 MAC（或 MAC 太多）時完整重建
+- 重建失敗時該輪的範圍放回佇列，與下一次重建一起重試
+
+前端以 GET /mac-list/{maintenance_id}/comparisons/regeneration 輪詢進度。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from app.core.config import settings
+from app.core.timezone import now_utc
+from app.db.base import get_session_context
+from app.services.client_comparison_service import ClientComparisonService
+
+logger = logging.getLogger(__name__)
+
+# 單輪待重算的 MAC 超過此數改為完整重建
+_MAX_PARTIAL_MACS = 2000
+
+
+@dataclass
+class RegenerationJob:
+    """某歲修的比較結果重建佇列與進度。"""
+
+    maintenance_id: str
+    requested_at: datetime
+    status: str = "queued"  # queued / running / done / failed
+    phase: str | None = None  # syncing_cases / generating / saving（running 時）
+    scope: str | None = None  # 本輪範圍：full / partial
+    comparisons: int = 0  # 本輪產生的比較筆數（saving 之後才有）
+    runs: int = 0  # 已完成的輪數
+    requests: int = 0  # 累計請求數（與 runs 的差距即被合併的請求）
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+    # 等待下一輪的請求
+    pending: bool = False
+    pending_full: bool = False
+    pending_macs: set[str] = field(default_factory=set)
+    sync_cases: bool = False
+    first_request_at: float = 0.0  # loop.time()
+    last_request_at: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "maintenance_id": self.maintenance_id,
+            "status": self.status,
+            "phase": self.phase,
+            "scope": self.scope,
+            "comparisons": self.comparisons,
+            "runs": self.runs,
+            "requests": self.requests,
+            "rerun_pending": self.pending,
+            "pending_macs": None if self.pending_full else len(self.pending_macs),
+            "sync_cases": self.sync_cases,
+            "requested_at": self.requested_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+_jobs: dict[str, RegenerationJob] = {}
+# 保留 worker task 的強參照，避免執行中被 GC
+_tasks: dict[str, asyncio.Task[None]] = {}
+
+
+def get_regeneration(maintenance_id: str) -> RegenerationJob | None:
+    """該歲修的重建佇列狀態（從未請求過為 None）。"""
+    return _jobs.get(maintenance_id)
+
+
+def request_regeneration(
+    maintenance_id: str,
+    macs: Iterable[str] | None = None,
+    sync_cases: bool = False,
+) -> RegenerationJob:
+    """
+    排入比較結果重建並立即回傳 job。
+
+    Args:
+        macs: 被異動的 MAC；None 表示完整重建。
+        sync_cases: 重建前先同步案件（清單新增了 Client）。
+    """
+    now = asyncio.get_running_loop().time()
+    job = _jobs.get(maintenance_id)
+    if job is None:
+        job = RegenerationJob(maintenance_id=maintenance_id, requested_at=now_utc())
+        _jobs[maintenance_id] = job
+
+    if not job.pending:
+        job.pending = True
+        job.first_request_at = now
+        if job.status != "running":
+            job.status = "queued"
+    job.last_request_at = now
+    job.requested_at = now_utc()
+    job.requests += 1
+    _enqueue(
+        job, None if macs is None else {mac.upper() for mac in macs}, sync_cases,
+    )
+
+    task = _tasks.get(maintenance_id)
+    if task is None or task.done():
+        _tasks[maintenance_id] = asyncio.create_task(_worker(job))
+    return job
+
+
+def _enqueue(
+    job: RegenerationJob,
+    macs: set[str] | None,
+    sync_cases: bool,
+) -> None:
+    """把範圍併入下一輪（macs 為 None 表示完整重建）。"""
+    job.sync_cases = job.sync_cases or sync_cases
+    if macs is None:
+        job.pending_full = True
+    elif not job.pending_full:
+        job.pending_macs.update(macs)
+        if len(job.pending_macs) > _MAX_PARTIAL_MACS:
+            job.pending_full = True
+    if job.pending_full:
+        job.pending_macs.clear()
+
+
+async def wait_for_regeneration(maintenance_id: str) -> None:
+    """等待該歲修的 worker 處理完所有已排入的請求。"""
+    task = _tasks.get(maintenance_id)
+    if task is not None:
+        await asyncio.shield(task)
+
+
+async def _worker(job: RegenerationJob) -> None:
+    loop = asyncio.get_running_loop()
+    while job.pending:
+        # 防抖：等到請求靜止 debounce 秒，或距第一個請求已達 max_delay
+        while True:
+            start_at = min(
+                job.last_request_at + settings.comparison_regen_debounce_seconds,
+                job.first_request_at + settings.comparison_regen_max_delay_seconds,
+            )
+            delay = start_at - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        macs = None if job.pending_full else job.pending_macs
+        sync_cases = job.sync_cases
+        job.pending = False
+        job.pending_full = False
+        job.pending_macs = set()
+        job.sync_cases = False
+        if not await _rebuild(job, macs, sync_cases):
+            # 失敗的範圍留在佇列：下一輪（執行中已有新請求，或下一個請求）重試
+            _enqueue(job, macs, sync_cases)
+
+
+async def _rebuild(
+    job: RegenerationJob,
+    macs: set[str] | None,
+    sync_cases: bool,
+) -> bool:
+    """執行一輪重建，成功時回傳 True。"""
+    job.status = "running"
+    job.scope = "full" if macs is None else "partial"
+    job.started_at = now_utc()
+    job.comparisons = 0
+    job.error = None
+    try:
+        # 使用新的 session 來確保能看到最新的已提交資料
+        async with get_session_context() as session:
+            if sync_cases:
+                # 為新加入清單的 MAC 建立 Case 記錄（不受比較結果影響，先做）
+                from app.services.case_service import CaseService
+
+                job.phase = "syncing_cases"
+                await CaseService().sync_cases(job.maintenance_id, session)
+
+            job.phase = "generating"
+            service = ClientComparisonService()
+            comparisons = await service.generate_comparisons(
+                maintenance_id=job.maintenance_id,
+                session=session,
+                macs=macs,
+            )
+            job.phase = "saving"
+            job.comparisons = len(comparisons)
+            if macs is None:
+                await service.save_comparisons(
+                    comparisons=comparisons,
+                    session=session,
+                )
+            elif macs:
+                await service.replace_comparisons(
+                    job.maintenance_id, macs, comparisons, session,
+                )
+    except Exception as e:
+        # 比較生成失敗不應影響主要操作，記錄錯誤供進度查詢
+        logger.exception(
+            "Failed to regenerate comparisons for %s", job.maintenance_id,
+        )
+        job.status = "failed"
+        job.error = str(e)
+    else:
+        job.status = "done"
+        logger.info(
+            "Saved %d comparisons for %s (%s)",
+            job.comparisons, job.maintenance_id, job.scope,
+        )
+    job.phase = None
+    job.finished_at = now_utc()
+    job.runs += 1
+    failed = job.status == "failed"
+    if job.pending:
+        job.status = "queued"
+    return not failed
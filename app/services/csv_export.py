@@ -0,0 +1,107 @@
+"""
+Streaming CSV export.
+
+匯出以 server-side cursor（session.stream + yield_per）逐批讀取，每批編碼
+為一段 UTF-8 位元組交給 StreamingResponse；記憶體只與批量大小有關，與總列數
+無關，第一個位元組也不必等整個查詢跑完。
+
+串流在 endpoint 回傳之後才執行，因此這裡自行開 session，不能沿用 request
+的 session（屆時已關閉）。串流中的 cursor 佔住連線，每批需要額外查詢時
+（如案件的 client 快照）以 lookup_session 另開一個 session 查。
+"""
+from __future__ import annotations
+
+import csv
+import io
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Sequence,
+)
+from typing import Any, Literal, cast, overload
+
+from sqlalchemy import Row, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.base import get_session_context
+
+# 每批從 cursor 讀取並編碼的列數
+CSV_CHUNK_ROWS = 1000
+
+# Excel 需要 BOM 才會以 UTF-8 開啟
+_BOM = "\ufeff"
+
+# 本批 rows → 本批的 CSV 列（不需要查詢，lookup 為 None）
+ChunkFormatter = Callable[[Sequence[Row[Any]], None], Iterable[Sequence[Any]]]
+
+# 本批 rows、lookup session → 本批的 CSV 列（lookup_session=True）
+LookupChunkFormatter = Callable[
+    [Sequence[Row[Any]], AsyncSession],
+    Awaitable[Iterable[Sequence[Any]]],
+]
+
+
+def _encode(rows: Iterable[Sequence[Any]], prefix: str = "") -> bytes:
+    buffer = io.StringIO()
+    buffer.write(prefix)
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+@overload
+def stream_csv(
+    stmt: Select[*tuple[Any, ...]],
+    header: Sequence[str],
+    format_chunk: ChunkFormatter,
+    *,
+    chunk_rows: int | None = None,
+    lookup_session: Literal[False] = False,
+) -> AsyncIterator[bytes]: ...
+
+
+@overload
+def stream_csv(
+    stmt: Select[*tuple[Any, ...]],
+    header: Sequence[str],
+    format_chunk: LookupChunkFormatter,
+    *,
+    chunk_rows: int | None = None,
+    lookup_session: Literal[True],
+) -> AsyncIterator[bytes]: ...
+
+
+async def stream_csv(
+    stmt: Select[*tuple[Any, ...]],
+    header: Sequence[str],
+    format_chunk: ChunkFormatter | LookupChunkFormatter,
+    *,
+    chunk_rows: int | None = None,
+    lookup_session: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    逐批串流 stmt 的查詢結果為 CSV（含 BOM 與標頭列）。
+
+    Args:
+        format_chunk: (本批 rows, lookup) → 本批的 CSV 列。
+            lookup_session=True 時為 async 並收到另開的 session；
+            否則為一般函式，lookup 為 None。
+        chunk_rows: 每批列數（預設 CSV_CHUNK_ROWS）。
+        lookup_session: 為 format_chunk 另開一個 session。
+    """
+    yield _encode([header], prefix=_BOM)
+
+    async with get_session_context() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=chunk_rows or CSV_CHUNK_ROWS),
+        )
+        if lookup_session:
+            format_with_lookup = cast(LookupChunkFormatter, format_chunk)
+            async with get_session_context() as lookup:
+                async for partition in result.partitions():
+                    yield _encode(await format_with_lookup(partition, lookup))
+        else:
+            format_rows = cast(ChunkFormatter, format_chunk)
+            async for partition in result.partitions():
+                yield _encode(format_rows(partition, None))
@@ -7,25 +7,33 @@ from __future__ import annotations
 
 import logging
 import math
+import time
 from collections import defaultdict
+from datetime import UTC, datetime
 from typing import Any
 
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import CollectionError, MaintenanceDeviceList
-
-logger = logging.getLogger(__name__)
-from app.indicators.transceiver import TransceiverIndicator
-from app.indicators.version import VersionIndicator
-from app.indicators.uplink import UplinkIndicator
-from app.indicators.port_channel import PortChannelIndicator
-from app.indicators.power import PowerIndicator
-from app.indicators.fan import FanIndicator
+from app.core.config import settings
+from app.db.models import (
+    CollectionError,
+    IndicatorResult,
+    MaintenanceDeviceList,
+)
+from app.indicators.base import BaseIndicator, IndicatorEvaluationResult
 from app.indicators.error_count import ErrorCountIndicator
+from app.indicators.fan import FanIndicator
 from app.indicators.ping import PingIndicator
-from app.indicators.base import IndicatorEvaluationResult
-from app.services.threshold_service import ensure_cache
+from app.indicators.port_channel import PortChannelIndicator
+from app.indicators.power import PowerIndicator
+from app.indicators.transceiver import TransceiverIndicator
+from app.indicators.uplink import UplinkIndicator
+from app.indicators.version import VersionIndicator
+from app.repositories.indicator_results import IndicatorResultRepo
+from app.services.threshold_service import ensure_cache, load_thresholds_many
+
+logger = logging.getLogger(__name__)
 
 
 class IndicatorService:
@@ -50,19 +58,172 @@ class IndicatorService:
         """評估所有指標（從 DB 中的採集資料進行真實評估）。"""
         return await self._evaluate_all_real(maintenance_id, session)
 
-    async def _evaluate_all_real(
+    async def evaluate_maintenances(
+        self,
+        maintenance_ids: list[str],
+        session: AsyncSession,
+    ) -> dict[str, dict[str, IndicatorEvaluationResult]]:
+        """
+        一次評估多個歲修，並覆寫 indicator_results 中的最新結果。
+
+        背景評估器在每輪採集後呼叫；閾值以單一 IN 查詢重新載入，
+        各指標以 maintenance_id IN (...) 一次取回所有歲修的資料
+        （查詢數不隨歲修數增加），結果以 IN 條件一次刪除 + 一次寫入。
+        呼叫端負責 commit。
+        """
+        await load_thresholds_many(session, maintenance_ids)
+        if not maintenance_ids:
+            return {}
+
+        t0 = time.monotonic()
+        evaluated_at = datetime.now(UTC)
+        all_results: dict[str, dict[str, IndicatorEvaluationResult]] = {
+            mid: {} for mid in maintenance_ids
+        }
+        timings: dict[str, float] = {}
+        for name, indicator in self._indicators().items():
+            t1 = time.monotonic()
+            try:
+                by_mid = await indicator.evaluate_many(maintenance_ids, session)
+            except Exception as e:
+                # 缺少的指標在 replace 時一併清除，讀取端改走即時評估
+                logger.error("Error evaluating %s: %s", name, e)
+                continue
+            finally:
+                timings[name] = time.monotonic() - t1
+            for mid, result in by_mid.items():
+                all_results[mid][name] = result
+
+        rows = [
+            self._to_result_row(result, evaluated_at)
+            for results in all_results.values()
+            for result in results.values()
+        ]
+        await IndicatorResultRepo(session).replace(maintenance_ids, rows)
+
+        logger.info(
+            "Indicators for %d maintenances (%.2fs) [%s]",
+            len(maintenance_ids),
+            time.monotonic() - t0,
+            " ".join(f"{n}={s:.3f}s" for n, s in timings.items()),
+        )
+        return all_results
+
+    async def get_results(
         self,
         maintenance_id: str,
         session: AsyncSession,
-    ) -> dict[str, IndicatorEvaluationResult]:
-        """真實評估所有指標。"""
-        import time as _time
+    ) -> tuple[dict[str, IndicatorEvaluationResult], datetime]:
+        """
+        讀取端點用：回傳 (評估結果, evaluated_at)。
 
-        # 確保該歲修的閾值快取已載入
-        await ensure_cache(session, maintenance_id)
+        優先讀取背景評估器儲存的結果；沒有結果、缺少指標、
+        或超過 indicator_results_max_age_seconds 時改為即時評估。
+        """
+        max_age = settings.indicator_results_max_age_seconds
+        if max_age > 0:
+            rows = await IndicatorResultRepo(session).get_latest(maintenance_id)
+            stored = self._from_result_rows(rows, max_age)
+            if stored is not None:
+                return stored
+
+        results = await self.evaluate_all(maintenance_id, session)
+        return results, datetime.now(UTC)
+
+    async def get_stored_version(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> tuple[tuple[str, int, datetime], ...] | None:
+        """
+        get_results 會回傳已儲存結果時，回傳這批結果的版本（不載入 details）。
+
+        需要即時評估（停用、缺少指標或過期）時回傳 None。呼叫端可以版本
+        快取由結果衍生的資料，版本相同即表示 get_results 會回傳相同內容。
+        """
+        max_age = settings.indicator_results_max_age_seconds
+        if max_age <= 0:
+            return None
+        versions = await IndicatorResultRepo(session).get_versions(maintenance_id)
+        if self._stored_evaluated_at(
+            [(t, at) for t, _, at in versions], max_age,
+        ) is None:
+            return None
+        return tuple(sorted(versions))
+
+    def _stored_evaluated_at(
+        self,
+        rows: list[tuple[str, datetime]],
+        max_age: int,
+    ) -> datetime | None:
+        """(indicator_type, evaluated_at) 完整且未過期時回傳整批的評估時間。"""
+        if not rows or {t for t, _ in rows} != {
+            i.indicator_type for i in self.get_all_indicators()
+        }:
+            return None
+
+        # DB 欄位為 naive datetime，一律視為 UTC
+        evaluated_at = min(at for _, at in rows)
+        if evaluated_at.tzinfo is None:
+            evaluated_at = evaluated_at.replace(tzinfo=UTC)
+        if (datetime.now(UTC) - evaluated_at).total_seconds() > max_age:
+            return None
+        return evaluated_at
+
+    def _from_result_rows(
+        self,
+        rows: list[IndicatorResult],
+        max_age: int,
+    ) -> tuple[dict[str, IndicatorEvaluationResult], datetime] | None:
+        """已儲存的結果完整且未過期時轉回 IndicatorEvaluationResult。"""
+        evaluated_at = self._stored_evaluated_at(
+            [(row.indicator_type, row.evaluated_at) for row in rows], max_age,
+        )
+        if evaluated_at is None:
+            return None
+        by_type = {row.indicator_type: row for row in rows}
+
+        results: dict[str, IndicatorEvaluationResult] = {}
+        for name, row in by_type.items():
+            # 模型標註為 str，實際存的是 JSON 物件
+            details: dict[str, Any] = (
+                row.details if isinstance(row.details, dict) else {}
+            )
+            results[name] = IndicatorEvaluationResult(
+                indicator_type=row.indicator_type,
+                maintenance_id=row.maintenance_id,
+                total_count=row.total_count,
+                pass_count=row.pass_count,
+                fail_count=row.fail_count,
+                pass_rates=row.pass_rates or {},
+                failures=details.get("failures"),
+                passes=details.get("passes"),
+                summary=details.get("summary"),
+            )
+        return results, evaluated_at
+
+    @staticmethod
+    def _to_result_row(
+        result: IndicatorEvaluationResult,
+        evaluated_at: datetime,
+    ) -> IndicatorResult:
+        return IndicatorResult(
+            indicator_type=result.indicator_type,
+            maintenance_id=result.maintenance_id,
+            pass_rates=result.pass_rates,
+            total_count=result.total_count,
+            pass_count=result.pass_count,
+            fail_count=result.fail_count,
+            details={
+                "failures": result.failures,
+                "passes": result.passes,
+                "summary": result.summary,
+            },
+            evaluated_at=evaluated_at,
+        )
 
-        t0 = _time.monotonic()
-        indicators = {
+    def _indicators(self) -> dict[str, BaseIndicator]:
+        return {
             "transceiver": self.transceiver_indicator,
             "version": self.version_indicator,
             "uplink": self.uplink_indicator,
@@ -73,10 +234,20 @@ class IndicatorService:
             "ping": self.ping_indicator,
         }
 
+    async def _evaluate_all_real(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> dict[str, IndicatorEvaluationResult]:
+        """真實評估所有指標。"""
+        # 確保該歲修的閾值快取已載入
+        await ensure_cache(session, maintenance_id)
+
+        t0 = time.monotonic()
         results = {}
         timings = {}
-        for name, indicator in indicators.items():
-            t1 = _time.monotonic()
+        for name, indicator in self._indicators().items():
+            t1 = time.monotonic()
             try:
                 results[name] = await indicator.evaluate(
                     maintenance_id=maintenance_id,
@@ -84,9 +255,9 @@ class IndicatorService:
                 )
             except Exception as e:
                 logger.error("Error evaluating %s: %s", name, e)
-            timings[name] = _time.monotonic() - t1
+            timings[name] = time.monotonic() - t1
 
-        elapsed = _time.monotonic() - t0
+        elapsed = time.monotonic() - t0
         parts = [
             f"{n}: {r.pass_count}/{r.total_count}"
             for n, r in results.items()
@@ -106,13 +277,17 @@ class IndicatorService:
         self,
         maintenance_id: str,
         session: AsyncSession,
+        results: tuple[dict[str, IndicatorEvaluationResult], datetime] | None = None,
     ) -> dict[str, Any]:
         """
         獲取 Dashboard 摘要。
         
         包含所有指標的通過率和快速統計。
+        呼叫端已取得 get_results 的結果時可由 results 傳入，避免重複評估。
         """
-        results = await self.evaluate_all(maintenance_id, session)
+        if results is None:
+            results = await self.get_results(maintenance_id, session)
+        by_type, evaluated_at = results
 
         # 查詢採集錯誤（含設備主機名，用來判斷與 indicator 失敗的重疊）
         ce_device_sets = await self._get_collection_error_devices(
@@ -137,6 +312,7 @@ class IndicatorService:
 
         summary = {
             "maintenance_id": maintenance_id,
+            "evaluated_at": evaluated_at.isoformat(),
             "indicators": {},
             "overall": {
                 "total_count": 0,
@@ -146,7 +322,7 @@ class IndicatorService:
             }
         }
 
-        for indicator_type, result in results.items():
+        for indicator_type, result in by_type.items():
             ce_devices = ce_device_sets.get(indicator_type, set())
             ce_count = len(ce_devices)
 
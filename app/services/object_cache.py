@@ -0,0 +1,120 @@
+"""
+Local disk LRU cache for served upload objects.
+
+案件頁面的縮圖每次瀏覽都會經過 /uploads/files/...，
+熱門物件留一份在本機磁碟，下次直接從檔案回傳，不必再從物件儲存拉：
+
+- 完整（非 Range）下載時邊傳邊寫入暫存檔，傳完才加入快取；中斷則丟棄
+- 總大小上限 upload_cache_max_bytes，超過時淘汰最久未使用的物件；
+  單一物件超過上限的 1/8 不快取
+- 索引（含 ETag / Content-Type）只在記憶體，啟動時清掉上次留下的快取檔
+- 上傳的物件名稱含隨機 ID、不會被覆寫，因此命中時不必再向物件儲存確認
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import BinaryIO
+
+from app.core.config import settings
+from app.services.storage import ObjectInfo
+
+
+def _is_cache_name(name: str) -> bool:
+    return len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+
+
+class ObjectCache:
+    """以物件名稱為 key 的磁碟 LRU。"""
+
+    def __init__(self, root: str | Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[Path, ObjectInfo]] = OrderedDict()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 上次執行留下的檔案不在索引裡，清掉
+        for path in self.root.iterdir():
+            if path.is_file() and (
+                _is_cache_name(path.name) or path.suffix == ".tmp"
+            ):
+                path.unlink(missing_ok=True)
+
+    @property
+    def max_object_bytes(self) -> int:
+        return self.max_bytes // 8
+
+    def _path(self, object_name: str) -> Path:
+        return self.root / hashlib.sha256(object_name.encode()).hexdigest()
+
+    def open(self, object_name: str) -> tuple[BinaryIO, ObjectInfo] | None:
+        """命中時回傳已開啟的檔案（之後被淘汰也能讀完）與中繼資料。"""
+        entry = self._entries.get(object_name)
+        if entry is None:
+            return None
+        path, info = entry
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            self._remove(object_name)
+            return None
+        self._entries.move_to_end(object_name)
+        return f, info
+
+    async def fill(
+        self,
+        object_name: str,
+        info: ObjectInfo,
+        chunks: AsyncIterator[bytes],
+    ) -> AsyncIterator[bytes]:
+        """轉傳 chunks，同時寫入快取；完整收到 info.size bytes 才加入。"""
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        received = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    f.write(chunk)
+                    received += len(chunk)
+                    yield chunk
+            if received != info.size:
+                return
+            path = self._path(object_name)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        self._add(object_name, path, info)
+
+    def _add(self, object_name: str, path: Path, info: ObjectInfo) -> None:
+        if object_name in self._entries:
+            self.size -= self._entries.pop(object_name)[1].size
+        self._entries[object_name] = (path, info)
+        self.size += info.size
+        while self.size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._path(oldest).unlink(missing_ok=True)
+
+    def _remove(self, object_name: str) -> None:
+        _, info = self._entries.pop(object_name)
+        self.size -= info.size
+
+
+_cache: ObjectCache | None = None
+
+
+def get_object_cache() -> ObjectCache | None:
+    """上傳物件的磁碟快取（upload_cache_max_bytes 為 0 時停用）。"""
+    global _cache
+    if settings.upload_cache_max_bytes <= 0:
+        return None
+    if _cache is None:
+        root = settings.upload_cache_dir or Path(
+            tempfile.gettempdir(), "netora-upload-cache",
+        )
+        _cache = ObjectCache(root, settings.upload_cache_max_bytes)
+    return _cache
@@ -0,0 +1,300 @@
+"""
+Report rendering jobs and artifact cache.
+
+報告（HTML 匯出、JSON 預覽）在背景 task 渲染，產物以
+(歲修, 報告種類, 資料版本) 為 key 存成本機檔案，端點直接回傳檔案並附 ETag：
+
+- 資料版本見 ReportService.data_version（已儲存的指標結果、採集錯誤、忽略設定）；
+  版本不變時直接回傳既有產物，瀏覽器帶 If-None-Match 時回 304
+- 同一 key 同時只有一個渲染 task，其他請求等待同一個 task
+- 請求斷線不會取消渲染（shield），產物留給下一個請求
+- 需要即時評估（沒有已儲存的結果）時版本為 None：仍合併同時的請求，但不寫檔
+- 每個歲修的每種報告只保留最新版本的檔案（舊版本保留一分鐘給傳送中的請求）
+- 產物中的產生時間是佔位字串 GENERATED_AT_MARKER，回傳時才換成當下時間，
+  因此同一版本的產物不會帶著第一次渲染的時間；ETag 只依資料版本
+
+POST /reports/maintenance/{maintenance_id}/render 只排入渲染、立即回傳。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Literal
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.timezone import now_utc
+from app.db.base import get_session_context
+from app.services.report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+ReportKind = Literal["html", "html-summary", "json"]
+
+# 報告種類 → (副檔名, Content-Type)
+REPORT_KINDS: dict[str, tuple[str, str]] = {
+    "html": ("html", "text/html; charset=utf-8"),
+    "html-summary": ("html", "text/html; charset=utf-8"),
+    "json": ("json", "application/json"),
+}
+
+# 被新版本取代的產物保留秒數
+_STALE_GRACE_SECONDS = 60
+
+# 產物中產生時間的佔位字串（每份產物恰好出現一次）
+GENERATED_AT_MARKER = "__REPORT_GENERATED_AT__"
+_MARKER = GENERATED_AT_MARKER.encode()
+_READ_SIZE = 64 * 1024
+
+
+def html_kind(include_details: bool) -> ReportKind:
+    """HTML 匯出的報告種類（是否含明細是兩份不同的報告）。"""
+    return "html" if include_details else "html-summary"
+
+
+@dataclass(frozen=True)
+class ReportArtifact:
+    """渲染好的報告；path 為已存檔的產物，content 為未存檔（即時評估）的內容。"""
+
+    maintenance_id: str
+    kind: str
+    etag: str | None
+    path: Path | None = None
+    content: bytes | None = None
+
+    @property
+    def media_type(self) -> str:
+        return REPORT_KINDS[self.kind][1]
+
+    def generated_at(self) -> str:
+        """回傳時的產生時間（HTML 頁首與 JSON 預覽格式不同）。"""
+        return ReportService.generated_at(html=self.kind != "json")
+
+    def size(self, generated_at: str) -> int:
+        """填入 generated_at 後的長度（Content-Length）。"""
+        if self.content is not None:
+            raw = len(self.content)
+        else:
+            assert self.path is not None
+            raw = self.path.stat().st_size
+        return raw - len(_MARKER) + len(generated_at.encode())
+
+    def iter_bytes(self, generated_at: str) -> Iterator[bytes]:
+        """分段讀出產物，並把佔位字串換成 generated_at。"""
+        if self.content is not None:
+            yield from _stamp(iter((self.content,)), generated_at.encode())
+            return
+        assert self.path is not None
+        with self.path.open("rb") as f:
+            chunks = iter(lambda: f.read(_READ_SIZE), b"")
+            yield from _stamp(chunks, generated_at.encode())
+
+
+def _stamp(chunks: Iterator[bytes], value: bytes) -> Iterator[bytes]:
+    """替換第一個佔位字串；保留前段結尾可能被切開的部分接到下一段。"""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        index = pending.find(_MARKER)
+        if index >= 0:
+            yield pending[:index] + value
+            yield pending[index + len(_MARKER):]
+            yield from chunks
+            return
+        keep = len(_MARKER) - 1
+        if len(pending) > keep:
+            yield pending[:-keep]
+            pending = pending[-keep:]
+    if pending:
+        yield pending
+
+
+class ArtifactStore:
+    """本機檔案的報告產物：<root>/<歲修雜湊>/<種類>-<版本雜湊>.<副檔名>。"""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    @staticmethod
+    def digest(maintenance_id: str, kind: str, version: tuple[Any, ...]) -> str:
+        key = repr((maintenance_id, kind, version)).encode()
+        return hashlib.sha256(key).hexdigest()[:32]
+
+    def _dir(self, maintenance_id: str) -> Path:
+        # 歲修 ID 由使用者輸入，不直接當路徑
+        return self.root / hashlib.sha256(maintenance_id.encode()).hexdigest()[:16]
+
+    def _path(self, maintenance_id: str, kind: str, digest: str) -> Path:
+        ext = REPORT_KINDS[kind][0]
+        return self._dir(maintenance_id) / f"{kind}-{digest}.{ext}"
+
+    def get(
+        self,
+        maintenance_id: str,
+        kind: str,
+        version: tuple[Any, ...],
+    ) -> ReportArtifact | None:
+        digest = self.digest(maintenance_id, kind, version)
+        path = self._path(maintenance_id, kind, digest)
+        if not path.is_file():
+            return None
+        return ReportArtifact(maintenance_id, kind, f'"{digest}"', path=path)
+
+    def put(
+        self,
+        maintenance_id: str,
+        kind: str,
+        version: tuple[Any, ...],
+        data: bytes,
+    ) -> ReportArtifact:
+        """寫入產物（先寫暫存檔再 rename），並刪除同種類的舊版本。"""
+        digest = self.digest(maintenance_id, kind, version)
+        path = self._path(maintenance_id, kind, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        # 舊版本保留一段時間：可能還有請求正在傳送
+        cutoff = time.time() - _STALE_GRACE_SECONDS
+        for old in path.parent.glob(f"{kind}-*.{REPORT_KINDS[kind][0]}"):
+            if old != path and old.stat().st_mtime < cutoff:
+                old.unlink(missing_ok=True)
+        return ReportArtifact(maintenance_id, kind, f'"{digest}"', path=path)
+
+
+@dataclass
+class ReportJob:
+    """排入渲染時的報告狀態（渲染失敗只記錄 log，下次請求重新渲染）。"""
+
+    maintenance_id: str
+    kind: str
+    requested_at: datetime
+    status: str = "rendering"  # rendering / ready
+    etag: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "maintenance_id": self.maintenance_id,
+            "kind": self.kind,
+            "status": self.status,
+            "etag": self.etag,
+            "requested_at": self.requested_at.isoformat(),
+        }
+
+
+_store: ArtifactStore | None = None
+# (maintenance_id, kind, version) → 渲染中的 task（強參照，避免執行中被 GC）
+_tasks: dict[tuple[Any, ...], asyncio.Task[ReportArtifact]] = {}
+
+
+def get_artifact_store() -> ArtifactStore:
+    """報告產物目錄（report_artifact_dir，未設定時用系統暫存目錄）。"""
+    global _store
+    if _store is None:
+        root = settings.report_artifact_dir or Path(
+            tempfile.gettempdir(), "netora-reports",
+        )
+        _store = ArtifactStore(root)
+    return _store
+
+
+async def get_report(
+    maintenance_id: str,
+    kind: str,
+    session: AsyncSession,
+) -> ReportArtifact:
+    """回傳目前資料版本的報告；尚未渲染時等待（或加入進行中的）渲染 task。"""
+    version = await ReportService().data_version(maintenance_id, session)
+    if version is not None:
+        artifact = get_artifact_store().get(maintenance_id, kind, version)
+        if artifact is not None:
+            return artifact
+    return await asyncio.shield(_start(maintenance_id, kind, version))
+
+
+async def request_report(
+    maintenance_id: str,
+    kind: str,
+    session: AsyncSession,
+) -> ReportJob:
+    """排入渲染並立即回傳狀態（已有目前版本的產物時為 ready）。"""
+    job = ReportJob(maintenance_id=maintenance_id, kind=kind, requested_at=now_utc())
+    version = await ReportService().data_version(maintenance_id, session)
+    if version is not None:
+        artifact = get_artifact_store().get(maintenance_id, kind, version)
+        if artifact is not None:
+            job.status = "ready"
+            job.etag = artifact.etag
+            return job
+
+    _start(maintenance_id, kind, version)
+    return job
+
+
+def _start(
+    maintenance_id: str,
+    kind: str,
+    version: tuple[Any, ...] | None,
+) -> asyncio.Task[ReportArtifact]:
+    key = (maintenance_id, kind, version)
+    task = _tasks.get(key)
+    if task is None:
+        task = asyncio.create_task(_render(maintenance_id, kind))
+        _tasks[key] = task
+        task.add_done_callback(lambda t: _done(key, t))
+    return task
+
+
+def _done(key: tuple[Any, ...], task: asyncio.Task[ReportArtifact]) -> None:
+    if _tasks.get(key) is task:
+        del _tasks[key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            "Failed to render %s report for %s: %s",
+            key[1], key[0], task.exception(),
+        )
+
+
+async def _render(maintenance_id: str, kind: str) -> ReportArtifact:
+    # 使用新的 session：請求結束（或斷線）後仍要完成渲染；
+    # 版本在同一個 session 內重新取得，產物與內容一致
+    async with get_session_context() as session:
+        service = ReportService()
+        version = await service.data_version(maintenance_id, session)
+        if kind == "json":
+            body = await service.render_preview(
+                maintenance_id, session, generated_at=GENERATED_AT_MARKER,
+            )
+            data = json.dumps(
+                jsonable_encoder(body), ensure_ascii=False, separators=(",", ":"),
+            ).encode()
+        else:
+            chunks = await service.render_html_report(
+                maintenance_id, kind == "html", session,
+                generated_at=GENERATED_AT_MARKER,
+            )
+            data = "".join(chunks).encode()
+
+    if version is None:
+        return ReportArtifact(maintenance_id, kind, None, content=data)
+    return await asyncio.to_thread(
+        get_artifact_store().put, maintenance_id, kind, version, data,
+    )
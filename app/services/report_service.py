@@ -3,107 +3,58 @@ Report Service.
 
 Sanity Check 報告生成服務。
 提供 HTML 報告生成功能，包含整體通過率、各指標統計、失敗詳情。
+
+- 指標只評估一次：摘要與明細共用同一份 get_results 結果
+- 版面為模組層級的 format 樣板（import 時建立一次），逐段產生：
+  頁首 + 每個指標一張卡片 + 頁尾，endpoint 可直接串流
+- 已儲存的指標結果、採集錯誤與忽略設定都沒變時（見 data_version），
+  沿用上次渲染的卡片，只重新產生含產生時間的頁首
 """
 from __future__ import annotations
 
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from typing import Any
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.models import CollectionError, MaintenanceDeviceList
 from app.services.indicator_service import IndicatorService
 
-
-class ReportService:
-    """Sanity Check 報告生成服務。"""
-
-    def __init__(self) -> None:
-        """初始化報告服務。"""
-        self.indicator_service = IndicatorService()
-
-    async def generate_html_report(
-        self,
-        maintenance_id: str,
-        include_details: bool,
-        session: AsyncSession,
-    ) -> str:
-        """
-        生成完整的 HTML 報告。
-
-        Args:
-            maintenance_id: 歲修 ID
-            include_details: 是否包含失敗詳情
-            session: 資料庫 session
-
-        Returns:
-            完整的 HTML 字串
-        """
-        # 獲取摘要資料
-        summary = await self.indicator_service.get_dashboard_summary(
-            maintenance_id, session
-        )
-
-        # 獲取詳細失敗 + 通過列表
-        results = await self.indicator_service.evaluate_all(maintenance_id, session)
-
-        indicator_details = {}
-        for indicator_type, result in results.items():
-            indicator_details[indicator_type] = {
-                "indicator_type": result.indicator_type,
-                "total_count": result.total_count,
-                "pass_count": result.pass_count,
-                "fail_count": result.fail_count,
-                "pass_rate": result.pass_rate_percent,
-                "failures": result.failures or [],
-                "passes": result.passes or [],
-            }
-
-        # 使用台灣時區 (UTC+8)
-        tw_tz = timezone(timedelta(hours=8))
-        generated_at = datetime.now(tw_tz).strftime("%Y-%m-%d %H:%M:%S (台灣時間)")
-
-        return self._render_html(
-            maintenance_id=maintenance_id,
-            generated_at=generated_at,
-            summary=summary,
-            indicator_details=indicator_details,
-            include_details=include_details,
-        )
-
-    def _render_html(
-        self,
-        maintenance_id: str,
-        generated_at: str,
-        summary: dict[str, Any],
-        indicator_details: dict[str, Any],
-        include_details: bool,
-    ) -> str:
-        """渲染 HTML 報告。"""
-        overall = summary.get("overall", {})
-        overall_pass_rate = overall.get("pass_rate", 0)
-        overall_total = overall.get("total_count", 0)
-        overall_pass = overall.get("pass_count", 0)
-        overall_fail = overall.get("fail_count", 0)
-
-        # 決定整體狀態顏色
-        if overall_pass_rate >= 95:
-            status_color = "#10b981"  # green
-            status_text = "PASS"
-        elif overall_pass_rate >= 80:
-            status_color = "#f59e0b"  # yellow
-            status_text = "WARNING"
-        else:
-            status_color = "#ef4444"  # red
-            status_text = "FAIL"
-
-        # 生成指標卡片 HTML
-        indicator_cards_html = self._generate_indicator_cards(
-            summary.get("indicators", {}),
-            indicator_details,
-            include_details,
-        )
-
-        html = f"""<!DOCTYPE html>
+# 產生時間的格式：HTML 頁首 / JSON 預覽
+_GENERATED_AT_HTML = "%Y-%m-%d %H:%M:%S (台灣時間)"
+_TW_TZ = timezone(timedelta(hours=8))
+
+# 渲染結果快取：(maintenance_id, include_details, data_version) → (摘要, 卡片)
+REPORT_CACHE_SIZE = 16
+_cache: OrderedDict[tuple[Any, ...], tuple[dict[str, Any], list[str]]] = OrderedDict()
+
+_INDICATOR_NAMES = {
+    "transceiver": "Transceiver",
+    "version": "Version",
+    "uplink": "Uplink",
+    "port_channel": "Port Channel",
+    "power": "Power",
+    "fan": "Fan",
+    "error_count": "Error Count",
+    "ping": "Ping",
+}
+
+_DETAIL_MAX_ITEMS = 20
+
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+})
+
+# ── Templates ────────────────────────────────────────────────────
+
+_PAGE_START = """<!DOCTYPE html>
 <html lang="zh-TW">
 <head>
     <meta charset="UTF-8">
@@ -430,7 +381,9 @@ class ReportService:
         </section>
 
         <section class="indicators-grid">
-            {indicator_cards_html}
+            """
+
+_PAGE_END = """
         </section>
 
         <footer class="footer">
@@ -441,29 +394,269 @@ class ReportService:
 </body>
 </html>"""
 
-        return html
+_CARD = """
+            <div class="indicator-card">
+                <div class="indicator-header">
+                    <span class="indicator-name">{name}</span>
+                    <span class="indicator-rate {rate_class}">{pass_rate:.1f}%</span>
+                </div>
+                <div class="indicator-stats">
+                    <span>Total: {total}</span>
+                    <span style="color: #10b981">✓ {passed}</span>
+                    <span style="color: #ef4444">✗ {failed}</span>
+                </div>
+                {failures_html}
+                {passes_html}
+            </div>"""
 
-    def _generate_indicator_cards(
+_DETAIL_TABLE = """
+            <div class="detail-section">
+                <div class="detail-title {css_class}">{title}</div>
+                <table class="detail-table">
+                    <thead>
+                        <tr>
+                            <th>設備</th>
+                            <th>項目</th>
+                            <th>描述</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {rows}
+                    </tbody>
+                </table>
+                {more_html}
+            </div>"""
+
+_DETAIL_ROW = """<tr>
+                <td class="text-device">{device}</td>
+                <td class="text-muted">{interface}</td>
+                <td class="text-{css_class}">{reason}</td>
+            </tr>\n""".format
+
+_MORE_ITEMS = '<div class="more-items">... 還有 {count} 筆未顯示</div>'.format
+
+
+@dataclass
+class ReportData:
+    """一次評估得到的報告資料（摘要與明細來自同一份結果）。"""
+
+    maintenance_id: str
+    evaluated_at: datetime
+    summary: dict[str, Any]
+    indicator_details: dict[str, Any]
+
+
+class ReportService:
+    """Sanity Check 報告生成服務。"""
+
+    def __init__(self) -> None:
+        """初始化報告服務。"""
+        self.indicator_service = IndicatorService()
+
+    async def get_report_data(
         self,
-        indicators_summary: dict[str, Any],
-        indicator_details: dict[str, Any],
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> ReportData:
+        """評估一次，產生摘要與各指標明細（失敗 + 通過列表）。"""
+        results, evaluated_at = await self.indicator_service.get_results(
+            maintenance_id, session,
+        )
+        summary = await self.indicator_service.get_dashboard_summary(
+            maintenance_id, session, results=(results, evaluated_at),
+        )
+
+        indicator_details = {}
+        for indicator_type, result in results.items():
+            indicator_details[indicator_type] = {
+                "indicator_type": result.indicator_type,
+                "total_count": result.total_count,
+                "pass_count": result.pass_count,
+                "fail_count": result.fail_count,
+                "pass_rate": result.pass_rate_percent,
+                "failures": result.failures or [],
+                "passes": result.passes or [],
+            }
+        return ReportData(maintenance_id, evaluated_at, summary, indicator_details)
+
+    @staticmethod
+    def generated_at(html: bool) -> str:
+        """目前時間（台灣時間）作為報告的產生時間；html=False 為 ISO 格式。"""
+        now = datetime.now(_TW_TZ)
+        return now.strftime(_GENERATED_AT_HTML) if html else now.isoformat()
+
+    async def render_preview(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+        generated_at: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        JSON 預覽：摘要與各指標明細，供前端預覽或自行處理。
+
+        generated_at 未指定時為目前時間。
+        """
+        data = await self.get_report_data(maintenance_id, session)
+
+        return {
+            "maintenance_id": maintenance_id,
+            "generated_at": generated_at or self.generated_at(html=False),
+            "evaluated_at": data.evaluated_at.astimezone(_TW_TZ).isoformat(),
+            "summary": data.summary,
+            "indicators": data.indicator_details,
+        }
+
+    async def data_version(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> tuple[Any, ...] | None:
+        """
+        報告內容的版本（不載入指標明細）。
+
+        由已儲存指標結果的版本、採集錯誤與忽略設定組成；版本相同時
+        報告內容（產生時間除外）相同。需要即時評估時回傳 None（不可快取）。
+        """
+        stored = await self.indicator_service.get_stored_version(
+            maintenance_id, session,
+        )
+        if stored is None:
+            return None
+
+        errors = await session.execute(
+            select(
+                CollectionError.collection_type,
+                CollectionError.switch_hostname,
+            ).where(CollectionError.maintenance_id == maintenance_id)
+        )
+        ignored = await session.execute(
+            select(
+                MaintenanceDeviceList.new_hostname,
+                MaintenanceDeviceList.ignored_indicators,
+            ).where(
+                MaintenanceDeviceList.maintenance_id == maintenance_id,
+                MaintenanceDeviceList.new_hostname.isnot(None),
+            )
+        )
+        return (
+            stored,
+            tuple(sorted(tuple(row) for row in errors.all())),
+            tuple(sorted(
+                (hostname, tuple(indicators))
+                for hostname, indicators in ignored.all()
+                if indicators
+            )),
+        )
+
+    async def render_html_report(
+        self,
+        maintenance_id: str,
+        include_details: bool,
+        session: AsyncSession,
+        generated_at: str | None = None,
+    ) -> list[str]:
+        """
+        產生 HTML 報告的各段（頁首、指標卡片、頁尾），依序串接即為完整報告。
+
+        版本未變時沿用快取的卡片，不重新讀取指標明細。
+        generated_at 未指定時為目前時間。
+        """
+        version = await self.data_version(maintenance_id, session)
+        key = (maintenance_id, include_details, version)
+        cached = _cache.get(key) if version is not None else None
+        if cached is not None:
+            _cache.move_to_end(key)
+            summary, cards = cached
+        else:
+            data = await self.get_report_data(maintenance_id, session)
+            summary = data.summary
+            # 卡片之間以換行分隔；分隔符先併入卡片，之後直接逐段輸出
+            cards = [
+                card if i == 0 else "\n" + card
+                for i, card in enumerate(self._render_cards(
+                    summary.get("indicators", {}),
+                    data.indicator_details,
+                    include_details,
+                ))
+            ]
+            if version is not None:
+                _cache[key] = (summary, cards)
+                while len(_cache) > REPORT_CACHE_SIZE:
+                    _cache.popitem(last=False)
+
+        return [
+            self._render_page_start(
+                maintenance_id,
+                generated_at or self.generated_at(html=True),
+                summary,
+            ),
+            *cards,
+            _PAGE_END,
+        ]
+
+    async def generate_html_report(
+        self,
+        maintenance_id: str,
         include_details: bool,
+        session: AsyncSession,
     ) -> str:
-        """生成各指標的卡片 HTML。"""
-        cards = []
-
-        indicator_names = {
-            "transceiver": "Transceiver",
-            "version": "Version",
-            "uplink": "Uplink",
-            "port_channel": "Port Channel",
-            "power": "Power",
-            "fan": "Fan",
-            "error_count": "Error Count",
-            "ping": "Ping",
-        }
+        """
+        生成完整的 HTML 報告。
+
+        Args:
+            maintenance_id: 歲修 ID
+            include_details: 是否包含失敗詳情
+            session: 資料庫 session
+
+        Returns:
+            完整的 HTML 字串
+        """
+        return "".join(await self.render_html_report(
+            maintenance_id, include_details, session,
+        ))
 
-        for indicator_type, name in indicator_names.items():
+    # ── Rendering ────────────────────────────────────────────────
+
+    @staticmethod
+    def _render_page_start(
+        maintenance_id: str,
+        generated_at: str,
+        summary: dict[str, Any],
+    ) -> str:
+        """頁首：樣式、標題與整體狀態。"""
+        overall = summary.get("overall", {})
+        overall_pass_rate = overall.get("pass_rate", 0)
+
+        # 決定整體狀態顏色
+        if overall_pass_rate >= 95:
+            status_color = "#10b981"  # green
+            status_text = "PASS"
+        elif overall_pass_rate >= 80:
+            status_color = "#f59e0b"  # yellow
+            status_text = "WARNING"
+        else:
+            status_color = "#ef4444"  # red
+            status_text = "FAIL"
+
+        return _PAGE_START.format(
+            maintenance_id=maintenance_id,
+            generated_at=generated_at,
+            status_color=status_color,
+            status_text=status_text,
+            overall_pass_rate=overall_pass_rate,
+            overall_total=overall.get("total_count", 0),
+            overall_pass=overall.get("pass_count", 0),
+            overall_fail=overall.get("fail_count", 0),
+        )
+
+    def _render_cards(
+        self,
+        indicators_summary: dict[str, Any],
+        indicator_details: dict[str, Any],
+        include_details: bool,
+    ) -> Iterator[str]:
+        """逐一產生各指標的卡片 HTML。"""
+        for indicator_type, name in _INDICATOR_NAMES.items():
             if indicator_type not in indicators_summary:
                 continue
 
@@ -472,8 +665,6 @@ class ReportService:
 
             pass_rate = summary.get("pass_rate", 0)
             total = summary.get("total_count", 0)
-            passed = summary.get("pass_count", 0)
-            failed = summary.get("fail_count", 0)
             failures = details.get("failures", [])
             passes = details.get("passes", [])
 
@@ -495,7 +686,7 @@ class ReportService:
                         items=failures,
                         css_class="fail",
                         title=f"❌ 未通過項目 ({len(failures)})",
-                        max_items=20,
+                        max_items=_DETAIL_MAX_ITEMS,
                         total_items=len(failures),
                     )
                 elif passes:
@@ -505,27 +696,20 @@ class ReportService:
                         items=unique_passes,
                         css_class="pass",
                         title=f"✅ 通過項目 ({len(unique_passes)} 台設備)",
-                        max_items=20,
+                        max_items=_DETAIL_MAX_ITEMS,
                         total_items=len(unique_passes),
                     )
 
-            card = f"""
-            <div class="indicator-card">
-                <div class="indicator-header">
-                    <span class="indicator-name">{name}</span>
-                    <span class="indicator-rate {rate_class}">{pass_rate:.1f}%</span>
-                </div>
-                <div class="indicator-stats">
-                    <span>Total: {total}</span>
-                    <span style="color: #10b981">✓ {passed}</span>
-                    <span style="color: #ef4444">✗ {failed}</span>
-                </div>
-                {failures_html}
-                {passes_html}
-            </div>"""
-            cards.append(card)
-
-        return "\n".join(cards)
+            yield _CARD.format(
+                name=name,
+                rate_class=rate_class,
+                pass_rate=pass_rate,
+                total=total,
+                passed=summary.get("pass_count", 0),
+                failed=summary.get("fail_count", 0),
+                failures_html=failures_html,
+                passes_html=passes_html,
+            )
 
     @staticmethod
     def _format_item_interface(item: dict) -> str:
@@ -545,44 +729,26 @@ class ReportService:
         max_items: int,
         total_items: int,
     ) -> str:
-        """渲染失敗或通過的明細表格。"""
-        rows = ""
-        for item in items[:max_items]:
-            if not isinstance(item, dict):
-                continue
-            device = self._escape(item.get("device", "—"))
-            interface = self._escape(self._format_item_interface(item))
-            reason = self._escape(item.get("reason", "—"))
-            rows += f"""<tr>
-                <td class="text-device">{device}</td>
-                <td class="text-muted">{interface}</td>
-                <td class="text-{css_class}">{reason}</td>
-            </tr>\n"""
+        """渲染失敗或通過的明細表格（只取前 max_items 筆）。"""
+        escape = self._escape
+        rows = "".join(
+            _DETAIL_ROW(
+                device=escape(item.get("device", "—")),
+                interface=escape(self._format_item_interface(item)),
+                reason=escape(item.get("reason", "—")),
+                css_class=css_class,
+            )
+            for item in items[:max_items]
+            if isinstance(item, dict)
+        )
 
         more_html = ""
         if total_items > max_items:
-            more_html = (
-                f'<div class="more-items">'
-                f"... 還有 {total_items - max_items} 筆未顯示</div>"
-            )
+            more_html = _MORE_ITEMS(count=total_items - max_items)
 
-        return f"""
-            <div class="detail-section">
-                <div class="detail-title {css_class}">{title}</div>
-                <table class="detail-table">
-                    <thead>
-                        <tr>
-                            <th>設備</th>
-                            <th>項目</th>
-                            <th>描述</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {rows}
-                    </tbody>
-                </table>
-                {more_html}
-            </div>"""
+        return _DETAIL_TABLE.format(
+            css_class=css_class, title=title, rows=rows, more_html=more_html,
+        )
 
     @staticmethod
     def _dedupe_by_device(items: list[dict]) -> list[dict]:
@@ -597,11 +763,6 @@ class ReportService:
         return result
 
     @staticmethod
-    def _escape(text: str) -> str:
+    def _escape(text: Any) -> str:
         """Escape HTML special characters."""
-        return (
-            text.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-        )
+        return str(text).translate(_ESCAPE_TABLE)
@@ -3,7 +3,8 @@ Scheduler Service.
 
 Architecture (v2.20.0 — continuous collection loop):
   - collection_loop (continuous): 完成即開始下一輪，無固定間隔
-      SNMP round (ALL collectors) → API passthrough (ACL) → client_collection → cooldown → repeat
+      SNMP round (ALL collectors) → API passthrough (ACL) → client_collection
+      → indicator evaluation (all maintenances, stored for read endpoints) → cooldown → repeat
   - device_ping (15s): batch ICMP via GNMSPING API
   - client_ping (15s): batch ICMP for client IPs
   - retention (30min): cleanup old data
@@ -178,6 +179,9 @@ class SchedulerService:
                 # ── Phase 3: Client collection (組裝 + case sync) ──
                 await self._run_client_collection()
 
+                # ── Phase 4: 評估所有歲修指標，結果寫入 indicator_results ──
+                await self._run_indicator_evaluation(maintenance_ids)
+
                 elapsed = _time.monotonic() - t0
                 logger.info(
                     "=== Collection round #%d done: %.1fs ===",
@@ -573,8 +577,8 @@ class SchedulerService:
                     maintenance_id=mid,
                 )
                 logger.info(
-                    "Client collection for %s: %d/%d switches, %d records",
-                    mid,
+                    "Client collection for %s (%s): %d/%d switches, %d records",
+                    mid, result["mode"],
                     result["success"], result["total"],
                     result["client_records_count"],
                 )
@@ -630,6 +634,33 @@ class SchedulerService:
             len(maintenance_ids), elapsed,
         )
 
+    # ── Indicator Evaluation ───────────────────────────────────
+
+    async def _run_indicator_evaluation(self, maintenance_ids: list[str]) -> None:
+        """
+        一次評估所有活躍歲修並儲存結果。
+
+        Dashboard / 報告 / 拓樸讀取儲存的結果，不必每個請求重新評估。
+        失敗只記錄 log：讀取端會退回即時評估。
+        """
+        from app.db.base import get_session_context
+        from app.services.indicator_service import IndicatorService
+
+        t0 = _time.monotonic()
+        try:
+            async with get_session_context() as session:
+                await IndicatorService().evaluate_maintenances(
+                    maintenance_ids, session,
+                )
+        except Exception as e:
+            logger.error("Indicator evaluation failed: %s", e)
+            return
+
+        logger.info(
+            "Indicator evaluation done: %d maintenances, %.2fs",
+            len(maintenance_ids), _time.monotonic() - t0,
+        )
+
     # ── Device Ping ─────────────────────────────────────────────
 
     def add_device_ping_job(self, interval_seconds: int = 30) -> str:
@@ -3,59 +3,253 @@ Object storage service (MinIO / S3-compatible).
 
 提供檔案上傳、取得公開 URL 等操作。
 使用 miniopy-async 做非同步 I/O。
+
+後端由 storage_backend 選擇：
+- minio：MinIO / S3-compatible（正式環境）
+- local：本機目錄 storage_local_dir（開發、測試用）
+
+上傳與下載都以串流進行：上傳從 UploadFile 分段讀取後送出，
+下載依 offset / length 分段讀取（支援 HTTP Range），不把整個物件讀進記憶體。
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
 import json
 import logging
+import mimetypes
+import os
+import tempfile
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Protocol
 
 from miniopy_async import Minio
+from miniopy_async.error import S3Error
+from miniopy_async.helpers import MIN_PART_SIZE
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-_client: Minio | None = None
+# 串流讀寫的分段大小
+CHUNK_SIZE = 64 * 1024
+
+
+class ObjectNotFoundError(Exception):
+    """物件不存在。"""
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    """物件的中繼資料（下載時的 Content-Type / Content-Length / ETag）。"""
+
+    size: int
+    content_type: str
+    etag: str  # 含雙引號，可直接作為 HTTP ETag
+
+
+class StorageBackend(Protocol):
+    """物件儲存後端。stream 需有 read(n)，可為同步或 async（如 UploadFile）。"""
+
+    async def ensure_bucket(self) -> None: ...
+
+    async def put(
+        self, object_name: str, stream: Any, length: int, content_type: str,
+    ) -> None: ...
+
+    async def stat(self, object_name: str) -> ObjectInfo: ...
+
+    def iter_range(
+        self, object_name: str, offset: int = 0, length: int | None = None,
+    ) -> AsyncIterator[bytes]: ...
+
+
+async def _read(stream: Any, size: int) -> bytes:
+    result = stream.read(size)
+    if asyncio.iscoroutine(result):
+        result = await result
+    data: bytes = result
+    return data
 
 
-def _get_client() -> Minio:
-    """Get or create MinIO async client (singleton)."""
-    global _client
-    if _client is None:
-        cfg = settings.minio
-        _client = Minio(
-            endpoint=cfg.endpoint,
-            access_key=cfg.access_key,
-            secret_key=cfg.secret_key,
-            secure=cfg.secure,
-            region=cfg.region or None,
+def read_file_range(
+    f: BinaryIO,
+    offset: int = 0,
+    length: int | None = None,
+) -> Iterator[bytes]:
+    """分段讀取已開啟檔案的 [offset, offset + length)；length 為 None 讀到結尾。"""
+    f.seek(offset)
+    remaining = length
+    while remaining is None or remaining > 0:
+        size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+        chunk = f.read(size)
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+class MinioBackend:
+    """MinIO / S3-compatible 後端。"""
+
+    def __init__(self) -> None:
+        self._client: Minio | None = None
+
+    @property
+    def client(self) -> Minio:
+        """Get or create MinIO async client (singleton)."""
+        if self._client is None:
+            cfg = settings.minio
+            self._client = Minio(
+                endpoint=cfg.endpoint,
+                access_key=cfg.access_key,
+                secret_key=cfg.secret_key,
+                secure=cfg.secure,
+                region=cfg.region or None,
+            )
+        return self._client
+
+    async def ensure_bucket(self) -> None:
+        """Ensure the upload bucket exists; create if missing with public-read policy."""
+        client = self.client
+        bucket = settings.minio.bucket
+        if not await client.bucket_exists(bucket):
+            await client.make_bucket(bucket)
+            logger.info("Created MinIO bucket: %s", bucket)
+
+            # Set public-read policy so images can be viewed by browsers
+            policy = {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Principal": {"AWS": "*"},
+                        "Action": ["s3:GetObject"],
+                        "Resource": [f"arn:aws:s3:::{bucket}/*"],
+                    },
+                ],
+            }
+            await client.set_bucket_policy(bucket, json.dumps(policy))
+            logger.info("Set public-read policy on bucket: %s", bucket)
+
+    async def put(
+        self, object_name: str, stream: Any, length: int, content_type: str,
+    ) -> None:
+        # 長度未知（-1）時以 multipart 分段上傳
+        await self.client.put_object(
+            bucket_name=settings.minio.bucket,
+            object_name=object_name,
+            data=stream,
+            length=length,
+            content_type=content_type,
+            part_size=MIN_PART_SIZE if length < 0 else 0,
         )
-    return _client
+
+    async def stat(self, object_name: str) -> ObjectInfo:
+        try:
+            obj = await self.client.stat_object(settings.minio.bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+                raise ObjectNotFoundError(object_name) from e
+            raise
+        return ObjectInfo(
+            size=obj.size or 0,
+            content_type=obj.content_type or "application/octet-stream",
+            etag=f'"{obj.etag}"',
+        )
+
+    async def iter_range(
+        self, object_name: str, offset: int = 0, length: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        response = await self.client.get_object(
+            settings.minio.bucket, object_name, offset=offset, length=length or 0,
+        )
+        try:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
+            await response.release()
+
+
+class LocalBackend:
+    """本機目錄後端：物件存成 <root>/<object_name>，Content-Type 依副檔名判斷。"""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, object_name: str) -> Path:
+        path = (self.root / object_name).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ObjectNotFoundError(object_name)
+        return path
+
+    async def ensure_bucket(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    async def put(
+        self, object_name: str, stream: Any, length: int, content_type: str,
+    ) -> None:
+        path = self._path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := await _read(stream, CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    async def stat(self, object_name: str) -> ObjectInfo:
+        try:
+            st = self._path(object_name).stat()
+        except (FileNotFoundError, NotADirectoryError) as e:
+            raise ObjectNotFoundError(object_name) from e
+        content_type, _ = mimetypes.guess_type(object_name)
+        tag = hashlib.md5(
+            f"{st.st_mtime_ns}-{st.st_size}".encode(), usedforsecurity=False,
+        ).hexdigest()
+        return ObjectInfo(
+            size=st.st_size,
+            content_type=content_type or "application/octet-stream",
+            etag=f'"{tag}"',
+        )
+
+    async def iter_range(
+        self, object_name: str, offset: int = 0, length: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        try:
+            f = self._path(object_name).open("rb")
+        except FileNotFoundError as e:
+            raise ObjectNotFoundError(object_name) from e
+        with f:
+            for chunk in read_file_range(f, offset, length):
+                yield chunk
+
+
+_backend: StorageBackend | None = None
+
+
+def get_backend() -> StorageBackend:
+    """Get or create the configured storage backend (singleton)."""
+    global _backend
+    if _backend is None:
+        if settings.storage_backend == "local":
+            _backend = LocalBackend(settings.storage_local_dir)
+        else:
+            _backend = MinioBackend()
+    return _backend
 
 
 async def ensure_bucket() -> None:
-    """Ensure the upload bucket exists; create if missing with public-read policy."""
-    client = _get_client()
-    bucket = settings.minio.bucket
-    if not await client.bucket_exists(bucket):
-        await client.make_bucket(bucket)
-        logger.info("Created MinIO bucket: %s", bucket)
-
-        # Set public-read policy so images can be viewed by browsers
-        policy = {
-            "Version": "2012-10-17",
-            "Statement": [
-                {
-                    "Effect": "Allow",
-                    "Principal": {"AWS": "*"},
-                    "Action": ["s3:GetObject"],
-                    "Resource": [f"arn:aws:s3:::{bucket}/*"],
-                },
-            ],
-        }
-        await client.set_bucket_policy(bucket, json.dumps(policy))
-        logger.info("Set public-read policy on bucket: %s", bucket)
+    """Ensure the upload bucket (or local directory) exists."""
+    await get_backend().ensure_bucket()
 
 
 async def upload_file(
@@ -74,21 +268,45 @@ async def upload_file(
     Returns:
         Public URL string for the uploaded object.
     """
-    client = _get_client()
-    bucket = settings.minio.bucket
-
-    await client.put_object(
-        bucket_name=bucket,
-        object_name=object_name,
-        data=io.BytesIO(data),
-        length=len(data),
-        content_type=content_type,
-    )
-
-    logger.debug("Uploaded %s (%d bytes)", object_name, len(data))
+    return await upload_stream(object_name, io.BytesIO(data), len(data), content_type)
+
+
+async def upload_stream(
+    object_name: str,
+    stream: Any,
+    length: int = -1,
+    content_type: str = "application/octet-stream",
+) -> str:
+    """
+    Upload from a readable stream without buffering the whole file.
+
+    Args:
+        object_name: Object key (e.g., "cases/mid123/abc.jpg")
+        stream: Object with read(n) (sync or async, e.g. UploadFile)
+        length: Content length; -1 if unknown (multipart upload)
+        content_type: MIME type
+
+    Returns:
+        Public URL string for the uploaded object.
+    """
+    await get_backend().put(object_name, stream, length, content_type)
+    logger.debug("Uploaded %s (%d bytes)", object_name, length)
     return get_public_url(object_name)
 
 
+async def stat_object(object_name: str) -> ObjectInfo:
+    """Object metadata; raises ObjectNotFoundError if missing."""
+    return await get_backend().stat(object_name)
+
+
+def iter_object(
+    object_name: str,
+    offset: int = 0,
+    length: int | None = None,
+) -> AsyncIterator[bytes]:
+    """Stream an object (or a byte range of it) in chunks."""
+    return get_backend().iter_range(object_name, offset, length)
+
 
 async def get_object(object_name: str) -> tuple[bytes, str]:
     """
@@ -97,16 +315,9 @@ async def get_object(object_name: str) -> tuple[bytes, str]:
     Returns:
         (data_bytes, content_type)
     """
-    client = _get_client()
-    bucket = settings.minio.bucket
-    response = await client.get_object(bucket, object_name)
-    try:
-        data = await response.read()
-    finally:
-        response.close()
-        await response.release()
-    ct = response.headers.get("Content-Type", "application/octet-stream")
-    return data, ct
+    info = await stat_object(object_name)
+    data = b"".join([chunk async for chunk in iter_object(object_name)])
+    return data, info.content_type
 
 
 def get_public_url(object_name: str) -> str:
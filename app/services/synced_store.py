@@ -0,0 +1,134 @@
+"""
+Per-maintenance in-process caches kept in sync with the DB.
+
+ClientStateStore（目前狀態）與 ClientSearchStore（搜尋索引）共用的同步流程：
+每次讀取以一個查詢取得同步點（見 app.repositories.sync_points），
+
+- 同步點未變 → 直接使用
+- 只有新增 → 由子類別增量套用（無法套用時重新載入）
+- 有紀錄被刪除 → 重新載入
+- 載入時超過 max_clients 個 client → 此歲修不進記憶體，呼叫端改查 DB
+"""
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Sized
+from typing import Generic, Protocol, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.sync_points import SyncVersion
+
+logger = logging.getLogger(__name__)
+
+
+class SyncedEntry(Protocol):
+    """快取內容與 DB 的同步點（已套用到的最大 id、id <= max_id 的筆數）。"""
+
+    max_id: int
+    record_count: int
+
+
+EntryT = TypeVar("EntryT", bound=SyncedEntry)
+RowsT = TypeVar("RowsT", bound=Sized)
+
+
+class SyncedStore(ABC, Generic[EntryT, RowsT]):
+    """每個歲修一份 EntryT；子類別提供同步點查詢、增量套用與載入。"""
+
+    # log 中的名稱
+    label = "cache"
+
+    def __init__(self, max_clients: int) -> None:
+        self.max_clients = max_clients
+        self._entries: dict[str, EntryT] = {}
+        self._oversized: set[str] = set()
+
+    async def current(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> EntryT | None:
+        """與 DB 同步後的內容；None 表示此歲修不使用記憶體（超過上限）。"""
+        if maintenance_id in self._oversized:
+            return None
+
+        entry = self._entries.get(maintenance_id)
+        if entry is not None:
+            total, max_id, known_count = await self._get_version(
+                session, maintenance_id, entry.max_id,
+            )
+            if known_count == entry.record_count:
+                if max_id is None or max_id <= entry.max_id:
+                    return entry
+                if await self._catch_up(maintenance_id, entry, session, max_id):
+                    entry.max_id = max_id
+                    entry.record_count = total
+                    return entry
+            logger.info(
+                "%s of %s changed elsewhere; reloading",
+                self.label, maintenance_id,
+            )
+
+        return await self._load(maintenance_id, session)
+
+    def invalidate(self, maintenance_id: str) -> None:
+        self._entries.pop(maintenance_id, None)
+        self._oversized.discard(maintenance_id)
+
+    async def _load(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> EntryT | None:
+        # 先取同步點再載入：載入期間寫入的紀錄 id 較大，下次讀取時補齊
+        # （子類別的套用須可重複）
+        total, max_id, _ = await self._get_version(session, maintenance_id, 0)
+        rows = await self._fetch(maintenance_id, session)
+        if len(rows) > self.max_clients:
+            logger.info(
+                "%s of %s has %d clients (> %d); not kept in memory",
+                self.label, maintenance_id, len(rows), self.max_clients,
+            )
+            self.invalidate(maintenance_id)
+            self._oversized.add(maintenance_id)
+            return None
+
+        entry = self._build(rows)
+        entry.max_id = max_id or 0
+        entry.record_count = total
+        self._entries[maintenance_id] = entry
+        self._loaded(maintenance_id, entry)
+        return entry
+
+    # ── Subclass hooks ───────────────────────────────────────────
+
+    @abstractmethod
+    async def _get_version(
+        self,
+        session: AsyncSession,
+        maintenance_id: str,
+        known_max_id: int,
+    ) -> SyncVersion: ...
+
+    @abstractmethod
+    async def _catch_up(
+        self,
+        maintenance_id: str,
+        entry: EntryT,
+        session: AsyncSession,
+        max_id: int,
+    ) -> bool:
+        """套用 (entry.max_id, max_id] 的新紀錄；回傳 False 表示需重新載入。"""
+
+    @abstractmethod
+    async def _fetch(
+        self, maintenance_id: str, session: AsyncSession,
+    ) -> RowsT: ...
+
+    @abstractmethod
+    def _build(self, rows: RowsT) -> EntryT: ...
+
+    def _loaded(self, maintenance_id: str, entry: EntryT) -> None:
+        """載入完成後的處理（預設無）。"""
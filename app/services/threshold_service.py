@@ -28,6 +28,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.db.models import ThresholdConfig
+from app.repositories.indicator_results import IndicatorResultRepo
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,9 @@ THRESHOLD_FIELDS: dict[str, tuple[str, str, str]] = {
     "transceiver_temperature_max": ("transceiver_temperature_max", "°C", "溫度上限"),
     "transceiver_voltage_min": ("transceiver_voltage_min", "V", "電壓下限"),
     "transceiver_voltage_max": ("transceiver_voltage_max", "V", "電壓上限"),
+    "error_count_growth_window_minutes": (
+        "error_count_growth_window_minutes", "min", "CRC 增長判定時間窗（0 = 最新變化點）",
+    ),
 }
 
 # 按指標分組（前端 UI 用）
@@ -54,6 +58,9 @@ THRESHOLD_GROUPS: dict[str, list[str]] = {
         "transceiver_temperature_min", "transceiver_temperature_max",
         "transceiver_voltage_min", "transceiver_voltage_max",
     ],
+    "error_count": [
+        "error_count_growth_window_minutes",
+    ],
 }
 
 # ── 記憶體快取（per-maintenance）─────────────────────────────────
@@ -98,6 +105,44 @@ async def ensure_cache(
     await load_thresholds(session, maintenance_id)
 
 
+async def load_thresholds_many(
+    session: AsyncSession,
+    maintenance_ids: list[str],
+) -> None:
+    """
+    以單一 IN 查詢重新載入多個歲修的覆寫值到快取。
+
+    背景評估器每輪呼叫：排程與 API 可能是不同 process（K8s split），
+    不能依賴 ensure_cache 的常駐快取，否則 API 端的閾值修改永遠不會生效。
+    """
+    if not maintenance_ids:
+        return
+
+    stmt = select(ThresholdConfig).where(
+        ThresholdConfig.maintenance_id.in_(maintenance_ids)
+    )
+    result = await session.execute(stmt)
+    rows = {row.maintenance_id: row for row in result.scalars().all()}
+
+    for mid in maintenance_ids:
+        _cache[mid] = _overrides_from_row(rows.get(mid))
+
+    logger.debug(
+        "Reloaded threshold overrides for %d maintenances", len(maintenance_ids),
+    )
+
+
+def _overrides_from_row(row: ThresholdConfig | None) -> dict[str, float | int]:
+    """ThresholdConfig 行中非 NULL 的欄位即為覆寫值。"""
+    overrides: dict[str, float | int] = {}
+    if row is not None:
+        for key in THRESHOLD_FIELDS:
+            db_value = getattr(row, key, None)
+            if db_value is not None:
+                overrides[key] = db_value
+    return overrides
+
+
 async def load_thresholds(
     session: AsyncSession,
     maintenance_id: str,
@@ -108,19 +153,11 @@ async def load_thresholds(
     Returns:
         合併後的完整閾值（包含 value / default / is_override）。
     """
-    maint_cache: dict[str, float | int] = {}
-
     stmt = select(ThresholdConfig).where(
         ThresholdConfig.maintenance_id == maintenance_id
     )
     result = await session.execute(stmt)
-    row = result.scalar_one_or_none()
-
-    if row is not None:
-        for key in THRESHOLD_FIELDS:
-            db_value = getattr(row, key, None)
-            if db_value is not None:
-                maint_cache[key] = db_value
+    maint_cache = _overrides_from_row(result.scalar_one_or_none())
 
     _cache[maintenance_id] = maint_cache
 
@@ -172,6 +209,8 @@ async def update_thresholds(
         else:
             maint_cache.pop(key, None)
 
+    # 已儲存的評估結果以舊閾值算出，清除後讀取端改走即時評估
+    await IndicatorResultRepo(session).invalidate(maintenance_id)
     await session.commit()
 
     logger.info(
@@ -205,6 +244,7 @@ async def reset_thresholds(
     if row is not None:
         for key in THRESHOLD_FIELDS:
             setattr(row, key, None)
+        await IndicatorResultRepo(session).invalidate(maintenance_id)
         await session.commit()
 
     logger.info(
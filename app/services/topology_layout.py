@@ -0,0 +1,232 @@
+"""
+Topology hierarchy layout.
+
+以圖心 (eccentricity) + hostname 關鍵字決定每台設備在拓樸圖上的階層
+（0=Core, 1=Agg, 2=Edge, ...）。只依賴節點與非管理連線的鄰接關係，
+TopologyStore 在兩者不變時沿用上次的結果。
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+
+# Hostname 關鍵字優先級（數字越小 = 層級越高）
+# 兩條 chain 合併：CORE/RT/BDR > AGG/SSPN > SPN > LAGG > EDGE/.../LEAF
+_HOSTNAME_TIER_PATTERNS: list[tuple[int, re.Pattern[str]]] = [
+    (0, re.compile(r"(?:CORE|RT|BDR)", re.IGNORECASE)),
+    (1, re.compile(r"(?:AGG|SSPN)", re.IGNORECASE)),
+    (2, re.compile(r"SPN", re.IGNORECASE)),
+    (3, re.compile(r"LAGG", re.IGNORECASE)),
+    (4, re.compile(r"(?:EDGE|EQP|AMHS|OTHERS|SNR|TOR|ENG|GDS|LEAF)",
+                    re.IGNORECASE)),
+]
+_FW_PATTERN = re.compile(r"FW", re.IGNORECASE)
+_DEFAULT_TIER = 5
+
+
+def hostname_tier(hostname: str) -> int:
+    """回傳 hostname 的層級優先度（數字越小越高層）。"""
+    for tier, pat in _HOSTNAME_TIER_PATTERNS:
+        if pat.search(hostname):
+            return tier
+    return _DEFAULT_TIER
+
+
+def compute_hierarchy(
+    all_hostnames: set[str],
+    adjacency: dict[str, set[str]],
+) -> dict[str, int]:
+    """
+    基於圖心 (eccentricity) + hostname 關鍵字的階層計算。
+
+    算法：
+    1. 分離連通分量
+    2. 找出每個分量中離心率 (eccentricity) 最小的所有節點（見 _graph_center）
+    3. 離心率平手時，以 hostname 關鍵字優先級打破平手
+       CORE/RT/BDR > AGG/SSPN > SPN > LAGG > EDGE/EQP/LEAF/...
+    4. 從圖心做 BFS 逐層展開
+    5. FW 節點拉到與直連鄰居相同的層級
+    6. 孤立節點放到最底層
+    """
+    if not all_hostnames:
+        return {}
+
+    adj = {h: adjacency.get(h, set()) for h in all_hostnames}
+
+    # ── 找連通分量 ──
+    visited: set[str] = set()
+    components: list[set[str]] = []
+    for h in all_hostnames:
+        if h in visited:
+            continue
+        comp: set[str] = set()
+        q: deque[str] = deque([h])
+        while q:
+            node = q.popleft()
+            if node in comp:
+                continue
+            comp.add(node)
+            visited.add(node)
+            for nb in adj.get(node, set()):
+                if nb not in comp:
+                    q.append(nb)
+        components.append(comp)
+
+    components.sort(key=len, reverse=True)
+
+    levels: dict[str, int] = {}
+    global_max_level = 0
+
+    for comp in components:
+        if len(comp) == 1:
+            continue
+
+        # ── 找圖心：離心率最小 + hostname 優先級最高 ──
+        candidates = _graph_center(comp, adj)
+
+        # 平手時，只保留 hostname tier 最高（數字最小）的
+        if len(candidates) > 1:
+            best_tier = min(hostname_tier(h) for h in candidates)
+            center = {
+                h for h in candidates if hostname_tier(h) == best_tier
+            }
+        else:
+            center = candidates
+
+        # ── 從圖心 BFS 展開 ──
+        comp_levels: dict[str, int] = {}
+        q = deque()
+        for c in center:
+            comp_levels[c] = 0
+            q.append(c)
+
+        while q:
+            node = q.popleft()
+            for nb in sorted(adj.get(node, set())):
+                if nb in comp and nb not in comp_levels:
+                    comp_levels[nb] = comp_levels[node] + 1
+                    q.append(nb)
+
+        # ── BFS 同層平手：hostname tier 低的應該在更深層 ──
+        # 收集每層的節點，若同層內 tier 差異大則拆分
+        max_lv = max(comp_levels.values()) if comp_levels else 0
+        for lv in range(max_lv + 1):
+            nodes_at_lv = [h for h, level in comp_levels.items() if level == lv]
+            if len(nodes_at_lv) <= 1:
+                continue
+            tiers_at_lv = {hostname_tier(h) for h in nodes_at_lv}
+            if len(tiers_at_lv) <= 1:
+                continue
+            # 同一 BFS 層有不同 tier → tier 較大的往下推
+            best = min(tiers_at_lv)
+            for h in nodes_at_lv:
+                if hostname_tier(h) > best:
+                    # 推到下一層，同時級聯推動其 BFS 子樹
+                    _push_down(h, comp_levels, adj, comp)
+
+        # ── FW 節點：與直連鄰居同層 ──
+        for node in comp:
+            if _FW_PATTERN.search(node) and node in comp_levels:
+                neighbor_levels = [
+                    comp_levels[nb] for nb in adj.get(node, set())
+                    if nb in comp_levels
+                ]
+                if neighbor_levels:
+                    comp_levels[node] = min(neighbor_levels)
+
+        levels.update(comp_levels)
+        comp_max = max(comp_levels.values()) if comp_levels else 0
+        if comp_max > global_max_level:
+            global_max_level = comp_max
+
+    # 孤立節點 / 未分配的放最底層
+    for h in all_hostnames:
+        if h not in levels:
+            levels[h] = global_max_level + 1
+
+    return levels
+
+
+def _bfs_distances(source: str, adj: dict[str, set[str]]) -> dict[str, int]:
+    dist: dict[str, int] = {source: 0}
+    q = deque([source])
+    while q:
+        curr = q.popleft()
+        d = dist[curr] + 1
+        for nb in adj.get(curr, ()):
+            if nb not in dist:
+                dist[nb] = d
+                q.append(nb)
+    return dist
+
+
+def _graph_center(comp: set[str], adj: dict[str, set[str]]) -> set[str]:
+    """
+    分量中離心率最小的所有節點（圖心），只對可能是圖心的節點求精確離心率。
+
+    逐點 BFS 求全部離心率是 O(V·E)。這裡維護每個節點離心率的上下界
+    （Takes & Kosters 的 bounding eccentricities）：從 w 做一次 BFS 後，
+    對每個 v 有 max(d(w,v), ecc(w) - d(w,v)) ≤ ecc(v) ≤ ecc(w) + d(w,v)。
+    下界大於半徑上界（所有上界的最小值）的節點不可能是圖心，其餘節點
+    都要求到精確值。
+
+    BFS 來源從 degree 最高的節點開始，之後交替
+    - 離上一個來源最遠的節點：上一個來源不是圖心時，它就是證明其離心率
+      較大的端點，通常也同時排除同一分支的其他候選
+    - 下界最小的候選（可能的圖心，求精確離心率）
+
+    結果與逐點 BFS 完全相同；樹狀 / 階層式網路通常十次以內的 BFS 就收斂。
+    """
+    lower = dict.fromkeys(comp, 0)
+    upper = dict.fromkeys(comp, len(comp))
+    exact: dict[str, int] = {}
+    swept: set[str] = set()
+
+    source = max(comp, key=lambda h: (len(adj.get(h, ())), h))
+    outward = True
+    while True:
+        dist = _bfs_distances(source, adj)
+        ecc = max(dist.values())
+        for v, d in dist.items():
+            lower[v] = max(lower[v], d, ecc - d)
+            if ecc + d < upper[v]:
+                upper[v] = ecc + d
+            if lower[v] == upper[v]:
+                exact[v] = lower[v]
+        exact[source] = ecc
+        swept.add(source)
+
+        radius_bound = min(upper.values())
+        pending = [
+            v for v in comp if v not in exact and lower[v] <= radius_bound
+        ]
+        if not pending:
+            break
+        farthest = [v for v, d in dist.items() if d == ecc and v not in swept]
+        if outward and farthest:
+            source = max(farthest)
+        else:
+            source = min(
+                pending, key=lambda h: (lower[h], -len(adj.get(h, ())), h),
+            )
+        outward = not outward
+
+    radius = min(exact.values())
+    # 依 comp 的順序建立集合，後續展開的順序與逐點 BFS 版本一致
+    return {v for v in comp if exact.get(v) == radius}
+
+
+def _push_down(
+    node: str,
+    levels: dict[str, int],
+    adj: dict[str, set[str]],
+    comp: set[str],
+) -> None:
+    """將節點推到下一層，並級聯推動其子樹（BFS children）。"""
+    old_lv = levels[node]
+    new_lv = old_lv + 1
+    levels[node] = new_lv
+    # 級聯：如果鄰居的層 == old_lv + 1（原本的下一層），也要推
+    for nb in adj.get(node, set()):
+        if nb in comp and levels.get(nb, -1) == old_lv + 1:
+            _push_down(nb, levels, adj, comp)
@@ -0,0 +1,478 @@
+"""
+In-process topology model per maintenance.
+
+拓樸圖原本每次請求都重新載入所有 LLDP/CDP 鄰居記錄與期望、重新正規化
+每個介面名稱、重算階層（每個節點一次 BFS），並觸發指標評估。這裡每個
+歲修在記憶體保留已正規化的鄰居連線與建好的圖：
+
+- 鄰居記錄以 (collection_type, switch_hostname) 的最新 batch_id 為版本，
+  每次請求只查 latest_collection_batches，只重新載入 batch 變動的設備
+- 設備清單與期望只讀取所需欄位，與上次相同就沿用已建好的圖
+- 階層只依賴節點與非管理連線，兩者不變時沿用上次的結果
+- 指標失敗疊加以已儲存結果的版本（見 IndicatorService.get_stored_version）
+  + 忽略設定為 key 快取；需要即時評估時不快取
+
+DB 仍是唯一來源：版本每次請求都向 DB 比對，其他 process 寫入的變動
+下次讀取時就會套用；重啟後從頭載入。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.interfaces import (
+    is_topology_management_link,
+    normalize_interface_name,
+)
+from app.db.models import (
+    LatestCollectionBatch,
+    MaintenanceDeviceList,
+    NeighborRecord,
+    UplinkExpectation,
+)
+from app.services.indicator_service import IndicatorService
+from app.services.topology_layout import compute_hierarchy
+
+logger = logging.getLogger(__name__)
+
+UPLINK_COLLECTION_TYPES = ("get_uplink_lldp", "get_uplink_cdp")
+
+INDICATOR_LABELS = {
+    "transceiver": "光模塊",
+    "version": "版本",
+    "uplink": "Uplink",
+    "port_channel": "Port Channel",
+    "power": "電源",
+    "fan": "風扇",
+    "error_count": "錯誤計數",
+    "ping": "Ping",
+}
+
+
+class NeighborLink(NamedTuple):
+    """一筆鄰居記錄（介面名稱已正規化）。"""
+
+    record_id: int
+    source: str
+    target: str
+    local_interface: str
+    remote_interface: str
+
+
+class DeviceInfo(NamedTuple):
+    ip_address: str | None
+    vendor: str | None
+    ignored_indicators: tuple[str, ...]
+
+
+class ExpectedLink(NamedTuple):
+    id: int
+    hostname: str
+    local_interface: str
+    expected_neighbor: str
+    expected_interface: str
+
+
+class LinkState(NamedTuple):
+    source: str
+    target: str
+    local_interface: str
+    remote_interface: str
+    status: str          # "expected_pass" | "expected_fail" | "discovered"
+    is_management: bool
+
+
+@dataclass
+class TopologyGraph:
+    """建好的拓樸圖（不含指標失敗疊加）。"""
+
+    devices: dict[str, DeviceInfo]
+    links: list[LinkState]
+    link_stats: dict[str, int]
+    neighbor_count: dict[str, int]
+    levels: dict[str, int]
+
+
+@dataclass
+class FailureOverlay:
+    """每台設備的指標失敗（已排除被忽略的指標）。"""
+
+    device_failures: dict[str, list[str]] = field(default_factory=dict)
+    ping_failed: frozenset[str] = frozenset()
+    evaluated_at: str | None = None
+
+
+# ── Graph building ──────────────────────────────────────────────
+
+
+def build_links(
+    records: Iterable[NeighborLink],
+    expectations: Iterable[ExpectedLink],
+) -> tuple[list[LinkState], dict[str, int]]:
+    """
+    鄰居記錄 + 期望 → 去重後的連線與狀態統計。
+
+    LLDP 與 CDP 的同一條線只保留一次；一個 port 只能接一條線（先到先得，
+    records 的順序即優先順序）。連線以 interface-level 精確比對期望，
+    未匹配的期望補為 expected_fail（同樣遵守 per-port 約束）。
+    """
+    expectations = list(expectations)
+    exp_lookup: dict[tuple[str, str], list[ExpectedLink]] = defaultdict(list)
+    for exp in expectations:
+        exp_lookup[(exp.hostname, exp.expected_neighbor)].append(exp)
+
+    # ── 建構鄰居關係 (去重 LLDP+CDP) ──
+    seen_links: set[tuple[str, str, str, str]] = set()
+    used_ports: set[tuple[str, str]] = set()  # (hostname, local_if) — 每個 port 只能一條線
+    raw_links: list[NeighborLink] = []
+
+    for record in records:
+        src, dst = record.source, record.target
+        local_if, remote_if = record.local_interface, record.remote_interface
+
+        if src <= dst:
+            link_key = (src, dst, local_if, remote_if)
+        else:
+            link_key = (dst, src, remote_if, local_if)
+
+        if link_key in seen_links:
+            continue
+
+        # 物理約束：一個 port 只能接一條線
+        if (src, local_if) in used_ports or (dst, remote_if) in used_ports:
+            continue
+
+        seen_links.add(link_key)
+        used_ports.add((src, local_if))
+        used_ports.add((dst, remote_if))
+        raw_links.append(record)
+
+    # ── 判斷連線狀態 + 管理介面（interface-level 精確比對）──
+    links: list[LinkState] = []
+    stats = {"expected_pass": 0, "expected_fail": 0, "discovered": 0}
+    matched_exp_ids: set[int] = set()
+
+    for lnk in raw_links:
+        src, dst = lnk.source, lnk.target
+        local_if, remote_if = lnk.local_interface, lnk.remote_interface
+
+        is_mgmt = (
+            is_topology_management_link(local_if)
+            or is_topology_management_link(remote_if)
+        )
+
+        # interface-level: 正向 (src→dst) 或反向 (dst→src) 比對
+        # 期望值在入庫時已正規化
+        status = "discovered"
+        for exp in exp_lookup.get((src, dst), []):
+            if exp.local_interface == local_if and exp.expected_interface == remote_if:
+                status = "expected_pass"
+                matched_exp_ids.add(exp.id)
+                break
+        if status != "expected_pass":
+            for exp in exp_lookup.get((dst, src), []):
+                if exp.local_interface == remote_if and exp.expected_interface == local_if:
+                    status = "expected_pass"
+                    matched_exp_ids.add(exp.id)
+                    break
+
+        links.append(LinkState(src, dst, local_if, remote_if, status, is_mgmt))
+        stats[status] += 1
+
+    # ── 未匹配的期望 → expected_fail ──
+    for exp in expectations:
+        if exp.id in matched_exp_ids:
+            continue
+        local_port = (exp.hostname, exp.local_interface)
+        remote_port = (exp.expected_neighbor, exp.expected_interface)
+        if local_port in used_ports or remote_port in used_ports:
+            continue
+        used_ports.add(local_port)
+        used_ports.add(remote_port)
+        links.append(LinkState(
+            exp.hostname, exp.expected_neighbor,
+            exp.local_interface, exp.expected_interface,
+            "expected_fail", False,
+        ))
+        stats["expected_fail"] += 1
+
+    return links, stats
+
+
+def build_overlay(
+    results: dict[str, Any],
+    devices: dict[str, DeviceInfo],
+    evaluated_at: str | None,
+) -> FailureOverlay:
+    """指標評估結果 → 每台設備的失敗摘要（跳過該設備忽略的指標）。"""
+    device_failures: dict[str, list[str]] = defaultdict(list)
+    ping_failed: set[str] = set()
+    for ind_name, result in results.items():
+        for f in (result.failures or []):
+            device = f.get("device", "")
+            if not device:
+                continue
+            info = devices.get(device)
+            if info is not None and ind_name in info.ignored_indicators:
+                continue
+            label = INDICATOR_LABELS.get(ind_name, ind_name)
+            reason = f.get("reason", "")
+            device_failures[device].append(f"{label}: {reason}" if reason else label)
+            if ind_name == "ping":
+                ping_failed.add(device)
+    return FailureOverlay(dict(device_failures), frozenset(ping_failed), evaluated_at)
+
+
+# ── Per-maintenance model ───────────────────────────────────────
+
+
+class MaintenanceTopology:
+    """單一歲修的拓樸模型，以 DB 版本增量同步。"""
+
+    def __init__(self) -> None:
+        # (collection_type, switch_hostname) → 已載入的 batch_id / 鄰居連線
+        self.batches: dict[tuple[str, str], int] = {}
+        self.records: dict[tuple[str, str], list[NeighborLink]] = {}
+        self.devices: dict[str, DeviceInfo] = {}
+        self.expectations: list[ExpectedLink] = []
+        self.graph: TopologyGraph | None = None
+        self._layout_key: tuple[frozenset[str], frozenset[Any]] | None = None
+        self._overlay_key: tuple[Any, ...] | None = None
+        self._overlay: FailureOverlay | None = None
+
+    async def sync(self, maintenance_id: str, session: AsyncSession) -> TopologyGraph:
+        """比對 DB 版本，只重新載入變動的部分，回傳目前的圖。"""
+        changed = await self._sync_neighbors(maintenance_id, session)
+        changed |= await self._sync_devices(maintenance_id, session)
+        changed |= await self._sync_expectations(maintenance_id, session)
+        if changed or self.graph is None:
+            self.graph = self._build()
+        return self.graph
+
+    async def overlay(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> FailureOverlay:
+        """指標失敗疊加；已儲存結果與忽略設定都沒變時直接沿用。"""
+        svc = IndicatorService()
+        version = await svc.get_stored_version(maintenance_id, session)
+        key = None
+        if version is not None:
+            key = (version, tuple(
+                (h, d.ignored_indicators) for h, d in self.devices.items()
+                if d.ignored_indicators
+            ))
+            if key == self._overlay_key and self._overlay is not None:
+                return self._overlay
+
+        results, evaluated = await svc.get_results(maintenance_id, session)
+        overlay = build_overlay(results, self.devices, evaluated.isoformat())
+        if key is not None:
+            self._overlay_key, self._overlay = key, overlay
+        return overlay
+
+    # ── Sync ─────────────────────────────────────────────────────
+
+    async def _sync_neighbors(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> bool:
+        stmt = select(
+            LatestCollectionBatch.collection_type,
+            LatestCollectionBatch.switch_hostname,
+            LatestCollectionBatch.batch_id,
+        ).where(
+            LatestCollectionBatch.maintenance_id == maintenance_id,
+            LatestCollectionBatch.collection_type.in_(UPLINK_COLLECTION_TYPES),
+        )
+        latest = {
+            (ct, host): batch_id
+            for ct, host, batch_id in (await session.execute(stmt)).all()
+        }
+        if latest == self.batches:
+            return False
+
+        for key in self.batches.keys() - latest.keys():
+            self.records.pop(key, None)
+        stale = {
+            batch_id: key for key, batch_id in latest.items()
+            if self.batches.get(key) != batch_id
+        }
+        if stale:
+            for key in stale.values():
+                self.records[key] = []
+            rows = await session.execute(
+                select(
+                    NeighborRecord.batch_id,
+                    NeighborRecord.id,
+                    NeighborRecord.switch_hostname,
+                    NeighborRecord.remote_hostname,
+                    NeighborRecord.local_interface,
+                    NeighborRecord.remote_interface,
+                ).where(
+                    NeighborRecord.maintenance_id == maintenance_id,
+                    NeighborRecord.batch_id.in_(list(stale)),
+                )
+            )
+            for batch_id, record_id, src, dst, local_if, remote_if in rows.all():
+                self.records[stale[batch_id]].append(NeighborLink(
+                    record_id, src, dst,
+                    normalize_interface_name(local_if),
+                    normalize_interface_name(remote_if),
+                ))
+        self.batches = latest
+        return True
+
+    async def _sync_devices(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> bool:
+        stmt = select(
+            MaintenanceDeviceList.new_hostname,
+            MaintenanceDeviceList.new_ip_address,
+            MaintenanceDeviceList.new_vendor,
+            MaintenanceDeviceList.ignored_indicators,
+        ).where(
+            MaintenanceDeviceList.maintenance_id == maintenance_id,
+        ).order_by(MaintenanceDeviceList.id)
+        devices = {
+            hostname: DeviceInfo(ip, vendor, tuple(ignored or ()))
+            for hostname, ip, vendor, ignored in (await session.execute(stmt)).all()
+            if hostname
+        }
+        if devices == self.devices:
+            return False
+        self.devices = devices
+        return True
+
+    async def _sync_expectations(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> bool:
+        stmt = select(
+            UplinkExpectation.id,
+            UplinkExpectation.hostname,
+            UplinkExpectation.local_interface,
+            UplinkExpectation.expected_neighbor,
+            UplinkExpectation.expected_interface,
+        ).where(
+            UplinkExpectation.maintenance_id == maintenance_id,
+        ).order_by(UplinkExpectation.id)
+        expectations = [
+            ExpectedLink(*row) for row in (await session.execute(stmt)).all()
+        ]
+        if expectations == self.expectations:
+            return False
+        self.expectations = expectations
+        return True
+
+    # ── Build ────────────────────────────────────────────────────
+
+    def _ordered_records(self) -> list[NeighborLink]:
+        """LLDP 先於 CDP，同一協定內依記錄 id（決定 port 衝突時的優先順序）。"""
+        ordered: list[NeighborLink] = []
+        for ct in UPLINK_COLLECTION_TYPES:
+            ordered.extend(sorted(
+                (
+                    record
+                    for (key_ct, _), records in self.records.items()
+                    if key_ct == ct
+                    for record in records
+                ),
+                key=lambda r: r.record_id,
+            ))
+        return ordered
+
+    def _build(self) -> TopologyGraph:
+        links, stats = build_links(self._ordered_records(), self.expectations)
+
+        all_hostnames: set[str] = set(self.devices.keys())
+        neighbors: dict[str, set[str]] = defaultdict(set)
+        # 階層排除管理介面連線，避免 mgmt 連線干擾階層判定
+        non_mgmt_adj: dict[str, set[str]] = defaultdict(set)
+        for lnk in links:
+            all_hostnames.add(lnk.source)
+            all_hostnames.add(lnk.target)
+            # 鄰居計數（用於所有連線，包含 mgmt）
+            neighbors[lnk.source].add(lnk.target)
+            neighbors[lnk.target].add(lnk.source)
+            if not lnk.is_management:
+                non_mgmt_adj[lnk.source].add(lnk.target)
+                non_mgmt_adj[lnk.target].add(lnk.source)
+
+        layout_key = (
+            frozenset(all_hostnames),
+            frozenset((h, frozenset(nbs)) for h, nbs in non_mgmt_adj.items()),
+        )
+        if layout_key != self._layout_key or self.graph is None:
+            levels = compute_hierarchy(all_hostnames, non_mgmt_adj)
+            self._layout_key = layout_key
+        else:
+            levels = self.graph.levels
+
+        return TopologyGraph(
+            devices=self.devices,
+            links=links,
+            link_stats=stats,
+            neighbor_count={h: len(nbs) for h, nbs in neighbors.items()},
+            levels=levels,
+        )
+
+
+class TopologyStore:
+    """每個歲修一個 MaintenanceTopology；同一歲修的同步以 lock 串行。"""
+
+    def __init__(self) -> None:
+        self._models: dict[str, MaintenanceTopology] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(
+        self,
+        maintenance_id: str,
+        session: AsyncSession,
+    ) -> tuple[TopologyGraph, FailureOverlay]:
+        """回傳與 DB 同步後的圖與指標失敗疊加。"""
+        lock = self._locks.setdefault(maintenance_id, asyncio.Lock())
+        async with lock:
+            model = self._models.get(maintenance_id)
+            if model is None:
+                model = self._models[maintenance_id] = MaintenanceTopology()
+            graph = await model.sync(maintenance_id, session)
+            try:
+                overlay = await model.overlay(maintenance_id, session)
+            except Exception:
+                # topology 不因 indicator 失敗而中斷
+                logger.debug("Indicator overlay failed for %s", maintenance_id,
+                             exc_info=True)
+                overlay = FailureOverlay()
+            return graph, overlay
+
+    def invalidate(self, maintenance_id: str) -> None:
+        self._models.pop(maintenance_id, None)
+
+
+# ── Singleton ────────────────────────────────────────────────────
+
+_topology_store: TopologyStore | None = None
+
+
+def get_topology_store() -> TopologyStore | None:
+    """Get the store, or None when topology_store_enabled is off."""
+    global _topology_store
+    if not settings.topology_store_enabled:
+        return None
+    if _topology_store is None:
+        _topology_store = TopologyStore()
+    return _topology_store
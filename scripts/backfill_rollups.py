@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Rebuild indicator_rollups from collection_batches history.
+
+新增 indicator_rollups 表之前的歷史 batch 沒有彙總資料，
+時間序列圖表會是空的；此腳本依時間順序重算每個 batch 的 rollups，
+同時補齊寫入時衍生的 per-row 欄位（如 interface_error_records 的 CRC 增量）。
+冪等：已存在的 rollups 會先刪除再寫入，可重複執行。
+
+Usage:
+    python scripts/backfill_rollups.py                      # 所有歲修、所有類型
+    python scripts/backfill_rollups.py --mid TEST-001       # 只跑指定歲修
+    python scripts/backfill_rollups.py --api get_fan        # 只跑指定採集類型
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)-5s %(message)s",
+    datefmt="%H:%M:%S",
+)
+logger = logging.getLogger("backfill_rollups")
+
+
+async def main() -> None:
+    from app.db.base import get_session_context
+    from app.repositories.rollups import (
+        rebuild_rollups,
+        rollup_collection_types,
+    )
+
+    available = rollup_collection_types()
+
+    parser = argparse.ArgumentParser(description="Backfill indicator rollups")
+    parser.add_argument("--mid", help="Maintenance ID (default: all)")
+    parser.add_argument(
+        "--api", choices=available,
+        help="Only rebuild one collection type (default: all)",
+    )
+    args = parser.parse_args()
+
+    for collection_type in [args.api] if args.api else available:
+        # 每個類型一個 transaction，失敗時不影響已完成的類型
+        async with get_session_context() as session:
+            count = await rebuild_rollups(
+                session, collection_type, maintenance_id=args.mid,
+            )
+        logger.info("%-20s %6d batches rebuilt", collection_type, count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
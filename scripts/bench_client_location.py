@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Client 位置解析效能基準：舊版逐筆 ORM 候選 vs DB 端 join 後的候選 rows。
+
+模擬 N 台 switch × 每台 M 筆 MAC table（大多為未登記主機），
+登記其中 K 個 MAC（部分出現在多台 switch 的 uplink / port-channel），
+比較兩條路徑並確認選出的位置一致：
+
+- legacy：get_latest_per_device 的 ORM rows → 每個候選建立 ClientRecord，
+  五條規則中每次重新解析 speed（即改寫前的 collect_client_data）
+- joined：ClientLocationRepo.get_candidates 形狀的 rows（只有已登記 MAC，
+  interface / ACL / per-port MAC 數已 join）→
+  ClientCollectionService._locate_registered_macs
+
+ORM 建立以建構子近似 hydration（實際 hydration 成本更高）。joined 路徑的
+rows 事先在記憶體組好，不含 DB 端 join 的成本；另列出傳回應用程式的筆數。
+
+Usage:
+    python scripts/bench_client_location.py
+    python scripts/bench_client_location.py 200 5000 3000
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# Ensure project root is on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.interfaces import is_port_channel  # noqa: E402
+from app.db.models import (  # noqa: E402
+    ClientRecord,
+    InterfaceStatusRecord,
+    MacTableRecord,
+)
+from app.services.client_collection_service import (  # noqa: E402
+    ClientCollectionService,
+    _parse_speed_mbps,
+)
+
+MacRow = namedtuple(
+    "MacRow", "mac_address switch_hostname interface_name vlan_id",
+)
+IfRow = namedtuple(
+    "IfRow", "switch_hostname interface_name speed duplex link_status",
+)
+CandidateRow = namedtuple(
+    "CandidateRow",
+    "mac_address switch_hostname interface_name vlan_id "
+    "speed duplex link_status acl_number mac_count",
+)
+
+PORTS = 48
+SPEEDS = ["100M", "1G", "1G", "10G"]
+
+
+def make_data(switches: int, macs_per_switch: int, registered: int, seed: int = 42):
+    """產生 MAC table / interface status rows 與登記的 MAC 清單。"""
+    rng = random.Random(seed)
+    mac_rows: list[MacRow] = []
+    for s in range(switches):
+        host = f"SW-{s:04d}"
+        for i in range(macs_per_switch):
+            n = s * macs_per_switch + i
+            mac = f"02:{n >> 32 & 0xFF:02X}:{n >> 24 & 0xFF:02X}:" \
+                  f"{n >> 16 & 0xFF:02X}:{n >> 8 & 0xFF:02X}:{n & 0xFF:02X}"
+            mac_rows.append(MacRow(mac, host, f"GE1/0/{i % PORTS + 1}", 100))
+
+    registered_macs = {
+        r.mac_address.upper() for r in rng.sample(mac_rows, registered)
+    }
+    # 三分之一的登記 MAC 也從其他 switch 的 uplink / port-channel 學到
+    neighbor_ports: set[tuple[str, str]] = set()
+    for mac in list(registered_macs)[: registered // 3]:
+        host = f"SW-{rng.randrange(switches):04d}"
+        iface = rng.choice(["GE1/0/48", "Port-channel1"])
+        mac_rows.append(MacRow(mac.lower(), host, iface, 100))
+        neighbor_ports.add((host, iface))
+
+    if_rows = [
+        IfRow(f"SW-{s:04d}", f"GE1/0/{p + 1}", rng.choice(SPEEDS), "full", "up")
+        for s in range(switches)
+        for p in range(PORTS)
+    ]
+    return mac_rows, if_rows, registered_macs, neighbor_ports
+
+
+def legacy_select(candidates, neighbor_ports, mac_count_per_port):
+    """改寫前的 _select_best_candidate（ClientRecord 候選、重複解析 speed）。"""
+    if len(candidates) == 1:
+        return candidates[0]
+    remaining = candidates
+    with_acl = [r for r in remaining if r.acl_rules_applied is not None]
+    if with_acl:
+        remaining = with_acl
+    if len(remaining) == 1:
+        return remaining[0]
+    non_pc = [r for r in remaining if not is_port_channel(r.interface_name)]
+    if non_pc:
+        remaining = non_pc
+    if len(remaining) == 1:
+        return remaining[0]
+    no_nbr = [
+        r for r in remaining
+        if (r.switch_hostname, r.interface_name) not in neighbor_ports
+    ]
+    if no_nbr:
+        remaining = no_nbr
+    if len(remaining) == 1:
+        return remaining[0]
+    with_speed = [
+        (r, _parse_speed_mbps(r.speed))
+        for r in remaining
+        if _parse_speed_mbps(r.speed) is not None
+    ]
+    if with_speed:
+        min_spd = min(s for _, s in with_speed)
+        min_records = [r for r, s in with_speed if s == min_spd]
+        if len(min_records) == 1:
+            return min_records[0]
+        remaining = min_records
+    counted = [
+        (r, mac_count_per_port.get((r.switch_hostname, r.interface_name), 0))
+        for r in remaining
+    ]
+    min_cnt = min(c for _, c in counted)
+    fewest = [r for r, c in counted if c == min_cnt]
+    if len(fewest) == 1:
+        return fewest[0]
+    return ClientRecord(mac_address=remaining[0].mac_address)
+
+
+def run_legacy(mac_records, if_records, registered, neighbor_ports):
+    if_map = {(r.switch_hostname, r.interface_name): r for r in if_records}
+    mac_count_per_port: dict[tuple[str, str], int] = {}
+    for r in mac_records:
+        key = (r.switch_hostname, r.interface_name)
+        mac_count_per_port[key] = mac_count_per_port.get(key, 0) + 1
+    candidates_per_mac: dict[str, list[ClientRecord]] = {}
+    for r in mac_records:
+        mac_upper = r.mac_address.upper()
+        if mac_upper not in registered:
+            continue
+        if_rec = if_map.get((r.switch_hostname, r.interface_name))
+        candidates_per_mac.setdefault(mac_upper, []).append(ClientRecord(
+            mac_address=r.mac_address,
+            switch_hostname=r.switch_hostname,
+            interface_name=r.interface_name,
+            vlan_id=r.vlan_id,
+            speed=if_rec.speed if if_rec else None,
+            duplex=if_rec.duplex if if_rec else None,
+            link_status=if_rec.link_status if if_rec else None,
+            acl_rules_applied=None,
+        ))
+    return {
+        mac: legacy_select(c, neighbor_ports, mac_count_per_port)
+        for mac, c in candidates_per_mac.items()
+    }
+
+
+def join_candidates(mac_rows, if_rows, registered):
+    """模擬 ClientLocationRepo.get_candidates 傳回的 rows。"""
+    if_map = {(r.switch_hostname, r.interface_name): r for r in if_rows}
+    counts: dict[tuple[str, str], int] = {}
+    for r in mac_rows:
+        key = (r.switch_hostname, r.interface_name)
+        counts[key] = counts.get(key, 0) + 1
+    rows = []
+    for r in mac_rows:
+        if r.mac_address.upper() not in registered:
+            continue
+        port = (r.switch_hostname, r.interface_name)
+        if_rec = if_map.get(port)
+        rows.append(CandidateRow(
+            r.mac_address, *port, r.vlan_id,
+            if_rec.speed if if_rec else None,
+            if_rec.duplex if if_rec else None,
+            if_rec.link_status if if_rec else None,
+            None, counts[port],
+        ))
+    return rows
+
+
+def run_joined(candidate_rows, neighbor_ports):
+    return ClientCollectionService._locate_registered_macs(
+        candidate_rows, neighbor_ports,
+    )
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    args = [int(a) for a in sys.argv[1:]]
+    switches, per_switch, registered = (args + [200, 5000, 3000][len(args):])[:3]
+
+    mac_rows, if_rows, macs, neighbors = make_data(switches, per_switch, registered)
+    print(
+        f"{switches} switches x {per_switch} MACs = {len(mac_rows):,} rows, "
+        f"{len(macs):,} registered"
+    )
+
+    (mac_orm, if_orm), build_s = timed(lambda: (
+        [MacTableRecord(**r._asdict()) for r in mac_rows],
+        [InterfaceStatusRecord(**r._asdict()) for r in if_rows],
+    ))
+    legacy, legacy_s = timed(run_legacy, mac_orm, if_orm, macs, neighbors)
+    candidate_rows = join_candidates(mac_rows, if_rows, macs)
+    joined, joined_s = timed(run_joined, candidate_rows, neighbors)
+
+    def key(r):
+        return (r.switch_hostname, r.interface_name, r.speed)
+
+    assert legacy.keys() == joined.keys()
+    assert all(key(legacy[m]) == key(joined[m]) for m in legacy), "mismatch"
+
+    print(f"  ORM rows (approx. hydration): {build_s:8.2f}s")
+    print(f"  legacy resolve:               {legacy_s:8.2f}s")
+    print(f"  joined resolve:               {joined_s:8.2f}s")
+    print(
+        f"  rows to application:          "
+        f"{len(mac_rows) + len(if_rows):,} -> {len(candidate_rows):,}"
+    )
+    print(
+        f"  app-side speedup:             "
+        f"{(build_s + legacy_s) / joined_s:8.1f}x (results identical)"
+    )
+
+
+if __name__ == "__main__":
+    main()
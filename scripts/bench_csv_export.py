@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+CSV 匯出效能基準：一次讀完再寫入 StringIO vs server-side cursor 逐批串流。
+
+在暫存 SQLite 檔建立 N 筆 Client（預設 200k），以與 mac-list export-csv
+相同的欄位格式匯出，確認兩條路徑輸出相同，並比較：
+
+- legacy：session.execute(stmt).all() → csv.writer(StringIO) → 一個 bytes
+- stream：app.services.csv_export.stream_csv（session.stream + yield_per）
+
+記憶體以 tracemalloc 的峰值計（只含 Python 配置）。串流路徑的位元組
+邊產生邊丟棄，模擬送往 client；另列出第一個資料 chunk 的延遲。
+
+Usage:
+    python scripts/bench_csv_export.py
+    python scripts/bench_csv_export.py 50000
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import hashlib
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Ensure project root is on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.enums import ClientDetectionStatus, TenantGroup  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.models import MaintenanceMacList  # noqa: E402
+from app.services import csv_export  # noqa: E402
+
+MID = "BENCH"
+HEADER = [
+    "mac_address", "ip_address", "tenant_group", "description", "default_assignee",
+]
+
+
+def format_row(c: MaintenanceMacList) -> list[str]:
+    return [
+        c.mac_address,
+        c.ip_address,
+        c.tenant_group.value if c.tenant_group else "F18",
+        c.description or "",
+        c.default_assignee or "",
+    ]
+
+
+async def seed(factory, n: int) -> None:
+    async with factory() as s:
+        for start in range(0, n, 5000):
+            await s.execute(insert(MaintenanceMacList), [
+                {
+                    "maintenance_id": MID,
+                    "mac_address": f"02:00:{i >> 24 & 0xFF:02X}:{i >> 16 & 0xFF:02X}:"
+                                   f"{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}",
+                    "ip_address": f"10.{i >> 16 & 0xFF}.{i >> 8 & 0xFF}.{i & 0xFF}",
+                    "tenant_group": TenantGroup.F18,
+                    "detection_status": ClientDetectionStatus.NOT_CHECKED,
+                    "description": f"機台 {i} 東側產線",
+                    "default_assignee": "系統管理員",
+                }
+                for i in range(start, min(start + 5000, n))
+            ])
+        await s.commit()
+
+
+def statement():
+    return (
+        select(MaintenanceMacList)
+        .where(MaintenanceMacList.maintenance_id == MID)
+        .order_by(MaintenanceMacList.mac_address)
+    )
+
+
+async def run_legacy(factory) -> tuple[str, float | None]:
+    async with factory() as s:
+        rows = (await s.execute(statement())).scalars().all()
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(HEADER)
+        for c in rows:
+            writer.writerow(format_row(c))
+        content = ("\ufeff" + output.getvalue()).encode("utf-8")
+    return hashlib.sha256(content).hexdigest(), None
+
+
+async def run_stream(factory) -> tuple[str, float | None]:
+    digest = hashlib.sha256()
+    first_data = None
+    t0 = time.perf_counter()
+    chunks = csv_export.stream_csv(
+        statement(), HEADER,
+        lambda rows, _: (format_row(c) for (c,) in rows),
+    )
+    async for i, chunk in _enumerate(chunks):
+        if i == 1:
+            first_data = time.perf_counter() - t0
+        digest.update(chunk)
+    return digest.hexdigest(), first_data
+
+
+async def _enumerate(aiter):
+    i = 0
+    async for item in aiter:
+        yield i, item
+        i += 1
+
+
+async def measure(fn, factory):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    digest, first = await fn(factory)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return digest, elapsed, peak, first
+
+
+async def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def session_context():
+            async with factory() as session:
+                yield session
+
+        csv_export.get_session_context = session_context
+
+        t0 = time.perf_counter()
+        await seed(factory, n)
+        print(f"seeded {n:,} clients in {time.perf_counter() - t0:.1f}s")
+
+        results = {}
+        for name, fn in (("legacy", run_legacy), ("stream", run_stream)):
+            digest, elapsed, peak, first = await measure(fn, factory)
+            results[name] = digest
+            first_s = f", first data chunk {first * 1000:.0f} ms" if first else ""
+            print(
+                f"{name:>6}: {elapsed:6.2f}s  {n / elapsed:>9,.0f} rows/s  "
+                f"peak {peak / 2**20:7.1f} MiB{first_s}"
+            )
+        await engine.dispose()
+
+    assert results["legacy"] == results["stream"], "outputs differ"
+    print("outputs identical")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+拓樸階層效能基準：逐點 BFS 求離心率 vs 離心率上下界（_graph_center）。
+
+產生園區形狀的拓樸（雙 Core、成對 AGG、EDGE 雙歸屬到同組 AGG，
+少數 EDGE 串接在其他 EDGE 下），以兩種方式計算 compute_hierarchy，
+確認階層完全相同，並比較耗時與 BFS 次數。
+
+Usage:
+    python scripts/bench_topology_layout.py
+    python scripts/bench_topology_layout.py 5000
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure project root is on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import topology_layout  # noqa: E402
+
+
+def campus(n: int, seed: int = 0) -> tuple[set[str], dict[str, set[str]]]:
+    rng = random.Random(seed)
+    n_agg = max(2, n // 20) & ~1
+    names = ["CORE-01", "CORE-02"]
+    names += [f"AGG-{i:03d}" for i in range(n_agg)]
+    names += [f"EDGE-{i:04d}" for i in range(n - len(names))]
+
+    adj: dict[str, set[str]] = defaultdict(set)
+
+    def link(a: int, b: int) -> None:
+        adj[names[a]].add(names[b])
+        adj[names[b]].add(names[a])
+
+    link(0, 1)
+    for a in range(2, 2 + n_agg):
+        link(a, 0)
+        link(a, 1)
+        if a % 2:
+            link(a - 1, a)
+    for e in range(2 + n_agg, n):
+        if rng.random() < 0.1 and e > 2 + n_agg:
+            link(e, rng.randrange(2 + n_agg, e))
+        else:
+            pair = 2 + 2 * rng.randrange(n_agg // 2)
+            link(e, pair)
+            link(e, pair + 1)
+    return set(names), adj
+
+
+def brute_force_center(comp: set[str], adj: dict[str, set[str]]) -> set[str]:
+    eccentricity = {
+        node: max(topology_layout._bfs_distances(node, adj).values())
+        for node in comp
+    }
+    min_ecc = min(eccentricity.values())
+    return {h for h, e in eccentricity.items() if e == min_ecc}
+
+
+def run(hostnames, adj) -> tuple[dict[str, int], float, int]:
+    sweeps = 0
+    real = topology_layout._bfs_distances
+
+    def counting(source, adj):
+        nonlocal sweeps
+        sweeps += 1
+        return real(source, adj)
+
+    with patch.object(topology_layout, "_bfs_distances", counting):
+        t0 = time.perf_counter()
+        levels = topology_layout.compute_hierarchy(hostnames, adj)
+        elapsed = time.perf_counter() - t0
+    return levels, elapsed, sweeps
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    hostnames, adj = campus(n)
+    edges = sum(len(nbs) for nbs in adj.values()) // 2
+    print(f"campus: {n:,} switches, {edges:,} links")
+
+    with patch.object(topology_layout, "_graph_center", brute_force_center):
+        expected, elapsed, sweeps = run(hostnames, adj)
+    print(f"per-node BFS: {elapsed * 1000:8.1f} ms  {sweeps:5d} BFS")
+
+    levels, elapsed, sweeps = run(hostnames, adj)
+    print(f"bounds:       {elapsed * 1000:8.1f} ms  {sweeps:5d} BFS")
+
+    assert levels == expected, "levels differ"
+    print("levels identical")
+
+
+if __name__ == "__main__":
+    main()
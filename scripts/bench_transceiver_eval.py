@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Transceiver 評估效能基準：逐筆 _check_single_record vs 欄位式 _TransceiverColumns。
+
+以隨機光模塊 rows（約 10% 異常、2% -36.95 未對接）比較兩條路徑，
+並確認兩者判定結果一致。兩條路徑使用各自在正式環境拿到的輸入：
+逐筆版吃 TransceiverRecord ORM 物件（get_latest_per_device），
+欄位式吃 column-only 查詢的 row tuple（get_latest_columns_per_device）。
+ORM hydration 本身不計入，因此實際差距只會更大。
+
+Usage:
+    python scripts/bench_transceiver_eval.py
+    python scripts/bench_transceiver_eval.py 10000 50000 100000
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# Ensure project root is on sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.models import TransceiverRecord  # noqa: E402
+from app.indicators.transceiver import (  # noqa: E402
+    _EVAL_COLUMNS,
+    _UNCONNECTED_DBM,
+    TransceiverIndicator,
+    _Thresholds,
+    _TransceiverColumns,
+)
+
+SIZES = [10_000, 50_000, 100_000]
+REPEAT = 3
+
+THRESHOLDS = _Thresholds(
+    tx_power_min=-12.0, tx_power_max=3.0,
+    rx_power_min=-18.0, rx_power_max=3.0,
+    temperature_min=0.0, temperature_max=70.0,
+    voltage_min=2.9, voltage_max=3.7,
+)
+
+
+Row = namedtuple("Row", _EVAL_COLUMNS)
+
+
+def make_rows(n: int, seed: int = 42) -> list[Row]:
+    """產生 n 筆模擬 row（屬性與 column-only 查詢結果相同）。"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        roll = rng.random()
+        tx, rx = rng.uniform(-6, 0), rng.uniform(-10, -2)
+        temp, volt = rng.uniform(25, 55), rng.uniform(3.2, 3.4)
+        if roll < 0.02:
+            tx = rx = _UNCONNECTED_DBM
+        elif roll < 0.07:
+            rx = rng.uniform(-30, -19)
+        elif roll < 0.10:
+            temp = None if roll < 0.08 else rng.uniform(71, 90)
+        rows.append(Row(
+            switch_hostname=f"SW-{i // 48:05d}",
+            interface_name=f"Te1/0/{i % 48 + 1}",
+            tx_power=tx, rx_power=rx, temperature=temp, voltage=volt,
+        ))
+    return rows
+
+
+def to_records(rows: list[Row]) -> list[TransceiverRecord]:
+    """Same data as ORM instances (what get_latest_per_device returns)."""
+    return [TransceiverRecord(**r._asdict()) for r in rows]
+
+
+def run_scalar(ind: TransceiverIndicator, rows: list) -> list[dict]:
+    failures = []
+    for r in rows:
+        f = ind._check_single_record(r, THRESHOLDS)
+        if f is not None:
+            failures.append(f)
+    for field in ("tx_power", "rx_power", "temperature", "voltage"):
+        ind._field_pass_rate(rows, field, -1e9, 1e9)
+    return failures
+
+
+def run_columnar(ind: TransceiverIndicator, rows: list) -> list[dict]:
+    columns = _TransceiverColumns(rows)
+    failing = columns.failing_rows(THRESHOLDS)
+    unconnected = columns.unconnected_only(THRESHOLDS, failing)
+    failures = [
+        ind._build_failure(rows[i], THRESHOLDS, flag)
+        for i, flag in zip(failing, unconnected, strict=True)
+    ]
+    for field in ("tx_power", "rx_power", "temperature", "voltage"):
+        columns.pass_count(field, -1e9, 1e9)
+    return failures
+
+
+def best_of(fn, *args) -> tuple[float, list]:
+    best = float("inf")
+    out: list = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    ind = TransceiverIndicator()
+    print(f"{'lanes':>8}  {'scalar (ms)':>12}  {'columnar (ms)':>14}  "
+          f"{'speedup':>8}  {'failures':>8}")
+    for n in sizes:
+        rows = make_rows(n)
+        t_scalar, f_scalar = best_of(run_scalar, ind, to_records(rows))
+        t_col, f_col = best_of(run_columnar, ind, rows)
+        assert f_scalar == f_col, "columnar result differs from scalar path"
+        print(f"{n:>8}  {t_scalar * 1000:>12.1f}  {t_col * 1000:>14.1f}  "
+              f"{t_scalar / t_col:>7.1f}x  {len(f_col):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Shared fixtures for integration tests — real SQLite DB.
+
+每個測試使用一個以測試模組命名的 in-memory SQLite（shared cache），
+開始時 create_all、結束時 drop_all。
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+@pytest.fixture
+async def engine(request: pytest.FixtureRequest) -> AsyncIterator[AsyncEngine]:
+    """建好所有資料表的 engine；資料庫名稱取自測試模組，模組間互不共用。"""
+    name = request.module.__name__.rsplit(".", 1)[-1]
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///file:{name}?mode=memory&cache=shared&uri=true",
+        echo=False,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> SessionFactory:
+    """expire_on_commit=False 的 session factory（與 app.db.base 相同設定）。"""
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def session(session_factory: SessionFactory) -> AsyncIterator[AsyncSession]:
+    async with session_factory() as s:
+        yield s
+
+
+@pytest.fixture
+def session_context(
+    session_factory: SessionFactory,
+) -> Callable[[], AbstractAsyncContextManager[AsyncSession]]:
+    """取代 get_session_context：正常結束 commit、例外時 rollback。"""
+
+    @asynccontextmanager
+    async def session_context() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    return session_context
@@ -0,0 +1,341 @@
+"""
+Integration tests for set-based case updates — real SQLite DB.
+
+update_ping_status 以每種 ping 結果一個 UPDATE 完成狀態轉換；
+update_change_flags 只把新記錄 fold 進 case_change_states，重算有新記錄 /
+新 Case / 穩定期到期的 Case；重啟、刪除與亂序寫入後結果仍必須與
+從完整歷史重算（_detect_change）一致。
+"""
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import CaseStatus, ClientDetectionStatus, TenantGroup
+from app.db.models import Case, ClientRecord, MaintenanceMacList
+from app.services import case_service
+from app.services.case_service import (
+    _PING_RANK,
+    TRACKED_ATTRIBUTES,
+    CaseService,
+    _change_rank,
+    _detect_change,
+    _get_transition_ts,
+)
+
+MID = "MAINT-CASES"
+
+
+@pytest.fixture(autouse=True)
+def _reset_watermarks():
+    yield
+    case_service._flag_watermarks.pop(MID, None)
+
+
+def _clock(offset: timedelta):
+    """讓 case_service 看到的 now 往後 offset。"""
+    class _Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + offset
+
+    return patch.object(case_service, "datetime", _Later)
+
+
+class CaseKey(NamedTuple):
+    id: int
+    client_id: int
+    mac_address: str
+
+
+async def _cases(session: AsyncSession, n: int, **case_fields) -> list[CaseKey]:
+    clients = [
+        MaintenanceMacList(
+            maintenance_id=MID, mac_address=f"AA:00:00:00:05:{i:02X}",
+            ip_address=f"10.0.5.{i}", tenant_group=TenantGroup.F12,
+            detection_status=ClientDetectionStatus.NOT_CHECKED,
+        )
+        for i in range(n)
+    ]
+    session.add_all(clients)
+    await session.flush()
+    if "last_ping_reachable" in case_fields:
+        case_fields["ping_rank"] = _PING_RANK[case_fields["last_ping_reachable"]]
+    cases = [
+        Case(
+            maintenance_id=MID, client_id=c.id, mac_address=c.mac_address,
+            status=CaseStatus.ASSIGNED, change_flags={}, **case_fields,
+        )
+        for c in clients
+    ]
+    session.add_all(cases)
+    await session.commit()
+    return [CaseKey(c.id, c.client_id, c.mac_address) for c in cases]
+
+
+def _record(case: CaseKey, at: datetime, **fields) -> ClientRecord:
+    return ClientRecord(
+        maintenance_id=MID, client_id=case.client_id,
+        mac_address=case.mac_address, collected_at=at, **fields,
+    )
+
+
+async def _ping_state(session: AsyncSession, case: CaseKey) -> tuple:
+    row = (await session.execute(
+        select(Case.last_ping_reachable, Case.ping_reachable_since)
+        .where(Case.id == case.id)
+    )).one()
+    return tuple(row)
+
+
+class TestUpdatePingStatus:
+
+    NOW = datetime.now(timezone.utc).replace(tzinfo=None)
+    SINCE = datetime(2026, 1, 15, 8, 0)
+
+    @pytest.mark.parametrize(("old", "old_since", "ping", "expected"), [
+        (False, None, True, (True, "now")),
+        (None, None, True, (True, "now")),
+        (True, None, True, (True, "now")),
+        (True, SINCE, True, (True, SINCE)),
+        (True, SINCE, False, (False, None)),
+        (True, SINCE, None, (None, None)),
+        (False, None, False, (False, None)),
+    ])
+    async def test_transitions(self, session, old, old_since, ping, expected):
+        [case] = await _cases(
+            session, 1, last_ping_reachable=old, ping_reachable_since=old_since,
+        )
+        session.add(_record(case, self.NOW, ping_reachable=ping))
+        await session.commit()
+
+        before = datetime.now(timezone.utc).replace(tzinfo=None)
+        await CaseService().update_ping_status(MID, session)
+        session.expire_all()
+        reachable, since = await _ping_state(session, case)
+
+        assert reachable is expected[0]
+        ping_rank = (await session.execute(
+            select(Case.ping_rank).where(Case.id == case.id)
+        )).scalar_one()
+        assert ping_rank == _PING_RANK[expected[0]]
+        if expected[1] == "now":
+            assert since >= before - timedelta(seconds=1)
+        else:
+            assert since == expected[1]
+
+    async def test_uses_latest_record_per_client(self, session):
+        [case] = await _cases(session, 1, last_ping_reachable=True)
+        session.add_all([
+            _record(case, self.NOW, ping_reachable=False),
+            _record(case, self.NOW - timedelta(minutes=5), ping_reachable=True),
+        ])
+        await session.commit()
+
+        await CaseService().update_ping_status(MID, session)
+        session.expire_all()
+
+        assert await _ping_state(session, case) == (False, None)
+
+    async def test_cases_without_records_are_untouched(self, session):
+        [case] = await _cases(
+            session, 1, last_ping_reachable=True, ping_reachable_since=self.SINCE,
+        )
+
+        await CaseService().update_ping_status(MID, session)
+        session.expire_all()
+
+        assert await _ping_state(session, case) == (True, self.SINCE)
+
+
+async def _reference_flags(session: AsyncSession) -> dict[int, dict[str, bool]]:
+    """改寫前的算法：每個 Case 從完整歷史重算。"""
+    records = (await session.execute(
+        select(ClientRecord)
+        .where(ClientRecord.maintenance_id == MID, ClientRecord.client_id.isnot(None))
+        .order_by(ClientRecord.client_id, ClientRecord.collected_at)
+    )).scalars().all()
+    by_client: dict[int, list] = defaultdict(list)
+    for r in records:
+        by_client[r.client_id].append(r)
+
+    cases = (await session.execute(
+        select(Case.id, Case.client_id).where(Case.maintenance_id == MID)
+    )).fetchall()
+    return {
+        case_id: {
+            attr: _detect_change(
+                [getattr(r, attr) for r in by_client[client_id]],
+                last_collected_at=_get_transition_ts(by_client[client_id], attr),
+            )
+            for attr in TRACKED_ATTRIBUTES
+        }
+        for case_id, client_id in cases
+    }
+
+
+async def _stored_flags(session: AsyncSession) -> dict[int, dict[str, bool]]:
+    session.expire_all()
+    rows = await session.execute(
+        select(Case.id, Case.change_flags).where(Case.maintenance_id == MID)
+    )
+    return dict(rows.fetchall())
+
+
+def _random_fields(rng: random.Random) -> dict:
+    return {
+        "ping_reachable": rng.choice([True, False, None]),
+        "vlan_id": rng.choice([10, 10, 20, None]),
+        "speed": rng.choice(["1G", "1G", "100M", None]),
+        "interface_name": rng.choice(["GE1/0/1", "GE1/0/1", None]),
+        "link_status": rng.choice(["up", None]),
+        "duplex": "full",
+    }
+
+
+class TestUpdateChangeFlags:
+
+    @pytest.mark.parametrize("seed", range(4))
+    async def test_matches_full_history_recompute(self, session, seed):
+        rng = random.Random(seed)
+        cases = await _cases(session, 10)
+        service = CaseService()
+        start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=2)
+
+        for step in range(8):
+            at = start + timedelta(minutes=15 * step)
+            session.add_all(
+                _record(case, at, **_random_fields(rng))
+                for case in rng.sample(cases, rng.randint(0, 4))
+            )
+            if step == 5:
+                await _cases(session, 2)
+            if rng.random() < 0.3:
+                # 亂序寫入：時間早於已 fold 的記錄
+                late = rng.choice(cases)
+                session.add(_record(late, at - timedelta(minutes=40), **_random_fields(rng)))
+            if rng.random() < 0.2:
+                await session.execute(
+                    delete(ClientRecord).where(
+                        ClientRecord.client_id == rng.choice(cases).client_id,
+                        ClientRecord.collected_at < at - timedelta(minutes=30),
+                    )
+                )
+            if rng.random() < 0.3:
+                case_service._flag_watermarks.pop(MID, None)  # 模擬重啟
+            await session.commit()
+            await service.update_change_flags(MID, session)
+
+            assert await _stored_flags(session) == await _reference_flags(session)
+            ranks = await session.execute(
+                select(Case.change_rank, Case.change_flags)
+                .where(Case.maintenance_id == MID)
+            )
+            for rank, flags in ranks:
+                assert rank == _change_rank(flags)
+
+    async def test_unchanged_round_reads_no_history(self, session):
+        [case] = await _cases(session, 1)
+        session.add(_record(case, datetime(2026, 1, 1), speed="1G"))
+        await session.commit()
+        service = CaseService()
+        await service.update_change_flags(MID, session)
+
+        with patch.object(
+            CaseService, "_load_client_histories",
+            side_effect=AssertionError("history reloaded"),
+        ):
+            assert await service.update_change_flags(MID, session) == 0
+
+    async def test_new_records_are_folded_without_history(self, session):
+        cases = await _cases(session, 3)
+        start = datetime(2026, 1, 1)
+        session.add_all(_record(c, start, vlan_id=10) for c in cases)
+        await session.commit()
+        service = CaseService()
+        await service.update_change_flags(MID, session)
+
+        session.add(_record(cases[0], start + timedelta(minutes=5), vlan_id=20))
+        await session.commit()
+        with patch.object(
+            CaseService, "_load_client_histories",
+            side_effect=AssertionError("history reloaded"),
+        ):
+            assert await service.update_change_flags(MID, session) == 1
+
+            # 重啟後以保存的狀態繼續，不讀完整歷史
+            case_service._flag_watermarks.pop(MID, None)
+            session.add(_record(cases[1], start + timedelta(minutes=10), vlan_id=30))
+            await session.commit()
+            assert await service.update_change_flags(MID, session) == 1
+
+        assert await _stored_flags(session) == await _reference_flags(session)
+
+    async def test_only_affected_cases_are_rebuilt(self, session):
+        cases = await _cases(session, 3)
+        start = datetime(2026, 1, 1)
+        session.add_all(_record(c, start, speed="1G") for c in cases)
+        await session.commit()
+        service = CaseService()
+        await service.update_change_flags(MID, session)
+
+        # 亂序寫入的 client 需重建；其他 client 的新記錄直接 fold
+        session.add_all([
+            _record(cases[0], start - timedelta(minutes=5), speed="100M"),
+            _record(cases[1], start + timedelta(minutes=5), speed="100M"),
+        ])
+        await session.commit()
+        with patch.object(
+            CaseService, "_load_client_histories",
+            wraps=CaseService._load_client_histories,
+        ) as load:
+            assert await service.update_change_flags(MID, session) == 2
+
+        assert load.call_args.args[1] == {cases[0].client_id}
+        assert await _stored_flags(session) == await _reference_flags(session)
+
+    async def test_flag_clears_after_stabilization(self, session):
+        [case] = await _cases(session, 1)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        session.add_all([
+            _record(case, now - timedelta(hours=1), speed=None),
+            _record(case, now - timedelta(minutes=10), speed="1G"),
+        ])
+        await session.commit()
+        service = CaseService()
+        await service.update_change_flags(MID, session)
+        assert (await _stored_flags(session))[case.id]["speed"] is True
+
+        with _clock(timedelta(minutes=4)):
+            await service.update_change_flags(MID, session)
+        assert (await _stored_flags(session))[case.id]["speed"] is True
+
+        with _clock(timedelta(minutes=6)):
+            assert await service.update_change_flags(MID, session) == 1
+        assert (await _stored_flags(session))[case.id]["speed"] is False
+
+    async def test_deleted_history_is_rebuilt(self, session):
+        [case] = await _cases(session, 1)
+        session.add_all([
+            _record(case, datetime(2026, 1, 1), vlan_id=10),
+            _record(case, datetime(2026, 1, 2), vlan_id=20),
+        ])
+        await session.commit()
+        service = CaseService()
+        await service.update_change_flags(MID, session)
+        assert (await _stored_flags(session))[case.id]["vlan_id"] is True
+
+        await session.execute(
+            delete(ClientRecord).where(ClientRecord.collected_at < datetime(2026, 1, 2))
+        )
+        await session.commit()
+        await service.update_change_flags(MID, session)
+
+        assert (await _stored_flags(session))[case.id]["vlan_id"] is False
@@ -0,0 +1,368 @@
+"""
+Integration tests for checkpoint summaries — real SQLite DB.
+
+ClientComparisonService.summarize_checkpoints 單次掃描變化點計數，
+結果須與逐一 _generate_checkpoint_diff 再計數（/diff 的異常判斷）完全一致。
+"""
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientRecord, MaintenanceMacList
+from app.parsers.protocols import PingResultData
+from app.repositories.client_records import ClientRecordRepo
+from app.repositories.typed_records import get_typed_repo
+from app.services import client_collection_service, client_comparison_service
+from app.services.client_collection_service import ClientCollectionService
+from app.services.client_comparison_service import ClientComparisonService
+
+MID = "MAINT-SUMMARY"
+# 端點傳入的時間來自 DB（naive UTC）
+T0 = datetime(2026, 3, 1, 8, 0)
+MACS = ["AA:00:00:00:00:0A", "AA:00:00:00:00:0B", "AA:00:00:00:00:0C"]
+NEVER_SEEN = "AA:00:00:00:00:0D"
+
+
+@pytest.fixture(autouse=True)
+def _reset_change_logs():
+    yield
+    # 變化點快取是模組層級，避免跨測試沿用
+    client_comparison_service._change_logs.pop(MID, None)
+
+
+async def _clients(
+    session: AsyncSession, macs: list[str],
+) -> list[MaintenanceMacList]:
+    clients = [
+        MaintenanceMacList(
+            maintenance_id=MID, mac_address=mac, ip_address=f"10.0.0.{i}",
+            tenant_group=TenantGroup.F12,
+            detection_status=ClientDetectionStatus.NOT_CHECKED,
+        )
+        for i, mac in enumerate(macs, start=1)
+    ]
+    session.add_all(clients)
+    await session.flush()
+    return clients
+
+
+async def _collect(
+    session: AsyncSession,
+    clients: list[MaintenanceMacList],
+    at: datetime,
+    ports: dict[str, str | None],
+) -> None:
+    """以 MAC → interface（None = 未偵測）模擬一輪採集。"""
+    records = [
+        ClientRecord(
+            maintenance_id=MID, collected_at=at, client_id=c.id,
+            mac_address=c.mac_address, ip_address=c.ip_address,
+            switch_hostname="SW-01" if ports[c.mac_address] else None,
+            interface_name=ports[c.mac_address],
+        )
+        for c in clients
+        if c.mac_address in ports
+    ]
+    await ClientCollectionService()._save_changed_records(
+        session, MID, records, at.replace(tzinfo=UTC),
+    )
+
+
+async def _per_checkpoint_counts(
+    session: AsyncSession,
+    checkpoints: list[datetime],
+    current: datetime,
+    mac_to_categories: dict[str, list[int]],
+) -> dict[datetime, dict]:
+    """舊做法：每個 checkpoint 各自建立完整比較結果再計數。"""
+    service = ClientComparisonService()
+    expected = {}
+    for cp in checkpoints:
+        comparisons = await service._generate_checkpoint_diff(
+            MID, cp, current, session,
+        )
+        issue_count = change_count = 0
+        by_category: dict[int, int] = {}
+        for comp in comparisons:
+            if comp.is_changed:
+                change_count += 1
+            if comp.is_changed or comp.severity == "undetected":
+                issue_count += 1
+                for cat_id in mac_to_categories.get(comp.mac_address, []):
+                    by_category[cat_id] = by_category.get(cat_id, 0) + 1
+        expected[cp] = {
+            "issue_count": issue_count,
+            "change_count": change_count,
+            "mac_count": len(comparisons),
+            "by_category": {k: v for k, v in by_category.items() if v},
+        }
+    return expected
+
+
+def _drop_zero(counts: dict[datetime, dict]) -> dict[datetime, dict]:
+    for summary in counts.values():
+        summary["by_category"] = {
+            k: v for k, v in summary["by_category"].items() if v
+        }
+    return counts
+
+
+class TestCheckpointSummaries:
+
+    async def test_golden_counts(self, session):
+        clients = await _clients(session, MACS + [NEVER_SEEN])
+        a, b, c = MACS
+        t = [T0 + timedelta(minutes=15 * i) for i in range(4)]
+        await _collect(session, clients, t[0], {a: "Gi1/0/1", b: "Gi1/0/1", c: None})
+        await _collect(session, clients, t[1], {a: "Gi1/0/2", b: "Gi1/0/1", c: None})
+        await _collect(session, clients, t[2], {a: "Gi1/0/2", b: None, c: "Gi1/0/1"})
+        await _collect(session, clients, t[3], {a: "Gi1/0/2", b: None, c: "Gi1/0/1"})
+
+        counts = await ClientComparisonService().summarize_checkpoints(
+            MID, t[:3], t[3], session,
+            mac_to_categories={a: [1], NEVER_SEEN: [1], b: [2]},
+        )
+
+        # A：t0 的 port 不同才算變化；B：current 未偵測，每個 checkpoint 都算變化；
+        # C：未偵測的記錄仍有 IP（OLD 側有資料），一邊為 None 的欄位不算差異；
+        # NEVER_SEEN 兩側皆無資料 → 每個 checkpoint 都是 undetected 異常
+        assert _drop_zero(counts) == {
+            t[0]: {"issue_count": 3, "change_count": 2, "mac_count": 4,
+                   "by_category": {1: 2, 2: 1}},
+            t[1]: {"issue_count": 2, "change_count": 1, "mac_count": 4,
+                   "by_category": {1: 1, 2: 1}},
+            t[2]: {"issue_count": 2, "change_count": 1, "mac_count": 4,
+                   "by_category": {1: 1, 2: 1}},
+        }
+
+    @pytest.mark.parametrize("with_mac_list", [True, False])
+    async def test_matches_per_checkpoint_diffs(self, session, with_mac_list):
+        macs = [f"AA:00:00:00:01:{i:02X}" for i in range(12)]
+        clients = await _clients(session, macs)
+        rng = random.Random(32)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(10)]
+        for at in times:
+            # 部分 MAC 只在後段才出現
+            ports = {
+                mac: rng.choice(["Gi1/0/1", "Gi1/0/2", None])
+                for mac in macs
+                if at >= times[macs.index(mac) % 5]
+            }
+            await _collect(session, clients, at, ports)
+        if not with_mac_list:
+            await session.execute(delete(MaintenanceMacList))
+
+        mac_to_categories = {
+            mac: [cat for cat in (1, 2, 3) if i % cat == 0]
+            for i, mac in enumerate(macs)
+        }
+        checkpoints = [T0 - timedelta(minutes=5)] + [
+            t + timedelta(minutes=m) for t in times[:-1] for m in (0, 7)
+        ]
+        current = times[-1]
+
+        counts = await ClientComparisonService().summarize_checkpoints(
+            MID, checkpoints, current, session, mac_to_categories,
+        )
+        expected = await _per_checkpoint_counts(
+            session, checkpoints, current, mac_to_categories,
+        )
+
+        assert _drop_zero(counts) == expected
+
+
+class TestChangeLogCache:
+
+    async def test_new_data_only_extends_cached_log(self, session):
+        macs = [f"AA:00:00:00:02:{i:02X}" for i in range(6)]
+        clients = await _clients(session, macs)
+        rng = random.Random(33)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(8)]
+
+        async def collect(at: datetime) -> None:
+            await _collect(session, clients, at, {
+                mac: rng.choice(["Gi1/0/1", "Gi1/0/2", None]) for mac in macs
+            })
+
+        for at in times[:5]:
+            await collect(at)
+        service = ClientComparisonService()
+        await service.summarize_checkpoints(MID, times[:4], times[4], session)
+
+        for at in times[5:]:
+            await collect(at)
+        with patch.object(
+            ClientRecordRepo, "get_change_log",
+            autospec=True, side_effect=ClientRecordRepo.get_change_log,
+        ) as change_log:
+            counts = await service.summarize_checkpoints(
+                MID, times[:7], times[7], session,
+            )
+
+        # 只查詢快取尾端之後新寫入的變化點
+        change_log.assert_awaited_once()
+        assert change_log.await_args.kwargs["collected_after"] == times[3]
+        assert _drop_zero(counts) == await _per_checkpoint_counts(
+            session, times[:7], times[7], {},
+        )
+
+    async def test_deleted_records_rebuild_cache(self, session):
+        clients = await _clients(session, MACS)
+        a, b, c = MACS
+        t = [T0 + timedelta(minutes=15 * i) for i in range(3)]
+        await _collect(session, clients, t[0], {a: "Gi1/0/1", b: "Gi1/0/1", c: None})
+        await _collect(session, clients, t[1], {a: "Gi1/0/2", b: None, c: "Gi1/0/1"})
+        await _collect(session, clients, t[2], {a: "Gi1/0/3", b: None, c: "Gi1/0/1"})
+        service = ClientComparisonService()
+        await service.summarize_checkpoints(MID, t[:2], t[2], session)
+
+        # 從清單移除 B 再重新加入：舊記錄被刪除，快取不可沿用
+        await session.execute(
+            delete(ClientRecord).where(ClientRecord.mac_address == b)
+        )
+        counts = await service.summarize_checkpoints(MID, t[:2], t[2], session)
+
+        assert _drop_zero(counts) == await _per_checkpoint_counts(
+            session, t[:2], t[2], {},
+        )
+
+    async def test_uncached_checkpoints_split_cached_segments(self, session):
+        macs = [f"AA:00:00:00:03:{i:02X}" for i in range(6)]
+        clients = await _clients(session, macs)
+        rng = random.Random(34)
+        times = [T0 + timedelta(minutes=5 * i) for i in range(12)]
+        for at in times:
+            await _collect(session, clients, at, {
+                mac: rng.choice(["Gi1/0/1", "Gi1/0/2", None]) for mac in macs
+            })
+        service = ClientComparisonService()
+        await service.summarize_checkpoints(MID, times[3:11:3], times[11], session)
+
+        # 截止時間滑動：新的第一個 checkpoint 落在快取區段之前 / 之間
+        checkpoints = [times[1], times[4], times[6], times[9]]
+        with patch.object(
+            ClientRecordRepo, "get_change_log",
+            autospec=True, side_effect=ClientRecordRepo.get_change_log,
+        ) as change_log:
+            counts = await service.summarize_checkpoints(
+                MID, checkpoints, times[11], session,
+            )
+
+        # 只重新查詢被切開的區段，不重建整個快取
+        assert [
+            (call.args[2], call.args[3]) for call in change_log.await_args_list
+        ] == [(times[3], times[6]), (times[1], times[3])]
+        assert _drop_zero(counts) == await _per_checkpoint_counts(
+            session, checkpoints, times[11], {},
+        )
+
+    async def test_cache_is_bounded(self, session):
+        clients = await _clients(session, MACS)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(2)]
+        for at in times:
+            await _collect(session, clients, at, dict.fromkeys(MACS, "Gi1/0/1"))
+        client_comparison_service._change_logs["MAINT-OTHER"] = (
+            client_comparison_service._ChangeLog(
+                end=T0, fingerprint=(0, None), deltas=[(T0, {})],
+            )
+        )
+
+        with patch.object(client_comparison_service, "CHANGE_LOG_CACHE_SIZE", 1):
+            await ClientComparisonService().summarize_checkpoints(
+                MID, times[:1], times[1], session,
+            )
+
+        assert list(client_comparison_service._change_logs) == [MID]
+
+    async def test_cleanup_deletion_rebuilds_cache(self, session):
+        clients = await _clients(session, MACS)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(2)]
+        for at in times:
+            await _collect(session, clients, at, dict.fromkeys(MACS, "Gi1/0/1"))
+        service = ClientComparisonService()
+        await service.summarize_checkpoints(MID, times[:1], times[1], session)
+
+        # 超過保留期限的記錄被刪除：指紋改變，整個重建
+        await ClientCollectionService()._cleanup_old_records(session, MID)
+        with patch.object(
+            ClientRecordRepo, "get_change_log",
+            autospec=True, side_effect=ClientRecordRepo.get_change_log,
+        ) as change_log:
+            counts = await service.summarize_checkpoints(
+                MID, times[:1], times[1], session,
+            )
+
+        change_log.assert_awaited_once()
+        assert "collected_after" not in change_log.await_args.kwargs
+        assert _drop_zero(counts) == await _per_checkpoint_counts(
+            session, times[:1], times[1], {},
+        )
+
+    async def test_collection_round_only_extends_cache(
+        self, session_factory, session_context,
+    ):
+        """採集一輪（含清理舊記錄）後，下次只查詢新寫入的變化點。"""
+        async with session_factory() as s:
+            await _clients(s, MACS)
+            await s.commit()
+
+        async def collect_round(reachable: bool) -> None:
+            async with session_factory() as s:
+                await get_typed_repo("gnms_ping", s).save_batch(
+                    "__CLIENT_PING_F12__", "", [
+                        PingResultData(
+                            target=f"10.0.0.{i}", is_reachable=reachable,
+                        )
+                        for i in range(1, len(MACS) + 1)
+                    ], MID,
+                )
+                await s.commit()
+            await ClientCollectionService().collect_client_data(MID)
+
+        async def collected_times() -> list[datetime]:
+            async with session_factory() as s:
+                return list((await s.execute(
+                    select(ClientRecord.collected_at)
+                    .where(ClientRecord.maintenance_id == MID)
+                    .distinct().order_by(ClientRecord.collected_at)
+                )).scalars())
+
+        service = ClientComparisonService()
+        with patch(
+            "app.services.client_collection_service.get_session_context",
+            session_context,
+        ):
+            try:
+                await collect_round(True)
+                await collect_round(False)
+                t1, t2 = await collected_times()
+                async with session_factory() as s:
+                    await service.summarize_checkpoints(MID, [t1], t2, s)
+
+                await collect_round(True)
+                _, _, t3 = await collected_times()
+                with patch.object(
+                    ClientRecordRepo, "get_change_log",
+                    autospec=True, side_effect=ClientRecordRepo.get_change_log,
+                ) as change_log:
+                    async with session_factory() as s:
+                        counts = await service.summarize_checkpoints(
+                            MID, [t1, t2], t3, s,
+                        )
+                        expected = await _per_checkpoint_counts(
+                            s, [t1, t2], t3, {},
+                        )
+            finally:
+                client_collection_service._pending_changes.clear()
+                client_collection_service._assembly_states.clear()
+
+        change_log.assert_awaited_once()
+        assert change_log.await_args.kwargs["collected_after"] == t1
+        assert _drop_zero(counts) == expected
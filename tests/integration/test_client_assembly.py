@@ -0,0 +1,298 @@
+"""
+Integration tests for event-driven client assembly — real SQLite DB.
+
+save_batch 只在 hash 改變且 commit 後發佈 BatchChange；collect_client_data
+依事件只重算受影響的 client，結果必須與完整組裝一致，沒有變化的一輪不查候選。
+"""
+from __future__ import annotations
+
+import random
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientRecord, MaintenanceMacList
+from app.parsers.protocols import (
+    InterfaceStatusData,
+    MacTableData,
+    PingResultData,
+)
+from app.repositories import batch_events
+from app.repositories.batch_events import BatchChange
+from app.repositories.client_checkpoints import ClientCheckpointRepo
+from app.repositories.client_locations import ClientLocationRepo
+from app.repositories.client_records import ClientRecordRepo
+from app.repositories.typed_records import get_typed_repo
+from app.services import client_collection_service
+from app.services.client_collection_service import ClientCollectionService
+from app.services.client_state_store import ClientState, ClientStateStore
+
+MID = "MAINT-ASSEMBLY"
+SWITCHES = ["SW-01", "SW-02", "SW-03", "SW-04"]
+MACS = [f"AA:00:00:00:04:{i:02X}" for i in range(12)]
+PING_HOST = "__CLIENT_PING_F12__"
+
+
+@pytest.fixture
+def factory(session_factory, session_context):
+    with patch(
+        "app.services.client_collection_service.get_session_context",
+        session_context,
+    ):
+        yield session_factory
+
+    client_collection_service._pending_changes.clear()
+    client_collection_service._assembly_states.clear()
+
+
+@pytest.fixture
+def events():
+    received: list[BatchChange] = []
+    unsubscribe = batch_events.subscribe(received.append)
+    yield received
+    unsubscribe()
+
+
+async def _add_clients(factory) -> None:
+    async with factory() as s:
+        s.add_all(
+            MaintenanceMacList(
+                maintenance_id=MID, mac_address=mac, ip_address=f"10.0.4.{i}",
+                tenant_group=TenantGroup.F12,
+                detection_status=ClientDetectionStatus.NOT_CHECKED,
+            )
+            for i, mac in enumerate(MACS, start=1)
+        )
+        await s.commit()
+
+
+async def _save(factory, collection_type: str, host: str, items: list) -> None:
+    async with factory() as s:
+        await get_typed_repo(collection_type, s).save_batch(host, "", items, MID)
+        await s.commit()
+
+
+def _mac_table(rng: random.Random, host: str) -> list[MacTableData]:
+    """隨機一部分 MAC 出現在 host 的 access port 或 uplink。"""
+    return [
+        MacTableData(
+            mac_address=mac,
+            interface_name=rng.choice(["GE1/0/1", "GE1/0/2", "GE1/0/48"]),
+            vlan_id=10,
+        )
+        for mac in rng.sample(MACS, rng.randint(2, 6))
+    ]
+
+
+def _interfaces(rng: random.Random) -> list[InterfaceStatusData]:
+    return [
+        InterfaceStatusData(
+            interface_name=iface, link_status="up",
+            speed=rng.choice(["100M", "1G"]), duplex="full",
+        )
+        for iface in ("GE1/0/1", "GE1/0/2", "GE1/0/48")
+    ]
+
+
+def _ping(rng: random.Random) -> list[PingResultData]:
+    return [
+        PingResultData(target=f"10.0.4.{i}", is_reachable=rng.random() < 0.7)
+        for i in range(1, len(MACS) + 1)
+    ]
+
+
+async def _record_count(factory) -> int:
+    async with factory() as s:
+        return (await s.execute(
+            select(func.count()).select_from(ClientRecord)
+        )).scalar()
+
+
+async def _seed(factory, rng: random.Random) -> None:
+    await _add_clients(factory)
+    for host in SWITCHES:
+        await _save(factory, "get_mac_table", host, _mac_table(rng, host))
+        await _save(factory, "get_interface_status", host, _interfaces(rng))
+    await _save(factory, "gnms_ping", PING_HOST, _ping(rng))
+
+
+class TestBatchEvents:
+
+    async def test_published_after_commit_only_on_hash_change(self, factory, events):
+        items = [MacTableData(mac_address=MACS[0], interface_name="GE1/0/1")]
+        async with factory() as s:
+            repo = get_typed_repo("get_mac_table", s)
+            await repo.save_batch("SW-01", "", items, MID)
+            assert events == []
+            await s.commit()
+
+            await repo.save_batch("SW-01", "", items, MID)
+            await s.commit()
+
+        assert events == [BatchChange(MID, "get_mac_table", "SW-01")]
+
+    async def test_rolled_back_batch_is_not_published(self, factory, events):
+        async with factory() as s:
+            await get_typed_repo("get_mac_table", s).save_batch(
+                "SW-01", "", [MacTableData(mac_address=MACS[0], interface_name="GE1/0/1")], MID,
+            )
+            await s.rollback()
+
+        assert events == []
+
+    async def test_client_ping_differential_update_publishes(self, factory, events):
+        rng = random.Random(1)
+        await _save(factory, "gnms_ping", PING_HOST, _ping(rng))
+        flipped = _ping(rng)
+        await _save(factory, "gnms_ping", PING_HOST, flipped)
+        await _save(factory, "gnms_ping", PING_HOST, flipped)
+
+        assert events == [BatchChange(MID, "gnms_ping", PING_HOST)] * 2
+
+
+class TestIncrementalAssembly:
+
+    async def test_unchanged_round_skips_candidate_queries(self, factory):
+        await _seed(factory, random.Random(2))
+        service = ClientCollectionService()
+        first = await service.collect_client_data(MID)
+        written = await _record_count(factory)
+
+        with patch.object(
+            ClientLocationRepo, "get_candidates",
+            side_effect=AssertionError("candidates queried"),
+        ):
+            second = await service.collect_client_data(MID)
+
+        assert (first["mode"], second["mode"]) == ("full", "unchanged")
+        assert second["client_records_count"] == first["client_records_count"]
+        assert await _record_count(factory) == written
+
+    async def test_only_affected_clients_are_rebuilt(self, factory):
+        await _seed(factory, random.Random(3))
+        service = ClientCollectionService()
+        await service.collect_client_data(MID)
+        before = await _record_count(factory)
+
+        await _save(factory, "get_mac_table", "SW-09", [
+            MacTableData(mac_address=MACS[0], interface_name="GE1/0/7", vlan_id=10),
+        ])
+        with patch.object(
+            ClientCollectionService, "_build_client_records",
+            wraps=ClientCollectionService._build_client_records,
+        ) as build:
+            result = await service.collect_client_data(MID)
+
+        assert result["mode"] == "incremental"
+        rebuilt = build.call_args.args[3]
+        assert rebuilt == [
+            cid for cid, (mac, _) in
+            client_collection_service._assembly_states[MID].clients.items()
+            if mac == MACS[0]
+        ]
+        assert await _record_count(factory) <= before + 1
+
+    async def test_client_list_edit_is_picked_up(self, factory):
+        await _seed(factory, random.Random(4))
+        await _save(factory, "get_mac_table", "SW-09", [
+            MacTableData(mac_address="BB:00:00:00:00:01", interface_name="GE1/0/7", vlan_id=10),
+        ])
+        service = ClientCollectionService()
+        await service.collect_client_data(MID)
+
+        async with factory() as s:
+            await s.execute(
+                update(MaintenanceMacList)
+                .where(MaintenanceMacList.mac_address == MACS[0])
+                .values(mac_address="BB:00:00:00:00:01")
+            )
+            await s.commit()
+        result = await service.collect_client_data(MID)
+
+        state = client_collection_service._assembly_states[MID]
+        assert result["mode"] == "incremental"
+        assert state.best["BB:00:00:00:00:01"].switch_hostname == "SW-09"
+
+    @pytest.mark.parametrize("seed", range(5))
+    async def test_matches_full_assembly(self, factory, seed):
+        rng = random.Random(seed)
+        await _seed(factory, rng)
+        service = ClientCollectionService()
+        await service.collect_client_data(MID)
+
+        for _ in range(6):
+            for host in rng.sample(SWITCHES, rng.randint(0, 2)):
+                await _save(factory, "get_mac_table", host, _mac_table(rng, host))
+            if rng.random() < 0.5:
+                host = rng.choice(SWITCHES)
+                await _save(factory, "get_interface_status", host, _interfaces(rng))
+            if rng.random() < 0.5:
+                await _save(factory, "gnms_ping", PING_HOST, _ping(rng))
+            result = await service.collect_client_data(MID)
+            assert result["mode"] in ("incremental", "unchanged")
+
+        incremental = client_collection_service._assembly_states.pop(MID)
+        written = await _record_count(factory)
+        full = await service.collect_client_data(MID)
+
+        state = client_collection_service._assembly_states[MID]
+        assert full["mode"] == "full"
+        # 完整組裝沒有任何需要寫入的變化
+        assert await _record_count(factory) == written
+        assert state.best == incremental.best
+        assert state.ping == incremental.ping
+        assert full["client_records_count"] == incremental.found_count
+
+    async def test_periodic_full_assembly(self, factory):
+        await _seed(factory, random.Random(5))
+        service = ClientCollectionService()
+        await service.collect_client_data(MID)
+
+        with patch.object(
+            client_collection_service.settings,
+            "client_full_assembly_interval_seconds", 0,
+        ):
+            result = await service.collect_client_data(MID)
+
+        assert result["mode"] == "full"
+
+
+class TestStateStore:
+
+    async def test_applied_only_after_commit(self, factory):
+        await _seed(factory, random.Random(6))
+        store = ClientStateStore(max_clients=100)
+        service = ClientCollectionService()
+        with patch.object(
+            client_collection_service, "get_client_state_store",
+            return_value=store,
+        ):
+            await service.collect_client_data(MID)
+            async with factory() as s:
+                before = dict(await store.current_state(MID, s))
+
+            # 寫入新變化點後 commit 前失敗：記憶體不可留下被 rollback 的記錄
+            await _save(factory, "gnms_ping", PING_HOST, [
+                PingResultData(target=f"10.0.4.{i}", is_reachable=False)
+                for i in range(1, len(MACS) + 1)
+            ])
+            with (
+                patch.object(
+                    ClientCheckpointRepo, "register",
+                    side_effect=RuntimeError("db down"),
+                ),
+                pytest.raises(RuntimeError),
+            ):
+                await service.collect_client_data(MID)
+            assert dict(store._entries[MID]) == before
+
+            await service.collect_client_data(MID)
+
+        async with factory() as s:
+            state = await ClientRecordRepo(s).get_state_at(MID)
+        assert dict(store._entries[MID]) == {
+            mac: ClientState.of(r) for mac, r in state.items()
+        }
+        assert dict(store._entries[MID]) != before
@@ -0,0 +1,137 @@
+"""
+Integration tests for the client checkpoint registry — real SQLite DB.
+
+採集寫入快照時登記 checkpoint；ClientCheckpointRepo.list_since 須與
+「對 client_records 做 DISTINCT collected_at、分桶取第一筆」結果一致。
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete, distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientCheckpoint, ClientRecord, MaintenanceMacList
+from app.repositories.client_checkpoints import (
+    ClientCheckpointRepo,
+    checkpoint_bucket,
+)
+from app.services.client_collection_service import ClientCollectionService
+
+MID = "MAINT-CKPT"
+T0 = datetime(2026, 3, 1, 8, 0, tzinfo=UTC)
+INTERVAL = 15
+
+
+async def _collect_rounds(session: AsyncSession, times: list[datetime]) -> None:
+    """每輪讓唯一的 client 換一個 port，確保每輪都寫入快照。"""
+    client = MaintenanceMacList(
+        maintenance_id=MID, mac_address="AA:00:00:00:00:01",
+        ip_address="10.0.0.1", tenant_group=TenantGroup.F12,
+        detection_status=ClientDetectionStatus.NOT_CHECKED,
+    )
+    session.add(client)
+    await session.flush()
+    service = ClientCollectionService()
+    for i, at in enumerate(times):
+        await service._save_changed_records(session, MID, [ClientRecord(
+            maintenance_id=MID, collected_at=at, client_id=client.id,
+            mac_address=client.mac_address, ip_address=client.ip_address,
+            switch_hostname="SW-01", interface_name=f"Gi1/0/{i}",
+        )], at)
+
+
+async def _scan_checkpoints(
+    session: AsyncSession, cutoff: datetime,
+) -> list[datetime]:
+    """舊做法：DISTINCT collected_at 後分桶，每桶取第一筆。"""
+    result = await session.execute(
+        select(distinct(ClientRecord.collected_at))
+        .where(
+            ClientRecord.maintenance_id == MID,
+            ClientRecord.collected_at >= cutoff,
+        )
+        .order_by(ClientRecord.collected_at)
+    )
+    firsts: dict[str, datetime] = {}
+    for tp in result.scalars().all():
+        firsts.setdefault(checkpoint_bucket(tp, INTERVAL), tp)
+    return sorted(firsts.values())
+
+
+def _interval(minutes: int):
+    return patch(
+        "app.services.client_collection_service.settings"
+        ".checkpoint_interval_minutes",
+        minutes,
+    )
+
+
+# 每 5 分鐘一輪，跨 15 分鐘時間桶
+TIMES = [T0 + timedelta(minutes=5 * i) for i in range(10)]
+
+
+class TestCheckpointRegistry:
+
+    async def test_collection_registers_bucket_firsts(self, session):
+        with _interval(INTERVAL):
+            await _collect_rounds(session, TIMES)
+
+        result = await session.execute(
+            select(ClientCheckpoint.checkpoint_time)
+            .order_by(ClientCheckpoint.checkpoint_time)
+        )
+        assert [t.replace(tzinfo=UTC) for t in result.scalars()] == TIMES[::3]
+
+    @pytest.mark.parametrize("cutoff_minutes", [-1, 0, 5, 12, 20, 50])
+    async def test_list_since_matches_full_scan(self, session, cutoff_minutes):
+        with _interval(INTERVAL):
+            await _collect_rounds(session, TIMES)
+        cutoff = T0 + timedelta(minutes=cutoff_minutes)
+
+        listed = await ClientCheckpointRepo(session).list_since(
+            MID, cutoff, INTERVAL,
+        )
+
+        assert listed == await _scan_checkpoints(session, cutoff)
+
+    async def test_backfills_existing_history(self, session):
+        with _interval(INTERVAL):
+            await _collect_rounds(session, TIMES)
+        # 模擬 migration 前的既有資料 / 間隔設定變更
+        await session.execute(delete(ClientCheckpoint))
+
+        listed = await ClientCheckpointRepo(session).list_since(
+            MID, T0, INTERVAL,
+        )
+
+        assert listed == await _scan_checkpoints(session, T0)
+        result = await session.execute(select(ClientCheckpoint))
+        assert len(result.scalars().all()) == len(listed)
+
+
+    async def test_concurrent_backfill_is_ignored(self, session):
+        """同時的第一次請求各自回填相同的列：撞到唯一鍵的略過、不拋錯。"""
+        with _interval(INTERVAL):
+            await _collect_rounds(session, TIMES)
+        await session.execute(delete(ClientCheckpoint))
+        repo = ClientCheckpointRepo(session)
+        listed = await repo.list_since(MID, T0, INTERVAL)
+
+        # 另一個請求在已登記之後才送出同樣的回填
+        await repo._insert([
+            {
+                "maintenance_id": MID,
+                "interval_minutes": INTERVAL,
+                "bucket_key": checkpoint_bucket(tp, INTERVAL),
+                "checkpoint_time": tp + timedelta(minutes=1),
+            }
+            for tp in listed
+        ])
+
+        assert await repo.list_since(MID, T0, INTERVAL) == listed
+        result = await session.execute(select(ClientCheckpoint))
+        assert len(result.scalars().all()) == len(listed)
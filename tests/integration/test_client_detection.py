@@ -0,0 +1,111 @@
+"""
+Integration tests for ClientCollectionService.detect_clients — real SQLite DB.
+
+偵測狀態在記憶體中算好，只對狀態有變的 client 以每種狀態一個
+UPDATE ... WHERE id IN (...) 寫回，不再逐筆更新。
+"""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, select
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import MaintenanceMacList
+from app.parsers.protocols import MacTableData, PingResultData
+from app.repositories.typed_records import get_typed_repo
+from app.services import client_collection_service
+from app.services.client_collection_service import ClientCollectionService
+
+MID = "MAINT-DETECT"
+N = 30
+
+
+@pytest.fixture(autouse=True)
+def _patch_session(session_context):
+    with patch(
+        "app.services.client_collection_service.get_session_context",
+        session_context,
+    ):
+        yield
+
+    client_collection_service._pending_changes.clear()
+    client_collection_service._assembly_states.clear()
+
+
+def _mac(i: int) -> str:
+    return f"aa:00:00:00:06:{i:02x}"
+
+
+async def _seed(factory) -> None:
+    """偶數 client 在 mac table；3 的倍數 ping 不通。"""
+    async with factory() as s:
+        s.add_all(
+            MaintenanceMacList(
+                maintenance_id=MID, mac_address=_mac(i), ip_address=f"10.0.6.{i}",
+                tenant_group=TenantGroup.F12,
+                detection_status=ClientDetectionStatus.NOT_CHECKED,
+            )
+            for i in range(N)
+        )
+        await get_typed_repo("get_mac_table", s).save_batch("SW-01", "", [
+            MacTableData(mac_address=_mac(i).upper(), interface_name="GE1/0/1", vlan_id=10)
+            for i in range(0, N, 2)
+        ], MID)
+        await get_typed_repo("gnms_ping", s).save_batch("__CLIENT_PING_F12__", "", [
+            PingResultData(target=f"10.0.6.{i}", is_reachable=i % 3 != 0)
+            for i in range(N)
+        ], MID)
+        await s.commit()
+
+
+async def _statuses(factory) -> dict[str, ClientDetectionStatus]:
+    async with factory() as s:
+        rows = await s.execute(select(
+            MaintenanceMacList.mac_address, MaintenanceMacList.detection_status,
+        ))
+        return dict(rows.all())
+
+
+def _expected(i: int) -> ClientDetectionStatus:
+    if i % 2 == 0 and i % 3 != 0:
+        return ClientDetectionStatus.DETECTED
+    return ClientDetectionStatus.NOT_DETECTED
+
+
+class TestDetectClients:
+
+    async def test_statuses_applied_with_grouped_updates(
+        self, engine, session_factory,
+    ):
+        await _seed(session_factory)
+        updates: list[str] = []
+
+        def capture(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("UPDATE MAINTENANCE_MAC_LIST"):
+                updates.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            result = await ClientCollectionService().detect_clients(MID)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert await _statuses(session_factory) == {_mac(i): _expected(i) for i in range(N)}
+        detected = sum(_expected(i) is ClientDetectionStatus.DETECTED for i in range(N))
+        assert (result["total"], result["detected"]) == (N, detected)
+        assert result["not_detected"] == N - detected
+        assert len(updates) == 2
+
+    async def test_unchanged_statuses_are_not_rewritten(
+        self, engine, session_factory,
+    ):
+        await _seed(session_factory)
+        service = ClientCollectionService()
+        await service.detect_clients(MID)
+
+        result = await service.detect_clients(MID)
+
+        assert result["updated"] == 0
+        assert await _statuses(session_factory) == {_mac(i): _expected(i) for i in range(N)}
@@ -0,0 +1,163 @@
+"""
+Integration tests for the streaming CSV import of the client list — real SQLite DB.
+
+逐列讀取上傳檔、使用者只查一次、每批一個多列 INSERT；
+清單已存在與檔案內重複的 MAC 計入 skipped，後續工作交給背景 job。
+"""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, func, select
+
+from app.api.endpoints import mac_list
+from app.api.endpoints.auth import get_current_user
+from app.core.enums import ClientDetectionStatus, TenantGroup, UserRole
+from app.db.models import MaintenanceMacList, User
+
+MID = "MAINT-IMPORT"
+HEADER = "mac_address,ip_address,tenant_group,description,default_assignee\n"
+ROOT_USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+
+
+@pytest.fixture
+async def factory(session_factory, session_context):
+    async with session_factory() as s:
+        s.add_all([
+            User(
+                username="root", password_hash="x", display_name="Admin",
+                role=UserRole.ROOT, is_active=True,
+            ),
+            User(
+                username="pm", password_hash="x", display_name="PM One",
+                role=UserRole.PM, maintenance_id=MID, is_active=True,
+            ),
+            User(
+                username="gone", password_hash="x", display_name="Gone",
+                role=UserRole.PM, maintenance_id=MID, is_active=False,
+            ),
+        ])
+        await s.commit()
+
+    with patch.object(mac_list, "get_session_context", session_context):
+        yield session_factory
+
+
+async def _post(csv_text: str, **params) -> tuple[dict, list]:
+    app = FastAPI()
+    app.include_router(mac_list.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: ROOT_USER
+
+    with (
+        patch.object(mac_list, "write_log"),
+        patch.object(mac_list, "request_regeneration") as start,
+    ):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test",
+        ) as client:
+            resp = await client.post(
+                f"/api/mac-list/{MID}/import-csv",
+                params=params,
+                files={"file": ("clients.csv", csv_text.encode(), "text/csv")},
+            )
+    assert resp.status_code == 200, resp.text
+    return resp.json(), start.call_args_list
+
+
+async def _clients(factory) -> dict[str, MaintenanceMacList]:
+    async with factory() as s:
+        rows = (await s.execute(
+            select(MaintenanceMacList).where(MaintenanceMacList.maintenance_id == MID)
+        )).scalars().all()
+        return {r.mac_address: r for r in rows}
+
+
+class TestImportCsv:
+
+    async def test_validation_duplicates_and_assignees(self, factory):
+        async with factory() as s:
+            s.add(MaintenanceMacList(
+                maintenance_id=MID, mac_address="AA:00:00:00:07:01",
+                ip_address="10.0.7.1", tenant_group=TenantGroup.F18,
+                detection_status=ClientDetectionStatus.DETECTED,
+            ))
+            await s.commit()
+
+        body, starts = await _post(
+            HEADER
+            + "aa-00-00-00-07-01,10.0.7.1,F18,,\n"  # 已存在
+            + "AA:00:00:00:07:02,10.0.7.2,f12,desk,PM One\n"
+            + "AA:00:00:00:07:02,10.0.7.2,F12,again,\n"  # 檔案內重複
+            + "AA:00:00:00:07:03,10.0.7.3,,,\n"
+            + "AA:00:00:00:07:04,10.0.7.4,F18,,Gone\n"
+            + "AA:00:00:00:07:05,10.0.7.300,F18,,\n"
+            + "bad-mac,10.0.7.6,F18,,\n"
+            + "AA:00:00:00:07:07,10.0.7.7,F99,,\n"
+            + "AA:00:00:00:07:08\n"
+        )
+
+        assert (body["imported"], body["skipped"]) == (2, 2)
+        assert body["errors"] == [
+            "Row 6: 使用者 'Gone' 不存在或未啟用",
+            "Row 7: IP 格式錯誤 (10.0.7.300)",
+            "Row 8: MAC 格式錯誤 (bad-mac)",
+            "Row 9: 無效的 tenant_group (F99)",
+            "Row 10: IP 為空",
+        ]
+        clients = await _clients(factory)
+        assert clients["AA:00:00:00:07:02"].default_assignee == "PM One"
+        assert clients["AA:00:00:00:07:02"].tenant_group == TenantGroup.F12
+        assert clients["AA:00:00:00:07:02"].description == "desk"
+        assert clients["AA:00:00:00:07:03"].default_assignee == "Admin"
+        assert clients["AA:00:00:00:07:03"].tenant_group == TenantGroup.F18
+        assert clients["AA:00:00:00:07:01"].detection_status == ClientDetectionStatus.DETECTED
+        assert [c.args for c in starts] == [(MID,)]
+        assert starts[0].kwargs == {"sync_cases": True}
+
+    async def test_large_import_is_chunked(self, factory, engine):
+        n = 2 * mac_list._IMPORT_CHUNK_SIZE + 10
+        rows = "".join(
+            f"AA:00:00:{i >> 16:02X}:{(i >> 8) & 0xFF:02X}:{i & 0xFF:02X},"
+            f"10.1.{i >> 8 & 0xFF}.{i & 0xFF},F18,,PM One\n"
+            for i in range(n)
+        )
+        statements: list[str] = []
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement.lstrip().split()[0].upper())
+
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", capture)
+        try:
+            body, _ = await _post(HEADER + rows)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", capture)
+
+        assert (body["imported"], body["skipped"], body["total_errors"]) == (n, 0, 0)
+        # 使用者一次 + 每批一個存在性查詢；每批一個多列 INSERT + 一筆清單異動紀錄
+        assert statements.count("SELECT") == 1 + 3
+        assert statements.count("INSERT") == 3 + 1
+        async with factory() as s:
+            assert (await s.execute(
+                select(func.count()).select_from(MaintenanceMacList)
+            )).scalar() == n
+
+    async def test_replace_and_no_background_job_without_imports(self, factory):
+        await _post(HEADER + "AA:00:00:00:07:01,10.0.7.1,F18,,\n")
+
+        body, starts = await _post(
+            HEADER + "AA:00:00:00:07:01,10.0.7.1,F18,,\n", replace="true",
+        )
+        assert (body["imported"], body["skipped"]) == (1, 0)
+        assert len(await _clients(factory)) == 1
+
+        body, starts = await _post(HEADER + "AA:00:00:00:07:01,10.0.7.1,F18,,\n")
+        assert (body["imported"], body["skipped"]) == (0, 1)
+        assert starts == []
+        assert "comparison_job" not in body
@@ -0,0 +1,131 @@
+"""
+Integration tests for ClientLocationRepo — real SQLite DB.
+
+DB 端 semi-join / left join 的候選必須與 Python 逐表讀取後組合的結果一致：
+只含已登記 MAC（不分大小寫）、static ACL 優先、per-port MAC 數含未登記主機。
+"""
+from __future__ import annotations
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import MaintenanceMacList
+from app.parsers.protocols import AclData, InterfaceStatusData, MacTableData
+from app.repositories.client_locations import ClientLocationRepo
+from app.repositories.typed_records import get_typed_repo
+
+MID = "MAINT-LOCATE"
+REGISTERED = ["AA:00:00:00:00:01", "aa:00:00:00:00:02", "AA:00:00:00:00:03"]
+
+
+async def _seed(session: AsyncSession) -> None:
+    session.add_all(
+        MaintenanceMacList(
+            maintenance_id=MID, mac_address=mac, ip_address=f"10.0.0.{i}",
+            tenant_group=TenantGroup.F12,
+            detection_status=ClientDetectionStatus.NOT_CHECKED,
+        )
+        for i, mac in enumerate(REGISTERED, start=1)
+    )
+
+    mac_repo = get_typed_repo("get_mac_table", session)
+    # 舊 batch：不應出現在候選中
+    await mac_repo.save_batch("SW-01", "", [
+        MacTableData(mac_address="AA:00:00:00:00:01", interface_name="GE1/0/9", vlan_id=10),
+    ], MID)
+    await mac_repo.save_batch("SW-01", "", [
+        MacTableData(mac_address="AA:00:00:00:00:01", interface_name="GE1/0/1", vlan_id=10),
+        MacTableData(mac_address="BB:00:00:00:00:01", interface_name="GE1/0/1", vlan_id=10),
+        MacTableData(mac_address="BB:00:00:00:00:02", interface_name="GE1/0/1", vlan_id=10),
+        MacTableData(mac_address="AA:00:00:00:00:02", interface_name="GE1/0/2", vlan_id=20),
+    ], MID)
+    await mac_repo.save_batch("SW-02", "", [
+        MacTableData(mac_address="AA:00:00:00:00:01", interface_name="Port-channel1", vlan_id=10),
+        MacTableData(mac_address="AA:00:00:00:00:02", interface_name="GE1/0/3", vlan_id=20),
+        MacTableData(mac_address="BB:00:00:00:00:03", interface_name="GE1/0/4", vlan_id=30),
+    ], MID)
+
+    await get_typed_repo("get_interface_status", session).save_batch("SW-01", "", [
+        InterfaceStatusData(interface_name="GE1/0/1", link_status="up", speed="1G", duplex="full"),
+        InterfaceStatusData(interface_name="GE1/0/2", link_status="up", speed="100M", duplex="half"),
+    ], MID)
+    await get_typed_repo("get_static_acl", session).save_batch("SW-01", "", [
+        AclData(interface_name="GE1/0/1", acl_number="3001"),
+        AclData(interface_name="GE1/0/2", acl_number=None),
+    ], MID)
+    await get_typed_repo("get_dynamic_acl", session).save_batch("SW-01", "", [
+        AclData(interface_name="GE1/0/1", acl_number="9001"),
+        AclData(interface_name="GE1/0/2", acl_number="9002"),
+    ], MID)
+    await session.flush()
+
+
+async def _reference(session: AsyncSession) -> set[tuple]:
+    """改寫前的 Python 組合：逐表讀取最新 batch 後以 dict join。"""
+    async def latest(collection_type: str) -> list:
+        return await get_typed_repo(collection_type, session).get_latest_per_device(MID)
+
+    mac_rows = await latest("get_mac_table")
+    if_map = {
+        (r.switch_hostname, r.interface_name): r
+        for r in await latest("get_interface_status")
+    }
+    acl_map: dict[tuple[str, str], str] = {}
+    for collection_type in ("get_dynamic_acl", "get_static_acl"):
+        for r in await latest(collection_type):
+            if r.acl_number:
+                acl_map[(r.switch_hostname, r.interface_name)] = r.acl_number
+    counts: dict[tuple[str, str], int] = {}
+    for r in mac_rows:
+        port = (r.switch_hostname, r.interface_name)
+        counts[port] = counts.get(port, 0) + 1
+
+    registered = {mac.upper() for mac in REGISTERED}
+    out = set()
+    for r in mac_rows:
+        if r.mac_address.upper() not in registered:
+            continue
+        port = (r.switch_hostname, r.interface_name)
+        if_rec = if_map.get(port)
+        out.add((
+            r.mac_address, *port, r.vlan_id,
+            if_rec.speed if if_rec else None,
+            if_rec.duplex if if_rec else None,
+            if_rec.link_status if if_rec else None,
+            acl_map.get(port), counts[port],
+        ))
+    return out
+
+
+class TestClientLocationRepo:
+
+    async def test_matches_python_join(self, session):
+        await _seed(session)
+
+        rows = await ClientLocationRepo(session).get_candidates(MID)
+
+        assert {tuple(r) for r in rows} == await _reference(session)
+        assert len(rows) == 4
+
+    async def test_join_semantics(self, session):
+        await _seed(session)
+
+        rows = {
+            (r.switch_hostname, r.interface_name): r
+            for r in await ClientLocationRepo(session).get_candidates(MID)
+        }
+
+        assert ("SW-01", "GE1/0/9") not in rows
+        # static ACL 優先；static 為空時以 dynamic 補上
+        assert rows[("SW-01", "GE1/0/1")].acl_number == "3001"
+        assert rows[("SW-01", "GE1/0/2")].acl_number == "9002"
+        # per-port MAC 數包含未登記主機
+        assert rows[("SW-01", "GE1/0/1")].mac_count == 3
+        # 沒有 interface status / ACL 的 port 仍保留（left join）
+        assert rows[("SW-02", "Po1")].speed is None
+        assert rows[("SW-02", "Po1")].acl_number is None
+
+    async def test_counts_all_mac_rows(self, session):
+        await _seed(session)
+
+        assert await ClientLocationRepo(session).count_mac_rows(MID) == 7
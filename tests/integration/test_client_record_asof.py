@@ -0,0 +1,121 @@
+"""
+Integration tests for ClientRecord validity intervals — real SQLite DB.
+
+ClientCollectionService._save_changed_records 關閉舊區間（valid_to），
+ClientRecordRepo 的 as-of 查詢結果須與「掃完整歷史取每個 MAC 最新一筆」一致。
+"""
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientRecord, MaintenanceMacList
+from app.repositories.client_records import ClientRecordRepo
+from app.services.client_collection_service import ClientCollectionService
+
+MID = "MAINT-ASOF"
+T0 = datetime(2026, 3, 1, 8, 0, tzinfo=UTC)
+# 最後一個 MAC 由兩個 client 共用（同 MAC 多個 VM）
+MACS = ["AA:00:00:00:00:01", "AA:00:00:00:00:02", "AA:00:00:00:00:03"]
+
+
+async def _clients(session: AsyncSession) -> list[MaintenanceMacList]:
+    clients = [
+        MaintenanceMacList(
+            maintenance_id=MID, mac_address=mac, ip_address=f"10.0.0.{i}",
+            tenant_group=TenantGroup.F12,
+            detection_status=ClientDetectionStatus.NOT_CHECKED,
+        )
+        for i, mac in enumerate(MACS + MACS[-1:], start=1)
+    ]
+    session.add_all(clients)
+    await session.flush()
+    return clients
+
+
+async def _collect(
+    session: AsyncSession,
+    clients: list[MaintenanceMacList],
+    at: datetime,
+    ports: dict[int, str | None],
+) -> None:
+    """以 client.id → interface（None = 未偵測）模擬一輪採集。"""
+    records = [
+        ClientRecord(
+            maintenance_id=MID, collected_at=at, client_id=c.id,
+            mac_address=c.mac_address, ip_address=c.ip_address,
+            switch_hostname="SW-01" if ports[c.id] else None,
+            interface_name=ports[c.id],
+        )
+        for c in clients
+    ]
+    await ClientCollectionService()._save_changed_records(
+        session, MID, records, at,
+    )
+
+
+async def _brute_force_state(
+    session: AsyncSession, at: datetime,
+) -> dict[str, int]:
+    """舊做法：掃 collected_at <= at 的完整歷史，每個 MAC 取最新（同時間取 id 最小）。"""
+    result = await session.execute(
+        select(ClientRecord).where(
+            ClientRecord.maintenance_id == MID,
+            ClientRecord.collected_at <= at,
+        ).order_by(ClientRecord.collected_at.desc(), ClientRecord.id)
+    )
+    state: dict[str, int] = {}
+    for record in result.scalars().all():
+        state.setdefault(record.mac_address.upper(), record.id)
+    return state
+
+
+class TestValidityIntervals:
+
+    async def test_new_change_point_closes_previous(self, session):
+        clients = await _clients(session)
+        await _collect(session, clients, T0, {c.id: "Gi1/0/1" for c in clients})
+        # 只有第一個 client 變化
+        ports = {c.id: "Gi1/0/1" for c in clients}
+        ports[clients[0].id] = "Gi1/0/9"
+        t1 = T0 + timedelta(minutes=15)
+        await _collect(session, clients, t1, ports)
+
+        result = await session.execute(
+            select(ClientRecord.interface_name, ClientRecord.valid_to)
+            .where(ClientRecord.mac_address == MACS[0])
+            .order_by(ClientRecord.collected_at)
+        )
+        rows = result.all()
+        assert [r.interface_name for r in rows] == ["Gi1/0/1", "Gi1/0/9"]
+        assert rows[0].valid_to.replace(tzinfo=UTC) == t1
+        assert rows[1].valid_to is None
+
+        repo = ClientRecordRepo(session)
+        before = await repo.get_state_at(MID, T0 + timedelta(minutes=5))
+        current = await repo.get_state_at(MID)
+        assert before[MACS[0]].interface_name == "Gi1/0/1"
+        assert current[MACS[0]].interface_name == "Gi1/0/9"
+        assert set(current) == set(MACS)
+
+    async def test_as_of_matches_full_history_scan(self, session):
+        clients = await _clients(session)
+        rng = random.Random(31)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(12)]
+        for at in times:
+            await _collect(session, clients, at, {
+                c.id: rng.choice(["Gi1/0/1", "Gi1/0/2", None]) for c in clients
+            })
+
+        repo = ClientRecordRepo(session)
+        probes = [T0 - timedelta(minutes=1)] + [
+            t + timedelta(minutes=m) for t in times for m in (0, 7)
+        ]
+        for at in probes:
+            state = await repo.get_state_at(MID, at)
+            expected = await _brute_force_state(session, at)
+            assert {mac: r.id for mac, r in state.items()} == expected, at
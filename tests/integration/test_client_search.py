@@ -0,0 +1,189 @@
+"""
+Integration tests for the client list search index — real SQLite DB.
+
+search_condition 由記憶體 trigram 索引回答時，結果必須與 LIKE 條件相同；
+同一 process 的寫入直接套用到索引，其他 process 的寫入（未知 token）觸發重新載入。
+"""
+from __future__ import annotations
+
+import random
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select, update
+
+from app.api.endpoints import mac_list
+from app.api.endpoints.auth import get_current_user
+from app.core.enums import ClientDetectionStatus, TenantGroup, UserRole
+from app.db.models import ClientListChange, MaintenanceMacList, User
+from app.repositories.client_list_changes import ClientListChangeRepo
+from app.services import client_search
+from app.services.client_search import like_condition, parse_keywords
+
+MID = "MAINT-SEARCH"
+ROOT_USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+WORDS = ["desk", "printer", "會議室", "lab", "camera", "東側"]
+
+
+@pytest.fixture
+async def factory(session_factory, session_context):
+    async with session_factory() as s:
+        s.add(User(
+            username="root", password_hash="x", display_name="Admin",
+            role=UserRole.ROOT, is_active=True,
+        ))
+        await s.commit()
+
+    with (
+        patch.object(mac_list, "get_session_context", session_context),
+        patch.object(client_search, "_client_search_store", None),
+        patch.object(mac_list, "write_log"),
+        patch.object(mac_list, "request_regeneration"),
+    ):
+        yield session_factory
+
+
+def _client(i: int, rng: random.Random) -> MaintenanceMacList:
+    return MaintenanceMacList(
+        maintenance_id=MID,
+        mac_address=f"AA:{rng.randrange(4):02X}:00:00:{i >> 8:02X}:{i & 0xFF:02X}",
+        ip_address=f"10.{rng.randrange(3)}.{rng.randrange(10)}.{i % 50}",
+        tenant_group=TenantGroup.F18,
+        detection_status=ClientDetectionStatus.NOT_CHECKED,
+        description=(
+            " ".join(rng.sample(WORDS, 2)) if rng.random() < 0.8 else None
+        ),
+    )
+
+
+async def _search(factory, search: str) -> tuple[set[int], set[int], bool]:
+    """(索引結果, LIKE 結果, 是否由索引回答)。"""
+    async with factory() as s:
+        condition = await client_search.search_condition(s, MID, search)
+        base = select(MaintenanceMacList.id).where(
+            MaintenanceMacList.maintenance_id == MID,
+        )
+        indexed = set((await s.execute(base.where(condition))).scalars())
+        like = set((await s.execute(
+            base.where(like_condition(parse_keywords(search)))
+        )).scalars())
+    return indexed, like, "LIKE" not in str(condition)
+
+
+async def _api(method: str, path: str, **kwargs):
+    app = FastAPI()
+    app.include_router(mac_list.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: ROOT_USER
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        resp = await client.request(method, f"/api/mac-list/{MID}{path}", **kwargs)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _index():
+    return client_search.get_client_search_store()._entries.get(MID)
+
+
+class TestClientSearch:
+
+    @pytest.mark.parametrize("seed", range(3))
+    async def test_index_matches_like(self, factory, seed):
+        rng = random.Random(seed)
+        async with factory() as s:
+            s.add_all(_client(i, rng) for i in range(300))
+            await s.commit()
+
+        queries = [
+            "aa:01:00:00:00:2", "AA:03 10.2", "10.1.7.", "desk printer",
+            "會議室 cam", "aa:02:00:00:01 東側", "no-such-client", "10.0.3.4",
+        ]
+        queries += [
+            f"{rng.randrange(3)}.{rng.randrange(10)}.{rng.randrange(50)}"
+            for _ in range(10)
+        ]
+        served = 0
+        for search in queries:
+            indexed, like, from_index = await _search(factory, search)
+            assert indexed == like, search
+            served += from_index
+        assert served == len(queries)
+
+    async def test_endpoint_writes_update_index_in_place(self, factory):
+        rng = random.Random(7)
+        async with factory() as s:
+            s.add_all(_client(i, rng) for i in range(20))
+            await s.commit()
+        assert (await _search(factory, "AA:01:00:00:00:0"))[2]
+        index = _index()
+
+        added = await _api("POST", "", json={
+            "mac_address": "aa:bb:cc:dd:ee:01", "ip_address": "10.9.9.1",
+            "tenant_group": "F18", "description": "new kiosk",
+        })
+        await _api("PUT", f"/{added['id']}", json={"description": "lobby kiosk"})
+        rows = await _api("GET", "/detailed", params={"search": "lobby kiosk"})
+        assert [r["id"] for r in rows] == [added["id"]]
+        assert await _api("GET", "/detailed", params={"search": "new kiosk"}) == []
+
+        await _api("DELETE", f"/by-id/{added['id']}")
+        assert await _api("GET", "", params={"search": "AA:BB:CC"}) == []
+        assert _index() is index
+
+        await _api("DELETE", "")
+        assert await _api("GET", "", params={"search": "10.0"}) == []
+        assert _index() is index and len(index) == 0
+
+    async def test_other_process_writes_trigger_reload(self, factory):
+        rng = random.Random(3)
+        async with factory() as s:
+            s.add_all(_client(i, rng) for i in range(20))
+            await s.commit()
+        await _search(factory, "lobby")
+        index = _index()
+
+        # 其他 process：直接改 DB 並記錄異動（本 process 不知道 token）
+        async with factory() as s:
+            await s.execute(
+                update(MaintenanceMacList)
+                .where(MaintenanceMacList.id == 1)
+                .values(description="lobby printer")
+            )
+            await ClientListChangeRepo(s).record(MID)
+            await s.commit()
+
+        indexed, like, from_index = await _search(factory, "lobby")
+        assert indexed == like == {1} and from_index
+        assert _index() is not index
+
+        # 異動紀錄被刪除（歲修清除）也重新載入
+        index = _index()
+        async with factory() as s:
+            await s.execute(delete(MaintenanceMacList))
+            await s.execute(delete(ClientListChange))
+            await s.commit()
+        assert (await _search(factory, "lobby"))[:2] == (set(), set())
+        assert _index() is not index
+
+    async def test_csv_import_reloads_and_wildcards_use_like(self, factory):
+        await _search(factory, "kiosk")
+        csv_text = (
+            "mac_address,ip_address,tenant_group,description,default_assignee\n"
+            "AA:00:00:00:0A:01,10.0.10.1,F18,kiosk_1,\n"
+            "AA:00:00:00:0A:02,10.0.10.2,F18,kiosk 2,\n"
+        )
+        body = await _api("POST", "/import-csv", files={
+            "file": ("clients.csv", csv_text.encode(), "text/csv"),
+        })
+        assert body["imported"] == 2
+
+        indexed, like, from_index = await _search(factory, "kiosk")
+        assert len(indexed) == 2 and indexed == like and from_index
+        indexed, like, from_index = await _search(factory, "kiosk_")
+        assert len(indexed) == 2 and indexed == like and not from_index
@@ -0,0 +1,179 @@
+"""
+Integration tests for the in-process client state store — real SQLite DB.
+
+ClientStateStore 以 client_records 為準：其他 process 寫入的新記錄增量套用、
+記錄被刪除時重新載入；啟用後比較 / 摘要結果不變。
+"""
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientRecord, MaintenanceMacList
+from app.repositories.client_records import ClientRecordRepo
+from app.services import client_comparison_service
+from app.services.client_collection_service import ClientCollectionService
+from app.services.client_comparison_service import ClientComparisonService
+from app.services.client_state_store import ClientState, ClientStateStore
+
+MID = "MAINT-STORE"
+T0 = datetime(2026, 3, 1, 8, 0)
+MACS = [f"AA:00:00:00:03:{i:02X}" for i in range(8)]
+
+
+@pytest.fixture(autouse=True)
+def _reset_change_logs():
+    yield
+    client_comparison_service._change_logs.pop(MID, None)
+
+
+async def _clients(session: AsyncSession) -> list[MaintenanceMacList]:
+    clients = [
+        MaintenanceMacList(
+            maintenance_id=MID, mac_address=mac, ip_address=f"10.0.3.{i}",
+            tenant_group=TenantGroup.F12,
+            detection_status=ClientDetectionStatus.NOT_CHECKED,
+        )
+        for i, mac in enumerate(MACS, start=1)
+    ]
+    session.add_all(clients)
+    await session.flush()
+    return clients
+
+
+async def _collect(
+    session: AsyncSession,
+    clients: list[MaintenanceMacList],
+    at: datetime,
+    rng: random.Random,
+    store: ClientStateStore | None = None,
+) -> None:
+    """隨機 port 模擬一輪採集；store 為寫入端 process 的記憶體（None = 其他 process）。"""
+    records = [
+        ClientRecord(
+            maintenance_id=MID, collected_at=at, client_id=c.id,
+            mac_address=c.mac_address, ip_address=c.ip_address,
+            switch_hostname="SW-01" if port else None, interface_name=port,
+            vlan_id=10 if port else None, ping_reachable=bool(port),
+        )
+        for c in clients
+        for port in [rng.choice(["Gi1/0/1", "Gi1/0/2", None])]
+    ]
+    written = await ClientCollectionService()._save_changed_records(
+        session, MID, records, at.replace(tzinfo=UTC),
+    )
+    if store is not None:
+        # 寫入端 process 在 commit 後套用
+        await session.commit()
+        store.apply(MID, written)
+
+
+async def _db_state(session: AsyncSession) -> dict[str, ClientState]:
+    state = await ClientRecordRepo(session).get_state_at(MID)
+    return {mac: ClientState.of(r) for mac, r in state.items()}
+
+
+class TestStoreSync:
+
+    async def test_applies_writes_from_other_process(self, session):
+        clients = await _clients(session)
+        rng = random.Random(34)
+        store = ClientStateStore(max_clients=100)
+        await _collect(session, clients, T0, rng)
+        await store.current_state(MID, session)
+
+        for i in range(1, 4):
+            await _collect(session, clients, T0 + timedelta(minutes=15 * i), rng)
+        with patch.object(
+            ClientRecordRepo, "get_state_at",
+            side_effect=AssertionError("full reload"),
+        ):
+            table = await store.current_state(MID, session)
+
+        assert dict(table) == await _db_state(session)
+
+    async def test_in_process_writes_advance_sync_point(self, session):
+        clients = await _clients(session)
+        rng = random.Random(35)
+        store = ClientStateStore(max_clients=100)
+        await _collect(session, clients, T0, rng)
+        await store.current_state(MID, session)
+
+        await _collect(session, clients, T0 + timedelta(minutes=15), rng, store)
+        with patch.object(
+            ClientRecordRepo, "get_written_after",
+            side_effect=AssertionError("re-read"),
+        ):
+            table = await store.current_state(MID, session)
+
+        assert dict(table) == await _db_state(session)
+
+    async def test_deleted_records_reload(self, session):
+        clients = await _clients(session)
+        rng = random.Random(36)
+        store = ClientStateStore(max_clients=100)
+        await _collect(session, clients, T0, rng)
+        await store.current_state(MID, session)
+
+        await session.execute(
+            delete(ClientRecord).where(ClientRecord.mac_address == MACS[0])
+        )
+        table = await store.current_state(MID, session)
+
+        assert MACS[0] not in table
+        assert dict(table) == await _db_state(session)
+
+    async def test_oversized_maintenance_stays_in_db(self, session):
+        clients = await _clients(session)
+        await _collect(session, clients, T0, random.Random(37))
+
+        store = ClientStateStore(max_clients=len(MACS) - 1)
+
+        assert await store.current_state(MID, session) is None
+
+
+class TestComparisonsWithStore:
+
+    async def test_summaries_unchanged(self, session):
+        clients = await _clients(session)
+        rng = random.Random(38)
+        times = [T0 + timedelta(minutes=15 * i) for i in range(6)]
+        for at in times:
+            await _collect(session, clients, at, rng)
+        service = ClientComparisonService()
+
+        expected = await service.summarize_checkpoints(
+            MID, times[:-1], times[-1], session,
+        )
+        client_comparison_service._change_logs.pop(MID, None)
+        store = ClientStateStore(max_clients=100)
+        with patch.object(
+            client_comparison_service, "get_client_state_store",
+            return_value=store,
+        ):
+            counts = await service.summarize_checkpoints(
+                MID, times[:-1], times[-1], session,
+            )
+            diff = await service._generate_comparisons_at_time(
+                MID, times[0], None, session,
+            )
+
+        assert counts == expected
+        assert MID in store._entries
+        single = await service._generate_comparisons_at_time(
+            MID, times[0], None, session,
+        )
+        key = lambda c: c.mac_address  # noqa: E731
+        assert [
+            (c.mac_address, c.is_changed, c.new_interface_name)
+            for c in sorted(diff, key=key)
+        ] == [
+            (c.mac_address, c.is_changed, c.new_interface_name)
+            for c in sorted(single, key=key)
+        ]
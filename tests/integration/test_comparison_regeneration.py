@@ -0,0 +1,164 @@
+"""
+Integration tests for the comparison regeneration queue — real SQLite DB.
+
+部分重建（只重算被異動的 MAC）後的 client_comparisons 必須與完整重建一致，
+包含清單中已刪除的 MAC（其比較結果要移除）。
+"""
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.enums import ClientDetectionStatus, TenantGroup
+from app.db.models import ClientComparison, ClientRecord, MaintenanceMacList
+from app.services import comparison_jobs
+from app.services.client_comparison_service import ClientComparisonService
+
+MID = "MAINT-REGEN"
+T0 = datetime(2026, 3, 1, 8, 0, tzinfo=UTC)
+N = 12
+_COLUMNS = (
+    "mac_address",
+    *(f"{side}_{field}" for side in ("old", "new") for field in (
+        "ip_address", "switch_hostname", "interface_name", "vlan_id",
+        "speed", "duplex", "link_status", "ping_reachable",
+    )),
+    "is_changed", "severity",
+)
+
+
+@pytest.fixture
+def factory(session_factory, session_context):
+    with (
+        patch.object(comparison_jobs, "get_session_context", session_context),
+        patch.object(comparison_jobs.settings, "comparison_regen_debounce_seconds", 0),
+    ):
+        yield session_factory
+
+    comparison_jobs._jobs.clear()
+    comparison_jobs._tasks.clear()
+
+
+def _mac(i: int) -> str:
+    return f"AA:00:00:00:09:{i:02X}"
+
+
+async def _record(s: AsyncSession, i: int, at: datetime, rng: random.Random) -> None:
+    detected = rng.random() < 0.8
+    s.add(ClientRecord(
+        maintenance_id=MID, collected_at=at, mac_address=_mac(i),
+        ip_address=f"10.0.9.{i}",
+        switch_hostname=f"SW-{rng.randint(1, 2)}" if detected else None,
+        interface_name=f"GE1/0/{rng.randint(1, 3)}" if detected else None,
+        vlan_id=rng.choice([10, 20]), speed=rng.choice(["1G", "100M"]),
+        duplex="full", link_status="up", ping_reachable=rng.random() < 0.7,
+    ))
+
+
+async def _snapshot(factory) -> dict[str, tuple]:
+    async with factory() as s:
+        rows = (await s.execute(
+            select(ClientComparison).where(ClientComparison.maintenance_id == MID)
+        )).scalars().all()
+    snapshot = {r.mac_address: tuple(getattr(r, c) for c in _COLUMNS) for r in rows}
+    assert len(snapshot) == len(rows)
+    return snapshot
+
+
+async def _full_rebuild(factory) -> dict[str, tuple]:
+    async with factory() as s:
+        service = ClientComparisonService()
+        await service.save_comparisons(
+            await service.generate_comparisons(MID, s), s,
+        )
+    return await _snapshot(factory)
+
+
+class TestPartialRegeneration:
+
+    @pytest.mark.parametrize("seed", range(5))
+    async def test_partial_rebuild_matches_full_rebuild(self, factory, seed):
+        rng = random.Random(seed)
+        async with factory() as s:
+            s.add_all(
+                MaintenanceMacList(
+                    maintenance_id=MID, mac_address=_mac(i),
+                    ip_address=f"10.0.9.{i}", tenant_group=TenantGroup.F18,
+                    detection_status=ClientDetectionStatus.NOT_CHECKED,
+                )
+                for i in range(N)
+            )
+            for i in range(N):
+                await _record(s, i, T0, rng)
+            await s.commit()
+        await _full_rebuild(factory)
+
+        # 異動：新記錄、從清單刪除、新增、改 MAC
+        touched = set(rng.sample(range(N), 4))
+        removed, added = rng.choice(sorted(touched)), N
+        renamed_from, renamed_to = rng.choice(sorted(set(range(N)) - touched)), N + 1
+        async with factory() as s:
+            for i in touched | {added, renamed_to}:
+                await _record(s, i, T0 + timedelta(minutes=5), rng)
+            await s.execute(delete(MaintenanceMacList).where(
+                MaintenanceMacList.mac_address == _mac(removed),
+            ))
+            s.add(MaintenanceMacList(
+                maintenance_id=MID, mac_address=_mac(added),
+                ip_address=f"10.0.9.{added}", tenant_group=TenantGroup.F18,
+                detection_status=ClientDetectionStatus.NOT_CHECKED,
+            ))
+            await s.execute(
+                update(MaintenanceMacList)
+                .where(MaintenanceMacList.mac_address == _mac(renamed_from))
+                .values(mac_address=_mac(renamed_to))
+            )
+            await s.commit()
+
+        for i in touched | {added}:
+            comparison_jobs.request_regeneration(MID, macs=[_mac(i).lower()])
+        comparison_jobs.request_regeneration(
+            MID, macs={_mac(renamed_from), _mac(renamed_to)},
+        )
+        job = comparison_jobs.get_regeneration(MID)
+        await comparison_jobs.wait_for_regeneration(MID)
+        assert (job.status, job.scope, job.runs) == ("done", "partial", 1)
+
+        partial = await _snapshot(factory)
+        assert _mac(removed) not in partial
+        assert _mac(renamed_from) not in partial
+        assert partial == await _full_rebuild(factory)
+
+    async def test_scope_matches_stored_mac_column(self, factory):
+        """MAC 條件直接比對欄位（可用索引）；舊資料的小寫 MAC 也要涵蓋。"""
+        scope = ClientComparisonService._record_scope(MID, {_mac(1)})
+        sql = str(select(ClientRecord.id).where(*scope).compile())
+        assert "upper" not in sql.lower()
+
+        rng = random.Random(7)
+        async with factory() as s:
+            for i in range(3):
+                s.add(MaintenanceMacList(
+                    maintenance_id=MID, mac_address=_mac(i).lower(),
+                    ip_address=f"10.0.9.{i}", tenant_group=TenantGroup.F18,
+                    detection_status=ClientDetectionStatus.NOT_CHECKED,
+                ))
+                await _record(s, i, T0, rng)
+            await s.execute(
+                update(ClientRecord).values(
+                    mac_address=func.lower(ClientRecord.mac_address),
+                )
+            )
+            await s.commit()
+        full = await _full_rebuild(factory)
+
+        comparison_jobs.request_regeneration(MID, macs=[_mac(1)])
+        job = comparison_jobs.get_regeneration(MID)
+        await comparison_jobs.wait_for_regeneration(MID)
+        assert (job.status, job.scope) == ("done", "partial")
+        assert await _snapshot(factory) == full
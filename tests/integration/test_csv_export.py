@@ -0,0 +1,221 @@
+"""
+Integration tests for streaming CSV exports — real SQLite DB.
+
+匯出以 server-side cursor 逐批讀取、逐批編碼；內容需與原本一次讀完的
+版本相同（BOM、標頭、排序、案件的最新 client 快照）。
+"""
+from __future__ import annotations
+
+import csv
+import io
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+
+from app.api.endpoints import cases, comparisons, mac_list, system_logs
+from app.api.endpoints.auth import get_current_user, require_root
+from app.core.enums import CaseStatus, ClientDetectionStatus, TenantGroup
+from app.db.models import (
+    Case,
+    ClientComparison,
+    ClientRecord,
+    LatestClientRecord,
+    MaintenanceMacList,
+    SystemLog,
+)
+from app.parsers.protocols import PingResultData
+from app.repositories.typed_records import get_typed_repo
+from app.services import client_search, csv_export
+from app.services.csv_export import stream_csv
+
+MID = "MAINT-EXPORT"
+ROOT_USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+T0 = datetime(2026, 10, 1, 8, 0, 0)
+N = 40
+
+
+@pytest.fixture
+def factory(session_factory, session_context):
+    with (
+        patch.object(csv_export, "get_session_context", session_context),
+        patch.object(csv_export, "CSV_CHUNK_ROWS", 7),
+        patch.object(mac_list, "get_session_context", session_context),
+        patch.object(client_search, "_client_search_store", None),
+    ):
+        yield session_factory
+
+
+def _mac(i: int) -> str:
+    return f"AA:00:00:00:0E:{i:02X}"
+
+
+async def _seed_clients(factory) -> None:
+    """N 個 client；3 的倍數 ping 不通，5 的倍數沒有 ping 紀錄。"""
+    async with factory() as s:
+        s.add_all(
+            MaintenanceMacList(
+                maintenance_id=MID, mac_address=_mac(i),
+                ip_address=f"10.0.14.{i}", tenant_group=TenantGroup.F12,
+                detection_status=ClientDetectionStatus.NOT_CHECKED,
+                description=f"desk {i}" if i % 2 else None,
+            )
+            for i in range(N)
+        )
+        await get_typed_repo("gnms_ping", s).save_batch("__CLIENT_PING_F12__", "", [
+            PingResultData(target=f"10.0.14.{i}", is_reachable=i % 3 != 0)
+            for i in range(N) if i % 5
+        ], MID)
+        await s.commit()
+
+
+async def _get(router, path: str, **params):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: ROOT_USER
+    app.dependency_overrides[require_root] = lambda: ROOT_USER
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        resp = await client.get(f"/api{path}", params=params)
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert resp.content.startswith("\ufeff".encode())
+    return list(csv.reader(io.StringIO(resp.content.decode("utf-8-sig"))))
+
+
+class TestStreamCsv:
+
+    async def test_rows_are_encoded_per_chunk(self, factory):
+        async with factory() as s:
+            s.add_all(
+                SystemLog(level="INFO", source="api", summary=f"log, {i}\n第二行")
+                for i in range(N)
+            )
+            await s.commit()
+
+        chunks = [
+            chunk async for chunk in stream_csv(
+                select(SystemLog).order_by(SystemLog.id),
+                ["id", "summary"],
+                lambda rows, _: ([log.id, log.summary] for (log,) in rows),
+            )
+        ]
+
+        # 標頭一段 + 每 7 列一段
+        assert len(chunks) == 1 + (N + 6) // 7
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert rows[0] == ["id", "summary"]
+        assert rows[1:] == [[str(i + 1), f"log, {i}\n第二行"] for i in range(N)]
+
+    async def test_empty_result_has_header_only(self, factory):
+        chunks = [
+            chunk async for chunk in stream_csv(
+                select(SystemLog), ["id"], lambda rows, _: [],
+            )
+        ]
+        assert b"".join(chunks).decode("utf-8-sig") == "id\r\n"
+
+
+class TestExports:
+
+    async def test_client_list(self, factory):
+        await _seed_clients(factory)
+
+        rows = await _get(mac_list.router, f"/mac-list/{MID}/export-csv")
+
+        assert rows[0][:3] == ["mac_address", "ip_address", "ping_reachable"]
+        body = rows[1:]
+        assert len(body) == N
+        # ping 未檢測 → 不可達 → 可達，同群組依 MAC
+        reach = ["未檢測", "不可達", "可達"]
+        assert body == sorted(body, key=lambda r: (reach.index(r[2]), r[0]))
+        assert body[0] == [_mac(0), "10.0.14.0", "未檢測", "F12", "", ""]
+
+        filtered = await _get(
+            mac_list.router, f"/mac-list/{MID}/export-csv", search="desk",
+        )
+        assert sorted(r[0] for r in filtered[1:]) == [
+            _mac(i) for i in range(1, N, 2)
+        ]
+
+    async def test_cases_use_latest_snapshot(self, factory):
+        await _seed_clients(factory)
+        async with factory() as s:
+            clients = (await s.execute(
+                select(MaintenanceMacList).order_by(MaintenanceMacList.id)
+            )).scalars().all()
+            for i, client in enumerate(clients):
+                s.add(Case(
+                    maintenance_id=MID, client_id=client.id,
+                    mac_address=client.mac_address, status=CaseStatus.UNASSIGNED,
+                    last_ping_reachable=i % 3 != 0,
+                    change_flags={"vlan_id": True} if i % 4 == 0 else {},
+                ))
+                if i % 2 == 0:
+                    continue
+                for hours, switch in ((0, "SW-OLD"), (1, "SW-NEW")):
+                    s.add(ClientRecord(
+                        maintenance_id=MID, client_id=client.id,
+                        mac_address=client.mac_address,
+                        collected_at=T0 + timedelta(hours=hours),
+                        switch_hostname=switch, vlan_id=100 + hours,
+                    ))
+                s.add(LatestClientRecord(
+                    maintenance_id=MID, client_id=client.id,
+                    mac_address=client.mac_address, data_hash="x",
+                    collected_at=T0 + timedelta(hours=1), last_checked_at=T0,
+                ))
+            await s.commit()
+
+        rows = await _get(cases.router, f"/cases/{MID}/export-csv")
+
+        assert rows[0] == cases._csv_header()
+        by_mac = {r[1]: r for r in rows[1:]}
+        assert len(by_mac) == N
+        assert by_mac[_mac(1)][9] == "SW-NEW"
+        assert by_mac[_mac(1)][14] == "101"
+        assert by_mac[_mac(2)][9] == ""
+        assert by_mac[_mac(4)][16] != ""
+        assert [r[8] for r in rows[1:]] == sorted(
+            (r[8] for r in rows[1:]), key=["否", "是"].index,
+        )
+
+    async def test_comparisons_and_system_logs(self, factory):
+        async with factory() as s:
+            s.add_all(
+                ClientComparison(
+                    maintenance_id=MID, mac_address=_mac(i),
+                    is_changed=i % 2 == 0, old_vlan_id=10, new_vlan_id=10 + i % 2,
+                    differences={"vlan_id": True} if i % 2 else None,
+                    collected_at=T0,
+                )
+                for i in reversed(range(N))
+            )
+            s.add_all(
+                SystemLog(
+                    level="ERROR" if i % 2 else "INFO", source="api",
+                    summary=f"log {i}", created_at=T0 + timedelta(minutes=i),
+                )
+                for i in range(N)
+            )
+            await s.commit()
+
+        rows = await _get(
+            comparisons.router, f"/comparisons/export-csv/{MID}", changed_only=True,
+        )
+        header = rows[0]
+        assert [r[0] for r in rows[1:]] == [_mac(i) for i in range(0, N, 2)]
+        assert rows[1][header.index("new_vlan_id")] == "10"
+        assert rows[1][header.index("old_ping_reachable")] == ""
+
+        rows = await _get(system_logs.router, "/system-logs/export-csv", level="error")
+        assert [r[4] for r in rows[1:]] == [
+            f"log {i}" for i in reversed(range(N)) if i % 2
+        ]
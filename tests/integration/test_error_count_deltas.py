@@ -0,0 +1,127 @@
+"""
+Integration tests for write-time CRC deltas — real SQLite DB.
+
+InterfaceErrorRecordRepo.save_batch fills prev_crc_errors / crc_delta /
+first_growth_at; ErrorCountIndicator.evaluate filters on crc_delta > 0.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import InterfaceErrorRecord, MaintenanceDeviceList
+from app.indicators.error_count import ErrorCountIndicator
+from app.parsers.protocols import InterfaceErrorData
+from app.repositories.rollups import rebuild_rollups
+from app.repositories.typed_records import InterfaceErrorRecordRepo
+
+MID = "MAINT-CRC"
+
+
+@pytest.fixture
+async def session(session_factory):
+    async with session_factory() as s:
+        s.add(MaintenanceDeviceList(maintenance_id=MID, new_hostname="SW-01"))
+        await s.flush()
+        yield s
+
+
+async def _save(session: AsyncSession, **crc: int) -> None:
+    await InterfaceErrorRecordRepo(session).save_batch("SW-01", "", [
+        InterfaceErrorData(interface_name=name.replace("_", "/"), crc_errors=v)
+        for name, v in crc.items()
+    ], MID)
+
+
+async def _latest_rows(session: AsyncSession) -> dict[str, InterfaceErrorRecord]:
+    rows = await InterfaceErrorRecordRepo(session).get_latest_per_device(MID)
+    return {r.interface_name: r for r in rows}
+
+
+class TestWriteTimeDeltas:
+
+    async def test_first_collection_has_no_history(self, session):
+        await _save(session, Gi1_0_1=5)
+
+        row = (await _latest_rows(session))["GE1/0/1"]
+        assert (row.prev_crc_errors, row.crc_delta, row.first_growth_at) == (
+            None, 0, None,
+        )
+
+    async def test_delta_and_sticky_first_growth(self, session):
+        await _save(session, Gi1_0_1=5, Gi1_0_2=0)
+        await _save(session, Gi1_0_1=8, Gi1_0_2=0)
+        grown = (await _latest_rows(session))["GE1/0/1"]
+        assert (grown.prev_crc_errors, grown.crc_delta) == (5, 3)
+        first = grown.first_growth_at
+        assert first == grown.collected_at
+
+        # 下一個變化點不再增長：delta 歸零但 first_growth_at 沿用
+        await _save(session, Gi1_0_1=8, Gi1_0_2=1)
+        rows = await _latest_rows(session)
+        assert rows["GE1/0/1"].crc_delta == 0
+        assert rows["GE1/0/1"].first_growth_at == first
+        assert rows["GE1/0/2"].crc_delta == 1
+
+    async def test_backfill_recomputes_deltas(self, session):
+        await _save(session, Gi1_0_1=1)
+        await _save(session, Gi1_0_1=4)
+        # 模擬 migration 前的舊資料：衍生欄位為預設值
+        await session.execute(update(InterfaceErrorRecord).values(
+            prev_crc_errors=None, crc_delta=0, first_growth_at=None,
+        ))
+
+        await rebuild_rollups(session, "get_error_count")
+
+        result = await session.execute(
+            select(InterfaceErrorRecord.crc_delta)
+            .order_by(InterfaceErrorRecord.collected_at)
+        )
+        assert result.scalars().all() == [0, 3]
+
+
+class TestEvaluateOnStoredDeltas:
+
+    async def test_latest_change_point_growth_fails(self, session):
+        await _save(session, Gi1_0_1=5)
+        await _save(session, Gi1_0_1=9)
+
+        result = await ErrorCountIndicator().evaluate(MID, session)
+
+        assert result.fail_count == 1
+        growing = result.failures[0]["data"]["growing_interfaces"]
+        assert growing[0]["delta"] == 4
+
+    async def test_growth_before_latest_change_point_passes(self, session):
+        await _save(session, Gi1_0_1=5)
+        await _save(session, Gi1_0_1=9)
+        await _save(session, Gi1_0_1=9, Gi1_0_2=0)
+
+        result = await ErrorCountIndicator().evaluate(MID, session)
+
+        assert result.pass_count == 1
+
+    async def test_sliding_window_keeps_recent_growth(self, session):
+        await _save(session, Gi1_0_1=5)
+        await _save(session, Gi1_0_1=9)
+        await _save(session, Gi1_0_1=9, Gi1_0_2=0)
+
+        with patch(
+            "app.indicators.error_count.get_threshold", return_value=60,
+        ):
+            result = await ErrorCountIndicator().evaluate(MID, session)
+        assert result.fail_count == 1
+
+        # 增長發生在時間窗之前 → 通過
+        await session.execute(update(InterfaceErrorRecord).values(
+            collected_at=InterfaceErrorRecord.collected_at - timedelta(hours=2),
+        ))
+        with patch(
+            "app.indicators.error_count.get_threshold", return_value=60,
+        ):
+            result = await ErrorCountIndicator().evaluate(MID, session)
+        assert result.pass_count == 1
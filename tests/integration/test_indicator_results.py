@@ -0,0 +1,191 @@
+"""
+Integration tests for stored indicator results — real SQLite DB.
+
+IndicatorService.evaluate_maintenances（背景評估器）→ indicator_results
+→ get_results（讀取端點）查詢、過期 / 失效後退回即時評估。
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints import dashboard, maintenance_devices
+from app.db.models import (
+    IndicatorResult,
+    MaintenanceDeviceList,
+    VersionExpectation,
+)
+from app.parsers.protocols import FanStatusData
+from app.repositories.typed_records import get_typed_repo
+from app.services import threshold_service
+from app.services.indicator_service import IndicatorService
+from app.services.threshold_service import update_thresholds
+
+MIDS = ["MAINT-A", "MAINT-B"]
+ROOT_USER = {"user_id": 1, "username": "root", "role": "ROOT", "is_root": True}
+
+
+@pytest.fixture
+async def session(session_factory):
+    async with session_factory() as s:
+        for mid in MIDS:
+            s.add(MaintenanceDeviceList(maintenance_id=mid, new_hostname="SW-01"))
+        await s.flush()
+        await get_typed_repo("get_fan", s).save_batch("SW-01", "", [
+            FanStatusData(fan_id="1", status="ok"),
+            FanStatusData(fan_id="2", status="fail"),
+        ], "MAINT-A")
+        yield s
+
+    # 閾值快取是模組層級，避免覆寫值外洩到其他測試
+    for mid in MIDS:
+        threshold_service._cache.pop(mid, None)
+
+
+async def _stored_counts(session: AsyncSession) -> dict[str, int]:
+    result = await session.execute(
+        select(IndicatorResult.maintenance_id, func.count())
+        .group_by(IndicatorResult.maintenance_id)
+    )
+    return dict(result.all())
+
+
+class TestBatchEvaluation:
+
+    async def test_stores_latest_result_per_indicator(self, session):
+        service = IndicatorService()
+        await service.evaluate_maintenances(MIDS, session)
+        await service.evaluate_maintenances(MIDS, session)
+
+        indicator_count = len(service.get_all_indicators())
+        assert await _stored_counts(session) == dict.fromkeys(
+            MIDS, indicator_count,
+        )
+
+    async def test_read_path_uses_stored_results(self, session):
+        service = IndicatorService()
+        evaluated = await service.evaluate_maintenances(MIDS, session)
+
+        with patch.object(
+            service, "evaluate_all", side_effect=AssertionError("live eval"),
+        ):
+            results, evaluated_at = await service.get_results("MAINT-A", session)
+
+        assert evaluated_at.tzinfo is not None
+        fan = results["fan"]
+        assert (fan.pass_count, fan.fail_count) == (
+            evaluated["MAINT-A"]["fan"].pass_count,
+            evaluated["MAINT-A"]["fan"].fail_count,
+        )
+        assert fan.failures == evaluated["MAINT-A"]["fan"].failures
+
+    async def test_summary_reports_evaluated_at(self, session):
+        service = IndicatorService()
+        await service.evaluate_maintenances(MIDS, session)
+        _, evaluated_at = await service.get_results("MAINT-A", session)
+
+        summary = await service.get_dashboard_summary("MAINT-A", session)
+
+        assert summary["evaluated_at"] == evaluated_at.isoformat()
+        assert summary["indicators"]["fan"]["fail_count"] == 1
+
+
+    async def test_grouped_matches_per_maintenance(self, session):
+        session.add(VersionExpectation(
+            maintenance_id="MAINT-B", hostname="SW-01", expected_versions="R1",
+        ))
+        await session.flush()
+        service = IndicatorService()
+
+        grouped = await service.evaluate_maintenances(MIDS, session)
+
+        for mid in MIDS:
+            live = await service.evaluate_all(mid, session)
+            assert {n: r.model_dump() for n, r in grouped[mid].items()} == {
+                n: r.model_dump() for n, r in live.items()
+            }
+
+    async def test_queries_do_not_grow_with_maintenances(self, session, engine):
+        statements: list[str] = []
+
+        def capture(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        service = IndicatorService()
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await service.evaluate_maintenances(MIDS[:1], session)
+            one = len(statements)
+            statements.clear()
+            await service.evaluate_maintenances(MIDS, session)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert len(statements) == one
+
+
+class TestInvalidation:
+
+    async def _evaluate(self, session) -> None:
+        await IndicatorService().evaluate_maintenances(MIDS, session)
+        await session.commit()
+
+    async def test_device_list_write_invalidates(self, session):
+        await self._evaluate(session)
+        device_id = await session.scalar(
+            select(MaintenanceDeviceList.id)
+            .where(MaintenanceDeviceList.maintenance_id == "MAINT-A")
+        )
+
+        with patch.object(maintenance_devices, "write_log", AsyncMock()):
+            await maintenance_devices.delete_device(
+                "MAINT-A", device_id, ROOT_USER, session,
+            )
+
+        assert set(await _stored_counts(session)) == {"MAINT-B"}
+
+    async def test_ignore_toggle_invalidates(self, session):
+        await self._evaluate(session)
+
+        await dashboard.toggle_device_ignore(
+            "MAINT-B", "SW-01", "fan", ROOT_USER, session,
+        )
+
+        assert set(await _stored_counts(session)) == {"MAINT-A"}
+
+
+class TestFallbackToLive:
+
+    async def test_missing_results_evaluate_live(self, session):
+        results, _ = await IndicatorService().get_results("MAINT-A", session)
+
+        assert results["fan"].fail_count == 1
+        assert await _stored_counts(session) == {}
+
+    async def test_stale_results_evaluate_live(self, session):
+        service = IndicatorService()
+        await service.evaluate_maintenances(MIDS, session)
+        await session.execute(update(IndicatorResult).values(
+            evaluated_at=datetime.now(UTC) - timedelta(hours=1),
+        ))
+
+        with patch.object(service, "evaluate_all", return_value={}) as live:
+            await service.get_results("MAINT-A", session)
+        live.assert_awaited_once()
+
+    async def test_threshold_update_invalidates(self, session):
+        service = IndicatorService()
+        await service.evaluate_maintenances(MIDS, session)
+
+        await update_thresholds(
+            session, "MAINT-A", {"error_count_growth_window_minutes": 30},
+        )
+
+        assert await _stored_counts(session) == {
+            "MAINT-B": len(service.get_all_indicators()),
+        }
@@ -0,0 +1,180 @@
+"""
+Integration tests for indicator rollups — real SQLite DB.
+
+save_batch → indicator_rollups → time series / bucketed queries,
+plus rebuild_rollups (backfill) reproducing the write-time rollups.
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IndicatorRollup
+from app.indicators.error_count import ErrorCountIndicator
+from app.indicators.fan import FanIndicator
+from app.indicators.transceiver import TransceiverIndicator
+from app.parsers.protocols import (
+    FanStatusData,
+    InterfaceErrorData,
+    TransceiverChannelData,
+    TransceiverData,
+)
+from app.repositories.rollups import rebuild_rollups
+from app.repositories.typed_records import get_typed_repo
+
+MID = "MAINT-ROLLUP"
+
+
+async def _rollups(session: AsyncSession, collection_type: str) -> list[tuple]:
+    result = await session.execute(
+        select(
+            IndicatorRollup.batch_id,
+            IndicatorRollup.metric,
+            IndicatorRollup.sample_count,
+            IndicatorRollup.value_sum,
+            IndicatorRollup.value_min,
+            IndicatorRollup.value_max,
+        )
+        .where(IndicatorRollup.collection_type == collection_type)
+        .order_by(IndicatorRollup.batch_id, IndicatorRollup.metric)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def _gbic(name: str, rx: float, temp: float = 40.0) -> TransceiverData:
+    return TransceiverData(
+        interface_name=name, temperature=temp, voltage=3.3,
+        channels=[TransceiverChannelData(channel=1, tx_power=-2.0, rx_power=rx)],
+    )
+
+
+class TestWriteTimeRollups:
+
+    async def test_transceiver_rollup_excludes_management(self, session):
+        repo = get_typed_repo("get_gbic_details", session)
+        await repo.save_batch("SW-01", "", [
+            _gbic("Te1/0/1", -5.0, temp=30.0),
+            _gbic("Te1/0/2", -7.0, temp=50.0),
+            _gbic("Mgmt0", -40.0, temp=99.0),
+        ], MID)
+
+        rows = {r[1]: r[2:] for r in await _rollups(session, "get_gbic_details")}
+        assert rows["rx_power"] == (2, -12.0, -7.0, -5.0)
+        assert rows["temperature"] == (2, 80.0, 30.0, 50.0)
+
+    async def test_unchanged_round_writes_no_rollup(self, session):
+        repo = get_typed_repo("get_fan", session)
+        items = [FanStatusData(fan_id="1", status="ok")]
+        await repo.save_batch("SW-01", "", items, MID)
+        await repo.save_batch("SW-01", "", items, MID)
+
+        assert len(await _rollups(session, "get_fan")) == 1
+
+    async def test_fan_not_ok_count(self, session):
+        repo = get_typed_repo("get_fan", session)
+        await repo.save_batch("SW-01", "", [
+            FanStatusData(fan_id="1", status="ok"),
+            FanStatusData(fan_id="2", status="fail"),
+            FanStatusData(fan_id="3", status="absent"),
+        ], MID)
+
+        [(_, metric, count, total, _, _)] = await _rollups(session, "get_fan")
+        assert (metric, count, total) == ("status_not_ok", 3, 2.0)
+
+    async def test_crc_growth_against_previous_batch(self, session):
+        repo = get_typed_repo("get_error_count", session)
+        await repo.save_batch("SW-01", "", [
+            InterfaceErrorData(interface_name="Gi1/0/1", crc_errors=10),
+            InterfaceErrorData(interface_name="Gi1/0/2", crc_errors=5),
+        ], MID)
+        await repo.save_batch("SW-01", "", [
+            InterfaceErrorData(interface_name="Gi1/0/1", crc_errors=13),
+            InterfaceErrorData(interface_name="Gi1/0/2", crc_errors=0),
+            InterfaceErrorData(interface_name="Gi1/0/3", crc_errors=7),
+        ], MID)
+
+        growth = [
+            r[2:] for r in await _rollups(session, "get_error_count")
+            if r[1] == "crc_growth"
+        ]
+        # 首次採集無歷史；第二次：+3、計數器歸零視為 0、新介面不計
+        assert growth == [(0, 0.0, None, None), (2, 3.0, 0.0, 3.0)]
+
+
+class TestRollupReadPath:
+
+    async def test_time_series_reads_rollups(self, session):
+        fan_repo = get_typed_repo("get_fan", session)
+        await fan_repo.save_batch("SW-01", "", [
+            FanStatusData(fan_id="1", status="ok"),
+            FanStatusData(fan_id="2", status="fail"),
+        ], MID)
+        await fan_repo.save_batch("SW-01", "", [
+            FanStatusData(fan_id="1", status="ok"),
+            FanStatusData(fan_id="2", status="ok"),
+        ], MID)
+
+        points = await FanIndicator().get_time_series(
+            limit=10, session=session, maintenance_id=MID,
+        )
+        assert [p.values["status_ok"] for p in points] == [50.0, 100.0]
+
+        latest_only = await FanIndicator().get_time_series(
+            limit=1, session=session, maintenance_id=MID,
+        )
+        assert [p.values["status_ok"] for p in latest_only] == [100.0]
+
+    async def test_error_count_series_is_crc_total(self, session):
+        repo = get_typed_repo("get_error_count", session)
+        await repo.save_batch("SW-01", "", [
+            InterfaceErrorData(interface_name="Gi1/0/1", crc_errors=4),
+            InterfaceErrorData(interface_name="Gi1/0/2", crc_errors=6),
+        ], MID)
+
+        points = await ErrorCountIndicator().get_time_series(
+            limit=10, session=session, maintenance_id=MID,
+        )
+        assert [p.values["crc_errors"] for p in points] == [10.0]
+
+    async def test_bucketed_series_merges_rollups(self, session):
+        repo = get_typed_repo("get_gbic_details", session)
+        await repo.save_batch("SW-01", "", [_gbic("Te1/0/1", -4.0)], MID)
+        await repo.save_batch("SW-02", "", [
+            _gbic("Te1/0/1", -6.0), _gbic("Te1/0/2", -11.0),
+        ], MID)
+
+        now = datetime.now(UTC)
+        buckets = await TransceiverIndicator().get_bucketed_series(
+            session, MID, now - timedelta(hours=1), now + timedelta(minutes=1), 1,
+        )
+        assert len(buckets) == 1
+        assert buckets[0].count == 3
+        assert buckets[0].min["rx_power"] == -11.0
+        assert buckets[0].avg["rx_power"] == pytest.approx(-7.0)
+        assert buckets[0].max["rx_power"] == -4.0
+
+
+class TestBackfill:
+
+    async def test_rebuild_matches_write_time(self, session):
+        repo = get_typed_repo("get_error_count", session)
+        for crc in (1, 4, 4, 9):
+            await repo.save_batch("SW-01", "", [
+                InterfaceErrorData(interface_name="Gi1/0/1", crc_errors=crc),
+                InterfaceErrorData(interface_name="Gi1/0/2", crc_errors=crc * 2),
+            ], MID)
+        written = await _rollups(session, "get_error_count")
+
+        await session.execute(delete(IndicatorRollup))
+        assert await rebuild_rollups(session, "get_error_count") == 3
+        assert await _rollups(session, "get_error_count") == written
+
+        # 冪等：再跑一次結果相同
+        await rebuild_rollups(session, "get_error_count", maintenance_id=MID)
+        assert await _rollups(session, "get_error_count") == written
+
+    async def test_types_without_rollups_are_skipped(self, session):
+        assert await rebuild_rollups(session, "get_version") == 0
@@ -0,0 +1,443 @@
+"""
+Integration tests for keyset pagination of the list endpoints — real SQLite DB.
+
+以 cursor 逐頁取完的結果必須與一次取完（offset 模式）的順序完全相同，
+排序鍵相同的列（同一時間的日誌、同一 ping 狀態）不可重複或遺漏。
+"""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, select
+
+from app.api.endpoints import comparisons, mac_list, system_logs
+from app.api.endpoints.auth import get_current_user, require_root
+from app.core.enums import CaseStatus, ClientDetectionStatus, TenantGroup
+from app.db.base import get_async_session
+from app.db.models import (
+    Case,
+    ClientCategory,
+    ClientCategoryMember,
+    ClientComparison,
+    MaintenanceMacList,
+    SystemLog,
+)
+from app.db.pagination import SortKey, paginate
+from app.main import create_app
+from app.parsers.protocols import PingResultData
+from app.repositories.typed_records import get_typed_repo
+from app.services import client_search
+from app.services.case_service import (
+    _PING_RANK,
+    TRACKED_ATTRIBUTES,
+    CaseService,
+    _change_rank,
+)
+
+MID = "MAINT-PAGE"
+ROOT_USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+T0 = datetime(2026, 10, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def factory(session_factory, session_context):
+    with (
+        patch.object(mac_list, "get_session_context", session_context),
+        patch.object(client_search, "_client_search_store", None),
+    ):
+        yield session_factory
+
+
+async def _get(factory, router, path: str, **params):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: ROOT_USER
+    app.dependency_overrides[require_root] = lambda: ROOT_USER
+
+    async def session_override():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        return await client.get(f"/api{path}", params=params)
+
+
+async def _seed_clients(factory, rng: random.Random, n: int) -> None:
+    """ping 狀態隨機（含無紀錄），讓同一排序群組內有大量平手。"""
+    async with factory() as s:
+        s.add_all(
+            MaintenanceMacList(
+                maintenance_id=MID,
+                mac_address=f"AA:00:00:00:{i >> 8:02X}:{i & 0xFF:02X}",
+                ip_address=f"10.9.{i >> 8}.{i & 0xFF}",
+                tenant_group=TenantGroup.F18,
+                detection_status=rng.choice(list(ClientDetectionStatus)),
+                description=rng.choice(["desk", "lab", None]),
+            )
+            for i in rng.sample(range(n), n)
+        )
+        await get_typed_repo("gnms_ping", s).save_batch(
+            "__CLIENT_PING_F18__", "",
+            [
+                PingResultData(
+                    target=f"10.9.{i >> 8}.{i & 0xFF}",
+                    is_reachable=rng.random() < 0.6,
+                )
+                for i in range(n) if rng.random() < 0.7
+            ],
+            MID,
+        )
+        await s.commit()
+
+
+class TestPaginateUtility:
+
+    @pytest.mark.parametrize("seed", range(5))
+    async def test_mixed_directions_match_full_order(self, factory, seed):
+        rng = random.Random(seed)
+        async with factory() as s:
+            s.add_all(
+                SystemLog(
+                    level=rng.choice(["INFO", "ERROR"]), source="api",
+                    summary=f"log {i}",
+                    created_at=T0 + timedelta(seconds=rng.randrange(5)),
+                )
+                for i in range(60)
+            )
+            await s.commit()
+
+            stmt = select(SystemLog)
+            keys = [
+                SortKey(SystemLog.level),
+                SortKey(SystemLog.created_at, descending=True),
+                SortKey(SystemLog.id),
+            ]
+            full = await paginate(s, stmt, keys, limit=1000)
+            assert full.next_cursor is None
+
+            limit = rng.randrange(1, 9)
+            pages, cursor = [], None
+            while True:
+                page = await paginate(s, stmt, keys, limit=limit, cursor=cursor)
+                assert len(page.rows) <= limit
+                pages.extend(log.id for log in page.scalars())
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+
+        assert pages == [log.id for log in full.scalars()]
+
+    async def test_offset_path_is_kept(self, factory):
+        async with factory() as s:
+            s.add_all(
+                SystemLog(level="INFO", source="api", summary=f"log {i}",
+                          created_at=T0)
+                for i in range(10)
+            )
+            await s.commit()
+
+            keys = [SortKey(SystemLog.id)]
+            page = await paginate(s, select(SystemLog), keys, limit=3, offset=6)
+            assert [log.summary for log in page.scalars()] == [
+                "log 6", "log 7", "log 8",
+            ]
+            assert page.next_cursor is not None
+            last = await paginate(
+                s, select(SystemLog), keys, limit=3, cursor=page.next_cursor,
+            )
+            assert [log.summary for log in last.scalars()] == ["log 9"]
+            assert last.next_cursor is None
+
+
+class TestSystemLogs:
+
+    async def test_cursor_pages_match_offset_pages(self, factory):
+        rng = random.Random(7)
+        async with factory() as s:
+            s.add_all(
+                SystemLog(
+                    level="ERROR", source="api", summary=f"log {i}",
+                    created_at=T0 + timedelta(minutes=rng.randrange(10)),
+                )
+                for i in range(45)
+            )
+            await s.commit()
+
+        resp = await _get(factory, system_logs.router, "/system-logs", page_size=200)
+        expected = [item["id"] for item in resp.json()["items"]]
+        assert len(expected) == 45
+
+        ids, cursor, first = [], None, True
+        while True:
+            params = {"page_size": 10}
+            if cursor:
+                params["cursor"] = cursor
+            body = (await _get(
+                factory, system_logs.router, "/system-logs", **params,
+            )).json()
+            assert (body["total"] is None) is not first
+            first = False
+            ids.extend(item["id"] for item in body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert ids == expected
+
+    async def test_invalid_cursor_is_400(self, factory):
+        resp = await _get(
+            factory, system_logs.router, "/system-logs", cursor="not-a-cursor",
+        )
+        assert resp.status_code == 400
+
+
+class TestClientList:
+
+    @pytest.mark.parametrize("path", ["", "/detailed"])
+    async def test_cursor_pages_match_single_page(self, factory, path):
+        await _seed_clients(factory, random.Random(3), 120)
+
+        full = await _get(factory, mac_list.router, f"/mac-list/{MID}{path}")
+        assert "X-Next-Cursor" not in full.headers
+        expected = [c["id"] for c in full.json()]
+        assert len(expected) == 120
+
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 17}
+            if cursor:
+                params["cursor"] = cursor
+            resp = await _get(
+                factory, mac_list.router, f"/mac-list/{MID}{path}", **params,
+            )
+            assert resp.status_code == 200
+            ids.extend(c["id"] for c in resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+        assert ids == expected
+
+    async def test_filtered_detailed_pages(self, factory):
+        await _seed_clients(factory, random.Random(4), 80)
+        params = {"filter_status": "DETECTED", "search": "desk"}
+
+        full = await _get(
+            factory, mac_list.router, f"/mac-list/{MID}/detailed", **params,
+        )
+        page = await _get(
+            factory, mac_list.router, f"/mac-list/{MID}/detailed",
+            limit=5, **params,
+        )
+        rest = await _get(
+            factory, mac_list.router, f"/mac-list/{MID}/detailed",
+            limit=1000, cursor=page.headers["X-Next-Cursor"], **params,
+        )
+        assert [c["id"] for c in page.json() + rest.json()] == [
+            c["id"] for c in full.json()
+        ]
+        assert len(full.json()) > 5
+        assert all(c["detection_status"] == "DETECTED" for c in full.json())
+
+
+class TestCors:
+
+    async def test_next_cursor_header_is_exposed(self):
+        # 跨來源的前端須能讀到回應標頭中的下一頁游標
+        async with AsyncClient(
+            transport=ASGITransport(app=create_app()), base_url="http://test",
+        ) as client:
+            resp = await client.get(
+                "/health", headers={"Origin": "http://frontend.test"},
+            )
+        assert resp.headers["access-control-expose-headers"] == "X-Next-Cursor"
+
+
+class TestComparisonList:
+
+    async def test_pages_then_undetected_members_on_last_page(self, factory):
+        async with factory() as s:
+            s.add_all(
+                ClientComparison(
+                    maintenance_id=MID,
+                    mac_address=f"AA:00:00:00:0C:{i:02X}",
+                    collected_at=T0 + timedelta(minutes=i % 4),
+                    is_changed=i % 3 == 0,
+                    new_ip_address=f"10.0.12.{i}",
+                )
+                for i in range(23)
+            )
+            category = ClientCategory(
+                maintenance_id=MID, name="VIP", is_active=True,
+            )
+            s.add(category)
+            await s.flush()
+            s.add_all([
+                ClientCategoryMember(
+                    category_id=category.id, mac_address="AA:00:00:00:0C:01",
+                ),
+                ClientCategoryMember(
+                    category_id=category.id, mac_address="aa:00:00:00:0c:ff",
+                ),
+            ])
+            await s.commit()
+
+        path = f"/comparisons/list/{MID}"
+        full = (await _get(factory, comparisons.router, path)).json()
+        assert full["next_cursor"] is None
+        assert full["results"][-1]["mac_address"] == "AA:00:00:00:0C:FF"
+
+        results, cursor = [], None
+        while True:
+            params = {"limit": 6}
+            if cursor:
+                params["cursor"] = cursor
+            body = (await _get(factory, comparisons.router, path, **params)).json()
+            results.extend(body["results"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert sorted(r["mac_address"] for r in results) == sorted(
+            r["mac_address"] for r in full["results"]
+        )
+        async with factory() as s:
+            stored = (await s.execute(select(ClientComparison))).scalars().all()
+        stored.sort(key=lambda c: (c.collected_at, c.id), reverse=True)
+        assert [r["id"] for r in results[:-1]] == [c.id for c in stored]
+        # 未偵測成員只出現一次，且在最後一頁
+        assert [r["mac_address"] for r in results if r["id"] is None] == [
+            "AA:00:00:00:0C:FF",
+        ]
+        assert results[-1]["id"] is None
+
+    async def test_page_query_reads_index_order(self, engine, factory):
+        """分頁鍵為欄位本身：依 ix_cc_mid_collected_id 順序讀取，不另外排序。"""
+        async with factory() as s:
+            s.add_all(
+                ClientComparison(
+                    maintenance_id=MID, mac_address=f"AA:00:00:00:0D:{i:02X}",
+                    collected_at=T0 + timedelta(minutes=i % 3),
+                )
+                for i in range(10)
+            )
+            await s.commit()
+
+        statements: list[tuple[str, tuple]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "FROM client_comparisons" in statement and "LIMIT" in statement:
+                statements.append((statement, parameters))
+
+        path = f"/comparisons/list/{MID}"
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            first = await _get(factory, comparisons.router, path, limit=4)
+            await _get(
+                factory, comparisons.router, path,
+                limit=4, cursor=first.json()["next_cursor"],
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert len(statements) == 2
+        async with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = " ".join(
+                    row[-1] for row in (await conn.exec_driver_sql(
+                        f"EXPLAIN QUERY PLAN {statement}", parameters,
+                    )).all()
+                )
+                assert "ix_cc_mid_collected_id" in plan
+                assert "TEMP B-TREE" not in plan
+
+
+class TestCaseList:
+
+    async def _seed(self, factory, rng: random.Random, n: int) -> None:
+        """change_flags / ping 狀態隨機，排序值如排程寫入時一樣預先算好。"""
+        await _seed_clients(factory, rng, n)
+        async with factory() as s:
+            clients = (await s.execute(
+                select(MaintenanceMacList)
+                .where(MaintenanceMacList.maintenance_id == MID)
+            )).scalars().all()
+            for client in clients:
+                flags = {
+                    attr: rng.random() < 0.2 for attr in TRACKED_ATTRIBUTES
+                }
+                ping = rng.choice([True, False, None])
+                s.add(Case(
+                    maintenance_id=MID, client_id=client.id,
+                    mac_address=client.mac_address,
+                    status=rng.choice([CaseStatus.ASSIGNED, CaseStatus.RESOLVED]),
+                    change_flags=flags, change_rank=_change_rank(flags),
+                    last_ping_reachable=ping, ping_rank=_PING_RANK[ping],
+                ))
+            await s.commit()
+
+    async def test_cursor_pages_follow_change_priority(self, factory):
+        await self._seed(factory, random.Random(11), 80)
+        service = CaseService()
+        pages, cursor = [], None
+        async with factory() as s:
+            while True:
+                page = await service.get_cases(MID, s, page_size=7, cursor=cursor)
+                pages.extend(page["cases"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            full = await service.get_cases(MID, s, page_size=1000)
+
+        assert [c["id"] for c in pages] == [c["id"] for c in full["cases"]]
+        assert len(pages) == full["total"]
+        assert all(c["status"] != "RESOLVED" for c in pages)
+
+        # 變化數量多 → 逐級比較屬性（有變化在前）→ ping 未知 / 不可達 → MAC
+        def expected(c):
+            changed = [t["has_change"] for t in c["change_tags"]]
+            ping = {None: 0, False: 1, True: 2}[c["last_ping_reachable"]]
+            return (-sum(changed), [not x for x in changed], ping, c["mac_address"])
+
+        assert pages == sorted(pages, key=expected)
+
+    async def test_page_query_reads_index_order(self, engine, factory):
+        await self._seed(factory, random.Random(3), 30)
+        statements: list[tuple[str, tuple]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "FROM cases" in statement and "LIMIT" in statement:
+                statements.append((statement, parameters))
+
+        service = CaseService()
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with factory() as s:
+                first = await service.get_cases(MID, s, page_size=5)
+                await service.get_cases(
+                    MID, s, page_size=5, cursor=first["next_cursor"],
+                )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+        assert len(statements) == 2
+        async with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = " ".join(
+                    row[-1] for row in (await conn.exec_driver_sql(
+                        f"EXPLAIN QUERY PLAN {statement}", parameters,
+                    )).all()
+                )
+                assert "ix_cases_mid_rank" in plan
+                assert "TEMP B-TREE" not in plan
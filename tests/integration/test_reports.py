@@ -0,0 +1,341 @@
+"""
+Integration tests for report generation — real SQLite DB.
+
+報告只評估一次指標；已儲存的結果、採集錯誤、忽略設定不變時沿用渲染好的卡片，
+任一變動則重新產生；大量失敗項目時渲染仍在一秒內完成。
+端點：背景渲染的產物依資料版本存檔、以 ETag 回 304、同時的相同請求只渲染一次；
+產生時間在回傳時填入，不寫進產物。
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import update
+
+from app.api.endpoints import reports
+from app.api.endpoints.auth import get_current_user
+from app.db.base import get_async_session
+from app.db.models import (
+    CollectionError,
+    IndicatorResult,
+    MaintenanceDeviceList,
+)
+from app.services import report_jobs, report_service
+from app.services.indicator_service import IndicatorService
+from app.services.report_jobs import GENERATED_AT_MARKER, ArtifactStore
+from app.services.report_service import ReportService
+
+MID = "MAINT-REPORT"
+USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+
+
+@pytest.fixture
+async def factory(session_factory, session_context, tmp_path):
+    async with session_factory() as s:
+        s.add_all(
+            MaintenanceDeviceList(maintenance_id=MID, new_hostname=f"SW-{i:02d}")
+            for i in range(3)
+        )
+        await s.commit()
+
+    with (
+        patch.object(report_service, "_cache", OrderedDict()),
+        patch.object(report_jobs, "get_session_context", session_context),
+        patch.object(report_jobs, "_store", ArtifactStore(tmp_path)),
+    ):
+        yield session_factory
+
+    report_jobs._tasks.clear()
+
+
+async def _store_results(factory, fan_failures: list[dict]) -> None:
+    """模擬背景評估器：每輪以新的 evaluated_at 覆寫。"""
+    now = datetime.now(UTC).replace(tzinfo=None)
+    async with factory() as s:
+        await s.execute(IndicatorResult.__table__.delete())
+        for ind in IndicatorService().get_all_indicators():
+            failures = fan_failures if ind.indicator_type == "fan" else []
+            passes = [{"device": "SW-00", "reason": "ok"}]
+            s.add(IndicatorResult(
+                maintenance_id=MID, indicator_type=ind.indicator_type,
+                pass_rates={}, total_count=len(failures) + 1, pass_count=1,
+                fail_count=len(failures),
+                details={"failures": failures, "passes": passes},
+                evaluated_at=now,
+            ))
+        await s.commit()
+
+
+async def _report(factory, include_details: bool = True) -> str:
+    async with factory() as s:
+        return await ReportService().generate_html_report(MID, include_details, s)
+
+
+class TestReport:
+
+    async def test_evaluates_once(self, factory):
+        await _store_results(factory, [{"device": "SW-01", "reason": "<fail>"}])
+
+        with patch.object(
+            IndicatorService, "get_results", wraps=IndicatorService().get_results,
+        ) as get_results:
+            html = await _report(factory)
+        assert get_results.call_count == 1
+        assert "&lt;fail&gt;" in html
+        assert "❌ 未通過項目 (1)" in html
+
+    async def test_cards_cached_until_data_changes(self, factory):
+        await _store_results(factory, [{"device": "SW-01", "reason": "down"}])
+
+        with patch.object(
+            IndicatorService, "get_results", wraps=IndicatorService().get_results,
+        ) as get_results:
+            first = await _report(factory)
+            second = await _report(factory)
+            assert get_results.call_count == 1
+            assert second.split("</header>")[1] == first.split("</header>")[1]
+
+            # 不同的 include_details 是另一份報告
+            await _report(factory, include_details=False)
+            assert get_results.call_count == 2
+
+            # 忽略設定變更
+            async with factory() as s:
+                await s.execute(
+                    update(MaintenanceDeviceList)
+                    .where(MaintenanceDeviceList.new_hostname == "SW-01")
+                    .values(ignored_indicators=["fan"])
+                )
+                await s.commit()
+            await _report(factory)
+            assert get_results.call_count == 3
+
+            # 採集錯誤
+            async with factory() as s:
+                s.add(CollectionError(
+                    maintenance_id=MID, collection_type="get_fan",
+                    switch_hostname="SW-02", error_message="timeout",
+                ))
+                await s.commit()
+            await _report(factory)
+            assert get_results.call_count == 4
+
+            # 新的評估結果
+            await _store_results(factory, [{"device": "SW-02", "reason": "fail"}])
+            html = await _report(factory)
+            assert get_results.call_count == 5
+            assert "SW-02" in html
+
+    async def test_live_evaluation_is_not_cached(self, factory):
+        # 沒有已儲存的結果 → 即時評估，不快取
+        await _report(factory)
+        await _report(factory)
+        assert not report_service._cache
+
+    async def test_many_failures_render_within_a_second(self, factory):
+        failures = [
+            {"device": f"SW-{i:04d}", "interface": f"Fan{i}", "reason": "fail"}
+            for i in range(5000)
+        ]
+        await _store_results(factory, failures)
+
+        start = time.perf_counter()
+        html = await _report(factory)
+        assert time.perf_counter() - start < 1.0
+        assert "❌ 未通過項目 (5000)" in html
+        assert "... 還有 4980 筆未顯示" in html
+
+
+class TestReportEndpoints:
+
+    @pytest.fixture
+    async def client(self, factory):
+        app = FastAPI()
+        app.include_router(reports.router, prefix="/api")
+        app.dependency_overrides[get_current_user] = lambda: USER
+
+        async def session_override():
+            async with factory() as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = session_override
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test",
+        ) as client:
+            yield client
+
+    async def test_export_full_report(self, factory, client):
+        await _store_results(factory, [{"device": "SW-01", "reason": "down"}])
+
+        resp = await client.get(f"/api/reports/maintenance/{MID}/export")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/html")
+        assert f"sanity_report_{MID}_" in resp.headers["content-disposition"]
+        assert resp.headers["content-length"] == str(len(resp.content))
+        assert resp.text.startswith("<!DOCTYPE html>")
+        assert GENERATED_AT_MARKER not in resp.text
+        assert resp.text.endswith("</html>")
+        assert resp.text.count('<div class="indicator-card">') == len(
+            IndicatorService().get_all_indicators()
+        )
+
+    async def test_preview_evaluates_once(self, factory, client):
+        await _store_results(factory, [{"device": "SW-01", "reason": "down"}])
+
+        with patch.object(
+            IndicatorService, "get_results", wraps=IndicatorService().get_results,
+        ) as get_results:
+            resp = await client.get(f"/api/reports/maintenance/{MID}/preview")
+        assert resp.status_code == 200
+        assert get_results.call_count == 1
+        body = resp.json()
+        assert body["indicators"]["fan"]["failures"] == [
+            {"device": "SW-01", "reason": "down"},
+        ]
+        assert body["summary"]["indicators"]["fan"]["fail_count"] == 1
+
+    async def test_artifact_served_with_etag(self, factory, client):
+        await _store_results(factory, [{"device": "SW-01", "reason": "down"}])
+        url = f"/api/reports/maintenance/{MID}/export"
+
+        with (
+            patch.object(
+                IndicatorService, "get_results",
+                wraps=IndicatorService().get_results,
+            ) as get_results,
+            patch.object(ReportService, "generated_at", return_value="now"),
+        ):
+            first = await client.get(url)
+            second = await client.get(url)
+            assert get_results.call_count == 1
+        etag = first.headers["etag"]
+        assert second.headers["etag"] == etag
+        assert second.content == first.content
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        resp = await client.get(url, headers={"If-None-Match": f"W/{etag}"})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+
+        # 不含明細是另一份報告
+        summary = await client.get(url, params={"include_details": False})
+        assert summary.headers["etag"] != etag
+        assert "未通過項目" not in summary.text
+
+        # 新的評估結果 → 新版本
+        await _store_results(factory, [{"device": "SW-02", "reason": "down"}])
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        assert "SW-02" in resp.text
+
+    @pytest.mark.parametrize(("path", "ext"), [
+        ("export", "html"),
+        ("preview", "json"),
+    ])
+    async def test_generated_at_filled_per_response(
+        self, factory, client, path, ext,
+    ):
+        await _store_results(factory, [])
+        url = f"/api/reports/maintenance/{MID}/{path}"
+
+        with patch.object(
+            ReportService, "generated_at", side_effect=["first", "second"],
+        ):
+            first = await client.get(url)
+            second = await client.get(url)
+        assert second.headers["etag"] == first.headers["etag"]
+        assert "first" in first.text
+        assert "second" in second.text
+        assert second.headers["content-length"] == str(len(second.content))
+        if path == "preview":
+            assert second.json()["generated_at"] == "second"
+
+        # 產物只有佔位字串
+        (artifact,) = report_jobs._store.root.rglob(f"*.{ext}")
+        data = artifact.read_bytes()
+        assert data.count(GENERATED_AT_MARKER.encode()) == 1
+        assert b"second" not in data
+
+        resp = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        assert resp.status_code == 304
+
+    async def test_stamp_across_chunk_boundary(self):
+        data = b"x" * 10 + GENERATED_AT_MARKER.encode() + b"y" * 10
+        for size in range(1, len(data) + 1):
+            chunks = (data[i:i + size] for i in range(0, len(data), size))
+            stamped = b"".join(report_jobs._stamp(chunks, b"NOW"))
+            assert stamped == b"x" * 10 + b"NOW" + b"y" * 10
+
+    async def test_preview_artifact(self, factory, client):
+        await _store_results(factory, [])
+        url = f"/api/reports/maintenance/{MID}/preview"
+
+        first = await client.get(url)
+        assert first.headers["content-type"] == "application/json"
+        resp = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        assert resp.status_code == 304
+
+    async def test_concurrent_requests_render_once(self, factory, client):
+        await _store_results(factory, [{"device": "SW-01", "reason": "down"}])
+        url = f"/api/reports/maintenance/{MID}/export"
+
+        with (
+            patch.object(
+                IndicatorService, "get_results",
+                wraps=IndicatorService().get_results,
+            ) as get_results,
+            patch.object(ReportService, "generated_at", return_value="now"),
+        ):
+            responses = await asyncio.gather(*(client.get(url) for _ in range(5)))
+        assert get_results.call_count == 1
+        assert len({r.headers["etag"] for r in responses}) == 1
+        assert len({r.content for r in responses}) == 1
+
+    async def test_disconnected_request_keeps_rendering(self, factory):
+        await _store_results(factory, [])
+        async with factory() as s:
+            waiter = asyncio.create_task(report_jobs.get_report(MID, "html", s))
+            await asyncio.sleep(0)
+            while not report_jobs._tasks:
+                await asyncio.sleep(0)
+            task = next(iter(report_jobs._tasks.values()))
+            waiter.cancel()
+            artifact = await task
+            assert artifact.path.is_file()
+
+            assert await report_jobs.get_report(MID, "html", s) == artifact
+
+    async def test_live_evaluation_not_stored(self, factory, client):
+        resp = await client.get(f"/api/reports/maintenance/{MID}/export")
+        assert resp.status_code == 200
+        assert "etag" not in resp.headers
+        assert resp.text.endswith("</html>")
+        assert not any(report_jobs._store.root.rglob("*.html"))
+
+    async def test_render_in_background(self, factory, client):
+        await _store_results(factory, [])
+        url = f"/api/reports/maintenance/{MID}/render"
+
+        resp = await client.post(url, params={"kind": "json"})
+        assert resp.status_code == 202
+        assert resp.json()["status"] == "rendering"
+        await asyncio.gather(*report_jobs._tasks.values())
+
+        resp = await client.post(url, params={"kind": "json"})
+        assert resp.json()["status"] == "ready"
+        preview = await client.get(f"/api/reports/maintenance/{MID}/preview")
+        assert preview.headers["etag"] == resp.json()["etag"]
+
+        resp = await client.post(url, params={"kind": "pdf"})
+        assert resp.status_code == 422
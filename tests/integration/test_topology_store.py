@@ -0,0 +1,267 @@
+"""
+Integration tests for the incremental topology store — real SQLite DB.
+
+增量同步後的圖必須與從頭建立的模型相同；只有 batch 變動的設備重新載入，
+連線不變時沿用階層，已儲存的指標結果不變時沿用失敗疊加。
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import update
+
+from app.api.endpoints import topology
+from app.api.endpoints.auth import get_current_user
+from app.core.config import settings
+from app.db.base import get_async_session
+from app.db.models import (
+    IndicatorResult,
+    MaintenanceDeviceList,
+    UplinkExpectation,
+)
+from app.parsers.protocols import NeighborData
+from app.repositories.typed_records import get_typed_repo
+from app.services import topology_store
+from app.services.indicator_service import IndicatorService
+
+MID = "MAINT-TOPO"
+USER = {
+    "user_id": 1, "username": "root", "role": "ROOT", "maintenance_id": None,
+    "display_name": "Admin", "is_root": True,
+}
+EDGES = [f"EDGE-{i:02d}" for i in range(6)]
+
+
+@pytest.fixture
+def factory(session_factory):
+    with patch.object(topology_store, "_topology_store", None):
+        yield session_factory
+
+
+def _uplinks(agg: int) -> list[NeighborData]:
+    """AGG 的 LLDP：往 CORE 一條 + 往 3 台 EDGE。"""
+    items = [NeighborData(
+        local_interface="Ethernet1/49", remote_hostname="CORE-01",
+        remote_interface=f"Ethernet1/{agg + 1}",
+    )]
+    items.extend(
+        NeighborData(
+            local_interface=f"Ethernet1/{i + 1}", remote_hostname=edge,
+            remote_interface="GigabitEthernet0/1",
+        )
+        for i, edge in enumerate(EDGES[agg * 3:agg * 3 + 3])
+    )
+    return items
+
+
+async def _seed(factory) -> None:
+    async with factory() as s:
+        s.add_all(
+            MaintenanceDeviceList(
+                maintenance_id=MID, old_hostname=h, old_ip_address="10.0.0.1",
+                old_vendor="HPE", new_hostname=h, new_ip_address=f"10.1.0.{i}",
+                new_vendor="Cisco",
+            )
+            for i, h in enumerate(["CORE-01", "AGG-01", "AGG-02", *EDGES])
+        )
+        s.add_all([
+            UplinkExpectation(
+                maintenance_id=MID, hostname="AGG-01", local_interface="Eth1/49",
+                expected_neighbor="CORE-01", expected_interface="Eth1/1",
+            ),
+            # 不存在的連線 → expected_fail
+            UplinkExpectation(
+                maintenance_id=MID, hostname="EDGE-05", local_interface="Gi0/2",
+                expected_neighbor="AGG-01", expected_interface="Eth1/10",
+            ),
+        ])
+        lldp = get_typed_repo("get_uplink_lldp", s)
+        for agg in range(2):
+            await lldp.save_batch(f"AGG-0{agg + 1}", "", _uplinks(agg), MID)
+        # CDP 重複回報同一條線 + 一條管理介面連線
+        await get_typed_repo("get_uplink_cdp", s).save_batch("CORE-01", "", [
+            NeighborData(local_interface="Ethernet1/1", remote_hostname="AGG-01",
+                         remote_interface="Ethernet1/49"),
+            NeighborData(local_interface="mgmt0", remote_hostname="OOB-SW",
+                         remote_interface="Gi1/0/1"),
+        ], MID)
+        await s.commit()
+
+
+async def _topology(factory) -> dict:
+    app = FastAPI()
+    app.include_router(topology.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: USER
+
+    async def session_override():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        resp = await client.get(f"/api/topology/{MID}")
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+async def _assert_matches_fresh(factory, body: dict) -> None:
+    """與停用 store（每次請求從頭建立）的輸出相同；即時評估的時間除外。"""
+    with patch.object(settings, "topology_store_enabled", False):
+        fresh = await _topology(factory)
+    if body["evaluated_at"] != fresh["evaluated_at"]:
+        body, fresh = dict(body, evaluated_at=None), dict(fresh, evaluated_at=None)
+    assert body == fresh
+
+
+class TestTopologyStore:
+
+    async def test_graph(self, factory):
+        await _seed(factory)
+
+        body = await _topology(factory)
+
+        links = {(link["source"], link["target"]): link for link in body["links"]}
+        assert links[("AGG-01", "CORE-01")]["status"] == "expected_pass"
+        # CDP 的反向回報去重
+        assert ("CORE-01", "AGG-01") not in links
+        assert links[("CORE-01", "OOB-SW")]["is_management"] is True
+        assert links[("EDGE-05", "AGG-01")]["status"] == "expected_fail"
+        nodes = {n["name"]: n for n in body["nodes"]}
+        assert nodes["CORE-01"]["level"] == 0
+        assert nodes["AGG-02"]["level"] == 1
+        assert nodes["EDGE-04"]["level"] == 2
+        assert nodes["OOB-SW"]["in_device_list"] is False
+        assert body["stats"]["expected_pass"] == 1
+        assert body["stats"]["total_links"] == len(body["links"]) == 10
+
+        await _assert_matches_fresh(factory, body)
+
+    async def test_only_changed_batches_are_reloaded(self, factory):
+        await _seed(factory)
+        await _topology(factory)
+        model = topology_store.get_topology_store()._models[MID]
+        agg2_records = model.records[("get_uplink_lldp", "AGG-02")]
+
+        # AGG-01 換線：EDGE-00 改接到 AGG-02 的 port
+        async with factory() as s:
+            items = _uplinks(0)[:1] + _uplinks(0)[2:]
+            await get_typed_repo("get_uplink_lldp", s).save_batch(
+                "AGG-01", "", items, MID,
+            )
+            await get_typed_repo("get_uplink_lldp", s).save_batch(
+                "AGG-02", "", _uplinks(1) + [NeighborData(
+                    local_interface="Ethernet1/9", remote_hostname="EDGE-00",
+                    remote_interface="Gi0/1",
+                )], MID,
+            )
+            await s.commit()
+
+        body = await _topology(factory)
+        assert model.records[("get_uplink_lldp", "AGG-02")] is not agg2_records
+        assert ("AGG-02", "EDGE-00") in {
+            (link["source"], link["target"]) for link in body["links"]
+        }
+        assert ("AGG-01", "EDGE-00") not in {
+            (link["source"], link["target"]) for link in body["links"]
+        }
+        await _assert_matches_fresh(factory, body)
+
+        # 沒有變動 → 不再查鄰居記錄
+        core_records = model.records[("get_uplink_cdp", "CORE-01")]
+        await _topology(factory)
+        assert model.records[("get_uplink_cdp", "CORE-01")] is core_records
+
+    async def test_hierarchy_reused_when_adjacency_unchanged(self, factory):
+        await _seed(factory)
+        await _topology(factory)
+
+        calls = []
+        real = topology_store.compute_hierarchy
+
+        def counting(*args):
+            calls.append(args)
+            return real(*args)
+
+        with patch.object(topology_store, "compute_hierarchy", counting):
+            # 期望變更只影響連線狀態，不影響鄰接 → 沿用階層
+            async with factory() as s:
+                await s.execute(
+                    update(UplinkExpectation)
+                    .where(UplinkExpectation.hostname == "AGG-01")
+                    .values(expected_interface="Eth1/7")
+                )
+                await s.commit()
+            body = await _topology(factory)
+            assert calls == []
+            assert body["stats"]["expected_pass"] == 0
+
+            # 新設備 → 節點變動，重算
+            async with factory() as s:
+                s.add(MaintenanceDeviceList(
+                    maintenance_id=MID, old_hostname="X", old_ip_address="10.0.0.9",
+                    old_vendor="HPE", new_hostname="EDGE-99",
+                ))
+                await s.commit()
+            body = await _topology(factory)
+            assert len(calls) == 1
+
+        await _assert_matches_fresh(factory, body)
+
+    async def test_overlay_cached_by_stored_results_version(self, factory):
+        await _seed(factory)
+        async def store_results(reason: str) -> None:
+            # 背景評估器每輪以新的 evaluated_at 覆寫
+            now = datetime.now(UTC).replace(tzinfo=None)
+            async with factory() as s:
+                await s.execute(IndicatorResult.__table__.delete())
+                for ind in IndicatorService().get_all_indicators():
+                    failures = []
+                    if ind.indicator_type in ("ping", "fan"):
+                        failures = [{"device": "EDGE-01", "reason": reason}]
+                    s.add(IndicatorResult(
+                        maintenance_id=MID, indicator_type=ind.indicator_type,
+                        pass_rates={}, total_count=1, pass_count=1 - len(failures),
+                        fail_count=len(failures),
+                        details={"failures": failures}, evaluated_at=now,
+                    ))
+                await s.commit()
+
+        await store_results("down")
+        with patch.object(
+            IndicatorService, "get_results", wraps=IndicatorService().get_results,
+        ) as get_results:
+            first = await _topology(factory)
+            second = await _topology(factory)
+            assert get_results.call_count == 1
+            assert first == second
+
+            edge = {n["name"]: n for n in first["nodes"]}["EDGE-01"]
+            assert edge["ping_failed"] is True
+            assert edge["indicator_failures"] == ["風扇: down", "Ping: down"]
+
+            # 忽略設定變更 → 重新疊加
+            async with factory() as s:
+                await s.execute(
+                    update(MaintenanceDeviceList)
+                    .where(MaintenanceDeviceList.new_hostname == "EDGE-01")
+                    .values(ignored_indicators=["fan"])
+                )
+                await s.commit()
+            edge = {n["name"]: n for n in (await _topology(factory))["nodes"]}["EDGE-01"]
+            assert edge["indicator_failures"] == ["Ping: down"]
+            assert get_results.call_count == 2
+
+            # 新的評估結果 → 重新疊加
+            await store_results("timeout")
+            body = await _topology(factory)
+            assert get_results.call_count == 3
+            edge = {n["name"]: n for n in body["nodes"]}["EDGE-01"]
+            assert edge["indicator_failures"] == ["Ping: timeout"]
+
+        await _assert_matches_fresh(factory, body)
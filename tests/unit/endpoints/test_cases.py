@@ -16,6 +16,7 @@ from fastapi import FastAPI
 from app.api.endpoints.auth import get_current_user, require_write
 from app.api.endpoints.cases import router
 from app.db.base import get_async_session
+from app.db.pagination import InvalidCursorError
 
 ROOT_USER = {
     "user_id": 1,
@@ -207,6 +208,46 @@ class TestListCases:
         assert resp.status_code == 200
         mock_get.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_list_with_cursor(self):
+        """GET with cursor forwards it; an undecodable cursor is 400."""
+        session = _make_mock_session()
+        app = _build_app(ROOT_USER, session)
+
+        mock_result = {
+            "cases": [],
+            "count": 0,
+            "total": None,
+            "page": None,
+            "page_size": 50,
+            "total_pages": None,
+            "next_cursor": None,
+        }
+
+        with patch(
+            "app.api.endpoints.cases._svc.get_cases",
+            new_callable=AsyncMock,
+            return_value=mock_result,
+        ) as mock_get:
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                resp = await ac.get("/cases/MAINT-001", params={"cursor": "abc"})
+
+        assert resp.status_code == 200
+        assert resp.json()["next_cursor"] is None
+        assert mock_get.call_args.kwargs["cursor"] == "abc"
+
+        with patch(
+            "app.api.endpoints.cases._svc.get_cases",
+            new_callable=AsyncMock,
+            side_effect=InvalidCursorError("無效的分頁游標"),
+        ):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                resp = await ac.get("/cases/MAINT-001", params={"cursor": "bad"})
+
+        assert resp.status_code == 400
+
 
 # ========== TestGetCaseStats ==========
 
@@ -6,6 +6,7 @@ Tests /config/frontend, /maintenance/{id}/summary, and
 """
 from __future__ import annotations
 
+from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -17,6 +18,7 @@ from app.api.endpoints.dashboard import router
 from app.db.base import get_async_session
 from app.indicators.base import IndicatorEvaluationResult
 
+EVALUATED_AT = datetime(2026, 1, 1, 8, 0, tzinfo=UTC)
 
 # ── Helpers ──────────────────────────────────────────────────────
 
@@ -238,7 +240,7 @@ class TestGetIndicatorDetails:
             summary="8/10 pass",
         )
 
-        # Mock evaluate_all to return dict with the indicator
+        # Mock get_results to return dict with the indicator
         fake_results = {"transceiver": fake_result}
 
         # Mock the CollectionError query — no collection errors
@@ -252,7 +254,9 @@ class TestGetIndicatorDetails:
             "app.api.endpoints.dashboard.IndicatorService"
         ) as MockService:
             instance = MockService.return_value
-            instance.evaluate_all = AsyncMock(return_value=fake_results)
+            instance.get_results = AsyncMock(
+                return_value=(fake_results, EVALUATED_AT),
+            )
 
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -269,12 +273,13 @@ class TestGetIndicatorDetails:
         assert data["fail_count"] == 2
         assert len(data["failures"]) == 2
         assert data["collection_errors"] == 0
+        assert data["evaluated_at"] == EVALUATED_AT.isoformat()
 
     @pytest.mark.anyio
     async def test_unknown_indicator_returns_error(self, root_user):
         session = _mock_session()
 
-        # evaluate_all returns results without the requested indicator
+        # get_results returns results without the requested indicator
         fake_results = {}
 
         err_mock_result = MagicMock()
@@ -287,7 +292,9 @@ class TestGetIndicatorDetails:
             "app.api.endpoints.dashboard.IndicatorService"
         ) as MockService:
             instance = MockService.return_value
-            instance.evaluate_all = AsyncMock(return_value=fake_results)
+            instance.get_results = AsyncMock(
+                return_value=(fake_results, EVALUATED_AT),
+            )
 
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -335,7 +342,9 @@ class TestGetIndicatorDetails:
             "app.api.endpoints.dashboard.IndicatorService"
         ) as MockService:
             instance = MockService.return_value
-            instance.evaluate_all = AsyncMock(return_value=fake_results)
+            instance.get_results = AsyncMock(
+                return_value=(fake_results, EVALUATED_AT),
+            )
 
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
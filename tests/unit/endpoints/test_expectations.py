@@ -167,6 +167,7 @@ class TestUplinkExpectations:
             topo1,
             topo2,
             topo3,
+            MagicMock(),  # invalidate IndicatorResult
         ]
 
         session.refresh.side_effect = lambda obj: setattr(obj, "id", 99)
@@ -210,7 +211,10 @@ class TestUplinkExpectations:
         topo3 = MagicMock()
         topo3.scalar_one_or_none.return_value = None
 
-        session.execute.side_effect = [find_result, topo1, topo2, topo3]
+        session.execute.side_effect = [
+            find_result, topo1, topo2, topo3,
+            MagicMock(),  # invalidate IndicatorResult
+        ]
 
         with patch("app.api.endpoints.expectations.write_log", new_callable=AsyncMock):
             transport = ASGITransport(app=app)
@@ -347,7 +351,10 @@ class TestVersionExpectations:
         dup_result = MagicMock()
         dup_result.scalar_one_or_none.return_value = None
 
-        session.execute.side_effect = [dup_result]
+        session.execute.side_effect = [
+            dup_result,
+            MagicMock(),  # invalidate IndicatorResult
+        ]
         session.refresh.side_effect = lambda obj: setattr(obj, "id", 50)
 
         with patch("app.api.endpoints.expectations.write_log", new_callable=AsyncMock):
@@ -428,7 +435,10 @@ class TestPortChannelExpectations:
         dup_result = MagicMock()
         dup_result.scalar_one_or_none.return_value = None
 
-        session.execute.side_effect = [dup_result]
+        session.execute.side_effect = [
+            dup_result,
+            MagicMock(),  # invalidate IndicatorResult
+        ]
         session.refresh.side_effect = lambda obj: setattr(obj, "id", 77)
 
         with patch("app.api.endpoints.expectations.write_log", new_callable=AsyncMock):
@@ -5,6 +5,7 @@ Tests:
 - list_indicators (GET /indicators)
 - get_indicator (GET /indicators/{name})
 - get_indicator_timeseries (GET /indicators/{maint}/{name}/timeseries)
+- get_indicator_aggregated_timeseries (GET .../timeseries/aggregated)
 - get_indicator_raw_data (GET /indicators/{maint}/{name}/rawdata)
 - trigger_collection (POST /indicators/{maint}/{name}/collect)
 - Access control (check_maintenance_access)
@@ -13,7 +14,7 @@ Tests:
 """
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -28,7 +29,10 @@ from app.indicators.base import (
     IndicatorMetadata,
     ObservedField,
     RawDataRow,
+    TimeSeriesBucket,
     TimeSeriesPoint,
+    buckets_from_aggregates,
+    compute_bucket_seconds,
 )
 
 
@@ -822,3 +826,163 @@ class TestCollectAccessControl:
                 )
 
         assert resp.status_code == 403
+
+
+# ══════════════════════════════════════════════════════════════════
+# Aggregated (downsampled) time series
+# ══════════════════════════════════════════════════════════════════
+
+
+class TestAggregatedTimeseries:
+    """GET /indicators/{maint}/{name}/timeseries/aggregated"""
+
+    URL = "/indicators/MAINT-001/transceiver/timeseries/aggregated"
+
+    @pytest.mark.asyncio
+    async def test_returns_buckets(self):
+        session = _mock_session()
+        app = _build_app(ROOT_USER, session)
+        indicator = _fake_indicator("transceiver")
+        indicator.get_bucketed_series = AsyncMock(return_value=[
+            TimeSeriesBucket(
+                timestamp=NOW, count=3,
+                min={"tx_power": -3.0}, avg={"tx_power": -2.0},
+                max={"tx_power": -1.0},
+            ),
+        ])
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = indicator
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(self.URL, params={
+                    "start": "2026-01-15T00:00:00Z",
+                    "end": "2026-01-16T00:00:00Z",
+                    "points": 24,
+                })
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["bucket_seconds"] == 3600
+        assert data["data"][0]["avg"] == {"tx_power": -2.0}
+        assert data["data"][0]["count"] == 3
+        kwargs = indicator.get_bucketed_series.call_args.kwargs
+        assert kwargs["points"] == 24
+        assert kwargs["end"] - kwargs["start"] == timedelta(days=1)
+
+    @pytest.mark.asyncio
+    async def test_default_range_is_last_24h(self):
+        session = _mock_session()
+        app = _build_app(ROOT_USER, session)
+        indicator = _fake_indicator("transceiver")
+        indicator.get_bucketed_series = AsyncMock(return_value=[])
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = indicator
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(self.URL)
+
+        assert resp.status_code == 200
+        kwargs = indicator.get_bucketed_series.call_args.kwargs
+        assert kwargs["end"] - kwargs["start"] == timedelta(hours=24)
+        assert kwargs["points"] == 200
+
+    @pytest.mark.asyncio
+    async def test_start_after_end_400(self):
+        app = _build_app(ROOT_USER, _mock_session())
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = _fake_indicator("transceiver")
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(self.URL, params={
+                    "start": "2026-01-16T00:00:00Z",
+                    "end": "2026-01-15T00:00:00Z",
+                })
+
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_unsupported_indicator_400(self):
+        app = _build_app(ROOT_USER, _mock_session())
+        indicator = _fake_indicator("fan")
+        indicator.get_bucketed_series = AsyncMock(
+            side_effect=NotImplementedError("fan 不支援區間聚合時間序列"),
+        )
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = indicator
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/indicators/MAINT-001/fan/timeseries/aggregated"
+                )
+
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_points_too_large_rejected(self):
+        app = _build_app(ROOT_USER, _mock_session())
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = _fake_indicator("transceiver")
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(self.URL, params={"points": 5000})
+
+        assert resp.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_guest_wrong_maintenance_403(self):
+        app = _build_app(GUEST_OTHER, _mock_session())
+
+        with patch(
+            "app.api.endpoints.indicators.indicator_manager"
+        ) as mock_mgr:
+            mock_mgr.get_indicator.return_value = _fake_indicator("transceiver")
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(self.URL)
+
+        assert resp.status_code == 403
+
+
+class TestBucketHelpers:
+    """compute_bucket_seconds / buckets_from_aggregates"""
+
+    def test_bucket_seconds_rounds_up(self):
+        start = datetime(2026, 1, 1)
+        assert compute_bucket_seconds(start, start + timedelta(hours=1), 7) == 515
+        assert compute_bucket_seconds(start, start + timedelta(seconds=3), 100) == 1
+
+    def test_buckets_from_aggregates(self):
+        start = datetime(2026, 1, 1)
+        rows = [
+            {"bucket": 0, "count": 2, "crc_errors_min": 1, "crc_errors_avg": 1.5,
+             "crc_errors_max": 2},
+            {"bucket": 3, "count": 1, "crc_errors_min": None,
+             "crc_errors_avg": None, "crc_errors_max": None},
+        ]
+        buckets = buckets_from_aggregates(rows, ("crc_errors",), start, 60)
+        assert [b.timestamp for b in buckets] == [
+            start, start + timedelta(minutes=3),
+        ]
+        assert buckets[0].avg == {"crc_errors": 1.5}
+        assert buckets[1].avg == {}
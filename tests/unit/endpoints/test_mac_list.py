@@ -108,6 +108,13 @@ def _scalars_all(rows):
     return result
 
 
+def _page_rows(rows):
+    """Mock result of the paginated client query: (client, ping, mac, id) rows."""
+    result = MagicMock()
+    result.all.return_value = [(r, 2, r.mac_address, r.id) for r in rows]
+    return result
+
+
 def _scalar_one_or_none(value):
     """Configure a mock session.execute() result so .scalar_one_or_none() works."""
     result = MagicMock()
@@ -142,7 +149,7 @@ class TestListClients:
         """Mock session returning client rows -> 200."""
         rows = [_make_client_row(id=1), _make_client_row(id=2, mac="AA:BB:CC:DD:EE:02", ip="192.168.1.101")]
         session = AsyncMock()
-        session.execute = AsyncMock(return_value=_scalars_all(rows))
+        session.execute = AsyncMock(return_value=_page_rows(rows))
 
         app = _build_app(ROOT_USER)
         with patch(
@@ -168,7 +175,7 @@ class TestListClients:
 
         # The detailed endpoint query order:
         # 1. categories query -> scalars().all()   (determines filter)
-        # 2. main client query -> scalars().all()
+        # 2. main client query -> paginated rows
         # 3. (skipped: member query, because cat_ids is empty)
         # 4. ping status query -> rows  (because mac_addresses is non-empty)
         ping_result = MagicMock()
@@ -177,7 +184,7 @@ class TestListClients:
         session.execute = AsyncMock(
             side_effect=[
                 _scalars_all([]),          # categories (empty)
-                _scalars_all([row]),       # clients
+                _page_rows([row]),         # clients
                 ping_result,              # ping status (empty)
             ]
         )
@@ -286,7 +293,7 @@ class TestAddClient:
                 return_value=_mock_session_context(session)(),
             ),
             patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.regenerate_comparisons", new_callable=AsyncMock),
+            patch("app.api.endpoints.mac_list.request_regeneration"),
         ):
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -363,7 +370,7 @@ class TestUpdateClient:
                 return_value=_mock_session_context(session)(),
             ),
             patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.regenerate_comparisons", new_callable=AsyncMock),
+            patch("app.api.endpoints.mac_list.request_regeneration"),
         ):
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -418,7 +425,7 @@ class TestDeleteClient:
                 return_value=_mock_session_context(session)(),
             ),
             patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.regenerate_comparisons", new_callable=AsyncMock),
+            patch("app.api.endpoints.mac_list.request_regeneration"),
         ):
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -468,7 +475,7 @@ class TestDeleteClient:
                 return_value=_mock_session_context(session)(),
             ),
             patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.regenerate_comparisons", new_callable=AsyncMock),
+            patch("app.api.endpoints.mac_list.request_regeneration"),
         ):
             async with AsyncClient(
                 transport=ASGITransport(app=app), base_url="http://test"
@@ -520,7 +527,7 @@ class TestImportExportCsv:
 
     @pytest.mark.anyio
     async def test_import_csv(self):
-        """POST import-csv with file -> 200 with counts."""
+        """POST import-csv with file -> 200 with counts; follow-up work in background."""
         session = AsyncMock()
 
         # CSV content
@@ -530,15 +537,16 @@ class TestImportExportCsv:
         )
 
         # Calls during import:
-        # 1. check existing MAC -> scalar_one_or_none (None)
-        # 2. resolve_default_assignee -> ROOT user display_name
+        # 1. active users (once) -> ROOT user display_name
+        # 2. existing MACs of the chunk -> none
+        # 3. multi-row INSERT
         session.execute = AsyncMock(
             side_effect=[
-                _scalar_one_or_none(None),    # MAC not existing
-                MagicMock(first=MagicMock(return_value=("系統管理員",))),  # ROOT user
+                MagicMock(all=MagicMock(return_value=[("系統管理員", "ROOT")])),
+                _scalars_all([]),
+                MagicMock(),
             ]
         )
-        session.add = MagicMock()
         session.commit = AsyncMock()
 
         app = _build_app(ROOT_USER)
@@ -548,26 +556,80 @@ class TestImportExportCsv:
                 return_value=_mock_session_context(session)(),
             ),
             patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.regenerate_comparisons", new_callable=AsyncMock),
-            patch("app.api.endpoints.mac_list.CaseService", create=True) as MockCaseService,
+            patch("app.api.endpoints.mac_list.request_regeneration") as start,
         ):
-            # Mock CaseService used inside import_csv
-            mock_case_svc = AsyncMock()
-            mock_case_svc.sync_cases = AsyncMock()
-            # Patch the import inside the function
-            with patch(
-                "app.services.case_service.CaseService",
-                return_value=mock_case_svc,
-            ):
-                async with AsyncClient(
-                    transport=ASGITransport(app=app), base_url="http://test"
-                ) as client:
-                    resp = await client.post(
-                        "/api/mac-list/MAINT-001/import-csv",
-                        files={"file": ("test.csv", csv_content.encode(), "text/csv")},
-                    )
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.post(
+                    "/api/mac-list/MAINT-001/import-csv",
+                    files={"file": ("test.csv", csv_content.encode(), "text/csv")},
+                )
 
         assert resp.status_code == 200
         body = resp.json()
         assert body["imported"] == 1
         assert body["skipped"] == 0
+        start.assert_called_once_with("MAINT-001", sync_cases=True)
+        inserted = session.execute.await_args_list[2].args[1]
+        assert inserted[0]["mac_address"] == "AA:BB:CC:DD:EE:01"
+        assert inserted[0]["default_assignee"] == "系統管理員"
+
+
+# ══════════════════════════════════════════════════════════════════
+# TestDetectClients
+# ══════════════════════════════════════════════════════════════════
+
+
+class TestDetectClients:
+    """POST /api/mac-list/{maintenance_id}/detect + regeneration progress"""
+
+    @pytest.mark.anyio
+    async def test_detect_returns_without_waiting_for_comparisons(self):
+        """偵測後比較結果在背景重建，回應附上 job 進度。"""
+        from datetime import datetime, timezone
+
+        from app.services.comparison_jobs import RegenerationJob
+
+        service = MagicMock()
+        service.detect_clients = AsyncMock(return_value={"total": 2, "detected": 1})
+        job = RegenerationJob(
+            maintenance_id="MAINT-001",
+            requested_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        )
+
+        app = _build_app(PM_USER)
+        with (
+            patch(
+                "app.services.client_collection_service.get_client_collection_service",
+                return_value=service,
+            ),
+            patch("app.api.endpoints.mac_list.write_log", new_callable=AsyncMock),
+            patch(
+                "app.api.endpoints.mac_list.request_regeneration", return_value=job,
+            ) as start,
+        ):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.post("/api/mac-list/MAINT-001/detect")
+
+        assert resp.status_code == 200
+        start.assert_called_once_with("MAINT-001")
+        body = resp.json()
+        assert body["detected"] == 1
+        assert body["comparison_job"]["status"] == "queued"
+
+    @pytest.mark.anyio
+    async def test_progress_idle_without_job(self):
+        app = _build_app(GUEST_USER)
+        with patch("app.api.endpoints.mac_list.get_regeneration", return_value=None):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                resp = await client.get(
+                    "/api/mac-list/MAINT-001/comparisons/regeneration",
+                )
+
+        assert resp.status_code == 200
+        assert resp.json() == {"maintenance_id": "MAINT-001", "status": "idle"}
@@ -239,6 +239,7 @@ class TestAddDevice:
                 _scalar_one_or_none(None),  # new_hostname not duplicate
                 _scalar_one_or_none(None),  # old_ip not duplicate
                 _scalar_one_or_none(None),  # new_ip not duplicate
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.add = MagicMock()
@@ -284,6 +285,7 @@ class TestAddDevice:
             side_effect=[
                 _scalar_one_or_none(None),  # new_hostname not duplicate
                 _scalar_one_or_none(None),  # new_ip not duplicate
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.add = MagicMock()
@@ -363,6 +365,7 @@ class TestUpdateDevice:
                 _scalar_one_or_none(None),      # new_hostname unique
                 _scalar_one_or_none(None),      # old_ip unique
                 _scalar_one_or_none(None),      # new_ip unique
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.commit = AsyncMock()
@@ -416,6 +419,7 @@ class TestDeleteDevice:
                 _scalar_one_or_none(existing),
                 MagicMock(),   # delete LatestCollectionBatch
                 MagicMock(),   # delete CollectionError
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.delete = AsyncMock()
@@ -459,6 +463,7 @@ class TestDeleteDevice:
                 MagicMock(),         # delete LatestCollectionBatch
                 MagicMock(),         # delete CollectionError
                 delete_batch_result, # delete devices
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.commit = AsyncMock()
@@ -578,6 +583,7 @@ class TestImportExportCsv:
                 _scalar_one_or_none(None),  # new_hostname unique
                 _scalar_one_or_none(None),  # old_ip unique
                 _scalar_one_or_none(None),  # new_ip unique
+                MagicMock(),  # invalidate IndicatorResult
             ]
         )
         session.add = MagicMock()
@@ -90,6 +90,11 @@ def _make_log_row(
     return row
 
 
+def _page_rows(logs):
+    """paginate() 的查詢結果：每列為 (log, created_at, id)。"""
+    return [(log, log.created_at, log.id) for log in logs]
+
+
 # ══════════════════════════════════════════════════════════════════
 # TestFrontendError
 # ══════════════════════════════════════════════════════════════════
@@ -170,9 +175,9 @@ class TestGetLogs:
         count_result = MagicMock()
         count_result.scalar.return_value = 2
 
-        # Second execute: select query -> returns scalars list
+        # Second execute: page query -> rows with sort key columns
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = [log1, log2]
+        rows_result.all.return_value = _page_rows([log1, log2])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -203,7 +208,7 @@ class TestGetLogs:
 
         log1 = _make_log_row(id=10, level="ERROR", source="api", summary="filtered")
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = [log1]
+        rows_result.all.return_value = _page_rows([log1])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -231,9 +236,9 @@ class TestGetLogs:
         count_result.scalar.return_value = 25
 
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = [
+        rows_result.all.return_value = _page_rows([
             _make_log_row(id=i) for i in range(11, 21)
-        ]
+        ])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -284,7 +289,7 @@ class TestGetLogs:
 
         log1 = _make_log_row(id=99, summary="keyword match")
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = [log1]
+        rows_result.all.return_value = _page_rows([log1])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -309,7 +314,7 @@ class TestGetLogs:
         count_result.scalar.return_value = 0
 
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = []
+        rows_result.all.return_value = _page_rows([])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -340,7 +345,7 @@ class TestGetLogs:
         count_result.scalar.return_value = 0
 
         rows_result = MagicMock()
-        rows_result.scalars.return_value.all.return_value = []
+        rows_result.all.return_value = _page_rows([])
 
         session.execute = AsyncMock(side_effect=[count_result, rows_result])
 
@@ -0,0 +1,218 @@
+"""
+Tests for app.api.endpoints.uploads.
+
+Covers:
+- POST /uploads/case-image/{maintenance_id} (streaming upload, type / size checks)
+- GET  /uploads/files/{path} (streaming download, Range, ETag / 304, disk cache)
+
+Uses the local filesystem storage backend under tmp_path.
+"""
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api.endpoints import uploads
+from app.api.endpoints.auth import get_current_user
+from app.services import object_cache, storage
+from app.services.object_cache import ObjectCache
+from app.services.storage import LocalBackend
+
+USER = {"user_id": 1, "username": "alice", "role": "PM", "maintenance_id": "M1"}
+IMAGE = bytes(range(256)) * 40  # 10 KB
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = LocalBackend(tmp_path / "objects")
+    cache = ObjectCache(tmp_path / "cache", max_bytes=100 * 1024)
+    with (
+        patch.object(storage, "_backend", backend),
+        patch.object(object_cache, "_cache", cache),
+        patch.object(uploads, "write_log", AsyncMock()),
+    ):
+        yield backend
+
+
+@pytest.fixture
+async def client(backend):
+    app = FastAPI()
+    app.include_router(uploads.router)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as client:
+        yield client
+
+
+async def _upload(client, data: bytes = IMAGE, content_type: str = "image/png"):
+    return await client.post(
+        "/uploads/case-image/M1",
+        files={"file": ("shot.png", data, content_type)},
+    )
+
+
+def _object_path(url: str) -> str:
+    return url.removeprefix("/api/v1")
+
+
+class TestUpload:
+
+    async def test_upload_streams_to_backend(self, client, backend):
+        resp = await _upload(client)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["filename"].endswith(".png")
+        assert body["url"] == f"/api/v1/uploads/files/cases/M1/{body['filename']}"
+        stored = backend.root / "cases" / "M1" / body["filename"]
+        assert stored.read_bytes() == IMAGE
+        uploads.write_log.assert_awaited_once()
+
+    async def test_rejects_type(self, client, backend):
+        resp = await _upload(client, content_type="application/pdf")
+        assert resp.status_code == 400
+        assert not backend.root.exists()
+
+    async def test_rejects_too_large(self, client, backend):
+        resp = await _upload(client, data=b"x" * (uploads.MAX_FILE_SIZE + 1))
+        assert resp.status_code == 400
+        assert not any(backend.root.rglob("*.png"))
+
+    async def test_size_checked_while_streaming(self, backend):
+        """大小未知時邊讀邊檢查，超過即中止且不留下檔案。"""
+        file = AsyncMock()
+        file.read = AsyncMock(side_effect=[b"x" * 4096] * 3 + [b""])
+        reader = uploads._LimitedReader(file, limit=10_000)
+        with pytest.raises(uploads._FileTooLargeError):
+            await storage.upload_stream("cases/M1/big.png", reader)
+        assert not any(p.is_file() for p in backend.root.rglob("*"))
+
+
+class TestServe:
+
+    async def test_full_download(self, client):
+        url = _object_path((await _upload(client)).json()["url"])
+
+        resp = await client.get(url)
+        assert resp.status_code == 200
+        assert resp.content == IMAGE
+        assert resp.headers["content-type"] == "image/png"
+        assert resp.headers["content-length"] == str(len(IMAGE))
+        assert resp.headers["accept-ranges"] == "bytes"
+        assert "immutable" in resp.headers["cache-control"]
+        assert resp.headers["etag"].startswith('"')
+
+    async def test_not_found(self, client):
+        resp = await client.get("/uploads/files/cases/M1/missing.png")
+        assert resp.status_code == 404
+        resp = await client.get("/uploads/files/../../etc/passwd")
+        assert resp.status_code == 404
+
+    async def test_if_none_match(self, client):
+        url = _object_path((await _upload(client)).json()["url"])
+        etag = (await client.get(url)).headers["etag"]
+
+        resp = await client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+
+    @pytest.mark.parametrize(("header", "start", "end"), [
+        ("bytes=0-99", 0, 99),
+        ("bytes=100-", 100, len(IMAGE) - 1),
+        ("bytes=-10", len(IMAGE) - 10, len(IMAGE) - 1),
+        ("bytes=5000-999999", 5000, len(IMAGE) - 1),
+    ])
+    @pytest.mark.parametrize("cached", [False, True])
+    async def test_range(self, client, header, start, end, cached):
+        url = _object_path((await _upload(client)).json()["url"])
+        if cached:
+            await client.get(url)
+
+        resp = await client.get(url, headers={"Range": header})
+        assert resp.status_code == 206
+        assert resp.content == IMAGE[start:end + 1]
+        assert resp.headers["content-range"] == f"bytes {start}-{end}/{len(IMAGE)}"
+        assert resp.headers["content-length"] == str(end - start + 1)
+
+    @pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1", "bytes=9-3"])
+    async def test_unsupported_range_serves_full(self, client, header):
+        url = _object_path((await _upload(client)).json()["url"])
+        resp = await client.get(url, headers={"Range": header})
+        assert resp.status_code == 200
+        assert resp.content == IMAGE
+
+    async def test_unsatisfiable_range(self, client):
+        url = _object_path((await _upload(client)).json()["url"])
+        resp = await client.get(url, headers={"Range": f"bytes={len(IMAGE)}-"})
+        assert resp.status_code == 416
+        assert resp.headers["content-range"] == f"bytes */{len(IMAGE)}"
+
+    async def test_if_range_mismatch_serves_full(self, client):
+        url = _object_path((await _upload(client)).json()["url"])
+        resp = await client.get(
+            url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'},
+        )
+        assert resp.status_code == 200
+        assert resp.content == IMAGE
+
+
+class TestDiskCache:
+
+    async def test_second_download_served_from_cache(self, client, backend):
+        url = _object_path((await _upload(client)).json()["url"])
+        first = await client.get(url)
+
+        with (
+            patch.object(backend, "stat", AsyncMock()) as stat,
+            patch.object(backend, "iter_range") as iter_range,
+        ):
+            second = await client.get(url)
+        stat.assert_not_called()
+        iter_range.assert_not_called()
+        assert second.content == IMAGE
+        assert second.headers["etag"] == first.headers["etag"]
+
+    async def test_range_miss_not_cached(self, client):
+        url = _object_path((await _upload(client)).json()["url"])
+        await client.get(url, headers={"Range": "bytes=0-9"})
+        assert object_cache._cache.size == 0
+
+    async def test_evicts_least_recently_used(self, client):
+        cache = object_cache._cache
+        urls = [
+            _object_path((await _upload(client)).json()["url"]) for _ in range(12)
+        ]
+        for url in urls:
+            await client.get(url)
+            # 最早的一張保持熱門
+            await client.get(urls[0])
+
+        assert cache.size <= cache.max_bytes
+        cached = set(cache._entries)
+        names = [url.removeprefix("/uploads/files/") for url in urls]
+        assert names[0] in cached
+        assert names[1] not in cached
+        assert names[-1] in cached
+        assert len(list(cache.root.iterdir())) == len(cached)
+
+    async def test_oversized_object_not_cached(self, client):
+        big = IMAGE * 2  # 20 KB > max_bytes / 8
+        url = _object_path((await _upload(client, data=big)).json()["url"])
+        resp = await client.get(url)
+        assert resp.content == big
+        assert object_cache._cache.size == 0
+
+    async def test_interrupted_download_not_cached(self, backend, tmp_path):
+        cache = ObjectCache(tmp_path / "cache2", max_bytes=100 * 1024)
+        await storage.upload_file("cases/M1/a.png", IMAGE, "image/png")
+        info = await storage.stat_object("cases/M1/a.png")
+
+        body = cache.fill("cases/M1/a.png", info, storage.iter_object("cases/M1/a.png"))
+        await anext(body)
+        await body.aclose()
+        assert cache.open("cases/M1/a.png") is None
+        assert not any(cache.root.iterdir())
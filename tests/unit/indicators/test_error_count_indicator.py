@@ -3,8 +3,10 @@ Unit tests for ErrorCountIndicator.evaluate() — device-level evaluation.
 
 Mocking strategy:
 - indicator._get_active_device_hostnames  -> returns list of hostnames
-- InterfaceErrorRecordRepo.get_latest_per_device -> returns list of mock records
-- ErrorCountIndicator._get_previous_batches -> returns dict
+- InterfaceErrorRecordRepo.get_latest_item_counts -> {hostname: item_count}
+- InterfaceErrorRecordRepo.get_growing_interfaces -> rows with crc_delta > 0
+  (delta 於寫入時預先計算，見 InterfaceErrorRecordRepo.derive_row_fields)
+- indicator._get_error_devices -> set of hostnames with CollectionError
 """
 from __future__ import annotations
 
@@ -21,23 +23,59 @@ from app.indicators.error_count import ErrorCountIndicator
 # ---------------------------------------------------------------------------
 
 MAINTENANCE_ID = "maint-001"
+REPO = "app.indicators.error_count.InterfaceErrorRecordRepo"
 
 
-def _make_record(
+def _growth(
     hostname: str,
     interface: str,
+    prev_crc_errors: int,
     crc_errors: int,
-    batch_id: int = 100,
     collected_at: datetime | None = None,
 ) -> MagicMock:
-    """Create a mock InterfaceErrorRecord with the required attributes."""
-    rec = MagicMock()
-    rec.switch_hostname = hostname
-    rec.interface_name = interface
-    rec.crc_errors = crc_errors
-    rec.batch_id = batch_id
-    rec.collected_at = collected_at or datetime(2026, 1, 1, 12, 0, 0)
-    return rec
+    """Mock growth row (columns returned by get_growing_interfaces)."""
+    row = MagicMock()
+    row.switch_hostname = hostname
+    row.interface_name = interface
+    row.prev_crc_errors = prev_crc_errors
+    row.crc_errors = crc_errors
+    row.crc_delta = crc_errors - prev_crc_errors
+    row.collected_at = collected_at or datetime(2026, 1, 1, 12, 0, 0)
+    row.first_growth_at = row.collected_at
+    return row
+
+
+async def _evaluate(
+    indicator: ErrorCountIndicator,
+    session: AsyncMock,
+    hostnames: list[str],
+    item_counts: dict[str, int],
+    growth_rows: list[MagicMock],
+    error_devices: set[str] | None = None,
+    growth_calls: list | None = None,
+):
+    with (
+        patch.object(
+            indicator, "_get_active_device_hostnames",
+            new_callable=AsyncMock, return_value=hostnames,
+        ),
+        patch.object(
+            indicator, "_get_error_devices",
+            new_callable=AsyncMock, return_value=error_devices or set(),
+        ),
+        patch(
+            f"{REPO}.get_latest_item_counts",
+            new_callable=AsyncMock, return_value=item_counts,
+        ),
+        patch(
+            f"{REPO}.get_growing_interfaces",
+            new_callable=AsyncMock, return_value=growth_rows,
+        ) as growing,
+    ):
+        result = await indicator.evaluate(MAINTENANCE_ID, session)
+    if growth_calls is not None:
+        growth_calls.append(growing.call_args)
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -62,24 +100,10 @@ class TestErrorCountEvaluate:
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
         """CRC errors grew on an interface -> device fails."""
-        current = [_make_record("switch-A", "Gi1/0/1", crc_errors=15, batch_id=200)]
-        prev = {"switch-A": {"Gi1/0/1": {"crc_errors": 10}}}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {"switch-A": 1},
+            [_growth("switch-A", "Gi1/0/1", 10, 15)],
+        )
 
         assert result.total_count == 1
         assert result.pass_count == 0
@@ -97,31 +121,17 @@ class TestErrorCountEvaluate:
         assert growing[0]["delta"] == 5
         assert growing[0]["prev_crc_errors"] == 10
         assert growing[0]["crc_errors"] == 15
+        assert growing[0]["first_growth_at"] == "2026-01-01T12:00:00"
 
-    # 2. Delta zero → device pass ---------------------------------------------
+    # 2. No growth rows → device pass -----------------------------------------
 
-    async def test_delta_zero_is_pass(
+    async def test_no_growth_is_pass(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """CRC errors unchanged -> device passes with '計數器未增長'."""
-        current = [_make_record("switch-A", "Gi1/0/1", crc_errors=10, batch_id=200)]
-        prev = {"switch-A": {"Gi1/0/1": {"crc_errors": 10}}}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """No interface with crc_delta > 0 -> device passes with '計數器未增長'."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {"switch-A": 3}, [],
+        )
 
         assert result.total_count == 1
         assert result.pass_count == 1
@@ -129,96 +139,52 @@ class TestErrorCountEvaluate:
         assert result.passes is not None
         assert result.passes[0]["reason"] == "計數器未增長"
 
-    # 3. Delta negative → device pass (counter reset) -------------------------
+    # 3. Default window → only latest batch is queried ------------------------
 
-    async def test_delta_negative_is_pass(
+    async def test_default_window_queries_latest_batch(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """CRC errors decreased (counter reset) -> device passes."""
-        current = [_make_record("switch-A", "Gi1/0/1", crc_errors=3, batch_id=200)]
-        prev = {"switch-A": {"Gi1/0/1": {"crc_errors": 50}}}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
+        """error_count_growth_window_minutes=0 -> since=None (latest change point)."""
+        calls: list = []
+        with patch(
+            "app.indicators.error_count.get_threshold", return_value=0,
         ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
-
-        assert result.total_count == 1
-        assert result.pass_count == 1
-        assert result.fail_count == 0
-        assert result.passes is not None
-        assert result.passes[0]["reason"] == "計數器未增長"
+            await _evaluate(
+                indicator, mock_session, ["switch-A"], {"switch-A": 1}, [],
+                growth_calls=calls,
+            )
 
-    # 4. First collection, no previous batch ----------------------------------
+        assert calls[0].kwargs["since"] is None
 
-    async def test_first_collection_no_previous(
+    async def test_sliding_window_sets_since(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """No previous batch data -> device passes with '首次採集'."""
-        current = [_make_record("switch-A", "Gi1/0/1", crc_errors=5, batch_id=200)]
-        prev: dict = {}  # no previous batches at all
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
+        """A positive window queries growth rows newer than now - N minutes."""
+        calls: list = []
+        with patch(
+            "app.indicators.error_count.get_threshold", return_value=30,
         ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+            before = datetime.utcnow()
+            await _evaluate(
+                indicator, mock_session, ["switch-A"], {"switch-A": 1}, [],
+                growth_calls=calls,
+            )
 
-        assert result.total_count == 1
-        assert result.pass_count == 1
-        assert result.fail_count == 0
-        assert result.passes is not None
-        assert "首次採集" in result.passes[0]["reason"]
+        since = calls[0].kwargs["since"]
+        assert since.tzinfo is None
+        assert 29 * 60 <= (before - since).total_seconds() <= 31 * 60
 
-    # 5. Non-active devices are filtered out ----------------------------------
+    # 4. Non-active devices are filtered out ----------------------------------
 
     async def test_non_active_devices_filtered(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """Records from inactive devices should not be counted."""
-        # "switch-B" is in the records but NOT in active device list
-        current = [
-            _make_record("switch-A", "Gi1/0/1", crc_errors=10, batch_id=200),
-            _make_record("switch-B", "Gi1/0/1", crc_errors=99, batch_id=201),
-        ]
-        prev: dict = {}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """Growth from devices outside the device list is ignored."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"],
+            {"switch-A": 1, "switch-B": 1},
+            [_growth("switch-B", "Gi1/0/1", 0, 99)],
+        )
 
         # Only switch-A counted (1 device)
         assert result.total_count == 1
@@ -232,7 +198,7 @@ class TestErrorCountEvaluate:
             all_devices.update(f["device"] for f in result.failures)
         assert "switch-B" not in all_devices
 
-    # 6. Empty device list ----------------------------------------------------
+    # 5. Empty device list ----------------------------------------------------
 
     async def test_empty_device_list(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
@@ -250,175 +216,73 @@ class TestErrorCountEvaluate:
         assert result.summary == "無設備資料"
         assert result.pass_rates == {"error_no_growth": 0}
 
-    # 7. Multiple interfaces per device — device-level aggregation ------------
+    # 6. Multiple growing interfaces — device-level aggregation ---------------
 
-    async def test_multiple_interfaces_one_growth_device_fails(
+    async def test_multiple_interfaces_one_device(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """Device with 3 interfaces, 1 has growth -> device fails (total=1, fail=1)."""
-        current = [
-            _make_record("switch-A", "Gi1/0/1", crc_errors=10, batch_id=200),
-            _make_record("switch-A", "Gi1/0/2", crc_errors=20, batch_id=200),
-            _make_record("switch-A", "Gi1/0/3", crc_errors=30, batch_id=200),
-        ]
-        prev = {
-            "switch-A": {
-                "Gi1/0/1": {"crc_errors": 10},   # delta=0  -> ok
-                "Gi1/0/2": {"crc_errors": 15},   # delta=+5 -> growth!
-                "Gi1/0/3": {"crc_errors": 30},   # delta=0  -> ok
-            },
-        }
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """Two growing interfaces on one device -> one device failure."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {"switch-A": 3},
+            [
+                _growth("switch-A", "Gi1/0/2", 15, 20),
+                _growth("switch-A", "Gi1/0/3", 0, 1),
+            ],
+        )
 
-        # Device level: 1 device, it fails
         assert result.total_count == 1
-        assert result.pass_count == 0
         assert result.fail_count == 1
-        assert result.failures is not None
-        assert len(result.failures) == 1
-        assert result.failures[0]["device"] == "switch-A"
-        # Only Gi1/0/2 should be in the growing list
         growing = result.failures[0]["data"]["growing_interfaces"]
-        assert len(growing) == 1
-        assert growing[0]["interface"] == "Gi1/0/2"
-        assert growing[0]["delta"] == 5
+        assert [g["interface"] for g in growing] == ["Gi1/0/2", "Gi1/0/3"]
+        assert "Gi1/0/2(+5)" in result.failures[0]["reason"]
 
-    # 8. Mixed devices — each evaluated independently -------------------------
+    # 7. Collection state ------------------------------------------------------
 
-    async def test_mixed_devices(
+    async def test_empty_batch_is_pass(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """Two devices, both have growth on one interface -> both fail."""
-        current = [
-            # switch-A: two interfaces
-            _make_record("switch-A", "Gi1/0/1", crc_errors=10, batch_id=200),
-            _make_record("switch-A", "Gi1/0/2", crc_errors=50, batch_id=200),
-            # switch-B: two interfaces
-            _make_record("switch-B", "Gi1/0/1", crc_errors=0, batch_id=201),
-            _make_record("switch-B", "Gi1/0/2", crc_errors=100, batch_id=201),
-        ]
-        prev = {
-            "switch-A": {
-                "Gi1/0/1": {"crc_errors": 10},   # delta=0  -> ok
-                "Gi1/0/2": {"crc_errors": 30},   # delta=+20 -> growth
-            },
-            "switch-B": {
-                "Gi1/0/1": {"crc_errors": 5},    # delta=-5 -> reset
-                "Gi1/0/2": {"crc_errors": 80},   # delta=+20 -> growth
-            },
-        }
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A", "switch-B"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """Latest batch with zero records (all interfaces zero errors) -> PASS."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {"switch-A": 0}, [],
+        )
 
-        # Device level: 2 devices, both fail
-        assert result.total_count == 2
-        assert result.pass_count == 0
-        assert result.fail_count == 2
-        assert result.pass_rates["error_no_growth"] == 0.0
+        assert result.pass_count == 1
+        assert result.passes[0]["reason"] == "所有介面零錯誤"
 
-        # Verify failures contain the right devices
-        fail_devices = {f["device"] for f in result.failures}
-        assert fail_devices == {"switch-A", "switch-B"}
+    async def test_empty_batch_with_collection_error_fails(
+        self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
+    ) -> None:
+        """Empty batch written on collection failure -> '採集失敗'."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {"switch-A": 0}, [],
+            error_devices={"switch-A"},
+        )
 
-    # 9. Device with no error records (collector skipped) → PASS --------------
+        assert result.fail_count == 1
+        assert result.failures[0]["reason"] == "採集失敗"
 
-    async def test_device_no_error_records_is_pass(
+    async def test_never_collected_fails(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """Active device with no collected error records -> PASS (無錯誤記錄)."""
-        # switch-A has records, switch-B has none (all interfaces zero errors)
-        current = [
-            _make_record("switch-A", "Gi1/0/1", crc_errors=5, batch_id=200),
-        ]
-        prev: dict = {}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A", "switch-B"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """No batch at all -> '尚未採集'."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A"], {}, [],
+        )
 
-        # 2 devices total, both pass
-        assert result.total_count == 2
-        assert result.pass_count == 2
-        assert result.fail_count == 0
-        assert result.passes is not None
-        pass_by_device = {p["device"]: p for p in result.passes}
-        assert pass_by_device["switch-B"]["reason"] == "無錯誤記錄"
-        assert "首次採集" in pass_by_device["switch-A"]["reason"]
+        assert result.fail_count == 1
+        assert result.failures[0]["reason"] == "尚未採集"
 
-    # 10. Mixed pass/fail across devices with different scenarios --------------
+    # 8. Mixed pass/fail across devices ----------------------------------------
 
     async def test_mixed_pass_fail_devices(
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
-        """3 devices: one no records (pass), one no growth (pass), one growth (fail)."""
-        current = [
-            # switch-A: stable
-            _make_record("switch-A", "Gi1/0/1", crc_errors=10, batch_id=200),
-            # switch-B: growth
-            _make_record("switch-B", "Gi1/0/1", crc_errors=20, batch_id=201),
-            # switch-C: no records (not in current)
-        ]
-        prev = {
-            "switch-A": {"Gi1/0/1": {"crc_errors": 10}},   # delta=0
-            "switch-B": {"Gi1/0/1": {"crc_errors": 5}},    # delta=+15
-        }
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["switch-A", "switch-B", "switch-C"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        """3 devices: zero errors (pass), no growth (pass), growth (fail)."""
+        result = await _evaluate(
+            indicator, mock_session, ["switch-A", "switch-B", "switch-C"],
+            {"switch-A": 1, "switch-B": 1, "switch-C": 0},
+            [_growth("switch-B", "Gi1/0/1", 5, 20)],
+        )
 
         assert result.total_count == 3
         assert result.pass_count == 2
@@ -427,6 +291,28 @@ class TestErrorCountEvaluate:
         assert result.summary == "錯誤計數: 2/3 設備通過"
 
 
+class TestGroupGrowth:
+    """Tests for ErrorCountIndicator._group_growth() (sliding-window merge)."""
+
+    def test_window_rows_accumulate_per_interface(self) -> None:
+        """Several growth batches of one interface merge into one entry."""
+        rows = [
+            _growth("sw1", "Gi1/0/1", 10, 12, datetime(2026, 1, 1, 12, 0)),
+            _growth("sw1", "Gi1/0/1", 12, 20, datetime(2026, 1, 1, 12, 5)),
+        ]
+        grouped = ErrorCountIndicator._group_growth(rows, {"sw1"})
+
+        [entry] = grouped["sw1"]
+        assert entry["delta"] == 10
+        assert entry["prev_crc_errors"] == 10
+        assert entry["crc_errors"] == 20
+        assert entry["first_growth_at"] == "2026-01-01T12:00:00"
+
+    def test_inactive_devices_dropped(self) -> None:
+        rows = [_growth("sw9", "Gi1/0/1", 0, 1)]
+        assert ErrorCountIndicator._group_growth(rows, {"sw1"}) == {}
+
+
 class TestCalcPercent:
     """Tests for ErrorCountIndicator._calc_percent() edge cases."""
 
@@ -475,24 +361,7 @@ class TestEvaluateResultStructure:
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
         """Result carries the correct indicator_type and maintenance_id."""
-        current = [_make_record("sw1", "Gi1/0/1", crc_errors=0, batch_id=100)]
-        prev: dict = {}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["sw1"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        result = await _evaluate(indicator, mock_session, ["sw1"], {"sw1": 1}, [])
 
         assert result.indicator_type == "error_count"
         assert result.maintenance_id == MAINTENANCE_ID
@@ -501,32 +370,10 @@ class TestEvaluateResultStructure:
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
         """Summary follows '錯誤計數: X/Y 設備通過' format."""
-        current = [
-            _make_record("sw1", "Gi1/0/1", crc_errors=0, batch_id=100),
-            _make_record("sw1", "Gi1/0/2", crc_errors=5, batch_id=100),
-        ]
-        prev = {
-            "sw1": {
-                "Gi1/0/1": {"crc_errors": 0},
-                "Gi1/0/2": {"crc_errors": 0},   # delta=+5 -> growth
-            },
-        }
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["sw1"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        result = await _evaluate(
+            indicator, mock_session, ["sw1"], {"sw1": 2},
+            [_growth("sw1", "Gi1/0/2", 0, 5)],
+        )
 
         # sw1 has growth on Gi1/0/2 -> device fails -> 0/1 pass
         assert result.summary == "錯誤計數: 0/1 設備通過"
@@ -535,24 +382,7 @@ class TestEvaluateResultStructure:
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
         """failures field is None when there are no failures."""
-        current = [_make_record("sw1", "Gi1/0/1", crc_errors=10, batch_id=100)]
-        prev = {"sw1": {"Gi1/0/1": {"crc_errors": 10}}}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["sw1"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        result = await _evaluate(indicator, mock_session, ["sw1"], {"sw1": 1}, [])
 
         assert result.failures is None
 
@@ -560,23 +390,9 @@ class TestEvaluateResultStructure:
         self, indicator: ErrorCountIndicator, mock_session: AsyncMock,
     ) -> None:
         """passes field is None when every device fails."""
-        current = [_make_record("sw1", "Gi1/0/1", crc_errors=20, batch_id=100)]
-        prev = {"sw1": {"Gi1/0/1": {"crc_errors": 5}}}
-
-        with (
-            patch.object(
-                indicator, "_get_active_device_hostnames",
-                new_callable=AsyncMock, return_value=["sw1"],
-            ),
-            patch(
-                "app.indicators.error_count.InterfaceErrorRecordRepo.get_latest_per_device",
-                new_callable=AsyncMock, return_value=current,
-            ),
-            patch.object(
-                indicator, "_get_previous_batches",
-                new_callable=AsyncMock, return_value=prev,
-            ),
-        ):
-            result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
+        result = await _evaluate(
+            indicator, mock_session, ["sw1"], {"sw1": 1},
+            [_growth("sw1", "Gi1/0/1", 5, 20)],
+        )
 
         assert result.passes is None
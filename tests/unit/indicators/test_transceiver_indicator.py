@@ -8,15 +8,22 @@ Tests cover:
 - _field_pass_rate helper
 - _collect_failure_reasons pure helper
 - _calc_percent edge cases
+- _TransceiverColumns masks match the scalar _check_single_record path
 """
 from __future__ import annotations
 
+import random
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.indicators.transceiver import TransceiverIndicator, _Thresholds, _UNCONNECTED_DBM
+from app.indicators.transceiver import (
+    TransceiverIndicator,
+    _Thresholds,
+    _TransceiverColumns,
+    _UNCONNECTED_DBM,
+)
 
 
 # ── Fixtures ────────────────────────────────────────────────────────
@@ -94,7 +101,7 @@ class TestEvaluateAllMetricsInRange:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -134,7 +141,7 @@ class TestEvaluateTxPowerBelowMin:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -167,7 +174,7 @@ class TestEvaluateRxPowerAboveMax:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -200,7 +207,7 @@ class TestEvaluateTemperatureOutOfRange:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -232,7 +239,7 @@ class TestEvaluateVoltageOutOfRange:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -264,7 +271,7 @@ class TestEvaluatePartialNoneIsFailure:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -296,7 +303,7 @@ class TestEvaluateAllFourNoneIsFailure:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -330,7 +337,7 @@ class TestEvaluateRecordsFromNonActiveDevicesFiltered:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -388,7 +395,7 @@ class TestDeviceNoTransceiverRecordsIsPass:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -416,7 +423,7 @@ class TestDeviceNoTransceiverRecordsIsPass:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=[],  # no records at all
             ),
@@ -454,7 +461,7 @@ class TestDeviceLevelAggregation:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -490,7 +497,7 @@ class TestDeviceLevelAggregation:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -534,7 +541,7 @@ class TestFieldPassRateCalculation:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -733,7 +740,7 @@ class TestEvaluateSummaryFormat:
                 return_value=STANDARD_THRESHOLDS,
             ),
             patch(
-                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+                "app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                 new_callable=AsyncMock,
                 return_value=records,
             ),
@@ -868,7 +875,7 @@ class TestUnconnectedDevicePass:
                          return_value=["SW-01"]),
             patch.object(TransceiverIndicator, "_load_thresholds",
                          return_value=STANDARD_THRESHOLDS),
-            patch("app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+            patch("app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                   new_callable=AsyncMock, return_value=records),
         ):
             result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
@@ -894,7 +901,7 @@ class TestUnconnectedDevicePass:
                          return_value=["SW-01"]),
             patch.object(TransceiverIndicator, "_load_thresholds",
                          return_value=STANDARD_THRESHOLDS),
-            patch("app.indicators.transceiver.TransceiverRecordRepo.get_latest_per_device",
+            patch("app.indicators.transceiver.TransceiverRecordRepo.get_latest_columns_per_device",
                   new_callable=AsyncMock, return_value=records),
         ):
             result = await indicator.evaluate(MAINTENANCE_ID, mock_session)
@@ -904,3 +911,59 @@ class TestUnconnectedDevicePass:
         # Only the real failure interface should be listed
         assert "Gi1/0/2" in result.failures[0]["interface"]
         assert len(result.failures[0]["data"]["failing_interfaces"]) == 1
+
+
+class TestColumnarMatchesScalar:
+    """_TransceiverColumns.evaluate must agree with _check_single_record."""
+
+    _VALUES = {
+        "tx_power": [None, -15.0, -10.0, -2.0, 3.0, 4.0, _UNCONNECTED_DBM, -36.9],
+        "rx_power": [None, -20.0, -15.0, -5.0, 0.0, 1.0, _UNCONNECTED_DBM, -37.1],
+        "temperature": [None, 5.0, 10.0, 35.0, 70.0, 80.0],
+        "voltage": [None, 2.5, 3.0, 3.3, 3.6, 4.0],
+    }
+
+    def _random_records(self, n: int, seed: int) -> list[MagicMock]:
+        rng = random.Random(seed)
+        return [
+            _make_record(
+                f"SW-{i % 7:02d}", f"Gi1/0/{i}",
+                **{f: rng.choice(vals) for f, vals in self._VALUES.items()},
+            )
+            for i in range(n)
+        ]
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_masks_match_single_record(self, indicator, thresholds, seed):
+        records = self._random_records(500, seed)
+        columns = _TransceiverColumns(records)
+        failing = columns.failing_rows(thresholds)
+        unconnected = dict(zip(
+            failing, columns.unconnected_only(thresholds, failing), strict=True,
+        ))
+
+        for i, record in enumerate(records):
+            expected = indicator._check_single_record(record, thresholds)
+            assert (i in unconnected) is (expected is not None)
+            if expected is not None:
+                built = indicator._build_failure(
+                    record, thresholds, unconnected[i],
+                )
+                assert built == expected
+
+    def test_pass_count_matches_field_pass_rate(self, indicator, thresholds):
+        records = self._random_records(300, 7)
+        columns = _TransceiverColumns(records)
+        for field, lo, hi in [
+            ("tx_power", thresholds.tx_power_min, thresholds.tx_power_max),
+            ("voltage", thresholds.voltage_min, thresholds.voltage_max),
+        ]:
+            assert indicator._column_pass_rate(columns, field, lo, hi) == (
+                indicator._field_pass_rate(records, field, lo, hi)
+            )
+
+    def test_empty_rows(self, thresholds):
+        columns = _TransceiverColumns([])
+        assert len(columns) == 0
+        assert columns.failing_rows(thresholds) == []
+        assert columns.pass_count("tx_power", -10.0, 3.0) == (0, 0)
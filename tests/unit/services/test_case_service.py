@@ -3,19 +3,29 @@ Tests for app.services.case_service.
 
 Covers:
 - _detect_change() pure function (no DB required)
-- update_ping_status() business logic (mocked DB)
+- folded change state (_fold_record / _state_flag) equivalence with _detect_change
 - auto_resolve_reachable() business logic (mocked DB)
 - auto_reopen_unreachable() business logic (mocked DB)
 """
 from __future__ import annotations
 
+import random
 from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from app.core.enums import CaseStatus
-from app.services.case_service import CaseService, _detect_change
+from app.db.models import CaseChangeState
+from app.services.case_service import (
+    CaseService,
+    _detect_change,
+    _fold_record,
+    _get_transition_ts,
+    _reset_state,
+    _state_flag,
+)
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -99,6 +109,88 @@ class TestDetectChange:
         assert _detect_change([None, 1], last_collected_at=old_ts) is False
 
 
+# ══════════════════════════════════════════════════════════════════
+# Folded change state — equivalence with _detect_change (no DB)
+# ══════════════════════════════════════════════════════════════════
+
+
+def _new_state(attr: str = "value") -> CaseChangeState:
+    state = CaseChangeState(attribute=attr)
+    _reset_state(state)
+    return state
+
+
+def _random_history(rng: random.Random, now: datetime) -> list[SimpleNamespace]:
+    """隨機值序列；時間點落在 now 前後 30 分鐘內（避開 15 分鐘的邊界）。"""
+    pool = rng.choice([
+        [None, 10, 10, 20],
+        [None, "1G", "1G"],
+        [True, False, None],
+        [None, 1000, "1000"],  # str() 相同視為同一個值
+        [None, "up"],
+    ])
+    start = now - timedelta(minutes=rng.randint(0, 30), seconds=30)
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            value=rng.choice(pool),
+            collected_at=(start + timedelta(minutes=i)).replace(tzinfo=None),
+        )
+        for i in range(rng.randint(0, 12))
+    ]
+
+
+class TestFoldedChangeState:
+    """逐筆 fold 的狀態必須與對完整歷史呼叫 _detect_change 的結果相同。"""
+
+    @pytest.mark.parametrize("seed", range(200))
+    def test_every_prefix_matches_detect_change(self, seed):
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        records = _random_history(rng, now)
+        state = _new_state()
+
+        for i, record in enumerate(records, start=1):
+            _fold_record(state, record)
+            prefix = records[:i]
+            expected = _detect_change(
+                [r.value for r in prefix],
+                last_collected_at=_get_transition_ts(prefix, "value"),
+            )
+            assert _state_flag(state, now)[0] is expected, prefix
+
+        assert state.record_count == len(records)
+        assert len(state.distinct_values) <= 2
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_deadline_is_when_flag_clears(self, seed):
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        records = _random_history(rng, now)
+        state = _new_state()
+        for record in records:
+            _fold_record(state, record)
+
+        flag, deadline = _state_flag(state, now)
+        if deadline is None:
+            # 不會隨時間改變
+            assert _state_flag(state, now + timedelta(hours=1))[0] is flag
+        else:
+            assert flag is True
+            assert _state_flag(state, deadline - timedelta(seconds=1))[0] is True
+            assert _state_flag(state, deadline + timedelta(seconds=1))[0] is False
+
+    def test_empty_state_has_no_change(self):
+        assert _state_flag(_new_state(), datetime.now(timezone.utc)) == (False, None)
+
+    def test_transition_without_timestamp_is_change(self):
+        state = _new_state()
+        _fold_record(state, SimpleNamespace(id=1, value=None, collected_at=None))
+        _fold_record(state, SimpleNamespace(id=2, value="up", collected_at=None))
+
+        assert _state_flag(state, datetime.now(timezone.utc)) == (True, None)
+
+
 # ══════════════════════════════════════════════════════════════════
 # Helpers for mocked DB tests
 # ══════════════════════════════════════════════════════════════════
@@ -126,296 +218,6 @@ def _make_rowcount_result(count):
     return result
 
 
-# ══════════════════════════════════════════════════════════════════
-# update_ping_status() tests
-# ══════════════════════════════════════════════════════════════════
-
-
-class TestUpdatePingStatus:
-    """Tests for CaseService.update_ping_status() business logic."""
-
-    @pytest.mark.asyncio
-    async def test_ping_unreachable_to_reachable_sets_since(self):
-        """When ping transitions from False to True, ping_reachable_since
-        should be set to approximately now."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:01"
-        # First execute: latest ClientRecord pings
-        latest_pings = [(mac, True)]
-        # Second execute: existing Case states (old_reachable=False, old_since=None)
-        case_states = [(mac, False, None)]
-        # Third execute: the UPDATE statement
-        update_result = MagicMock()
-
-        session.execute = AsyncMock(side_effect=[
-            _make_fetchall_result(latest_pings),
-            _make_fetchall_result(case_states),
-            update_result,
-        ])
-
-        before = datetime.now(timezone.utc)
-        await service.update_ping_status("MAINT-001", session)
-        after = datetime.now(timezone.utc)
-
-        # The UPDATE call is the third execute call
-        update_call = session.execute.call_args_list[2]
-        stmt = update_call[0][0]
-
-        # Verify commit was called
-        session.commit.assert_awaited_once()
-
-        # Verify the update was issued (3 execute calls: subquery, case_states, update)
-        assert session.execute.await_count == 3
-
-    @pytest.mark.asyncio
-    async def test_ping_reachable_to_reachable_keeps_since(self):
-        """When ping stays True with an existing since timestamp,
-        ping_reachable_since should remain unchanged."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:02"
-        original_since = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
-
-        latest_pings = [(mac, True)]
-        case_states = [(mac, True, original_since)]
-        update_result = MagicMock()
-
-        session.execute = AsyncMock(side_effect=[
-            _make_fetchall_result(latest_pings),
-            _make_fetchall_result(case_states),
-            update_result,
-        ])
-
-        await service.update_ping_status("MAINT-001", session)
-
-        # Verify the update was executed
-        assert session.execute.await_count == 3
-        session.commit.assert_awaited_once()
-
-    @pytest.mark.asyncio
-    async def test_ping_reachable_to_unreachable_clears_since(self):
-        """When ping transitions from True to False,
-        ping_reachable_since should be cleared to None."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:03"
-        original_since = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
-
-        latest_pings = [(mac, False)]
-        case_states = [(mac, True, original_since)]
-        update_result = MagicMock()
-
-        session.execute = AsyncMock(side_effect=[
-            _make_fetchall_result(latest_pings),
-            _make_fetchall_result(case_states),
-            update_result,
-        ])
-
-        await service.update_ping_status("MAINT-001", session)
-
-        assert session.execute.await_count == 3
-        session.commit.assert_awaited_once()
-
-    @pytest.mark.asyncio
-    async def test_ping_no_prior_state(self):
-        """When no prior Case exists for a MAC (not in case_states),
-        a reachable ping should set since to now."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:04"
-        latest_pings = [(mac, True)]
-        # No existing case state for this MAC
-        case_states = []
-        update_result = MagicMock()
-
-        session.execute = AsyncMock(side_effect=[
-            _make_fetchall_result(latest_pings),
-            _make_fetchall_result(case_states),
-            update_result,
-        ])
-
-        await service.update_ping_status("MAINT-001", session)
-
-        # Should still issue the UPDATE (even if the Case row may not exist,
-        # the service does not check; it always issues an UPDATE WHERE mac)
-        assert session.execute.await_count == 3
-        session.commit.assert_awaited_once()
-
-
-class TestUpdatePingStatusLogic:
-    """Detailed tests verifying the ping_reachable_since calculation logic
-    by inspecting the .values() passed to the UPDATE statement."""
-
-    @pytest.mark.asyncio
-    async def test_unreachable_to_reachable_since_is_now(self):
-        """Transition False -> True: new_since should be approximately now."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:10"
-        latest_pings = [(mac, True)]
-        case_states = [(mac, False, None)]
-
-        # We need to capture the actual values passed to the update.
-        # Patch datetime.now to return a fixed time.
-        fixed_now = datetime(2026, 2, 20, 10, 0, 0, tzinfo=timezone.utc)
-        captured_calls = []
-
-        async def capture_execute(stmt):
-            captured_calls.append(stmt)
-            if len(captured_calls) == 1:
-                return _make_fetchall_result(latest_pings)
-            elif len(captured_calls) == 2:
-                return _make_fetchall_result(case_states)
-            return MagicMock()
-
-        session.execute = AsyncMock(side_effect=capture_execute)
-
-        with patch("app.services.case_service.datetime") as mock_dt:
-            mock_dt.now.return_value = fixed_now
-            mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
-            await service.update_ping_status("MAINT-001", session)
-
-        # The third call should be the UPDATE with values
-        assert len(captured_calls) == 3
-        update_stmt = captured_calls[2]
-
-        # Extract compiled parameters from the update statement
-        compiled = update_stmt.compile(
-            compile_kwargs={"literal_binds": False}
-        )
-        params = compiled.params
-
-        assert params["last_ping_reachable"] is True
-        assert params["ping_reachable_since"] == fixed_now
-
-    @pytest.mark.asyncio
-    async def test_reachable_to_reachable_since_unchanged(self):
-        """Transition True -> True with existing since: keep original since."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:11"
-        original_since = datetime(2026, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
-        latest_pings = [(mac, True)]
-        case_states = [(mac, True, original_since)]
-
-        captured_calls = []
-
-        async def capture_execute(stmt):
-            captured_calls.append(stmt)
-            if len(captured_calls) == 1:
-                return _make_fetchall_result(latest_pings)
-            elif len(captured_calls) == 2:
-                return _make_fetchall_result(case_states)
-            return MagicMock()
-
-        session.execute = AsyncMock(side_effect=capture_execute)
-        await service.update_ping_status("MAINT-001", session)
-
-        assert len(captured_calls) == 3
-        update_stmt = captured_calls[2]
-        compiled = update_stmt.compile(compile_kwargs={"literal_binds": False})
-        params = compiled.params
-
-        assert params["last_ping_reachable"] is True
-        assert params["ping_reachable_since"] == original_since
-
-    @pytest.mark.asyncio
-    async def test_reachable_to_unreachable_since_cleared(self):
-        """Transition True -> False: since should be None."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:12"
-        original_since = datetime(2026, 1, 15, 8, 0, 0, tzinfo=timezone.utc)
-        latest_pings = [(mac, False)]
-        case_states = [(mac, True, original_since)]
-
-        captured_calls = []
-
-        async def capture_execute(stmt):
-            captured_calls.append(stmt)
-            if len(captured_calls) == 1:
-                return _make_fetchall_result(latest_pings)
-            elif len(captured_calls) == 2:
-                return _make_fetchall_result(case_states)
-            return MagicMock()
-
-        session.execute = AsyncMock(side_effect=capture_execute)
-        await service.update_ping_status("MAINT-001", session)
-
-        assert len(captured_calls) == 3
-        update_stmt = captured_calls[2]
-        compiled = update_stmt.compile(compile_kwargs={"literal_binds": False})
-        params = compiled.params
-
-        assert params["last_ping_reachable"] is False
-        assert params["ping_reachable_since"] is None
-
-    @pytest.mark.asyncio
-    async def test_no_prior_state_reachable_sets_since(self):
-        """No prior case state + reachable: since set to now."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        mac = "AA:BB:CC:DD:EE:13"
-        fixed_now = datetime(2026, 2, 20, 10, 0, 0, tzinfo=timezone.utc)
-        latest_pings = [(mac, True)]
-        case_states = []  # no prior state
-
-        captured_calls = []
-
-        async def capture_execute(stmt):
-            captured_calls.append(stmt)
-            if len(captured_calls) == 1:
-                return _make_fetchall_result(latest_pings)
-            elif len(captured_calls) == 2:
-                return _make_fetchall_result(case_states)
-            return MagicMock()
-
-        session.execute = AsyncMock(side_effect=capture_execute)
-
-        with patch("app.services.case_service.datetime") as mock_dt:
-            mock_dt.now.return_value = fixed_now
-            mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
-            await service.update_ping_status("MAINT-001", session)
-
-        assert len(captured_calls) == 3
-        update_stmt = captured_calls[2]
-        compiled = update_stmt.compile(compile_kwargs={"literal_binds": False})
-        params = compiled.params
-
-        assert params["last_ping_reachable"] is True
-        assert params["ping_reachable_since"] == fixed_now
-
-    @pytest.mark.asyncio
-    async def test_no_latest_pings_only_commits(self):
-        """When there are no latest ClientRecord pings, only commit is called
-        without any UPDATE statements."""
-        service = CaseService()
-        session = _make_mock_session()
-
-        latest_pings = []  # no records
-        case_states = [("AA:BB:CC:DD:EE:FF", True, None)]
-
-        session.execute = AsyncMock(side_effect=[
-            _make_fetchall_result(latest_pings),
-            _make_fetchall_result(case_states),
-        ])
-
-        await service.update_ping_status("MAINT-001", session)
-
-        # Only 2 execute calls (subquery + case_states), no update
-        assert session.execute.await_count == 2
-        session.commit.assert_awaited_once()
-
-
 # ══════════════════════════════════════════════════════════════════
 # auto_resolve_reachable() tests
 # ══════════════════════════════════════════════════════════════════
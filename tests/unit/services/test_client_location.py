@@ -0,0 +1,80 @@
+"""Tests for MAC location resolution in ClientCollectionService."""
+from collections import namedtuple
+
+from app.services.client_collection_service import ClientCollectionService
+
+CandidateRow = namedtuple(
+    "CandidateRow",
+    "mac_address switch_hostname interface_name vlan_id "
+    "speed duplex link_status acl_number mac_count",
+)
+MAC = "AA:BB:CC:DD:EE:01"
+
+
+def _row(host, iface, mac=MAC, speed=None, acl=None, mac_count=1):
+    return CandidateRow(
+        mac, host, iface, 10, speed, "full" if speed else None,
+        "up" if speed else None, acl, mac_count,
+    )
+
+
+def _locate(rows, neighbors=()):
+    return ClientCollectionService._locate_registered_macs(rows, set(neighbors))
+
+
+class TestLocateRegisteredMacs:
+    def test_single_candidate_keeps_joined_attributes(self):
+        best = _locate([_row("SW-01", "GE1/0/1", mac=MAC.lower(), speed="1G")])
+
+        assert list(best) == [MAC]
+        assert best[MAC].mac_address == MAC.lower()
+        assert (best[MAC].switch_hostname, best[MAC].speed) == ("SW-01", "1G")
+        assert best[MAC].speed_mbps == 1000
+
+    def test_acl_beats_port_channel_and_neighbor_rules(self):
+        rows = [
+            _row("SW-01", "GE1/0/1"),
+            _row("SW-02", "Port-channel1", acl="3001"),
+        ]
+        best = _locate(rows, neighbors=[("SW-02", "Port-channel1")])
+
+        assert best[MAC].switch_hostname == "SW-02"
+        assert best[MAC].acl_rules_applied == "3001"
+
+    def test_access_port_beats_neighbor_port(self):
+        rows = [
+            _row("SW-CORE", "GE1/0/48"),
+            _row("SW-01", "GE1/0/5"),
+        ]
+        best = _locate(rows, neighbors=[("SW-CORE", "GE1/0/48")])
+
+        assert best[MAC].switch_hostname == "SW-01"
+
+    def test_lowest_speed_wins(self):
+        rows = [
+            _row("SW-01", "GE1/0/1", speed="10G"),
+            _row("SW-02", "GE1/0/1", speed="100M"),
+        ]
+        best = _locate(rows)
+
+        assert best[MAC].switch_hostname == "SW-02"
+
+    def test_fewest_macs_per_port_wins(self):
+        rows = [
+            _row("SW-01", "GE1/0/1", mac_count=2),
+            _row("SW-02", "GE1/0/1", mac_count=1),
+        ]
+        best = _locate(rows)
+
+        assert best[MAC].switch_hostname == "SW-02"
+
+    def test_unresolved_tie_clears_location(self):
+        rows = [
+            _row("SW-01", "GE1/0/1"),
+            _row("SW-02", "GE1/0/1"),
+        ]
+        best = _locate(rows)
+
+        assert best[MAC].mac_address == MAC
+        assert best[MAC].switch_hostname is None
+        assert best[MAC].vlan_id is None
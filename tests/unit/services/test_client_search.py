@@ -0,0 +1,118 @@
+"""Tests for the client list trigram index."""
+import random
+
+import pytest
+
+from app.services.client_search import ClientSearchIndex, parse_keywords
+
+WORDS = ["desk", "Printer", "會議室", "AP", "F18", "lab", "東側", "cam"]
+
+
+def _values(rng: random.Random) -> tuple[str, str, str | None]:
+    octets = [rng.choice([0x00, 0xAA, 0x1F, rng.randrange(256)]) for _ in range(6)]
+    mac = ":".join(f"{o:02X}" for o in octets)
+    ip = f"10.{rng.randrange(3)}.{rng.randrange(20)}.{rng.randrange(30)}"
+    desc = None
+    if rng.random() < 0.8:
+        desc = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+    return mac, ip, desc
+
+
+def _expected(rows: dict, keywords: list[str]) -> set[int]:
+    """LIKE '%kw%' 的語意（ASCII 不分大小寫）：某一欄位包含所有關鍵字。"""
+    kws = [kw.lower() for kw in keywords]
+    return {
+        client_id
+        for client_id, values in rows.items()
+        if any(
+            value is not None and all(kw in value.lower() for kw in kws)
+            for value in values
+        )
+    }
+
+
+def _query(rng: random.Random, rows: dict) -> list[str]:
+    keywords = []
+    for _ in range(rng.randint(1, 3)):
+        source = rng.choice(list(rows.values()) or [("AA:00", "10.0", "desk")])
+        value = rng.choice([v for v in source if v] or ["x"])
+        start = rng.randrange(len(value))
+        keyword = value[start:start + rng.randint(1, 6)].strip() or "aa"
+        if rng.random() < 0.3:
+            keyword = keyword.swapcase()
+        keywords.append(keyword)
+    return keywords
+
+
+class TestClientSearchIndex:
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_matches_like_semantics_under_random_updates(self, seed):
+        rng = random.Random(seed)
+        index = ClientSearchIndex()
+        rows: dict[int, tuple] = {}
+
+        for step in range(400):
+            op = rng.random()
+            if op < 0.55 or not rows:
+                client_id = rng.randint(1, 120)
+                rows[client_id] = _values(rng)
+                index.put(client_id, *rows[client_id])
+            elif op < 0.8:
+                client_id = rng.choice(list(rows))
+                mac, ip, desc = rows[client_id]
+                rows[client_id] = (mac, ip, None if desc else rng.choice(WORDS))
+                index.put(client_id, *rows[client_id])
+            elif op < 0.99:
+                client_id = rng.choice(list(rows))
+                del rows[client_id]
+                index.discard(client_id)
+            else:
+                rows.clear()
+                index.clear()
+
+            if step % 5 == 0:
+                keywords = _query(rng, rows)
+                result = index.search(keywords)
+                if all(len(kw) < 3 for kw in keywords):
+                    assert result is None
+                else:
+                    assert result == _expected(rows, keywords), keywords
+
+        assert len(index) == len(rows)
+
+    def test_limit_gives_up_on_broad_queries(self):
+        index = ClientSearchIndex()
+        for i in range(50):
+            index.put(i, f"AA:00:00:00:00:{i:02X}", f"10.0.0.{i}", "desk")
+
+        assert index.search(["desk"], limit=49) is None
+        assert len(index.search(["desk"], limit=50)) == 50
+        assert index.search(["AA:00:00:00:00:1"], limit=49) == set(range(16, 32))
+
+    def test_case_accent_and_width_insensitive(self):
+        index = ClientSearchIndex()
+        index.put(1, "AA:BB:CC:00:00:01", "10.0.0.1", "Café 東側")
+        index.put(2, "AA:BB:CC:00:00:02", "10.0.0.2", "ＡＢＣ lab")
+
+        assert index.search(["aa:bb:cc:00:00:01"]) == {1}
+        assert index.search(["CAFE"]) == {1}
+        assert index.search(["abc"]) == {2}
+        assert index.search(["東側", "caf"]) == {1}
+        assert index.search(["cafe", "lab"]) == set()
+
+    def test_postings_are_compacted(self):
+        index = ClientSearchIndex()
+        for i in range(3000):
+            mac = f"AA:00:00:00:{i >> 8:02X}:{i & 0xFF:02X}"
+            index.put(1, mac, "10.0.0.1", f"desk {i}")
+
+        assert index._entries <= 2 * index._live_entries + 1024
+        assert index.search(["AA:00:00:00:0B:B7"]) == {1}
+        assert index.search(["AA:00:00:00:0B:B6"]) == set()
+
+
+def test_parse_keywords():
+    assert parse_keywords(None) == []
+    assert parse_keywords("   ") == []
+    assert parse_keywords(" aa:bb  10.0 ") == ["aa:bb", "10.0"]
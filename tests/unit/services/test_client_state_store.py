@@ -0,0 +1,89 @@
+"""Tests for the columnar ClientStateTable."""
+from datetime import UTC, datetime, timedelta
+
+from app.db.models import ClientRecord
+from app.services.client_state_store import ClientState, ClientStateTable
+
+T0 = datetime(2026, 3, 1, 8, 0)
+
+
+def _record(id_, mac, at=T0, **kwargs):
+    fields = {
+        "ip_address": "10.0.0.1",
+        "switch_hostname": "SW-01",
+        "interface_name": "GE1/0/1",
+        "vlan_id": 10,
+        "speed": "1G",
+        "duplex": "full",
+        "link_status": "up",
+        "ping_reachable": True,
+    }
+    fields.update(kwargs)
+    return ClientRecord(id=id_, mac_address=mac, collected_at=at, **fields)
+
+
+class TestClientStateTable:
+    def test_round_trips_fields_and_none(self):
+        table = ClientStateTable()
+        full = _record(1, "aa:00:00:00:00:01")
+        empty = _record(
+            2, "AA:00:00:00:00:02", ip_address=None, switch_hostname=None,
+            interface_name=None, vlan_id=None, speed=None, duplex=None,
+            link_status=None, ping_reachable=None,
+        )
+        table.apply([full, empty])
+
+        assert table["AA:00:00:00:00:01"] == ClientState.of(full)
+        assert table["AA:00:00:00:00:02"] == ClientState(*[None] * 8)
+        assert set(table) == {"AA:00:00:00:00:01", "AA:00:00:00:00:02"}
+
+    def test_newer_record_wins_regardless_of_apply_order(self):
+        table = ClientStateTable()
+        old = _record(1, "AA:00:00:00:00:01", interface_name="GE1/0/1")
+        new = _record(
+            5, "AA:00:00:00:00:01", at=T0 + timedelta(minutes=5),
+            interface_name="GE1/0/2",
+        )
+        table.apply([new])
+        table.apply([old])
+
+        assert table["AA:00:00:00:00:01"].interface_name == "GE1/0/2"
+
+    def test_same_time_keeps_smallest_id(self):
+        """同 MAC 多個 client 同時間寫入：與 get_state_at 一樣取 id 最小者。"""
+        table = ClientStateTable()
+        table.apply([
+            _record(8, "AA:00:00:00:00:01", interface_name="GE1/0/8"),
+            _record(3, "AA:00:00:00:00:01", interface_name="GE1/0/3"),
+        ])
+
+        assert table["AA:00:00:00:00:01"].interface_name == "GE1/0/3"
+
+    def test_naive_and_aware_times_compare(self):
+        table = ClientStateTable()
+        table.apply([_record(1, "AA:00:00:00:00:01", interface_name="GE1/0/1")])
+        table.apply([_record(
+            2, "AA:00:00:00:00:01", at=(T0 + timedelta(minutes=1)).replace(tzinfo=UTC),
+            interface_name="GE1/0/2",
+        )])
+
+        assert table["AA:00:00:00:00:01"].interface_name == "GE1/0/2"
+        assert table.covers(T0 + timedelta(minutes=1))
+        assert not table.covers(T0)
+
+    def test_memory_per_100k_clients_is_bounded(self):
+        table = ClientStateTable()
+        table.apply(
+            _record(
+                i, f"AA:BB:CC:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}",
+                ip_address=f"10.{i >> 16 & 0xFF}.{i >> 8 & 0xFF}.{i & 0xFF}",
+                switch_hostname=f"SW-{i % 200:03d}",
+                interface_name=f"GE1/0/{i % 48}",
+                vlan_id=i % 4000,
+            )
+            for i in range(100_000)
+        )
+
+        assert len(table) == 100_000
+        # 模組 docstring 記載約 27 MB / 10 萬個 client
+        assert table.memory_bytes() < 30 * 1024 * 1024
@@ -0,0 +1,205 @@
+"""Tests for the debounced comparison regeneration queue."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import comparison_jobs
+from app.services.comparison_jobs import (
+    get_regeneration,
+    request_regeneration,
+    wait_for_regeneration,
+)
+
+MID = "MAINT-JOBS"
+DEBOUNCE = 0.05
+
+
+@pytest.fixture
+def service():
+    """ClientComparisonService stub；記錄每輪的 macs 與同時執行數。"""
+    stub = MagicMock()
+    stub.calls = []
+    stub.running = 0
+    stub.max_running = 0
+    stub.release = asyncio.Event()
+    stub.release.set()
+
+    async def generate(maintenance_id, session, macs=None):
+        stub.running += 1
+        stub.max_running = max(stub.max_running, stub.running)
+        stub.calls.append(None if macs is None else set(macs))
+        try:
+            await stub.release.wait()
+        finally:
+            stub.running -= 1
+        return ["c"] * (3 if macs is None else len(macs))
+
+    stub.generate_comparisons = AsyncMock(side_effect=generate)
+    stub.save_comparisons = AsyncMock()
+    stub.replace_comparisons = AsyncMock()
+
+    @asynccontextmanager
+    async def session_context():
+        yield MagicMock()
+
+    with (
+        patch.object(comparison_jobs, "ClientComparisonService", return_value=stub),
+        patch.object(comparison_jobs, "get_session_context", session_context),
+        patch.object(
+            comparison_jobs.settings, "comparison_regen_debounce_seconds", DEBOUNCE,
+        ),
+        patch.object(
+            comparison_jobs.settings, "comparison_regen_max_delay_seconds", 1.0,
+        ),
+    ):
+        yield stub
+
+    comparison_jobs._jobs.clear()
+    comparison_jobs._tasks.clear()
+
+
+class TestRegenerationQueue:
+
+    async def test_burst_is_coalesced_into_one_partial_run(self, service):
+        for i in range(50):
+            job = request_regeneration(MID, macs=[f"aa:00:00:00:08:{i:02x}"])
+        assert job.status == "queued"
+        await asyncio.sleep(0)
+        assert service.calls == []
+
+        await wait_for_regeneration(MID)
+
+        assert get_regeneration(MID) is job
+        assert service.calls == [{f"AA:00:00:00:08:{i:02X}" for i in range(50)}]
+        assert (job.status, job.scope, job.runs, job.requests) == (
+            "done", "partial", 1, 50,
+        )
+        assert job.comparisons == 50
+        service.replace_comparisons.assert_awaited_once()
+        service.save_comparisons.assert_not_awaited()
+
+    async def test_full_request_supersedes_macs(self, service):
+        request_regeneration(MID, macs=["AA:00:00:00:08:01"])
+        job = request_regeneration(MID)
+        request_regeneration(MID, macs=["AA:00:00:00:08:02"])
+        assert job.to_dict()["pending_macs"] is None
+
+        await wait_for_regeneration(MID)
+
+        assert service.calls == [None]
+        assert job.scope == "full"
+        service.save_comparisons.assert_awaited_once()
+        service.replace_comparisons.assert_not_awaited()
+
+    async def test_too_many_macs_fall_back_to_full(self, service):
+        request_regeneration(MID, macs=[
+            f"AA:00:00:{i >> 8:02X}:{i & 0xFF:02X}:00"
+            for i in range(comparison_jobs._MAX_PARTIAL_MACS + 1)
+        ])
+        await wait_for_regeneration(MID)
+
+        assert service.calls == [None]
+
+    async def test_requests_while_running_queue_one_more_run(self, service):
+        service.release.clear()
+        job = request_regeneration(MID, macs=["AA:00:00:00:08:01"])
+        while not service.calls:
+            await asyncio.sleep(DEBOUNCE / 5)
+        assert (job.status, job.phase) == ("running", "generating")
+
+        request_regeneration(MID, macs=["AA:00:00:00:08:02"])
+        request_regeneration(MID, macs=["AA:00:00:00:08:03"])
+        assert job.to_dict()["rerun_pending"] is True
+        assert job.status == "running"
+        service.release.set()
+        await wait_for_regeneration(MID)
+
+        assert service.calls == [
+            {"AA:00:00:00:08:01"},
+            {"AA:00:00:00:08:02", "AA:00:00:00:08:03"},
+        ]
+        assert service.max_running == 1
+        assert (job.status, job.runs, job.requests, job.pending) == (
+            "done", 2, 3, False,
+        )
+
+    async def test_continuous_requests_are_bounded_by_max_delay(self, service):
+        with patch.object(
+            comparison_jobs.settings,
+            "comparison_regen_max_delay_seconds",
+            DEBOUNCE * 3,
+        ):
+            for i in range(12):
+                request_regeneration(MID, macs=[f"AA:00:00:00:08:{i:02X}"])
+                await asyncio.sleep(DEBOUNCE / 2)
+            await wait_for_regeneration(MID)
+
+        # 請求從未靜止超過 debounce，仍須在 max_delay 內開始
+        assert len(service.calls) >= 2
+        assert set().union(*service.calls) == {
+            f"AA:00:00:00:08:{i:02X}" for i in range(12)
+        }
+
+    async def test_failure_is_recorded_and_next_request_runs(self, service):
+        service.generate_comparisons.side_effect = RuntimeError("db gone")
+        job = request_regeneration(MID)
+        await wait_for_regeneration(MID)
+
+        assert (job.status, job.error) == ("failed", "db gone")
+
+        service.generate_comparisons.side_effect = None
+        service.generate_comparisons.return_value = []
+        assert request_regeneration(MID) is job
+        await wait_for_regeneration(MID)
+        assert (job.status, job.error, job.runs) == ("done", None, 2)
+
+    async def test_case_sync_runs_in_same_job(self, service):
+        with patch(
+            "app.services.case_service.CaseService.sync_cases",
+            new_callable=AsyncMock,
+        ) as sync:
+            request_regeneration(MID, macs=["AA:00:00:00:08:01"])
+            job = request_regeneration(MID, sync_cases=True)
+            await wait_for_regeneration(MID)
+
+        sync.assert_awaited_once()
+        assert (job.runs, job.sync_cases) == (1, False)
+
+    async def test_failed_macs_are_retried_with_next_request(self, service):
+        service.generate_comparisons.side_effect = RuntimeError("db gone")
+        request_regeneration(MID, macs=["aa:00:00:00:08:01"], sync_cases=True)
+        await wait_for_regeneration(MID)
+        job = get_regeneration(MID)
+        assert job.to_dict()["pending_macs"] == 1
+
+        service.generate_comparisons.side_effect = None
+        service.generate_comparisons.return_value = []
+        with patch(
+            "app.services.case_service.CaseService.sync_cases",
+            new_callable=AsyncMock,
+        ) as sync:
+            request_regeneration(MID, macs=["AA:00:00:00:08:02"])
+            await wait_for_regeneration(MID)
+
+        sync.assert_awaited_once()
+        assert service.generate_comparisons.await_args.kwargs["macs"] == {
+            "AA:00:00:00:08:01", "AA:00:00:00:08:02",
+        }
+        assert (job.status, job.pending_macs) == ("done", set())
+
+    async def test_failed_full_rebuild_stays_full(self, service):
+        service.generate_comparisons.side_effect = RuntimeError("db gone")
+        request_regeneration(MID)
+        await wait_for_regeneration(MID)
+
+        service.generate_comparisons.side_effect = None
+        service.generate_comparisons.return_value = []
+        request_regeneration(MID, macs=["AA:00:00:00:08:01"])
+        await wait_for_regeneration(MID)
+
+        assert service.generate_comparisons.await_args.kwargs["macs"] is None
+        service.save_comparisons.assert_awaited_once()
@@ -0,0 +1,129 @@
+"""Tests for the topology hierarchy layout (graph center via eccentricity bounds)."""
+import random
+from collections import defaultdict
+from unittest.mock import patch
+
+import pytest
+
+from app.services import topology_layout
+from app.services.topology_layout import (
+    _bfs_distances,
+    _graph_center,
+    compute_hierarchy,
+)
+
+PREFIXES = ["CORE", "AGG", "SPN", "LAGG", "EDGE", "FW", "X"]
+
+
+def _brute_force_center(comp: set[str], adj: dict[str, set[str]]) -> set[str]:
+    """原本的做法：每個節點一次 BFS 求離心率。"""
+    eccentricity = {
+        node: max(_bfs_distances(node, adj).values()) for node in comp
+    }
+    min_ecc = min(eccentricity.values())
+    return {h for h, e in eccentricity.items() if e == min_ecc}
+
+
+def _graph(rng: random.Random, n: int, edges: list[tuple[int, int]]):
+    names = [f"{rng.choice(PREFIXES)}-{i}" for i in range(n)]
+    adj: dict[str, set[str]] = defaultdict(set)
+    for a, b in edges:
+        if a != b:
+            adj[names[a]].add(names[b])
+            adj[names[b]].add(names[a])
+    return set(names), adj
+
+
+def _random_tree(rng, n):
+    return [(i, rng.randrange(i)) for i in range(1, n)]
+
+
+def _tree_with_cross_links(rng, n):
+    edges = _random_tree(rng, n)
+    edges += [(rng.randrange(n), rng.randrange(n)) for _ in range(n // 5)]
+    return edges
+
+
+def _sparse_random(rng, n):
+    # 可能不連通：多個分量 + 孤立節點
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(n)]
+
+
+def _cycle(rng, n):
+    return [(i, (i + 1) % n) for i in range(n)]
+
+
+def _grid(rng, n):
+    w = max(2, int(n ** 0.5))
+    return [
+        (i, j) for i in range(n) for j in (i + 1, i + w)
+        if j < n and (j != i + 1 or j % w)
+    ]
+
+
+def _campus(rng, n):
+    """雙 Core、成對 AGG、每台 EDGE 雙歸屬到同組 AGG（少數單歸屬 / 串接）。"""
+    edges = [(0, 1)]
+    n_agg = max(2, n // 20) & ~1
+    for a in range(2, 2 + n_agg):
+        edges += [(a, 0), (a, 1)]
+        if a % 2:
+            edges.append((a - 1, a))
+    for e in range(2 + n_agg, n):
+        pair = 2 + 2 * rng.randrange(n_agg // 2)
+        if rng.random() < 0.1 and e > 2 + n_agg:
+            edges.append((e, rng.randrange(2 + n_agg, e)))
+        else:
+            edges += [(e, pair), (e, pair + 1)]
+    return edges
+
+
+SHAPES = [_random_tree, _tree_with_cross_links, _sparse_random, _cycle, _grid, _campus]
+
+
+@pytest.mark.parametrize("shape", SHAPES, ids=lambda f: f.__name__.strip("_"))
+@pytest.mark.parametrize("seed", range(15))
+def test_center_matches_brute_force(shape, seed):
+    rng = random.Random(seed)
+    n = rng.randint(2, 120)
+    hostnames, adj = _graph(rng, n, shape(rng, n))
+    seen: set[str] = set()
+    for start in sorted(hostnames):
+        if start in seen:
+            continue
+        comp = set(_bfs_distances(start, adj))
+        seen |= comp
+        assert _graph_center(comp, adj) == _brute_force_center(comp, adj)
+
+
+@pytest.mark.parametrize("shape", SHAPES, ids=lambda f: f.__name__.strip("_"))
+@pytest.mark.parametrize("seed", range(10))
+def test_hierarchy_matches_brute_force_center(shape, seed):
+    rng = random.Random(100 + seed)
+    n = rng.randint(2, 80)
+    hostnames, adj = _graph(rng, n, shape(rng, n))
+
+    with patch.object(topology_layout, "_graph_center", _brute_force_center):
+        expected = compute_hierarchy(hostnames, adj)
+
+    assert compute_hierarchy(hostnames, adj) == expected
+
+
+def test_campus_needs_few_sweeps():
+    rng = random.Random(0)
+    n = 2000
+    hostnames, adj = _graph(rng, n, _campus(rng, n))
+    comp = set(_bfs_distances(next(iter(hostnames)), adj))
+
+    sweeps = []
+    real = topology_layout._bfs_distances
+
+    def counting(source, adj):
+        sweeps.append(source)
+        return real(source, adj)
+
+    with patch.object(topology_layout, "_bfs_distances", counting):
+        center = _graph_center(comp, adj)
+
+    assert center == _brute_force_center(comp, adj)
+    assert len(sweeps) <= 10
@@ -0,0 +1,51 @@
+"""Tests for app.db.pagination (cursor codec and seek condition)."""
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import mysql
+
+from app.db.pagination import (
+    InvalidCursorError,
+    SortKey,
+    decode_cursor,
+    encode_cursor,
+    seek_condition,
+)
+
+
+class TestCursorCodec:
+    def test_round_trip_keeps_types(self):
+        values = [
+            0, "AA:BB:CC:00:00:01", datetime(2026, 10, 1, 8, 30),
+            Decimal("1.2500"), 42,
+        ]
+        cursor = encode_cursor(values)
+        assert "=" not in cursor
+        assert decode_cursor(cursor, len(values)) == values
+        assert isinstance(decode_cursor(cursor, len(values))[3], Decimal)
+
+    @pytest.mark.parametrize("cursor", [
+        "not-a-cursor",
+        "%%%",
+        encode_cursor([1, 2]),           # 鍵數不符
+        encode_cursor([1, None, 3]),     # NULL 無法比較
+        encode_cursor([{"$x": 1}, 2, 3]),
+    ])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, 3)
+
+
+class TestSeekCondition:
+    def test_expands_per_key_direction(self):
+        keys = [
+            SortKey(column("a")),
+            SortKey(column("b"), descending=True),
+            SortKey(column("id")),
+        ]
+        sql = str(seek_condition(keys, [1, 2, 3]).compile(
+            dialect=mysql.dialect(), compile_kwargs={"literal_binds": True},
+        ))
+        assert sql == "a > 1 OR a = 1 AND b < 2 OR a = 1 AND b = 2 AND id > 3"